@@ -7,6 +7,8 @@ Responsibilities:
      vector store operations.
   3. Expose three public methods — list_vector_stores, search_vector_store,
      get_file_content — with stable return shapes so callers never change.
+  4. Optionally hedge slow searches (CAS_HEDGE_ENABLED, see utils.hedging).
+  5. Fan one search out across several vector stores (search_vector_stores).
 
 Transport layer
 ---------------
@@ -24,14 +26,18 @@ CASClient can be re-configured per request without passing secrets through
 every call chain.
 """
 
-from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
 import json
 import logging
 import os
 import requests
 import urllib3
 
+from utils.circuit_breaker import CircuitBreaker, get_breaker
 from utils.exceptions import CASClientError
+from utils.hedging import get_hedger, hedging_enabled
 
 logger = logging.getLogger(__name__)
 
@@ -157,6 +163,11 @@ class CASClient:
     # MCP transport
     # ------------------------------------------------------------------
 
+    @staticmethod
+    def _breaker_for(mcp_url: str) -> CircuitBreaker:
+        """Return the shared circuit breaker guarding the CAS host behind *mcp_url*."""
+        return get_breaker(f"cas:{urlsplit(mcp_url).netloc or mcp_url}")
+
     @staticmethod
     def _parse_mcp_sse_response(response: requests.Response) -> Any:
         """Parse an SSE stream from the MCP streamable endpoint.
@@ -229,6 +240,10 @@ class CASClient:
             "Accept": "application/json, text/event-stream",
         }
         timeout = int(os.getenv("CAS_TIMEOUT", "30"))
+        breaker = self._breaker_for(mcp_url)
+        if not breaker.allow_request():
+            logger.debug("mcp_call_rejected tool=%s breaker=%s", tool_name, breaker.name)
+            raise CASClientError(f"CAS circuit breaker open for {mcp_url} — failing fast")
         logger.debug("mcp_call tool=%s url=%s", tool_name, mcp_url)
         try:
             response = requests.post(
@@ -240,14 +255,29 @@ class CASClient:
                 verify=_CAS_VERIFY_SSL,
             )
             response.raise_for_status()
-            return self._parse_mcp_sse_response(response)
+            result = self._parse_mcp_sse_response(response)
         except requests.exceptions.HTTPError as exc:
             status = exc.response.status_code if exc.response is not None else "unknown"
+            # 4xx means CAS answered (bad token, missing CRAC) — only 5xx or
+            # an unknown status counts against the breaker.
+            if not isinstance(status, int) or status >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
             raise CASClientError(f"MCP tool '{tool_name}' failed with HTTP {status}") from exc
         except requests.exceptions.ConnectionError as exc:
+            breaker.record_failure()
             raise CASClientError(f"Could not connect to MCP endpoint {mcp_url}: {exc}") from exc
         except requests.exceptions.Timeout as exc:
+            breaker.record_failure()
             raise CASClientError(f"MCP request to {mcp_url} timed out") from exc
+        except Exception:
+            # Anything unexpected (e.g. a stream dropped mid-parse) still has
+            # to report back, or a half-open probe would never complete.
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return result
 
     def _mcp_arguments(self, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Build the base MCP argument dict (auth_token) for any CAS tool.
@@ -309,6 +339,10 @@ class CASClient:
         """
         if not self.is_configured():
             return {"status": "error", "error": _NOT_CONFIGURED}
+        breaker = self._breaker_for(self._build_mcp_url())
+        if not breaker.allow_request():
+            logger.debug("mcp_tools_list_rejected breaker=%s", breaker.name)
+            return {"status": "error", "error": "CAS circuit breaker open — failing fast"}
         try:
             payload = {
                 "jsonrpc": "2.0",
@@ -332,6 +366,7 @@ class CASClient:
             )
             response.raise_for_status()
             result = self._parse_mcp_sse_response(response)
+            breaker.record_success()
             if result is None:
                 return {"status": "error", "error": "Empty response from tools/list"}
             if isinstance(result, dict) and "error" in result:
@@ -349,15 +384,22 @@ class CASClient:
 
         except requests.exceptions.HTTPError as exc:
             status_code = exc.response.status_code if exc.response is not None else "unknown"
+            if not isinstance(status_code, int) or status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
             logger.warning("mcp_tools_list_http_error status=%s", status_code)
             return {"status": "error", "error": f"tools/list failed with HTTP {status_code}"}
         except requests.exceptions.ConnectionError as exc:
+            breaker.record_failure()
             logger.warning("mcp_tools_list_connection_error error=%r", exc)
             return {"status": "error", "error": f"Could not connect to MCP endpoint: {exc}"}
         except requests.exceptions.Timeout:
+            breaker.record_failure()
             logger.warning("mcp_tools_list_timeout url=%s", self._build_mcp_url())
             return {"status": "error", "error": "tools/list request timed out"}
         except Exception as exc:
+            breaker.record_failure()
             logger.warning("mcp_tools_list_exception error=%r", exc)
             return {"status": "error", "error": str(exc)}
 
@@ -443,11 +485,22 @@ class CASClient:
             if ranking_options is not None:
                 extra["ranking_options"] = ranking_options
 
-            result = self._call_mcp_tool(
-                mcp_url=self._build_mcp_url(),
-                tool_name="search_vector_stores",
-                arguments=self._mcp_arguments(extra),
-            )
+            mcp_url = self._build_mcp_url()
+            arguments = self._mcp_arguments(extra)
+
+            def _search() -> Any:
+                return self._call_mcp_tool(
+                    mcp_url=mcp_url,
+                    tool_name="search_vector_stores",
+                    arguments=arguments,
+                )
+
+            # CAS_HEDGE_ENABLED=true: send a duplicate search once this one
+            # outlives the observed p95, and keep whichever answers first.
+            if hedging_enabled():
+                result = get_hedger(f"cas-search:{urlsplit(mcp_url).netloc}").call(_search)
+            else:
+                result = _search()
             if result is None:
                 return {"status": "error", "error": "Empty response from MCP endpoint"}
 
@@ -474,6 +527,65 @@ class CASClient:
             logger.warning("cas_search_exception error=%r", exc)
             return {"status": "error", "error": str(exc)}
 
+    def search_vector_stores(
+        self,
+        vector_store_ids: List[str],
+        query: str,
+        max_num_results: int = 10,
+        min_score: float = 0.0,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Run ``search_vector_store`` against several stores concurrently.
+
+        Every store is searched in parallel, so the call takes roughly as long
+        as the slowest store — never longer than *timeout* seconds.  Stores
+        that error or miss the deadline are reported in ``stores`` and left
+        out of ``data``; the call only fails if no store answered.
+
+        Each result is a shallow copy tagged with ``vector_store_id`` so the
+        caller can tell which store it came from.
+
+        Returns:
+            ``{"status": "success", "data": [...], "stores": {id: "ok" | "timeout" | "error: ..."}}``
+            or ``{"status": "error", "error": "...", "stores": {...}}`` when
+            every store failed.
+        """
+        if not self.is_configured():
+            return {"status": "error", "error": _NOT_CONFIGURED}
+        if not vector_store_ids:
+            return {"status": "error", "error": "No vector stores to search"}
+
+        pool = ThreadPoolExecutor(max_workers=min(len(vector_store_ids), 16), thread_name_prefix="cas-federated")
+        try:
+            futures = {
+                pool.submit(self.search_vector_store, sid, query, max_num_results, min_score): sid
+                for sid in vector_store_ids
+            }
+            done, _ = wait(futures, timeout=timeout)
+        finally:
+            # Don't block on stragglers — their results are simply dropped.
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        data: List[Dict[str, Any]] = []
+        stores: Dict[str, str] = {}
+        for future, sid in futures.items():
+            if future not in done:
+                stores[sid] = "timeout"
+                continue
+            result = future.result()
+            if result.get("status") != "success":
+                stores[sid] = f"error: {result.get('error')}"
+                continue
+            stores[sid] = "ok"
+            data.extend({**r, "vector_store_id": sid} for r in result.get("data", []) if isinstance(r, dict))
+
+        failed = {sid: state for sid, state in stores.items() if state != "ok"}
+        if failed:
+            logger.warning("cas_federated_search partial stores=%r", failed)
+        if len(failed) == len(stores):
+            return {"status": "error", "error": "No vector store answered the search", "stores": stores}
+        return {"status": "success", "data": data, "stores": stores}
+
     def get_file_content(
         self,
         vector_store_id: str,
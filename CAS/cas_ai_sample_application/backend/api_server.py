@@ -5,13 +5,17 @@ Production-ready API with security, validation, and proper error handling
 """
 
 import asyncio
+import hmac
 import json
 import logging
 import os
+import queue
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Request, status
@@ -24,9 +28,23 @@ import uvicorn
 from agents.cas_client import CASClient
 from llm_service import LLMService
 from session_store import SessionStore, Turn
+from utils.circuit_breaker import breaker_states
 from utils.exceptions import ConfigurationError
+from utils.hedging import hedger_states
+from utils.profiling import (
+    PROFILE_HEADER,
+    PROFILE_ID_HEADER,
+    RequestProfiler,
+    profile_store,
+    profiling_enabled,
+    should_profile,
+)
 from utils.prompt_builder import NO_DOCS_ANSWER
 from utils.query import _NAMED_ENTITY, split_query
+from utils.source_cache import get_source_cache, source_cache_key
+from utils.speculation import speculation_state
+from utils.stream_coalescer import coalesce_from_env
+from utils.token_usage import process_usage
 from utils.validators import InputValidator, ValidationError
 
 # Load environment variables
@@ -59,10 +77,33 @@ def SESSION_ENABLED() -> bool:  # type: ignore[override]
     """Return whether session handling is currently active."""
     return _session_state["enabled"]
 
+# Batch endpoint limits — see POST /api/query/batch.
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+# Startup warm-up: tool discovery, vector-store resolution and the LLM
+# compatibility probe run in the background before traffic.  /api/ready
+# reports 503 until it finishes, so rolling deploys only route to warm pods.
+# Mutable container for the same reason as _session_state.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() not in ("false", "0", "no")
+_readiness: Dict[str, Any] = {"ready": False, "warmup": None}
+
 SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "3600"))
 SESSION_SWEEP_INTERVAL_SECONDS = int(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "300"))
 session_store = SessionStore(ttl_seconds=SESSION_TTL_SECONDS)
 
+# Hybrid compaction (SESSION_COMPACTION_MODE=hybrid) refines the extractive
+# summary with the LLM off the request path.  One worker keeps those
+# summarisation calls from competing with live traffic.
+_compaction_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="compaction")
+
+# Source preview — see GET /api/source/{vector_store_id}/{file_id}.  While an
+# answer streams, the content of its top SOURCE_PREWARM_FILES retrieved files
+# is fetched into the disk cache in the background.  Opt-in: each pre-warmed
+# file is a CAS fetch the user may never click, so the default 0 disables it.
+SOURCE_PREWARM_FILES = int(os.getenv("SOURCE_PREWARM_FILES", "0"))
+_source_prewarm_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="source-prewarm")
+
 
 def _apply_compaction(llm: LLMService, session_id: str, session) -> None:
     """Run compaction for *session* if it's over budget and persist the result.
@@ -77,9 +118,146 @@ def _apply_compaction(llm: LLMService, session_id: str, session) -> None:
     if plan is not None:
         session_store.set_summary(session_id, plan["summary"], plan["turns_to_keep"])
         logger.debug(
-            "session_compacted id=%s kept_turns=%d",
-            session_id, len(plan["turns_to_keep"]),
+            "session_compacted id=%s mode=%s kept_turns=%d",
+            session_id, plan.get("mode", "llm"), len(plan["turns_to_keep"]),
         )
+        if plan.get("mode") == "hybrid":
+            _compaction_pool.submit(_refine_compaction, llm, session_id, plan)
+
+
+def _refine_compaction(llm: LLMService, session_id: str, plan: Dict[str, Any]) -> None:
+    """Replace a hybrid plan's extractive summary with an LLM-written one.
+
+    Runs on _compaction_pool.  The swap is conditional: if the session was
+    compacted again while the LLM was working, the refinement is dropped.
+    """
+    try:
+        summary = llm._summarise_turns_with_llm(plan["turns_folded"], plan["prior_summary"])
+    except Exception:
+        logger.exception("compaction_refine_failed id=%s", session_id)
+        return
+    if summary is None:
+        logger.debug("compaction_refine_skipped id=%s llm_failure", session_id)
+        return
+    replaced = session_store.refine_summary(session_id, plan["summary"], summary)
+    logger.debug("compaction_refined id=%s replaced=%s", session_id, replaced)
+
+
+def _cited_chunk(chunks: List[Dict[str, Any]], source_number: Optional[int]) -> Optional[Dict[str, Any]]:
+    """Map the model's [SOURCE: N] citation back to the cited chunk."""
+    chunk = next((c for c in chunks if c["index"] == source_number), None)
+    if chunk is None and len(chunks) == 1:
+        chunk = chunks[0]
+    return chunk
+
+
+def _source_marker(chunk: Dict[str, Any], vector_store_id: str) -> Dict[str, Any]:
+    """Build the [SOURCE] payload; file ids let the client open /api/source."""
+    payload: Dict[str, Any] = {"source_name": chunk["source"]}
+    if chunk.get("file_id"):
+        payload["vector_store_id"] = chunk.get("vector_store_id") or vector_store_id
+        payload["file_id"] = chunk["file_id"]
+    return payload
+
+
+def _fetch_source_content(client: CASClient, vector_store_id: str, file_id: str) -> bytes:
+    """Load one document from CAS as UTF-8 bytes; 502 when CAS cannot provide it."""
+    result = client.get_file_content(vector_store_id, file_id)
+    if result.get("status") != "success":
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Could not fetch source from CAS: {result.get('error', 'unknown error')}",
+        )
+    return result["content"].encode("utf-8")
+
+
+def _prewarm_sources(
+    client: CASClient,
+    api_key: str,
+    cas_endpoint: str,
+    vector_store_id: str,
+    chunks: List[Dict[str, Any]],
+    limit: int,
+) -> None:
+    """Fetch the top *limit* distinct files behind *chunks* into the source cache.
+
+    Runs the fetches on _source_prewarm_pool so the answer keeps streaming.
+    Nothing here touches the cache itself — opening it does disk I/O that
+    must not fail or stall the stream — so each task looks it up, skips
+    files already cached and only logs failures.
+    """
+    if limit <= 0:
+        return
+    seen = set()
+    for chunk in chunks:
+        file_id = chunk.get("file_id")
+        if not file_id:
+            continue
+        store_id = chunk.get("vector_store_id") or vector_store_id
+        if (store_id, file_id) in seen:
+            continue
+        seen.add((store_id, file_id))
+        key = source_cache_key(cas_endpoint, api_key, store_id, file_id)
+        _source_prewarm_pool.submit(_prewarm_one_source, key, client, store_id, file_id)
+        if len(seen) >= limit:
+            break
+
+
+def _prewarm_one_source(key: str, client: CASClient, vector_store_id: str, file_id: str) -> None:
+    try:
+        cache = get_source_cache()
+        if not cache.enabled or key in cache:
+            return
+        cache.get_or_load(key, lambda: _fetch_source_content(client, vector_store_id, file_id))
+    except Exception as exc:
+        logger.debug("source_prewarm_failed file_id=%s error=%r", file_id, exc)
+
+
+def _store_answer_turn(
+    llm: LLMService,
+    session_id: str,
+    session,
+    query: str,
+    answer: str,
+    source_name: Optional[str],
+) -> None:
+    """Append an answered question to the session, then compact if over budget."""
+    # Strip any leaked FULL_ANSWER: prefix so the history block
+    # stays clean regardless of model format compliance.
+    stored_answer = re.sub(
+        r'^FULL_ANSWER:\s*', '', answer, flags=re.IGNORECASE
+    ).strip()
+    session_store.add_turn(
+        session_id,
+        Turn(
+            query=query,
+            answer=stored_answer,
+            sources=[source_name] if source_name else [],
+        ),
+    )
+    _apply_compaction(llm, session_id, session)
+
+
+def _resolve_store_scope(
+    llm: LLMService,
+    vector_store_ids: Optional[List[str]],
+) -> Union[str, Dict[str, Any]]:
+    """Decide which vector store(s) a request searches.
+
+    With ``vector_store_ids`` the list (``"*"`` expanded) is set on *llm* so
+    its CAS search tool fans out across every store; the first id is still
+    returned as the pipeline's nominal store.  Otherwise falls back to the
+    single configured or first-available store.  Returns an error dict when
+    nothing can be resolved.
+    """
+    if vector_store_ids:
+        ids = llm.resolve_vector_store_ids(vector_store_ids)
+        if isinstance(ids, dict):
+            return ids
+        llm.vector_store_ids = ids if len(ids) > 1 else None
+        logger.debug("federated_search stores=%r", ids)
+        return ids[0]
+    return llm.vector_store_id or llm._get_vector_store_id()
 
 
 async def _sweep_expired_sessions_loop() -> None:
@@ -97,26 +275,65 @@ async def _sweep_expired_sessions_loop() -> None:
             logger.warning("session_sweep_error error=%r", exc)
 
 
+def _warm_up() -> Dict[str, Any]:
+    """Fill the LLMService warm caches using the server's own .env credentials.
+
+    CAS credentials normally arrive per request; CAS_API_KEY / CAS_ENDPOINT
+    in .env are optional here and only used to pre-discover tools and
+    pre-resolve the default vector store.  Without them only the LLM
+    compatibility probe runs.
+    """
+    cas_client = CASClient()
+    api_key = os.getenv("CAS_API_KEY")
+    cas_endpoint = os.getenv("CAS_ENDPOINT")
+    if api_key and cas_endpoint:
+        cas_client.configure(api_key=api_key, cas_endpoint=cas_endpoint)
+    return LLMService(cas_client).warm_up()
+
+
+async def _run_warm_up() -> None:
+    """Run _warm_up off the event loop, then mark the process ready.
+
+    A failed warm-up still marks the process ready — the caches simply stay
+    cold and fill on first use, exactly as if warm-up were disabled.
+    """
+    start = time.perf_counter()
+    try:
+        report = await asyncio.to_thread(_warm_up)
+    except Exception as exc:
+        logger.warning("warmup_failed error=%r", exc)
+        report = {"error": str(exc)}
+    report["elapsed_ms"] = _elapsed_ms(start)
+    _readiness["warmup"] = report
+    _readiness["ready"] = True
+    logger.info("warmup_complete elapsed_ms=%s", report["elapsed_ms"])
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup/shutdown hooks, replacing the deprecated @app.on_event API.
 
     Startup: launch the background TTL sweep for expired sessions (only when
-    SESSION_ENABLED=true).
-    Shutdown: cancel it cleanly so process exit isn't left waiting on it.
+    SESSION_ENABLED=true) and the warm-up task (only when WARMUP_ENABLED=true).
+    Shutdown: cancel both cleanly so process exit isn't left waiting on them.
     """
+    background = []
     if SESSION_ENABLED():
-        sweep_task = asyncio.create_task(_sweep_expired_sessions_loop())
+        background.append(asyncio.create_task(_sweep_expired_sessions_loop()))
     else:
         logger.info("session_disabled — history, compaction, and TTL sweep are all off")
-        sweep_task = None
+    if WARMUP_ENABLED:
+        _readiness["ready"] = False
+        background.append(asyncio.create_task(_run_warm_up()))
+    else:
+        _readiness["ready"] = True
     try:
         yield
     finally:
-        if sweep_task is not None:
-            sweep_task.cancel()
+        for task in background:
+            task.cancel()
             try:
-                await sweep_task
+                await task
             except asyncio.CancelledError:
                 pass
 
@@ -218,12 +435,26 @@ class AuthValidationResponse(BaseModel):
     vector_stores: Optional[List[Dict[str, Any]]] = Field(None, description="Available vector stores")
 
 
+def _validate_store_ids(v: Optional[List[str]]) -> Optional[List[str]]:
+    """Shared check for the federated ``vector_store_ids`` field."""
+    if v is None:
+        return v
+    cleaned = [s.strip() for s in v]
+    if any(not s or len(s) > 200 for s in cleaned):
+        raise ValueError("vector_store_ids entries must be 1-200 characters")
+    return cleaned
+
+
 class QueryRequest(CASCredentialsBase):
     """Query request for the RAG pipeline — includes CAS credentials and search parameters."""
     query: str = Field(..., min_length=1, max_length=8000, description="User query")
     max_results: Optional[int] = Field(10, ge=1, le=50, description="Maximum results to retrieve")
     min_score: Optional[float] = Field(0.3, ge=0.0, le=1.0, description="Minimum relevance score")
     vector_store_id: Optional[str] = Field(None, max_length=200, description="Vector store ID to query")
+    vector_store_ids: Optional[List[str]] = Field(
+        None, min_length=1, max_length=50,
+        description='Federated search — store IDs to search together, or ["*"] for every store',
+    )
     session_id: Optional[str] = Field(None, description="Existing session id, if continuing a conversation")
 
     @field_validator('query', mode='before')
@@ -235,6 +466,11 @@ class QueryRequest(CASCredentialsBase):
         except ValidationError as exc:
             raise ValueError(str(exc)) from exc
 
+    @field_validator('vector_store_ids')
+    @classmethod
+    def validate_vector_store_ids(cls, v):
+        return _validate_store_ids(v)
+
     @field_validator('session_id', mode='before')
     @classmethod
     def validate_session_id_field(cls, v):
@@ -246,6 +482,49 @@ class QueryRequest(CASCredentialsBase):
             raise ValueError(str(exc)) from exc
 
 
+class BatchQuestion(BaseModel):
+    """One question in a batch request."""
+    query: str = Field(..., min_length=1, max_length=8000, description="User query")
+    session: Optional[str] = Field(
+        None, min_length=1, max_length=100,
+        description="Group label — questions sharing a label run in order against one conversation session",
+    )
+
+    @field_validator('query', mode='before')
+    @classmethod
+    def validate_query(cls, v):
+        """Sanitize query — strip HTML/script tags."""
+        try:
+            return InputValidator.validate_query(v)
+        except ValidationError as exc:
+            raise ValueError(str(exc)) from exc
+
+
+class BatchQueryRequest(CASCredentialsBase):
+    """Batch request — many questions run through the same RAG pipeline."""
+    questions: List[BatchQuestion] = Field(..., min_length=1, description="Questions to answer")
+    max_results: Optional[int] = Field(10, ge=1, le=50, description="Maximum results to retrieve")
+    min_score: Optional[float] = Field(0.3, ge=0.0, le=1.0, description="Minimum relevance score")
+    vector_store_id: Optional[str] = Field(None, max_length=200, description="Vector store ID to query")
+    vector_store_ids: Optional[List[str]] = Field(
+        None, min_length=1, max_length=50,
+        description='Federated search — store IDs to search together, or ["*"] for every store',
+    )
+    concurrency: Optional[int] = Field(None, ge=1, le=32, description="Parallel workers (default BATCH_CONCURRENCY)")
+
+    @field_validator('questions')
+    @classmethod
+    def validate_batch_size(cls, v):
+        if len(v) > BATCH_MAX_QUESTIONS:
+            raise ValueError(f"Batch exceeds BATCH_MAX_QUESTIONS={BATCH_MAX_QUESTIONS}")
+        return v
+
+    @field_validator('vector_store_ids')
+    @classmethod
+    def validate_vector_store_ids(cls, v):
+        return _validate_store_ids(v)
+
+
 # Exception Handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -285,15 +564,38 @@ async def root() -> Dict[str, str]:
 
 
 @app.get("/health", response_model=Dict[str, Any])
+@app.get("/api/health", response_model=Dict[str, Any])
 async def health() -> Dict[str, Any]:
-    """Health check endpoint for Kubernetes liveness and readiness probes."""
+    """Health check endpoint for Kubernetes liveness and readiness probes.
+
+    Also reports every CAS / LLM circuit breaker seen so far, so an operator
+    can tell "backend down, failing fast" apart from "backend slow", and the
+    LLM tokens this process has used, by call type, and how often
+    speculative retry searches were used or wasted.
+    """
     return {
         "status": "ok",
         "version": "1.0.0",
         "timestamp": datetime.now(timezone.utc).isoformat(),
+        "circuit_breakers": breaker_states(),
+        "hedging": hedger_states(),
+        "token_usage": process_usage.snapshot(),
+        "speculation": speculation_state(),
     }
 
 
+@app.get("/api/ready")
+async def readiness():
+    """Readiness probe — 503 until the startup warm-up has finished.
+
+    Point the Kubernetes readinessProbe here (and the livenessProbe at
+    /health) so a new pod only receives traffic once its caches are warm.
+    """
+    if not _readiness["ready"]:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"ready": False})
+    return {"ready": True, "warmup": _readiness["warmup"]}
+
+
 @app.post("/api/auth/validate", response_model=AuthValidationResponse)
 async def validate_authentication(auth_request: CASCredentialsBase):
     """
@@ -342,6 +644,9 @@ async def check_llm_compatibility():
     Returns compatible=True if the model reliably emits FULL_ANSWER: / [SOURCE: N].
     Returns compatible=False with a reason if it does not — callers should surface
     this as a non-blocking warning to the user.
+
+    The probe result is cached (LLM_COMPAT_CACHE_TTL_SECONDS) and usually
+    already computed by the startup warm-up, so this rarely costs an LLM call.
     """
     try:
         llm = LLMService()
@@ -350,6 +655,44 @@ async def check_llm_compatibility():
     return llm.check_model_compatibility()
 
 
+def _require_profiling_admin(request: Request) -> None:
+    """404 unless profiling is on; 403 while PROFILING_ADMIN_TOKEN is unset; 401 if it is not presented."""
+    if not profiling_enabled():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled")
+    token = os.getenv("PROFILING_ADMIN_TOKEN", "")
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Set PROFILING_ADMIN_TOKEN to use the profiling endpoints",
+        )
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token")
+
+
+@app.get("/api/admin/profiles")
+async def list_profiles(request: Request) -> Dict[str, Any]:
+    """List recorded request profiles, newest first (timings only)."""
+    _require_profiling_admin(request)
+    return {"profiles": profile_store.list()}
+
+
+@app.get("/api/admin/profiles/{request_id}")
+async def get_profile(request_id: str, request: Request, format: str = "json"):
+    """Return one profile: ``format=json`` for timings and top functions,
+    ``format=prof`` for the raw pstats file (``python -m pstats <file>``)."""
+    _require_profiling_admin(request)
+    record = profile_store.get(request_id)
+    if record is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    if format == "prof":
+        return Response(
+            content=record["stats"],
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{request_id}.prof"'},
+        )
+    return {k: v for k, v in record.items() if k != "stats"}
+
+
 @app.get("/api/session/status")
 async def get_session_status():
     """Return whether session/history handling is currently enabled."""
@@ -384,9 +727,305 @@ async def delete_session(session_id: str):
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
+_SOURCE_API_KEY_HEADER = "X-CAS-Api-Key"
+_SOURCE_ENDPOINT_HEADER = "X-CAS-Endpoint"
+_BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_byte_range(header: str, total: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``Range: bytes=`` spec into an inclusive (start, end).
+
+    Returns None when the header should be ignored (another unit, several
+    ranges) so the whole document is served; raises ValueError when the
+    range cannot be satisfied.
+    """
+    match = _BYTE_RANGE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        raise ValueError("empty range")
+    if not first:
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0 or total == 0:
+            raise ValueError("unsatisfiable range")
+        return max(0, total - length), total - 1
+    start = int(first)
+    end = int(last) if last else total - 1
+    if start >= total or end < start:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, total - 1)
+
+
+@app.get("/api/source/{vector_store_id}/{file_id}")
+async def get_source(
+    vector_store_id: str,
+    file_id: str,
+    request: Request,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+):
+    """Return the content of a cited source document.
+
+    CAS credentials travel in the ``X-CAS-Api-Key`` / ``X-CAS-Endpoint``
+    headers.  Content is served from the on-disk source cache
+    (utils.source_cache) and fetched from CAS on a miss.
+
+    Partial reads use either a standard ``Range: bytes=...`` header or the
+    ``offset`` / ``length`` query parameters (byte offsets, for clients that
+    page through a long document); both answer 206 with ``Content-Range``.
+    Every response carries a strong ``ETag``; ``If-None-Match`` answers 304.
+    """
+    try:
+        api_key = InputValidator.validate_token(request.headers.get(_SOURCE_API_KEY_HEADER))
+        cas_endpoint = InputValidator.validate_endpoint_url(request.headers.get(_SOURCE_ENDPOINT_HEADER))
+    except ValidationError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    if not (0 < len(vector_store_id) <= 200 and 0 < len(file_id) <= 200):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid source id")
+    if (offset is not None and offset < 0) or (length is not None and length < 1):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid offset or length")
+
+    client = _build_cas_client(api_key, cas_endpoint)
+    key = source_cache_key(cas_endpoint, api_key, vector_store_id, file_id)
+    # get_source_cache() builds the cache on first use, which scans and
+    # re-hashes the cache directory — keep that off the event loop too.
+    data, etag = await asyncio.to_thread(
+        lambda: get_source_cache().get_or_load(
+            key, lambda: _fetch_source_content(client, vector_store_id, file_id),
+        )
+    )
+
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and etag in (t.strip() for t in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    total = len(data)
+    byte_range: Optional[Tuple[int, int]] = None
+    try:
+        if not total:
+            pass  # nothing to slice; serve the empty document whole
+        elif offset is not None or length is not None:
+            start = offset or 0
+            if start >= total:
+                raise ValueError("offset past end")
+            end = total - 1 if length is None else min(total - 1, start + length - 1)
+            byte_range = (start, end)
+        elif request.headers.get("Range"):
+            byte_range = _parse_byte_range(request.headers["Range"], total)
+    except ValueError:
+        return Response(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "Content-Range": f"bytes */{total}"},
+        )
+
+    media_type = "text/plain; charset=utf-8"
+    if byte_range is None:
+        return Response(content=data, media_type=media_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+    return Response(
+        content=data[start:end + 1],
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+_META_HISTORY_PROMPT = (
+    "{history_block}\n\n"
+    'The user now asks: "{question}"\n\n'
+    "Answer using only the conversation history above. "
+    "If the user asks for all prior questions, list the user questions in order. "
+    "Do not use document sources."
+)
+
+
+def _answer_query(
+    llm: LLMService,
+    query: str,
+    vector_store_id: str,
+    max_results: int,
+    min_score: float,
+    session_id: Optional[str],
+    stream: bool,
+) -> Iterator[Tuple[str, Any]]:
+    """Answer *query* — split into its sub-questions — as a stream of events.
+
+    The question pipeline shared by /api/query/stream and /api/query/batch,
+    so both answer a given question the same way.  Events, in order, per
+    sub-question:
+
+      ("question", {"index", "total", "query"})  a sub-question starts
+      ("text", str)       answer text to show (tokens when *stream* is true)
+      ("chunks", list)    retrieval finished with these chunks
+      ("answer", dict)    the sub-question's result: status ok / no_docs /
+                          error, answer, source, cited chunk, timings_ms
+
+    The turn is recorded in *session_id* (if any) after its "answer" event,
+    so a consumer can flush its output first.  An "error" result (the LLM
+    is unavailable) ends the sequence.
+    """
+    queries = split_query(query)
+    session = session_store.get(session_id) if session_id else None
+    for idx, q in enumerate(queries, 1):
+        yield "question", {"index": idx, "total": len(queries), "query": q}
+        for kind, data in _answer_part(
+            llm, q, vector_store_id, max_results, min_score, session_id, session, stream,
+        ):
+            yield kind, data
+            if kind == "answer" and data["status"] == "error":
+                return
+
+
+def _answer_part(
+    llm: LLMService,
+    q: str,
+    vector_store_id: str,
+    max_results: int,
+    min_score: float,
+    session_id: Optional[str],
+    session,
+    stream: bool,
+) -> Iterator[Tuple[str, Any]]:
+    """Answer one sub-question for _answer_query.
+
+    Meta history questions, query resolution against session history, the
+    retrieval loop, synthesis and recording the turn.  With *stream* the
+    synthesis tokens are emitted as they arrive (regrouped by the stream
+    coalescer); otherwise the LLM is asked once, through its answer cache.
+    """
+    start = time.perf_counter()
+    timings: Dict[str, float] = {}
+    history_block = llm._build_history_block(session)
+
+    if _is_meta_history_question(q):
+        stage = time.perf_counter()
+        if history_block:
+            answer = llm._ask_llm(
+                _META_HISTORY_PROMPT.format(history_block=history_block, question=q),
+                call_type="synthesis",
+            ) or "I couldn't retrieve the conversation history right now."
+        else:
+            answer = "There is no conversation history yet."
+        timings["synthesis"] = _elapsed_ms(stage)
+        timings["total"] = _elapsed_ms(start)
+        yield "text", answer
+        if answer.startswith("[LLM_"):
+            yield "answer", {"status": "error", "error": answer, "timings_ms": timings}
+            return
+        yield "answer", {"status": "ok", "answer": answer, "source": None, "cited": None, "timings_ms": timings}
+        if session_id:
+            session_store.add_turn(session_id, Turn(query=q, answer=answer, sources=["[meta]"]))
+            _apply_compaction(llm, session_id, session)
+        return
+
+    # Resolve against the history block frozen above rather than the live
+    # session, so turns added for earlier sub-questions of this same query
+    # do not shift the rewrite context.
+    stage = time.perf_counter()
+    resolved_query = llm._resolve_query_from_block(q, history_block)
+    logger.debug("turn_start original=%r resolved=%r", q, resolved_query)
+
+    # Persist the subject from the ORIGINAL question (q), not the
+    # filler-stripped resolved_query. After stripping "What about"
+    # from "What about Tennessee — how many cases?", the result starts
+    # with "Tennessee" — making it the FIRST word, which _NAMED_ENTITY
+    # (non-first-word pattern) would miss. Using q preserves "What
+    # about Tennessee…" where "Tennessee" is still a non-first word.
+    # Bare fragments ("Organizations?") and pronoun follow-ups have no
+    # capitalised non-first word in q either, so they still pass through.
+    if session_id and _NAMED_ENTITY.search(q):
+        resolved_subject = llm._extract_subject_from_text(q)
+        if resolved_subject:
+            session_store.set_active_subject(session_id, resolved_subject)
+    timings["rewrite"] = _elapsed_ms(stage)
+
+    stage = time.perf_counter()
+    loop_result = llm._run_retrieval_loop(
+        query=resolved_query,
+        vector_store_id=vector_store_id,
+        max_results=max_results,
+        min_score=min_score,
+        history_block=history_block,
+    )
+    timings["retrieval"] = _elapsed_ms(stage)
+
+    chunks = loop_result["chunks"]
+    if not chunks:
+        timings["total"] = _elapsed_ms(start)
+        yield "text", NO_DOCS_ANSWER
+        yield "answer", {"status": "no_docs", "answer": NO_DOCS_ANSWER, "source": None, "cited": None, "timings_ms": timings}
+        return
+    yield "chunks", chunks
+
+    stage = time.perf_counter()
+    if loop_result.get("final_prompt") is None and "answer_text" in loop_result:
+        # answer_text may contain internal verification reasoning before
+        # FULL_ANSWER: — parse it first, then show only the clean answer.
+        full_response = loop_result["answer_text"]
+        streamed = False
+    elif stream:
+        full_response = ""
+        streamed = True
+        # Tokens are regrouped into larger writes (STREAM_FLUSH_CHARS /
+        # STREAM_FLUSH_MS).  The coalescer is fully drained when this loop
+        # ends, so whatever the consumer writes next goes out immediately.
+        for chunk in coalesce_from_env(llm._call_llm(loop_result["final_prompt"], call_type="synthesis")):
+            full_response += chunk
+            yield "text", chunk
+            if full_response.startswith("[LLM_"):
+                break
+    else:
+        full_response = llm._ask_llm(loop_result["final_prompt"], call_type="synthesis")
+        streamed = False
+    timings["synthesis"] = _elapsed_ms(stage)
+    timings["total"] = _elapsed_ms(start)
+
+    if full_response.startswith("[LLM_"):
+        if not streamed:
+            yield "text", full_response
+        yield "answer", {"status": "error", "error": full_response, "timings_ms": timings}
+        return
+
+    structured = llm._parse_structured_answer(full_response)
+    answer = structured.get("answer", full_response)
+    if not streamed:
+        yield "text", answer
+    src_num = structured.get("source_number")
+    cited = _cited_chunk(chunks, src_num)
+    source_name = cited["source"] if cited is not None else None
+    logger.debug(
+        "turn_end chunks=%d cited_src_num=%r cited_source=%r answer_prefix=%r",
+        len(chunks), src_num, source_name, answer[:80] if answer else "",
+    )
+    yield "answer", {
+        "status": "ok",
+        "answer": answer,
+        "source": source_name,
+        "cited": cited,
+        "resolved_query": resolved_query,
+        "iterations": loop_result.get("iterations"),
+        "timings_ms": timings,
+    }
+    if session_id:
+        _store_answer_turn(llm, session_id, session, q, answer, source_name)
+
+
 @app.post("/api/query/stream")
-async def query_llm_stream(request: QueryRequest):
-    """Streaming LLM query — streams tokens as the LLM generates them."""
+async def query_llm_stream(request: QueryRequest, http_request: Request):
+    """Streaming LLM query — streams tokens as the LLM generates them.
+
+    With PROFILING_ENABLED=true, a request carrying ``X-Profile: true`` (or
+    picked by PROFILING_SAMPLE_RATE) is run under the profiler; its id is
+    returned in ``X-Profile-Id`` — see /api/admin/profiles.
+    """
     logger.debug("stream_query cas_endpoint=%s query_len=%d", request.cas_endpoint, len(request.query))
 
     temp_agent = _build_cas_client(request.cas_api_key, request.cas_endpoint)
@@ -416,12 +1055,10 @@ async def query_llm_stream(request: QueryRequest):
     # --------------------------------------------------------------------------
 
     def generate():
-        queries = split_query(request.query)
-        total = len(queries)
         max_r = request.max_results or temp_llm.default_max_results
         min_score = request.min_score if request.min_score is not None else temp_llm.default_min_score
 
-        vector_store_id = temp_llm.vector_store_id or temp_llm._get_vector_store_id()
+        vector_store_id = _resolve_store_scope(temp_llm, request.vector_store_ids)
         if isinstance(vector_store_id, dict):
             logger.warning("stream_query could not resolve vector store: %s", vector_store_id.get("error"))
             yield "[ERROR: Could not resolve vector store]\n"
@@ -429,135 +1066,216 @@ async def query_llm_stream(request: QueryRequest):
 
         yield "[THINKING]"
 
-        for idx, q in enumerate(queries, 1):
-            yield f"**{q}**\n\n"
-
-            current_history_block = temp_llm._build_history_block(session)
-
-            if _is_meta_history_question(q):
-                if current_history_block:
-                    meta_prompt = (
-                        f"{current_history_block}\n\n"
-                        f'The user now asks: "{q}"\n\n'
-                        "Answer using only the conversation history above. "
-                        "If the user asks for all prior questions, list the user questions in order. "
-                        "Do not use document sources."
-                    )
-                    clean_answer = temp_llm._ask_llm(meta_prompt)
-                    if clean_answer.startswith("[LLM_"):
-                        yield clean_answer
-                        return
-                    if not clean_answer:
-                        clean_answer = "I couldn't retrieve the conversation history right now."
-                else:
-                    clean_answer = "There is no conversation history yet."
-
-                yield clean_answer
-                if SESSION_ENABLED():
-                    session_store.add_turn(
-                        active_session_id,
-                        Turn(query=q, answer=clean_answer, sources=["[meta]"]),
+        total = 1
+        for kind, data in _answer_query(
+            temp_llm, request.query, vector_store_id, max_r, min_score,
+            active_session_id, stream=True,
+        ):
+            if kind == "question":
+                idx, total = data["index"], data["total"]
+                yield f"**{data['query']}**\n\n"
+            elif kind == "text":
+                yield data
+            elif kind == "chunks":
+                # Start fetching the likely-cited documents now, while the answer
+                # is generated, so a click-through on [SOURCE] is served locally.
+                _prewarm_sources(
+                    temp_agent, request.cas_api_key, request.cas_endpoint,
+                    vector_store_id, data, SOURCE_PREWARM_FILES,
+                )
+            elif kind == "answer":
+                if data["status"] == "error":
+                    return
+                cited = data.get("cited")
+                if data.get("source"):
+                    # Usually a no-op — the cited file was among the pre-warmed ones.
+                    _prewarm_sources(
+                        temp_agent, request.cas_api_key, request.cas_endpoint,
+                        vector_store_id, [cited], min(1, SOURCE_PREWARM_FILES),
                     )
-                    _apply_compaction(temp_llm, active_session_id, session)
+                    yield f"\n[SOURCE]{json.dumps(_source_marker(cited, vector_store_id))}"
                 if total > 1 and idx < total:
                     yield "\n\n---\n\n"
-                continue
-
-            # Pass the frozen history block to _resolve_query rather than the
-            # live session so that add_turn calls from earlier iterations in
-            # this same generate() loop do not shift the rewrite context.
-            resolved_query = temp_llm._resolve_query_from_block(q, current_history_block)
-            logger.debug(
-                "turn_start idx=%d original=%r resolved=%r",
-                idx, q, resolved_query,
-            )
 
-            # Persist the subject from the ORIGINAL question (q), not the
-            # filler-stripped resolved_query. After stripping "What about"
-            # from "What about Tennessee — how many cases?", the result starts
-            # with "Tennessee" — making it the FIRST word, which _NAMED_ENTITY
-            # (non-first-word pattern) would miss. Using q preserves "What
-            # about Tennessee…" where "Tennessee" is still a non-first word.
-            # Bare fragments ("Organizations?") and pronoun follow-ups have no
-            # capitalised non-first word in q either, so they still pass through.
-            if SESSION_ENABLED() and _NAMED_ENTITY.search(q):
-                resolved_subject = temp_llm._extract_subject_from_text(q)
-                if resolved_subject:
-                    session_store.set_active_subject(active_session_id, resolved_subject)
-
-            loop_result = temp_llm._run_retrieval_loop(
-                query=resolved_query,
-                vector_store_id=vector_store_id,
-                max_results=max_r,
-                min_score=min_score,
-                history_block=current_history_block,
-            )
+        done = {
+            "model": temp_llm.llm_model,
+            "multi_query": total > 1,
+            "session_id": active_session_id,
+            "usage": temp_llm.usage.snapshot(),
+        }
+        if session is not None:
+            session_store.record_usage(active_session_id, temp_llm.usage)
+            done["session_usage"] = session.token_usage.snapshot()
+        yield f"\n[DONE]{json.dumps(done)}"
+
+    body = generate()
+    headers: Dict[str, str] = {}
+    if should_profile(http_request.headers.get(PROFILE_HEADER)):
+        profiler = RequestProfiler(label="query_stream")
+        body = profiler.wrap(body)
+        headers[PROFILE_ID_HEADER] = profiler.request_id
+    return StreamingResponse(body, media_type="text/plain", headers=headers)
+
+
+def _answer_batch_question(
+    llm: LLMService,
+    q: str,
+    vector_store_id: str,
+    max_results: int,
+    min_score: float,
+    session_id: Optional[str],
+) -> Dict[str, Any]:
+    """Answer one batch question end-to-end, without streaming.
+
+    Runs the same pipeline as /api/query/stream (_answer_query), so a
+    compound question is split and answered part by part exactly as it would
+    be interactively.  Returns the result fields of one NDJSON record,
+    including per-stage timings in ms; a compound question also carries the
+    per-part records under ``parts`` and the answers joined by the stream's
+    separator.
+    """
+    parts: List[Dict[str, Any]] = []
+    sub_question = q
+    for kind, data in _answer_query(llm, q, vector_store_id, max_results, min_score, session_id, stream=False):
+        if kind == "question":
+            sub_question = data["query"]
+        elif kind == "answer":
+            fields = {k: v for k, v in data.items() if k != "cited"}
+            parts.append({"query": sub_question, **fields})
+
+    if len(parts) == 1:
+        parts[0].pop("query")
+        return parts[0]
+
+    timings: Dict[str, float] = {}
+    for part in parts:
+        for stage, ms in part["timings_ms"].items():
+            timings[stage] = round(timings.get(stage, 0.0) + ms, 1)
+    failed = next((part for part in parts if part["status"] == "error"), None)
+    if failed is not None:
+        return {"status": "error", "error": failed["error"], "parts": parts, "timings_ms": timings}
+    return {
+        "status": "no_docs" if all(part["status"] == "no_docs" for part in parts) else "ok",
+        "answer": "\n\n---\n\n".join(part["answer"] for part in parts),
+        "source": next((part["source"] for part in parts if part.get("source")), None),
+        "parts": parts,
+        "timings_ms": timings,
+    }
 
-            chunks = loop_result["chunks"]
-            if not chunks:
-                yield NO_DOCS_ANSWER
-                if total > 1 and idx < total:
-                    yield "\n\n---\n\n"
-                continue
-
-            if loop_result.get("final_prompt") is None and "answer_text" in loop_result:
-                # answer_text may contain internal verification reasoning before
-                # FULL_ANSWER: — parse it first, then yield only the clean answer.
-                full_response = loop_result["answer_text"]
-                if full_response.startswith("[LLM_"):
-                    yield full_response
-                    return
-                structured = temp_llm._parse_structured_answer(full_response)
-                yield structured.get("answer", full_response)
-            else:
-                full_response = ""
-                for token in temp_llm._call_llm(loop_result["final_prompt"]):
-                    full_response += token
-                    yield token
-                    if full_response.startswith("[LLM_"):
-                        return
-                structured = temp_llm._parse_structured_answer(full_response)
-            src_num = structured.get("source_number")
-            source_name = next(
-                (c["source"] for c in chunks if c["index"] == src_num),
-                None,
-            )
-            if source_name is None and len(chunks) == 1:
-                source_name = chunks[0]["source"]
-            clean_answer = structured.get("answer", full_response)
-            logger.debug(
-                "turn_end idx=%d chunks=%d cited_src_num=%r cited_source=%r answer_prefix=%r",
-                idx,
-                len(chunks),
-                src_num,
-                source_name,
-                clean_answer[:80] if clean_answer else "",
-            )
-            if source_name:
-                yield f"\n[SOURCE]{json.dumps({'source_name': source_name})}"
-
-            if total > 1 and idx < total:
-                yield "\n\n---\n\n"
-
-            if SESSION_ENABLED():
-                # Strip any leaked FULL_ANSWER: prefix so the history block
-                # stays clean regardless of model format compliance.
-                stored_answer = re.sub(
-                    r'^FULL_ANSWER:\s*', '', clean_answer, flags=re.IGNORECASE
-                ).strip()
-                session_store.add_turn(
-                    active_session_id,
-                    Turn(
-                        query=q,
-                        answer=stored_answer,
-                        sources=[source_name] if source_name else [],
-                    ),
-                )
-                _apply_compaction(temp_llm, active_session_id, session)
 
-        yield f"\n[DONE]{json.dumps({'model': temp_llm.llm_model, 'multi_query': total > 1, 'session_id': active_session_id})}"
+@app.post("/api/query/batch")
+async def query_batch(request: BatchQueryRequest):
+    """Answer many questions with bounded parallelism, streaming NDJSON results.
+
+    Questions sharing a ``session`` label form one conversation: they run in
+    input order against a fresh session, so follow-ups resolve against the
+    earlier answers.  Unlabelled questions are independent.  Work units run
+    on up to ``concurrency`` threads over ONE LLMService, so tool discovery
+    happens once and retrieval / LLM results are shared across the batch.
 
-    return StreamingResponse(generate(), media_type="text/plain")
+    Each line of the response is a JSON record, in completion order, tagged
+    with the question's input ``index`` and per-stage ``timings_ms``.  The
+    last line is a ``{"done": true, ...}`` summary.
+    """
+    logger.debug("batch_query cas_endpoint=%s questions=%d", request.cas_endpoint, len(request.questions))
+
+    temp_agent = _build_cas_client(request.cas_api_key, request.cas_endpoint)
+    if not temp_agent.is_configured():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid CAS configuration")
+
+    try:
+        temp_llm = LLMService(temp_agent)
+    except ConfigurationError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"LLM backend is not configured: {exc}",
+        )
+    if request.vector_store_id:
+        temp_llm.vector_store_id = request.vector_store_id
+    temp_llm.enable_shared_caches()
+
+    # Labelled questions are grouped into one sequential unit per label (in
+    # first-appearance order); every unlabelled question is its own unit.
+    units: List[Tuple[Optional[str], List[int]]] = []
+    groups: Dict[str, List[int]] = {}
+    for i, item in enumerate(request.questions):
+        if item.session is None:
+            units.append((None, [i]))
+            continue
+        if item.session not in groups:
+            groups[item.session] = []
+            units.append((item.session, groups[item.session]))
+        groups[item.session].append(i)
+    workers = min(request.concurrency or BATCH_CONCURRENCY, len(units))
+
+    def generate():
+        batch_start = time.perf_counter()
+        max_r = request.max_results or temp_llm.default_max_results
+        min_score = request.min_score if request.min_score is not None else temp_llm.default_min_score
+        vector_store_id = _resolve_store_scope(temp_llm, request.vector_store_ids)
+        if isinstance(vector_store_id, dict):
+            logger.warning("batch_query could not resolve vector store: %s", vector_store_id.get("error"))
+            yield json.dumps({"done": True, "error": "Could not resolve vector store"}) + "\n"
+            return
+
+        results: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+
+        def run_unit(label: Optional[str], indices: List[int]) -> None:
+            # Every index must produce exactly one record, whatever fails, or
+            # the reader below waits on the queue forever.
+            session_id = None
+            pending = list(indices)
+            try:
+                if label is not None and SESSION_ENABLED():
+                    session_id = session_store.create()
+                while pending:
+                    i = pending[0]
+                    q = request.questions[i].query
+                    try:
+                        outcome = _answer_batch_question(temp_llm, q, vector_store_id, max_r, min_score, session_id)
+                    except Exception as exc:
+                        logger.warning("batch_question_error index=%d error=%r", i, exc)
+                        outcome = {"status": "error", "error": str(exc), "timings_ms": {}}
+                    results.put({"index": i, "query": q, "session": label, "session_id": session_id, **outcome})
+                    pending.pop(0)
+            except Exception as exc:
+                logger.warning("batch_unit_error session=%s error=%r", label, exc)
+                for i in pending:
+                    results.put({
+                        "index": i,
+                        "query": request.questions[i].query,
+                        "session": label,
+                        "session_id": session_id,
+                        "status": "error",
+                        "error": str(exc),
+                        "timings_ms": {},
+                    })
+
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+        errors = 0
+        try:
+            for label, indices in units:
+                pool.submit(run_unit, label, indices)
+            for _ in range(len(request.questions)):
+                record = results.get()
+                if record["status"] == "error":
+                    errors += 1
+                yield json.dumps(record) + "\n"
+        finally:
+            # A disconnected client closes this generator — don't block on
+            # questions that haven't started yet.
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        yield json.dumps({
+            "done": True,
+            "model": temp_llm.llm_model,
+            "total": len(request.questions),
+            "errors": errors,
+            "elapsed_ms": _elapsed_ms(batch_start),
+            "usage": temp_llm.usage.snapshot(),
+        }) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 # Run server
@@ -7,15 +7,150 @@ Responsibilities:
   3. Deduplicate chunks returned twice by CAS for the same source file.
   4. Apply a dominant-source filter to prevent cross-document contamination.
   5. Reindex chunks 1..N after filtering.
+  6. Put results from several vector stores on a common score scale
+     before they are merged (federated search).
+
+Chunks are ``Chunk`` records — slotted objects that also answer the
+read-mostly dict protocol (``c["content"]``, ``c.get("score")``) the prompt
+builder and api_server use.  ``ChunkSet`` accumulates them across retrieval
+iterations without re-sorting or copying.
 
 Configuration is read from environment variables so callers don't need to
 thread tuning values through every call site.
 """
 
-from typing import Any, Dict, List, Optional
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
 import ast
 import os
 import re
+import sys
+
+
+class Chunk:
+    """One retrieved passage.
+
+    ``__slots__`` keeps a record at roughly a third of the size of the
+    equivalent dict, and source names are interned so the many chunks that
+    come from the same file share one string.  Mapping-style access is kept
+    so existing ``chunk["field"]`` / ``chunk.get(...)`` callers, ``dict(c)``
+    and ``{**c}`` keep working.
+    """
+
+    __slots__ = ("index", "content", "score", "source", "file_id", "filename", "vector_store_id")
+
+    def __init__(
+        self,
+        content: str,
+        score: Optional[float] = None,
+        source: Any = None,
+        file_id: Optional[str] = None,
+        filename: Optional[str] = None,
+        vector_store_id: Optional[str] = None,
+        index: int = 0,
+    ) -> None:
+        self.index = index
+        self.content = content
+        self.score = score
+        self.source = sys.intern(source) if isinstance(source, str) else source
+        self.file_id = file_id
+        self.filename = filename
+        self.vector_store_id = vector_store_id
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any]) -> "Chunk":
+        """Build a record from a chunk dict (tests and older callers still pass dicts)."""
+        return cls(**{k: data[k] for k in cls.__slots__ if k in data})
+
+    def keys(self) -> tuple:
+        return self.__slots__
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Chunk):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None  # mutable (index is renumbered in place)
+
+    def __repr__(self) -> str:
+        return f"Chunk(index={self.index}, source={self.source!r}, score={self.score!r})"
+
+
+class ChunkSet:
+    """Chunks accumulated across retrieval iterations.
+
+    Keeps its records de-duplicated by content, ordered by score (highest
+    first, ties in arrival order — the same order a stable sort gives) and
+    numbered 1..N.  ``merge`` inserts each new chunk at its sorted position
+    and renumbers only from the first insertion point onward, instead of
+    re-sorting and copying every chunk on every iteration.  The content
+    index is a plain dict keyed by the content string; ``str`` caches its
+    hash, so repeat lookups never rehash the text.
+    """
+
+    __slots__ = ("_by_content", "_ordered", "_sort_keys")
+
+    def __init__(self, chunks: Iterable[Any] = ()) -> None:
+        self._by_content: Dict[str, Chunk] = {}
+        self._ordered: List[Chunk] = []
+        self._sort_keys: List[float] = []  # -score, ascending — parallel to _ordered
+        self.merge(chunks)
+
+    def merge(self, chunks: Iterable[Any]) -> int:
+        """Add every chunk whose content is not already present; return how many were added."""
+        first_changed = len(self._ordered)
+        added = 0
+        for chunk in chunks:
+            if not isinstance(chunk, Chunk):
+                chunk = Chunk.from_mapping(chunk)
+            if chunk.content in self._by_content:
+                continue
+            self._by_content[chunk.content] = chunk
+            key = -(chunk.score or 0.0)
+            pos = bisect_right(self._sort_keys, key)
+            self._sort_keys.insert(pos, key)
+            self._ordered.insert(pos, chunk)
+            if pos < first_changed:
+                first_changed = pos
+            added += 1
+        for i in range(first_changed, len(self._ordered)):
+            self._ordered[i].index = i + 1
+        return added
+
+    def as_list(self) -> List[Chunk]:
+        """Return the chunks in order as a new list (the records are shared)."""
+        return list(self._ordered)
+
+    def __contains__(self, content: object) -> bool:
+        return content in self._by_content
+
+    def __iter__(self) -> Iterator[Chunk]:
+        return iter(self._ordered)
+
+    def __len__(self) -> int:
+        return len(self._ordered)
 
 
 class ChunkProcessor:
@@ -110,6 +245,38 @@ class ChunkProcessor:
         text = re.sub(r'\n{3,}', '\n\n', text)
         return text.strip()
 
+    @staticmethod
+    def normalize_store_scores(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rescale federated search results onto one shared scale.
+
+        Every result's ``combined_probability_score`` is divided by the best
+        score returned across all stores, so the overall top hit scores 1.0
+        and every other hit keeps its ratio to it.  A store that returned
+        nothing relevant therefore stays low instead of having its best hit
+        lifted to 1.0, and the dominant-source filter can still drop it.
+        The original value is kept as ``raw_score`` inside the score object.
+
+        Results are returned as new dicts; the input is not modified.
+        """
+        top = 0.0
+        for r in results:
+            score_obj = r.get("score") if isinstance(r.get("score"), dict) else {}
+            top = max(top, score_obj.get("combined_probability_score") or 0.0)
+
+        normalized = []
+        for r in results:
+            score_obj = r.get("score") if isinstance(r.get("score"), dict) else {}
+            raw = score_obj.get("combined_probability_score") or 0.0
+            normalized.append({
+                **r,
+                "score": {
+                    **score_obj,
+                    "combined_probability_score": raw / top if top > 0 else 0.0,
+                    "raw_score": raw,
+                },
+            })
+        return normalized
+
     def process(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Run the full processing pipeline: build → deduplicate → filter → reindex.
 
@@ -117,7 +284,7 @@ class ChunkProcessor:
             results: Raw result dicts from CAS search_vector_store().
 
         Returns:
-            Processed, reindexed list of chunk dicts ready for prompt assembly.
+            Processed, reindexed list of ``Chunk`` records ready for prompt assembly.
         """
         raw = self._build(results)
         deduped = self._deduplicate(raw)
@@ -128,17 +295,18 @@ class ChunkProcessor:
     # Pipeline steps
     # ------------------------------------------------------------------
 
-    def _build(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _build(self, results: List[Dict[str, Any]]) -> List[Chunk]:
         """Convert raw CAS result dicts into normalised chunk records.
 
         Args:
             results: Raw CAS search result dicts.
 
         Returns:
-            List of normalised chunk dicts with index, content, score, source,
-            file_id, and filename fields.
+            List of ``Chunk`` records with index, content, score, source,
+            file_id, filename, and vector_store_id (set by federated search,
+            otherwise None) fields.
         """
-        chunks = []
+        chunks: List[Chunk] = []
         for index, result in enumerate(results, start=1):
             content = self._normalize(result.get("content", ""))
             if not content:
@@ -147,17 +315,18 @@ class ChunkProcessor:
                 content = content[:self.max_chunk_chars] + "..."
             metadata = result.get("metadata", {}) if isinstance(result.get("metadata"), dict) else {}
             score_obj = result.get("score", {}) if isinstance(result.get("score"), dict) else {}
-            chunks.append({
-                "index": index,
-                "content": content,
-                "score": score_obj.get("combined_probability_score"),
-                "source": (
+            chunks.append(Chunk(
+                index=index,
+                content=content,
+                score=score_obj.get("combined_probability_score"),
+                source=(
                     metadata.get("source") or metadata.get("file_name") or
                     metadata.get("title") or result.get("filename") or f"chunk-{index}"
                 ),
-                "file_id": result.get("file_id"),
-                "filename": result.get("filename"),
-            })
+                file_id=result.get("file_id"),
+                filename=result.get("filename"),
+                vector_store_id=result.get("vector_store_id"),
+            ))
         return chunks
 
     def _deduplicate(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -215,13 +384,18 @@ class ChunkProcessor:
 
         return [c for c in chunks if c["source"] in allowed]
 
-    def _reindex(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _reindex(self, chunks: List[Any]) -> List[Any]:
         """Renumber chunk index fields 1..N after filtering.
 
+        Renumbers in place rather than copying: the records were created by
+        ``_build`` in this same ``process`` call, so nothing else holds them.
+
         Args:
             chunks: Filtered chunk list whose indices may have gaps.
 
         Returns:
-            Same chunks with ``index`` fields replaced by a contiguous 1-based sequence.
+            The same list, with ``index`` fields replaced by a contiguous 1-based sequence.
         """
-        return [{**c, "index": i} for i, c in enumerate(chunks, start=1)]
+        for i, c in enumerate(chunks, start=1):
+            c["index"] = i
+        return chunks
@@ -16,27 +16,109 @@ Set LLM_BASE_URL, LLM_MODEL (and optionally LLM_API_KEY) in .env.
 """
 
 from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+import hashlib
 import json
 import logging
 import os
 import re
+import threading
 
 import requests
 from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
 
 from agents.cas_client import CASClient, _unwrap_mcp_result
 from agents.tool_registry import ToolRegistry
-from chunk_processor import ChunkProcessor
+from chunk_processor import Chunk, ChunkProcessor, ChunkSet
+from session_store import HistoryIndex, is_anchor_turn
+from utils.circuit_breaker import get_breaker
+from utils.compaction import COMPACTION_MODES, extractive_summary
 from utils.exceptions import ConfigurationError
 from utils.prompt_builder import PromptBuilder
+from utils.speculation import (
+    get_speculator,
+    match_threshold,
+    predict_retry_query,
+    query_similarity,
+    speculation_enabled,
+    submit_speculative,
+)
 from utils.query import is_bare_metric_fragment, is_self_contained, strip_trailing_pronoun
+from utils.token_usage import TokenUsage, process_usage
+from utils.tokenizer import count_tokens, count_tokens_uncached
+from utils.tool_snapshot import load_tool_snapshot, save_tool_snapshot, snapshot_ttl, tools_schema_hash
+from utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Process-wide warm caches.  LLMService is constructed per request, so results
+# worth keeping between requests live at module level.  TTLs are read from the
+# environment in __init__ and passed on every set(), because this module is
+# imported before api_server calls load_dotenv().  Filled ahead of traffic by
+# LLMService.warm_up(), called from the api_server lifespan hook.
+_tool_discovery_cache = TTLCache(ttl_seconds=600)
+_vector_store_cache = TTLCache(ttl_seconds=300)
+_compat_probe_cache = TTLCache(ttl_seconds=3600)
+
+
+def clear_warm_caches() -> None:
+    """Empty the discovery, vector-store and compatibility-probe caches."""
+    _tool_discovery_cache.clear()
+    _vector_store_cache.clear()
+    _compat_probe_cache.clear()
+
+
+# Hosts whose tool snapshot is being revalidated in the background, so a
+# burst of cold requests starts one tools/list call, not one each.
+_tool_revalidations: set = set()
+_tool_revalidations_lock = threading.Lock()
+
+
+def _schedule_tool_revalidation(cas_client: Any, host: str, ttl_seconds: float) -> None:
+    """Re-run tools/list for *host* on a daemon thread unless one is already running."""
+    with _tool_revalidations_lock:
+        if host in _tool_revalidations:
+            return
+        _tool_revalidations.add(host)
+    threading.Thread(
+        target=_revalidate_tools,
+        args=(cas_client, host, ttl_seconds),
+        name="tool-revalidate",
+        daemon=True,
+    ).start()
+
+
+def _revalidate_tools(cas_client: Any, host: str, ttl_seconds: float) -> None:
+    """Refresh the warm cache and snapshot for *host* from a live tools/list.
+
+    The warm-cache entry is replaced in one set(), so requests built after
+    this point register the new tool list and requests already running keep
+    the one they started with.  On failure the snapshot stays in service.
+    """
+    try:
+        result = cas_client.discover_tools()
+        tools = result.get("tools") if result.get("status") == "success" else None
+        if not tools:
+            logger.warning("tool_revalidation failed host=%s error=%r — keeping snapshot", host, result.get("error"))
+            return
+        previous = load_tool_snapshot(host)
+        changed = previous is None or previous["schema_hash"] != tools_schema_hash(tools)
+        _tool_discovery_cache.set(host, tools, ttl_seconds=ttl_seconds)
+        save_tool_snapshot(host, tools)
+        logger.info("tool_revalidation host=%s tools=%d changed=%s", host, len(tools), changed)
+    except Exception as exc:
+        logger.warning("tool_revalidation_exception host=%s error=%r", host, exc)
+    finally:
+        with _tool_revalidations_lock:
+            _tool_revalidations.discard(host)
+
 
 def estimate_tokens(text: str) -> int:
-    """Rough token estimator: 1 token ≈ 4 characters (floor division)."""
-    return len(text) // 4
+    """Token count for *text* using the configured tokenizer.
+
+    The 1 token ≈ 4 characters heuristic unless TOKENIZER_FILE names a
+    local tokenizer — see utils.tokenizer.
+    """
+    return count_tokens(text)
 
 
 class LLMService:
@@ -61,13 +143,29 @@ class LLMService:
         self.llm_model = llm_model
         self.llm_api_key = os.getenv("LLM_API_KEY", "")
         self.vector_store_id = os.getenv("CAS_VECTOR_STORE_ID")
+        # Federated search — set per request by api_server when the caller
+        # names several stores (or "*").  None means single-store search.
+        self.vector_store_ids: Optional[List[str]] = None
+        self.federated_max_stores = int(os.getenv("FEDERATED_MAX_STORES", "10"))
+        self.federated_store_timeout = float(os.getenv("FEDERATED_STORE_TIMEOUT_SECONDS", "10"))
         self.default_max_results = int(os.getenv("RAG_MAX_RESULTS", "10"))
         self.default_min_score = float(os.getenv("RAG_MIN_SCORE", "0.1"))
         self.request_timeout = int(os.getenv("LLM_TIMEOUT", "60"))
         self.llm_max_tokens = int(os.getenv("LLM_MAX_TOKENS", "300"))
+        # Ask for a usage block on streamed completions; turn off for servers
+        # that reject the stream_options field.
+        self.llm_stream_usage = os.getenv("LLM_STREAM_USAGE", "true").lower() not in ("false", "0", "no")
+        # Tokens consumed by this instance (i.e. this request), by call type.
+        self.usage = TokenUsage()
+        self.tool_discovery_ttl = float(os.getenv("TOOL_DISCOVERY_TTL_SECONDS", "600"))
+        self.vector_store_cache_ttl = float(os.getenv("VECTOR_STORE_CACHE_TTL_SECONDS", "300"))
+        self.compat_probe_ttl = float(os.getenv("LLM_COMPAT_CACHE_TTL_SECONDS", "3600"))
         self.chunk_processor = ChunkProcessor()
         self.retrieval_loop_max_iter = int(os.getenv("RETRIEVAL_LOOP_MAX_ITER", "2"))
         self.fact_check_enabled = os.getenv("FACT_CHECK_ENABLED", "true").lower() not in ("false", "0", "no")
+        # Pre-issue the likely [RETRY] search while verification runs — see
+        # utils.speculation.
+        self.speculative_retry_enabled = speculation_enabled()
         self.tool_router_enabled = os.getenv("TOOL_ROUTER_ENABLED", "true").lower() not in ("false", "0", "no")
         # PromptBuilder loads system_prompt.md once and owns all prompt assembly.
         # LLMService never constructs prompt strings directly.
@@ -102,6 +200,34 @@ class LLMService:
         self.session_compact_summary_tokens = int(
             os.getenv("SESSION_COMPACT_SUMMARY_TOKENS", "300")
         )
+        # How old turns are folded: "llm", "extractive" or "hybrid" — see
+        # utils.compaction.
+        self.session_compaction_mode = os.getenv("SESSION_COMPACTION_MODE", "llm").strip().lower()
+        if self.session_compaction_mode not in COMPACTION_MODES:
+            logger.warning(
+                "unknown SESSION_COMPACTION_MODE=%r, using llm", self.session_compaction_mode,
+            )
+            self.session_compaction_mode = "llm"
+
+        # Optional memo tables for bulk callers — None means caching is off.
+        # See enable_shared_caches().
+        self._llm_cache: Optional[Dict[Any, str]] = None
+        self._retrieval_cache: Optional[Dict[Any, Dict[str, Any]]] = None
+        self._cache_lock = threading.Lock()
+
+    def enable_shared_caches(self) -> None:
+        """Memoise LLM completions and tool results for this instance's lifetime.
+
+        Used by the batch endpoint, where one LLMService serves many questions
+        across worker threads: repeated router / rewrite prompts and repeated
+        retrieval queries are answered from memory instead of hitting the LLM
+        or CAS again.  Error results and ``[LLM_*]`` sentinels are never cached.
+        """
+        with self._cache_lock:
+            if self._llm_cache is None:
+                self._llm_cache = {}
+            if self._retrieval_cache is None:
+                self._retrieval_cache = {}
 
     # ------------------------------------------------------------------
     # Tool registration
@@ -116,8 +242,23 @@ class LLMService:
         max_results = self.default_max_results
         min_score = self.default_min_score
         cas = self.cas_client
+        service = self
 
         def _cas_search(query: str, vector_store_id: str = "", **_kwargs: Any) -> Dict[str, Any]:
+            # Read at call time: the registry is built in __init__, before
+            # api_server assigns the request's federated store list.
+            store_ids = service.vector_store_ids
+            if store_ids and len(store_ids) > 1:
+                result = cas.search_vector_stores(
+                    store_ids,
+                    query=query,
+                    max_num_results=max_results * 2,
+                    min_score=min_score,
+                    timeout=service.federated_store_timeout,
+                )
+                if result.get("status") == "success":
+                    result["data"] = ChunkProcessor.normalize_store_scores(result["data"])
+                return result
             return cas.search_vector_store(
                 vector_store_id=vector_store_id,
                 query=query,
@@ -177,13 +318,47 @@ class LLMService:
           LLM can request it with ``[CHUNK:<mcp_tool_name>]``.
         - If discovery fails or returns an empty list, falls back to the
           single hardcoded ``"cas"`` search tool so nothing breaks.
+
+        Results are cached in memory per CAS host and persisted to disk
+        (utils.tool_snapshot).  A cold process boots from a fresh snapshot
+        without waiting on tools/list and revalidates in the background;
+        a failed live call falls back to a snapshot of any age before
+        falling back to the hardcoded tool.
         """
         if not self.cas_client.is_configured():
             logger.debug("tool_discovery skipped — CAS client not configured yet, using fallback")
             self._register_fallback_cas_tool()
             return
 
-        result = self.cas_client.discover_tools()
+        cache_key = self._cas_cache_key()
+        cached_tools = _tool_discovery_cache.get(cache_key) if cache_key else None
+        if cached_tools is None and cache_key:
+            # Cold process (or expired warm cache): boot from the on-disk
+            # snapshot and let a background tools/list catch up.
+            snapshot = load_tool_snapshot(cache_key, max_age=snapshot_ttl())
+            if snapshot is not None:
+                cached_tools = snapshot["tools"]
+                _tool_discovery_cache.set(cache_key, cached_tools, ttl_seconds=self.tool_discovery_ttl)
+                _schedule_tool_revalidation(self.cas_client, cache_key, self.tool_discovery_ttl)
+                logger.debug("tool_discovery snapshot_hit host=%s tools=%d", cache_key, len(cached_tools))
+        if cached_tools is not None:
+            logger.debug("tool_discovery cache_hit host=%s tools=%d", cache_key, len(cached_tools))
+            result = {"status": "success", "tools": cached_tools}
+        else:
+            result = self.cas_client.discover_tools()
+            if cache_key and result.get("status") == "success" and result.get("tools"):
+                _tool_discovery_cache.set(cache_key, result["tools"], ttl_seconds=self.tool_discovery_ttl)
+                save_tool_snapshot(cache_key, result["tools"])
+            elif cache_key and result.get("status") != "success":
+                # Live discovery failed — an old snapshot still beats the
+                # single hardcoded tool.
+                stale = load_tool_snapshot(cache_key)
+                if stale is not None:
+                    logger.warning(
+                        "tool_discovery failed error=%r — using snapshot saved at %s",
+                        result.get("error"), stale.get("saved_at"),
+                    )
+                    result = {"status": "success", "tools": stale["tools"]}
         if result.get("status") != "success":
             logger.warning(
                 "tool_discovery failed error=%r — falling back to hardcoded cas tool",
@@ -265,11 +440,51 @@ class LLMService:
         )
         logger.debug("tool_discovery fallback registered hardcoded cas tool")
 
+    # ------------------------------------------------------------------
+    # Warm-up
+    # ------------------------------------------------------------------
+
+    def _cas_cache_key(self, include_token: bool = False) -> Optional[str]:
+        """Return the warm-cache key for the configured CAS host.
+
+        With ``include_token`` the key also carries a hash of the API token,
+        for results that depend on what the caller is allowed to see (e.g.
+        the vector stores visible to that token).
+        """
+        try:
+            host = str(self.cas_client._extract_host())
+        except Exception:
+            return None
+        if not include_token:
+            return host
+        token_hash = hashlib.sha256(str(self.cas_client._api_key).encode("utf-8")).hexdigest()[:16]
+        return f"{host}|{token_hash}"
+
+    def warm_up(self) -> Dict[str, Any]:
+        """Fill the process-wide warm caches ahead of traffic.
+
+        Tool discovery has already run (and been cached) in __init__; this
+        adds vector-store id resolution and the LLM compatibility probe.
+        Each step is reported separately so a failing CAS doesn't hide a
+        healthy LLM, or vice versa.
+        """
+        report: Dict[str, Any] = {"tools": self.tool_registry.tool_names}
+        if self.cas_client.is_configured():
+            vector_store_id = self.vector_store_id or self._get_vector_store_id()
+            report["vector_store"] = (
+                vector_store_id if isinstance(vector_store_id, str)
+                else {"error": vector_store_id.get("error")}
+            )
+        else:
+            report["vector_store"] = {"error": "CAS not configured"}
+        report["compatibility"] = self.check_model_compatibility()
+        return report
+
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
 
-    def check_model_compatibility(self) -> Dict[str, Any]:
+    def check_model_compatibility(self, use_cache: bool = True) -> Dict[str, Any]:
         """Send a minimal probe to the LLM to check structured-output format compliance.
 
         Sends a tiny synthetic context + question and checks whether the model
@@ -283,7 +498,25 @@ class LLMService:
                 (unreachable is handled by the existing LLM error sentinels).
               - "model" (str): the configured model name.
               - "reason" (str): human-readable explanation.
+
+        A definitive pass/fail result is cached per (LLM_BASE_URL, LLM_MODEL)
+        for LLM_COMPAT_CACHE_TTL_SECONDS, since the probe is a full LLM call.
+        "Probe skipped" results are not cached.  Pass ``use_cache=False`` to
+        force a fresh probe.
         """
+        cache_key = (self.llm_base_url, self.llm_model)
+        if use_cache:
+            cached = _compat_probe_cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+        result = self._probe_model_compatibility()
+        if not result.get("skipped"):
+            _compat_probe_cache.set(cache_key, result, ttl_seconds=self.compat_probe_ttl)
+        result.pop("skipped", None)
+        return result
+
+    def _probe_model_compatibility(self) -> Dict[str, Any]:
+        """Run the compatibility probe itself — see check_model_compatibility."""
         probe_prompt = (
             "You are a retrieval-augmented assistant.\n\n"
             "Context Sources:\n"
@@ -295,10 +528,15 @@ class LLMService:
             "[SOURCE: 1]\n\n"
             "Response:"
         )
-        text = self._ask_llm(probe_prompt)
+        text = self._ask_llm(probe_prompt, call_type="probe")
         if text.startswith("[LLM_"):
             logger.debug("llm_compat_check_skipped sentinel=%r", text[:60])
-            return {"compatible": True, "model": self.llm_model, "reason": "Probe skipped (LLM unreachable)."}
+            return {
+                "compatible": True,
+                "model": self.llm_model,
+                "reason": "Probe skipped (LLM unreachable).",
+                "skipped": True,
+            }
         has_full_answer = bool(re.search(r'FULL_ANSWER\s*:', text, re.IGNORECASE))
         has_source = bool(re.search(r'\[SOURCE\s*:\s*(\d+|N/A)\]', text, re.IGNORECASE))
         if has_full_answer and has_source:
@@ -317,25 +555,13 @@ class LLMService:
             results: Raw CAS search result dicts from search_vector_store().
 
         Returns:
-            Processed list of chunk dicts with index, content, score, source fields.
+            Processed list of Chunk records with index, content, score, source fields.
         """
         return self.chunk_processor.process(results)
 
     def _is_history_anchor_turn(self, turn) -> bool:
         """Return True when a turn is safe to use as the active retrieval anchor."""
-        if not turn.sources or any(source in ("[meta]", "[user-context]") for source in turn.sources):
-            return False
-
-        answer = (turn.answer or "").strip().lower()
-        if not answer:
-            return False
-        if "not available in the provided context sources" in answer:
-            return False
-        if "no relevant documents were found" in answer:
-            return False
-        if answer.startswith("[llm_"):
-            return False
-        return True
+        return is_anchor_turn(turn)
 
     def _build_history_block(self, session, max_turns: Optional[int] = None) -> str:
         """Build a compact history block from recent session turns.
@@ -348,19 +574,20 @@ class LLMService:
 
         Off-topic turns (no sources, or unavailable-answer turns) are excluded
         from the numbered display so they cannot pollute the rewrite context.
+
+        The regular/personal split and the anchor turn come from the
+        session's HistoryIndex, which SessionStore keeps up to date as turns
+        are added, so only the *max_turns* shown are walked here.
         """
         if session is None or (not session.turns and not session.running_summary):
             return ""
 
         max_turns = max_turns if max_turns is not None else self.session_history_turns
 
-        # Separate user-context turns from regular turns
-        regular_turns = [t for t in session.turns if not (
-            t.sources and any(s == "[user-context]" for s in t.sources)
-        )]
-        personal_turns = [t for t in session.turns if (
-            t.sources and any(s == "[user-context]" for s in t.sources)
-        )]
+        history_index = getattr(session, "history_index", None)
+        index = history_index() if history_index is not None else HistoryIndex().sync(list(session.turns))
+        regular_turns = index.regular
+        personal_turns = index.personal
 
         if not regular_turns and not session.running_summary and not personal_turns:
             return ""
@@ -370,10 +597,7 @@ class LLMService:
         # restricted to turns that passed document retrieval, so that the rewrite
         # context isn't poisoned by failed or off-topic turns.
         recent = regular_turns[-max_turns:]
-        active_turn = next(
-            (turn for turn in reversed(regular_turns) if self._is_history_anchor_turn(turn)),
-            None,
-        )
+        active_turn = index.anchor
 
         lines = ["[CONVERSATION HISTORY]"]
 
@@ -434,17 +658,21 @@ class LLMService:
         """
         if session is None or not session.turns:
             return False
-        full_text = " ".join(f"{t.query} {t.answer}" for t in session.turns)
+        # Counted per turn string so a memoising tokenizer only ever
+        # tokenizes each question / answer once.
+        used = sum(estimate_tokens(t.query) + estimate_tokens(t.answer) for t in session.turns)
         budget = int(self.session_max_context_tokens * self.session_compact_threshold)
-        return estimate_tokens(full_text) > budget
+        return used > budget
 
     def _compact_history(self, session) -> Optional[Dict[str, Any]]:
         """Compute a compaction plan when the session context budget is exceeded.
 
         Checks whether the serialised history exceeds
         session_max_context_tokens * session_compact_threshold tokens.
-        If so, summarises all but the last session_keep_turns turns with the LLM
-        and returns a plan the caller applies via SessionStore.set_summary().
+        If so, summarises all but the last session_keep_turns turns and
+        returns a plan the caller applies via SessionStore.set_summary().
+        The summary is written by the LLM or extracted locally, depending on
+        session_compaction_mode (see utils.compaction).
 
         This method is intentionally side-effect-free with respect to the
         session object — SessionStore owns the lock that guards concurrent
@@ -454,7 +682,10 @@ class LLMService:
         Returns:
             None if compaction isn't needed or the summarisation call failed
             (session is left unchanged in either case).
-            Otherwise a dict: {"summary": str, "turns_to_keep": List[Turn]}.
+            Otherwise a dict: {"summary": str, "turns_to_keep": List[Turn],
+            "mode": str, "turns_folded": List[Turn], "prior_summary": str}.
+            The last two let a "hybrid" caller refine the summary later with
+            _summarise_turns_with_llm().
         """
         if not self.needs_compaction(session):
             return None
@@ -466,10 +697,38 @@ class LLMService:
         if not turns_to_fold:
             return None
 
+        mode = self.session_compaction_mode
+        if mode == "llm":
+            summary = self._summarise_turns_with_llm(turns_to_fold, session.running_summary)
+            if summary is None:
+                logger.debug("compact_history_skipped llm_failure session=%s", session.session_id)
+                return None
+        else:
+            summary = extractive_summary(
+                turns_to_fold,
+                prior_summary=session.running_summary,
+                max_chars=self.session_compact_summary_tokens * 4,
+                subject_of=self._subject_from_regex,
+            )
+
+        logger.debug(
+            "compact_history_computed session=%s mode=%s folded_turns=%d kept_turns=%d",
+            session.session_id, mode, len(turns_to_fold), len(turns_to_keep),
+        )
+        return {
+            "summary": summary,
+            "turns_to_keep": turns_to_keep,
+            "mode": mode,
+            "turns_folded": list(turns_to_fold),
+            "prior_summary": session.running_summary,
+        }
+
+    def _summarise_turns_with_llm(self, turns, prior_summary: str = "") -> Optional[str]:
+        """Ask the LLM for a one-paragraph summary of *turns*; None on failure."""
         fold_text = "\n".join(
-            f"Q: {t.query}\nA: {t.answer}" for t in turns_to_fold
+            f"Q: {t.query}\nA: {t.answer}" for t in turns
         )
-        summary_prefix = f"Prior summary: {session.running_summary}\n\n" if session.running_summary else ""
+        summary_prefix = f"Prior summary: {prior_summary}\n\n" if prior_summary else ""
         compact_prompt = (
             f"{summary_prefix}"
             "Summarise the following conversation turns into one concise paragraph "
@@ -477,16 +736,12 @@ class LLMService:
             "Preserve specific event names, state names, and numeric values.\n\n"
             f"{fold_text}\n\nSummary:"
         )
-        summary = self._ask_llm(compact_prompt, max_tokens=self.session_compact_summary_tokens)
+        summary = self._ask_llm(
+            compact_prompt, max_tokens=self.session_compact_summary_tokens, call_type="compaction",
+        )
         if summary.startswith("[LLM_") or not summary:
-            logger.debug("compact_history_skipped llm_failure session=%s", session.session_id)
             return None
-
-        logger.debug(
-            "compact_history_computed session=%s folded_turns=%d kept_turns=%d",
-            session.session_id, len(turns_to_fold), len(turns_to_keep),
-        )
-        return {"summary": summary, "turns_to_keep": turns_to_keep}
+        return summary
 
     _EXPLICIT_SUBJECT_RE = re.compile(r'^Explicit subject:\s*(.+)$', re.MULTILINE)
 
@@ -523,28 +778,16 @@ class LLMService:
         re.IGNORECASE,
     )
 
-    def _extract_subject_from_text(self, text: str) -> Optional[str]:
-        """Extract the named subject from a question — regex first, LLM fallback.
+    def _subject_from_regex(self, text: str) -> Optional[str]:
+        """Regex-only half of _extract_subject_from_text — never calls the LLM.
 
-        Tries a fast regex scan for a capitalised named entity (proper noun)
-        before falling back to an LLM call.  The LLM call is only made when
-        the regex finds nothing — i.e. the question contains no obvious named
-        subject and we genuinely need the model to infer one.
-
-        This avoids an extra LLM round-trip on every self-contained question
-        (e.g. "How many cases for Winter Storm Blair?" → regex finds "Winter
-        Storm Blair" immediately, no LLM needed).
-
-        Importantly, the scan starts from the FIRST capitalised word in the
-        (opener-stripped) sentence — not from the second word.  This means
-        "Maryland Severe Weather — hotline calls?" correctly extracts
-        "Maryland Severe Weather" rather than the erroneous "Severe Weather".
+        Returns the first run of capitalised words after any question
+        opener, or None.  Also used by extractive compaction.
         """
         if not text:
             return None
-
-        # Fast path: strip leading wh-word / filler openers, then extract the
-        # first run of consecutive capitalised tokens.
+        # Strip leading wh-word / filler openers, then extract the first run
+        # of consecutive capitalised tokens.
         stripped = text.strip()
         # Remove leading question opener ("How many", "What about", "Now", …)
         scan = self._OPENER_RE.sub("", stripped).strip()
@@ -565,6 +808,31 @@ class LLMService:
                     break
             if tokens:
                 return " ".join(tokens)
+        return None
+
+    def _extract_subject_from_text(self, text: str) -> Optional[str]:
+        """Extract the named subject from a question — regex first, LLM fallback.
+
+        Tries a fast regex scan for a capitalised named entity (proper noun)
+        before falling back to an LLM call.  The LLM call is only made when
+        the regex finds nothing — i.e. the question contains no obvious named
+        subject and we genuinely need the model to infer one.
+
+        This avoids an extra LLM round-trip on every self-contained question
+        (e.g. "How many cases for Winter Storm Blair?" → regex finds "Winter
+        Storm Blair" immediately, no LLM needed).
+
+        Importantly, the scan starts from the FIRST capitalised word in the
+        (opener-stripped) sentence — not from the second word.  This means
+        "Maryland Severe Weather — hotline calls?" correctly extracts
+        "Maryland Severe Weather" rather than the erroneous "Severe Weather".
+        """
+        if not text:
+            return None
+
+        subject = self._subject_from_regex(text)
+        if subject:
+            return subject
 
         # Slow path: ask the LLM only when the regex found nothing.
         # This handles abbreviations, shorthand, and non-capitalised subjects.
@@ -575,7 +843,7 @@ class LLMService:
             "short noun phrase. Nothing else. If the question does not name a "
             "specific subject, output NONE."
         )
-        raw = self._ask_llm(prompt, max_tokens=20)
+        raw = self._ask_llm(prompt, max_tokens=20, call_type="rewrite")
         if raw.startswith("[LLM_") or not raw:
             return None
         subject = raw.strip().strip(" .\"'")
@@ -603,7 +871,7 @@ class LLMService:
             "Nothing else. No punctuation, no explanation, no extra words. "
             "If no Turn Q: line explicitly names a subject, output NONE."
         )
-        raw = self._ask_llm(prompt, max_tokens=20)
+        raw = self._ask_llm(prompt, max_tokens=20, call_type="rewrite")
         if raw.startswith("[LLM_") or not raw:
             return None
         subject = raw.strip().strip(" .\"'")
@@ -697,7 +965,7 @@ class LLMService:
             "Output format: one plain English search query on a single line. "
             "No markdown, no bullets, no numbered steps, no explanation — just the query."
         )
-        raw = self._ask_llm(rewrite_prompt, max_tokens=60)
+        raw = self._ask_llm(rewrite_prompt, max_tokens=60, call_type="rewrite")
         if raw.startswith("[LLM_") or not raw:
             return query
 
@@ -812,9 +1080,14 @@ class LLMService:
         if min_score is None:
             min_score = self.default_min_score
 
-        all_chunks: List[Dict[str, Any]] = []
+        # ChunkSet keeps the accumulated chunks de-duplicated, score-sorted
+        # and numbered as each fetch is merged in.
+        merged = ChunkSet()
+        all_chunks: List[Chunk] = []
         fetched_queries: List[str] = []
         current_query = query
+        # A speculative retry search adopted for the next iteration.
+        prefetched: Optional[Dict[str, Any]] = None
 
         # ── Pre-loop tool routing ────────────────────────────────────────────
         # Skipped when TOOL_ROUTER_ENABLED=false or only one tool is registered.
@@ -824,7 +1097,7 @@ class LLMService:
                 query=query,
                 available_tools=tool_names,
             )
-            raw_tool = self._ask_llm(routing_prompt, max_tokens=10)
+            raw_tool = self._ask_llm(routing_prompt, max_tokens=10, call_type="router")
             # Sanitise: take the first non-empty word, strip punctuation.
             chosen = raw_tool.strip().split()[0].strip(".,!?\"'").lower() if raw_tool.strip() else ""
             if chosen and self.tool_registry.is_registered(chosen):
@@ -857,11 +1130,28 @@ class LLMService:
                 "retrieval_loop dispatch iter=%d tool=%r query=%r",
                 iteration, current_tool, current_query,
             )
-            result = self.tool_registry.call(
-                current_tool,
-                current_query,
-                vector_store_id=vector_store_id,
-            )
+            if prefetched is not None and prefetched["key"] == loop_key:
+                future = prefetched["future"]
+                if not future.done():
+                    # Never wait on a speculation: fetch the actual retry query instead.
+                    future.cancel()
+                    result = {"status": "error", "error": "speculative search still running"}
+                else:
+                    try:
+                        result = future.result()
+                    except Exception as exc:
+                        result = {"status": "error", "error": str(exc)}
+                if result.get("status") == "success":
+                    get_speculator().record_hit()
+                    logger.info("retrieval_loop speculative_hit query=%r", current_query)
+                else:
+                    # The guess failed or is not ready; fetch what the verifier actually asked for.
+                    current_query = prefetched["retry_query"]
+                    fetched_queries.append((current_tool, current_query))
+                    result = self._call_tool(current_tool, current_query, vector_store_id)
+                prefetched = None
+            else:
+                result = self._call_tool(current_tool, current_query, vector_store_id)
             if result.get("status") != "success":
                 logger.warning(
                     "retrieval_loop tool_error tool=%r iter=%d query=%r error=%r — stopping loop",
@@ -870,25 +1160,13 @@ class LLMService:
                 break
 
             new_chunks = self._extract_chunks(result.get("data", []))
+            added = merged.merge(new_chunks)
             logger.info(
-                "retrieval_loop fetched iter=%d tool=%r raw=%d kept=%d cumulative=%d",
+                "retrieval_loop fetched iter=%d tool=%r raw=%d kept=%d new=%d cumulative=%d",
                 iteration, current_tool,
-                len(result.get("data", [])), len(new_chunks),
-                len(all_chunks) + sum(
-                    1 for c in new_chunks
-                    if c["content"] not in {ch["content"] for ch in all_chunks}
-                ),
+                len(result.get("data", [])), len(new_chunks), added, len(merged),
             )
-            existing_content = {chunk["content"] for chunk in all_chunks}
-            for chunk in new_chunks:
-                if chunk["content"] not in existing_content:
-                    all_chunks.append(chunk)
-                    existing_content.add(chunk["content"])
-
-            all_chunks = [{**chunk, "index": i} for i, chunk in enumerate(
-                sorted(all_chunks, key=lambda c: c.get("score") or 0.0, reverse=True),
-                start=1,
-            )]
+            all_chunks = merged.as_list()
 
             if iteration > self.retrieval_loop_max_iter:
                 logger.info(
@@ -909,7 +1187,8 @@ class LLMService:
                     iteration=iteration,
                     available_tools=self.tool_registry.tool_names,
                     tool_descriptions=self.tool_registry.tool_descriptions,
-                )
+                ),
+                call_type="decision",
             )
             logger.info(
                 "retrieval_loop llm_decision iter=%d current_tool=%r decision=%r",
@@ -959,8 +1238,12 @@ class LLMService:
             ):
                 verified_answer = decision
             else:
+                speculative = self._start_speculative_retry(
+                    query, decision, current_tool, vector_store_id, fetched_queries,
+                )
                 verified_answer = self._ask_llm(
-                    self.prompt_builder.build_verification_prompt(query, all_chunks, decision)
+                    self.prompt_builder.build_verification_prompt(query, all_chunks, decision),
+                    call_type="verify",
                 )
                 if verified_answer.startswith("[LLM_") or not verified_answer:
                     verified_answer = decision
@@ -970,9 +1253,26 @@ class LLMService:
                     refined = retry_match.group(1).strip()
                     if refined and (current_tool, refined) not in fetched_queries:
                         current_query = refined
+                        if (
+                            speculative is not None
+                            and query_similarity(refined, speculative["query"]) >= match_threshold()
+                        ):
+                            # Close enough to the guess: continue with the
+                            # search that is already in flight.
+                            current_query = speculative["query"]
+                            prefetched = {
+                                "key": (current_tool, current_query),
+                                "future": speculative["future"],
+                                "retry_query": refined,
+                            }
+                            speculative = None
+                        elif speculative is not None:
+                            speculative["future"].cancel()
                         # [RETRY] always re-uses the same tool that produced the bad answer.
                         continue
                     verified_answer = decision
+                if speculative is not None:
+                    speculative["future"].cancel()
 
             return {
                 "chunks": all_chunks,
@@ -989,6 +1289,56 @@ class LLMService:
             "forced": True,
         }
 
+    def _start_speculative_retry(
+        self,
+        query: str,
+        decision: str,
+        tool_name: str,
+        vector_store_id: str,
+        fetched_queries: List[Any],
+    ) -> Optional[Dict[str, Any]]:
+        """Start the CAS search for the likely [RETRY] query while verification runs.
+
+        The subject comes from the question, or failing that from the
+        candidate answer; the guess itself is utils.speculation's.  Returns
+        ``{"query", "future"}``, or None when speculation is off, nothing
+        could be guessed, the speculation budget is spent or every
+        speculation worker is busy.
+        """
+        if not self.speculative_retry_enabled:
+            return None
+        candidate = re.sub(r'^\s*FULL_ANSWER:\s*', '', decision)
+        subject = self._subject_from_regex(query) or self._subject_from_regex(candidate)
+        predicted = predict_retry_query(query, subject)
+        if not predicted or (tool_name, predicted) in fetched_queries:
+            return None
+        if not get_speculator().try_acquire():
+            logger.debug("speculative_retry skipped — budget spent")
+            return None
+        logger.debug("speculative_retry start tool=%r query=%r", tool_name, predicted)
+        future = submit_speculative(lambda: self._call_tool(tool_name, predicted, vector_store_id))
+        if future is None:
+            get_speculator().record_saturated()
+            logger.debug("speculative_retry skipped — pool saturated")
+            return None
+        return {"query": predicted, "future": future}
+
+    def _call_tool(self, tool_name: str, query: str, vector_store_id: str) -> Dict[str, Any]:
+        """Dispatch one retrieval through the ToolRegistry, memoised when enabled."""
+        cache = self._retrieval_cache
+        key = (tool_name, query, vector_store_id)
+        if cache is not None:
+            with self._cache_lock:
+                hit = cache.get(key)
+            if hit is not None:
+                logger.debug("retrieval_cache hit tool=%r query=%r", tool_name, query)
+                return hit
+        result = self.tool_registry.call(tool_name, query, vector_store_id=vector_store_id)
+        if cache is not None and result.get("status") == "success":
+            with self._cache_lock:
+                cache[key] = result
+        return result
+
     def _build_chat_payload(self, prompt: str, stream: bool, max_tokens: Optional[int] = None) -> Dict[str, Any]:
         """Build an OpenAI-compatible /v1/chat/completions request payload."""
         return {
@@ -996,6 +1346,7 @@ class LLMService:
             "messages": [{"role": "user", "content": prompt}],
             "stream": stream,
             "max_tokens": max_tokens if max_tokens is not None else self.llm_max_tokens,
+            **({"stream_options": {"include_usage": True}} if stream and self.llm_stream_usage else {}),
         }
 
     def _auth_headers(self) -> Dict[str, str]:
@@ -1004,9 +1355,56 @@ class LLMService:
             return {"Authorization": f"Bearer {self.llm_api_key}"}
         return {}
 
-    def _call_llm(self, prompt: str, max_tokens: Optional[int] = None) -> Iterator[str]:
-        """Call the OpenAI-compatible /v1/chat/completions API with streaming."""
+    def _record_usage(
+        self,
+        call_type: str,
+        prompt: str,
+        completion: str,
+        reported: Optional[Dict[str, Any]],
+    ) -> None:
+        """Add one completed LLM call to the request and process tallies.
+
+        Uses the server-reported usage block when there is one, otherwise
+        estimates both sides from the text.  The estimate bypasses the token
+        memo: a whole prompt or completion is counted once and would only
+        evict the session turns and chunks that are counted repeatedly.
+        """
+        if reported and isinstance(reported.get("prompt_tokens"), int):
+            prompt_tokens = reported["prompt_tokens"]
+            completion_tokens = int(reported.get("completion_tokens") or 0)
+            estimated = False
+        else:
+            prompt_tokens = count_tokens_uncached(prompt)
+            completion_tokens = count_tokens_uncached(completion)
+            estimated = True
+        self.usage.add(call_type, prompt_tokens, completion_tokens, estimated)
+        process_usage.add(call_type, prompt_tokens, completion_tokens, estimated)
+
+    def _call_llm(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        call_type: str = "other",
+    ) -> Iterator[str]:
+        """Call the OpenAI-compatible /v1/chat/completions API with streaming.
+
+        Guarded by the shared ``llm:<base_url>`` circuit breaker: while it is
+        open the ``[LLM_UNAVAILABLE ...]`` sentinel is yielded immediately
+        instead of waiting out LLM_TIMEOUT against a dead endpoint.
+
+        Every call that reaches the model is recorded in ``self.usage`` under
+        *call_type* (see utils.token_usage), including calls whose consumer
+        stops iterating early.
+        """
+        breaker = get_breaker(f"llm:{self.llm_base_url}")
+        if not breaker.allow_request():
+            logger.debug("llm_call_rejected breaker=%s", breaker.name)
+            yield f"[LLM_UNAVAILABLE url={self.llm_base_url} model={self.llm_model}]"
+            return
         payload = self._build_chat_payload(prompt, stream=True, max_tokens=max_tokens)
+        recorded = False
+        completion_parts: List[str] = []
+        reported_usage: Optional[Dict[str, Any]] = None
         try:
             with requests.post(
                 f"{self.llm_base_url}/v1/chat/completions",
@@ -1016,6 +1414,10 @@ class LLMService:
                 timeout=self.request_timeout,
             ) as response:
                 response.raise_for_status()
+                # The endpoint answered — record now so a consumer that stops
+                # iterating early still completes a half-open probe.
+                breaker.record_success()
+                recorded = True
                 for line in response.iter_lines():
                     if not line:
                         continue
@@ -1026,32 +1428,59 @@ class LLMService:
                         break
                     try:
                         chunk = json.loads(text)
-                        token = (
-                            chunk.get("choices", [{}])[0]
-                            .get("delta", {})
-                            .get("content", "")
-                        )
-                        if token:
-                            yield token
                     except json.JSONDecodeError:
                         continue
+                    if isinstance(chunk.get("usage"), dict):
+                        reported_usage = chunk["usage"]
+                    # The usage-only final chunk carries an empty choices list.
+                    choices = chunk.get("choices") or [{}]
+                    token = (choices[0].get("delta") or {}).get("content", "")
+                    if token:
+                        completion_parts.append(token)
+                        yield token
         except (RequestsConnectionError, Timeout):
+            if not recorded:
+                breaker.record_failure()
             logger.warning("llm_unreachable url=%s", self.llm_base_url)
             yield f"[LLM_UNAVAILABLE url={self.llm_base_url} model={self.llm_model}]"
         except requests.exceptions.HTTPError as exc:
             status_code = exc.response.status_code if exc.response is not None else "unknown"
+            if not isinstance(status_code, int) or status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
             logger.warning("llm_http_error status=%s url=%s model=%s", status_code, self.llm_base_url, self.llm_model)
             if status_code == 404:
                 yield f"[LLM_NOT_FOUND url={self.llm_base_url} model={self.llm_model}]"
             else:
                 yield f"[LLM_HTTP_ERROR status={status_code} url={self.llm_base_url} model={self.llm_model}]"
         except Exception as exc:
+            if not recorded:
+                breaker.record_failure()
             logger.warning("llm_stream_error error=%r", exc)
             yield f"[LLM_UNAVAILABLE url={self.llm_base_url} model={self.llm_model}]"
+        finally:
+            # `recorded` means the model accepted the request, so tokens were spent.
+            if recorded:
+                self._record_usage(call_type, prompt, "".join(completion_parts), reported_usage)
+
+    def _ask_llm(self, prompt: str, max_tokens: Optional[int] = None, call_type: str = "other") -> str:
+        """Call the LLM and return the complete response as a single string.
 
-    def _ask_llm(self, prompt: str, max_tokens: Optional[int] = None) -> str:
-        """Call the LLM and return the complete response as a single string."""
-        return "".join(self._call_llm(prompt, max_tokens=max_tokens)).strip()
+        *call_type* tags the call in the token usage tallies.
+        """
+        cache = self._llm_cache
+        key = (prompt, max_tokens)
+        if cache is not None:
+            with self._cache_lock:
+                hit = cache.get(key)
+            if hit is not None:
+                return hit
+        text = "".join(self._call_llm(prompt, max_tokens=max_tokens, call_type=call_type)).strip()
+        if cache is not None and text and not text.startswith("[LLM_"):
+            with self._cache_lock:
+                cache[key] = text
+        return text
 
     def _parse_structured_answer(self, llm_answer: str) -> Dict[str, Any]:
         """Parse the model response, extracting the answer text and source number."""
@@ -1077,7 +1506,54 @@ class LLMService:
         }
 
     def _get_vector_store_id(self) -> Union[str, Dict[str, Any]]:
-        """Fetch vector stores from CAS and return the first available ID."""
+        """Fetch vector stores from CAS and return the first available ID.
+
+        A successful resolution is cached per (CAS host, token) for
+        VECTOR_STORE_CACHE_TTL_SECONDS so requests that don't name a store
+        don't each pay for a list_vector_stores round trip.
+        """
+        cache_key = self._cas_cache_key(include_token=True)
+        cached = _vector_store_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            return cached
+        resolved = self._resolve_vector_store_id()
+        if cache_key and isinstance(resolved, str):
+            _vector_store_cache.set(cache_key, resolved, ttl_seconds=self.vector_store_cache_ttl)
+        return resolved
+
+    def resolve_vector_store_ids(self, requested: Sequence[str]) -> Union[List[str], Dict[str, Any]]:
+        """Expand a federated store list into concrete vector store ids.
+
+        ``"*"`` stands for every store visible to the caller's token.  The
+        result is de-duplicated in request order and capped at
+        FEDERATED_MAX_STORES.  Returns an error dict, like
+        _get_vector_store_id, when nothing usable remains.
+        """
+        ids: List[str] = []
+        for store_id in requested:
+            if store_id == "*":
+                result = self.cas_client.list_vector_stores()
+                if result.get("status") != "success":
+                    return {"status": "error", "error": "Unable to retrieve vector stores from CAS"}
+                ids.extend(
+                    s["id"] for s in result.get("vector_stores", [])
+                    if isinstance(s, dict) and s.get("id")
+                )
+            else:
+                ids.append(store_id)
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {"status": "error", "error": "No usable vector store IDs found"}
+        if len(ids) > self.federated_max_stores:
+            logger.warning(
+                "federated_search capping stores requested=%d max=%d",
+                len(ids), self.federated_max_stores,
+            )
+            ids = ids[:self.federated_max_stores]
+        return ids
+
+    def _resolve_vector_store_id(self) -> Union[str, Dict[str, Any]]:
+        """Uncached body of _get_vector_store_id."""
         result = self.cas_client.list_vector_stores()
         if result.get("status") != "success":
             return {"status": "error", "error": "Unable to retrieve vector stores from CAS"}
@@ -7,6 +7,9 @@ import uuid
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional
 
+from utils.token_usage import TokenUsage
+from utils.tokenizer import count_tokens
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,6 +23,65 @@ class Turn:
     timestamp: float = field(default_factory=time.time)
 
 
+_USER_CONTEXT_SOURCE = "[user-context]"
+_UNAVAILABLE_ANSWER_MARKERS = (
+    "not available in the provided context sources",
+    "no relevant documents were found",
+)
+
+
+def is_personal_turn(turn: Turn) -> bool:
+    """Return True for a [user-context] turn (a personal fact, not a Q&A)."""
+    return bool(turn.sources) and _USER_CONTEXT_SOURCE in turn.sources
+
+
+def is_anchor_turn(turn: Turn) -> bool:
+    """Return True when a turn is safe to use as the active retrieval anchor."""
+    if not turn.sources or any(source in ("[meta]", _USER_CONTEXT_SOURCE) for source in turn.sources):
+        return False
+
+    answer = (turn.answer or "").strip().lower()
+    if not answer:
+        return False
+    if any(marker in answer for marker in _UNAVAILABLE_ANSWER_MARKERS):
+        return False
+    if answer.startswith("[llm_"):
+        return False
+    return True
+
+
+class HistoryIndex:
+    """The parts of a session's turns the history block is rendered from.
+
+    Turns are partitioned into regular and personal ([user-context]) turns,
+    and the latest anchor turn is remembered, as they arrive — so rendering
+    the history block costs O(turns shown) rather than a pass over the
+    whole session.  ``sync`` indexes whatever was appended since the last
+    call and starts over only when the turn list was replaced or shortened.
+    """
+
+    def __init__(self) -> None:
+        self.regular: List[Turn] = []
+        self.personal: List[Turn] = []
+        self.anchor: Optional[Turn] = None
+        self._source: Optional[List[Turn]] = None
+        self._count = 0
+
+    def sync(self, turns: List[Turn]) -> "HistoryIndex":
+        if turns is not self._source or len(turns) < self._count:
+            self.__init__()
+            self._source = turns
+        for turn in turns[self._count:]:
+            if is_personal_turn(turn):
+                self.personal.append(turn)
+                continue
+            self.regular.append(turn)
+            if is_anchor_turn(turn):
+                self.anchor = turn
+        self._count = len(turns)
+        return self
+
+
 @dataclass
 class Session:
     """A conversation session comprising an ordered sequence of turns."""
@@ -35,6 +97,26 @@ class Session:
     # subject without ever restating its name, and a failed retrieval
     # ("not available") shouldn't erase a subject the user explicitly named.
     active_subject: str = ""
+    # LLM tokens spent on this conversation, by call type — see utils.token_usage.
+    token_usage: TokenUsage = field(default_factory=TokenUsage)
+    # Bumped by every SessionStore mutator.
+    version: int = 0
+    _history: HistoryIndex = field(default_factory=HistoryIndex, init=False, repr=False, compare=False)
+    _history_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def mark_changed(self) -> None:
+        """Record a mutation: bump ``version`` and bring the history index up to date."""
+        self.version += 1
+        self.history_index()
+
+    def history_index(self) -> HistoryIndex:
+        """Return the history index, first indexing any turns appended since the last call.
+
+        SessionStore mutators keep it current; the catch-up here covers turns
+        appended to ``turns`` directly.
+        """
+        with self._history_lock:
+            return self._history.sync(self.turns)
 
 
 class SessionStore:
@@ -54,6 +136,23 @@ class SessionStore:
                 return
             session.running_summary = summary
             session.turns = list(turns_to_keep)
+            session.mark_changed()
+
+    def refine_summary(self, session_id: str, expected: str, summary: str) -> bool:
+        """Replace the running summary with *summary* if it is still *expected*.
+
+        Used by hybrid compaction, where an LLM summary computed in the
+        background supersedes the extractive one.  If the session was
+        compacted again (or deleted) meanwhile the refinement is stale and is
+        dropped.  Returns True when the summary was replaced.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.running_summary != expected:
+                return False
+            session.running_summary = summary
+            session.mark_changed()
+            return True
 
     def set_active_subject(self, session_id: str, subject: str) -> None:
         """Record the subject established by the most recently resolved question.
@@ -69,7 +168,9 @@ class SessionStore:
             if session is None:
                 logger.warning("set_active_subject_skipped unknown session_id=%s", session_id)
                 return
-            session.active_subject = subject
+            if session.active_subject != subject:
+                session.active_subject = subject
+                session.mark_changed()
 
     def create(self) -> str:
         """Create a new session and return its id."""
@@ -96,6 +197,16 @@ class SessionStore:
                 logger.warning("add_turn_skipped unknown session_id=%s", session_id)
                 return
             session.turns.append(turn)
+            session.mark_changed()
+
+    def record_usage(self, session_id: str, usage: TokenUsage) -> None:
+        """Add one request's token usage to the session's running totals."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            logger.warning("record_usage_skipped unknown session_id=%s", session_id)
+            return
+        session.token_usage.merge(usage)
 
     def delete(self, session_id: str) -> bool:
         """Delete a session immediately. Returns True if it existed, False otherwise."""
@@ -122,10 +233,11 @@ class SessionStore:
             session = self._sessions.get(session_id)
         if session is None or not session.turns:
             return False
-        full_text = " ".join(f"{t.query} {t.answer}" for t in session.turns)
         budget = int(max_tokens * threshold)
-        # 1 token ≈ 4 characters (same heuristic as LLMService.estimate_tokens)
-        return len(full_text) // 4 > budget
+        # Same tokenizer as LLMService.estimate_tokens, counted per turn
+        # string so the memo in utils.tokenizer makes repeat checks cheap.
+        used = sum(count_tokens(t.query) + count_tokens(t.answer) for t in session.turns)
+        return used > budget
 
     def sweep_expired(self) -> None:
         """Remove sessions that have not been accessed within the TTL window."""
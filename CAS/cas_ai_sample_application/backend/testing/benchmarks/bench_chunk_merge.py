@@ -0,0 +1,105 @@
+"""
+Benchmark: chunk accumulation in the retrieval loop, dicts vs Chunk/ChunkSet.
+
+Replays the loop's accumulation step — each iteration merges a fresh batch
+of search results into everything fetched so far — once with the previous
+implementation (dict chunks, content sets rebuilt for the log line and the
+dedupe, full re-sort and ``{**chunk, "index": i}`` copy per iteration, plus
+ChunkProcessor's dict-copying reindex) and once with ChunkSet.merge over
+slotted Chunk records.
+
+Reports CPU time per accumulation (time.process_time) and the peak memory
+allocated while holding the result (tracemalloc).
+
+Run from the backend directory:
+    python testing/benchmarks/bench_chunk_merge.py [chunks_per_iteration] [iterations]
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from chunk_processor import Chunk, ChunkSet  # noqa: E402
+
+SOURCES = [f"product-line-{i}/manual-{i}.pdf" for i in range(8)]
+
+
+def _batches(per_iter: int, iterations: int, seed: int = 7):
+    rng = random.Random(seed)
+    batches = []
+    for it in range(iterations):
+        batch = []
+        for i in range(per_iter):
+            # ~20% repeats of earlier content, as refined queries overlap.
+            n = rng.randrange(per_iter * it + 1) if it and rng.random() < 0.2 else per_iter * it + i
+            batch.append((f"passage {n} " + "lorem ipsum dolor " * 40, rng.random(), "".join(rng.choice(SOURCES))))
+        batches.append(batch)
+    return batches
+
+
+def _dict_batches(batches):
+    return [[
+        {"index": i, "content": c, "score": s, "source": "".join(src), "file_id": None,
+         "filename": None, "vector_store_id": None}
+        for i, (c, s, src) in enumerate(batch, start=1)
+    ] for batch in batches]
+
+
+def _record_batches(batches):
+    return [[
+        Chunk(index=i, content=c, score=s, source="".join(src))
+        for i, (c, s, src) in enumerate(batch, start=1)
+    ] for batch in batches]
+
+
+def accumulate_dicts(batches):
+    all_chunks = []
+    for new_chunks in batches:
+        new_chunks = [{**c, "index": i} for i, c in enumerate(new_chunks, start=1)]  # old _reindex
+        _ = len(all_chunks) + sum(1 for c in new_chunks if c["content"] not in {ch["content"] for ch in all_chunks})
+        existing = {chunk["content"] for chunk in all_chunks}
+        for chunk in new_chunks:
+            if chunk["content"] not in existing:
+                all_chunks.append(chunk)
+                existing.add(chunk["content"])
+        all_chunks = [{**chunk, "index": i} for i, chunk in enumerate(
+            sorted(all_chunks, key=lambda c: c.get("score") or 0.0, reverse=True), start=1)]
+    return all_chunks
+
+
+def accumulate_records(batches):
+    merged = ChunkSet()
+    all_chunks = []
+    for new_chunks in batches:
+        for i, c in enumerate(new_chunks, start=1):  # new in-place _reindex
+            c["index"] = i
+        merged.merge(new_chunks)
+        all_chunks = merged.as_list()
+    return all_chunks
+
+
+def _measure(label, fn, make, raw, repeats):
+    cpu = 0.0
+    for _ in range(repeats):
+        data = make(raw)
+        start = time.process_time()
+        fn(data)
+        cpu += time.process_time() - start
+
+    tracemalloc.start()
+    result = fn(make(raw))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} chunks={len(result):4d}  cpu/accumulation={cpu / repeats * 1e3:7.3f} ms  peak={peak / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    per_iter = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    raw = _batches(per_iter, iterations)
+    _measure("dicts (before)", accumulate_dicts, _dict_batches, raw, 200)
+    _measure("Chunk/ChunkSet (after)", accumulate_records, _record_batches, raw, 200)
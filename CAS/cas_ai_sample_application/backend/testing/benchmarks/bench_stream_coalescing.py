@@ -0,0 +1,67 @@
+"""
+Benchmark: CPU cost per streamed answer with and without write coalescing.
+
+Drives a Starlette StreamingResponse directly through its ASGI interface
+with a synthetic token stream (a ~400-token answer of short tokens, like a
+typical LLM reply) and a no-op ``send``, then reports process CPU time per
+answer and ASGI sends per answer.  The LLM and the network are out of the
+picture, so the numbers isolate the per-chunk overhead that coalescing
+removes.
+
+Run from the backend directory:
+    python testing/benchmarks/bench_stream_coalescing.py [answers]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from starlette.responses import StreamingResponse  # noqa: E402
+
+from utils.stream_coalescer import coalesce_tokens  # noqa: E402
+
+TOKENS = [("word" if i % 7 else "\n") + (" " if i % 3 else "") for i in range(400)]
+
+
+async def _stream_one(max_chars: int) -> int:
+    sends = 0
+
+    async def receive():
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal sends
+        sends += 1
+
+    def generate():
+        yield "[THINKING]"
+        yield from coalesce_tokens(iter(TOKENS), max_chars=max_chars, max_delay_ms=50)
+        yield '\n[DONE]{"model": "bench"}'
+
+    response = StreamingResponse(generate(), media_type="text/plain")
+    await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+    return sends
+
+
+def _run(max_chars: int, answers: int) -> None:
+    async def main() -> int:
+        sends = 0
+        for _ in range(answers):
+            sends += await _stream_one(max_chars)
+        return sends
+
+    cpu_start = time.process_time()
+    sends = asyncio.run(main())
+    cpu = time.process_time() - cpu_start
+    label = "per-token (STREAM_FLUSH_CHARS=0)" if max_chars <= 0 else f"coalesced (STREAM_FLUSH_CHARS={max_chars})"
+    print(f"{label:<36} cpu/answer={cpu / answers * 1e3:7.3f} ms  sends/answer={sends / answers:6.1f}")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    _run(0, n)
+    _run(256, n)
@@ -13,13 +13,47 @@ mock_cas_client — a pre-configured MagicMock CASClient injected into LLMServic
 
 svc            — a fully-constructed LLMService(cas_client=mock_cas_client) ready
                  for method-level tests that don't care about the CASAgent itself.
+
+_reset_circuit_breakers — autouse; clears the process-wide circuit breaker
+                 and hedger registries, the LLMService warm caches, the
+                 process token usage tally, the tokenizer, the source
+                 cache and the retry speculator, and disables the tool-discovery snapshot file, so
+                 state injected by one test can never leak into a later test.
 """
 
 from unittest.mock import MagicMock
 
 import pytest
 
-from llm_service import LLMService
+from llm_service import LLMService, clear_warm_caches
+from utils.circuit_breaker import reset_breakers
+from utils.hedging import reset_hedgers
+from utils.source_cache import reset_source_cache
+from utils.speculation import reset_speculator
+from utils.token_usage import process_usage
+from utils.tokenizer import reset_tokenizer
+
+
+@pytest.fixture(autouse=True)
+def _reset_circuit_breakers(monkeypatch: pytest.MonkeyPatch):
+    """Start and finish every test with empty process-wide registries and caches."""
+    # No tool-discovery snapshot on disk unless a test points one at tmp_path.
+    monkeypatch.setenv("TOOL_SNAPSHOT_FILE", "")
+    reset_breakers()
+    reset_hedgers()
+    clear_warm_caches()
+    process_usage.reset()
+    reset_tokenizer()
+    reset_source_cache()
+    reset_speculator()
+    yield
+    reset_breakers()
+    reset_hedgers()
+    clear_warm_caches()
+    process_usage.reset()
+    reset_tokenizer()
+    reset_source_cache()
+    reset_speculator()
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,430 @@
+"""
+Unit tests for api_server endpoints
+
+Covers:
+  - GET  /api/health        — circuit breaker and hedger state reported
+  - POST /api/query/batch   — NDJSON streaming, input-index tagging, session
+                              grouping order, per-question error isolation,
+                              a failing session unit still reports every index,
+                              compound questions split as in /api/query/stream
+  - GET  /api/ready         — 503 until the lifespan warm-up completes
+  - _resolve_store_scope    — federated vector_store_ids handling
+  - _apply_compaction       — hybrid mode refines the summary in the background
+  - GET  /api/source/...    — cached source preview, ETag / 304, byte ranges,
+                              pre-warming of retrieved files (off the stream,
+                              opt-in)
+
+Naming convention:  test_<endpoint>_<condition>_<expected_outcome>
+TC-ID convention:   TC-API-<NNN> — matches the project's test catalogue format.
+
+LLMService is replaced with a MagicMock and _answer_batch_question is patched
+where the pipeline itself is not under test, so no CAS or LLM traffic is made.
+TestClient must use a host in ALLOWED_HOSTS (localhost by default).
+"""
+
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api_server
+from utils.token_usage import TokenUsage
+
+
+_CREDS = {"cas_api_key": "token-1234567890", "cas_endpoint": "https://cas.example.com"}
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return TestClient(api_server.app, base_url="http://localhost")
+
+
+@pytest.fixture
+def fake_llm():
+    llm = MagicMock()
+    llm.vector_store_id = "vs1"
+    llm.default_max_results = 10
+    llm.default_min_score = 0.1
+    llm.llm_model = "llama3"
+    llm.usage = TokenUsage()
+    with patch("api_server.LLMService", return_value=llm):
+        yield llm
+
+
+def _ndjson(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+
+class TestHealth:
+
+    @pytest.mark.unit
+    @pytest.mark.api
+    def test_api_health_reports_breakers(self, client: TestClient) -> None:
+        """TC-API-001: /api/health must include circuit_breakers and hedging maps."""
+        body = client.get("/api/health").json()
+        assert body["status"] == "ok"
+        assert "circuit_breakers" in body
+        assert "hedging" in body
+
+
+class TestBatchQuery:
+
+    @pytest.mark.unit
+    @pytest.mark.api
+    def test_batch_streams_one_record_per_question_plus_summary(self, client, fake_llm) -> None:
+        """TC-API-002: Every question yields one NDJSON record tagged by index; a done record ends the stream."""
+        def answer(llm, q, *args, **kwargs):
+            return {"status": "ok", "answer": f"A:{q}", "source": None, "timings_ms": {"total": 1.0}}
+
+        with patch("api_server._answer_batch_question", side_effect=answer):
+            resp = client.post("/api/query/batch", json={
+                **_CREDS,
+                "questions": [{"query": "first question"}, {"query": "second question"}],
+            })
+
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        records = _ndjson(resp)
+        assert records[-1]["done"] is True
+        assert records[-1]["total"] == 2
+        by_index = {r["index"]: r for r in records[:-1]}
+        assert by_index[0]["answer"] == "A:first question"
+        assert by_index[1]["answer"] == "A:second question"
+        fake_llm.enable_shared_caches.assert_called_once()
+
+    @pytest.mark.unit
+    @pytest.mark.api
+    def test_batch_session_group_runs_in_input_order(self, client, fake_llm) -> None:
+        """TC-API-003: Questions sharing a session label run sequentially in input order."""
+        seen = []
+
+        def answer(llm, q, vector_store_id, max_r, min_score, session_id):
+            seen.append((q, session_id))
+            return {"status": "ok", "answer": q, "source": None, "timings_ms": {}}
+
+        with patch("api_server._answer_batch_question", side_effect=answer):
+            resp = client.post("/api/query/batch", json={
+                **_CREDS,
+                "concurrency": 1,
+                "questions": [
+                    {"query": "Storm Alpha cases", "session": "s1"},
+                    {"query": "independent question"},
+                    {"query": "how many there", "session": "s1"},
+                ],
+            })
+
+        records = _ndjson(resp)[:-1]
+        s1 = [q for q, _ in seen if q != "independent question"]
+        assert s1 == ["Storm Alpha cases", "how many there"]
+        session_ids = {r["session_id"] for r in records if r["session"] == "s1"}
+        assert len(session_ids) == 1
+
+    @pytest.mark.unit
+    @pytest.mark.api
+    def test_batch_error_in_one_question_does_not_abort_batch(self, client, fake_llm) -> None:
+        """TC-API-004: An exception answering one question yields an error record; the rest still run."""
+        def answer(llm, q, *args, **kwargs):
+            if q == "bad question":
+                raise RuntimeError("boom")
+            return {"status": "ok", "answer": q, "source": None, "timings_ms": {}}
+
+        with patch("api_server._answer_batch_question", side_effect=answer):
+            resp = client.post("/api/query/batch", json={
+                **_CREDS,
+                "questions": [{"query": "bad question"}, {"query": "good question"}],
+            })
+
+        records = _ndjson(resp)
+        assert records[-1]["errors"] == 1
+        statuses = {r["index"]: r["status"] for r in records[:-1]}
+        assert statuses == {0: "error", 1: "ok"}
+
+    @pytest.mark.unit
+    @pytest.mark.api
+    def test_batch_session_create_failure_reports_every_index(self, client, fake_llm, monkeypatch) -> None:
+        """TC-API-017: If session_store.create raises, the unit's questions yield error records and the stream ends."""
+        monkeypatch.setattr(api_server, "SESSION_ENABLED", lambda: True)
+        monkeypatch.setattr(api_server.session_store, "create", MagicMock(side_effect=RuntimeError("store down")))
+
+        def answer(llm, q, *args, **kwargs):
+            return {"status": "ok", "answer": q, "source": None, "timings_ms": {}}
+
+        with patch("api_server._answer_batch_question", side_effect=answer):
+            resp = client.post("/api/query/batch", json={
+                **_CREDS,
+                "questions": [
+                    {"query": "Storm Alpha cases", "session": "s1"},
+                    {"query": "independent question"},
+                    {"query": "how many there", "session": "s1"},
+                ],
+            })
+
+        records = _ndjson(resp)
+        assert records[-1]["done"] is True
+        assert records[-1]["errors"] == 2
+        by_index = {r["index"]: r for r in records[:-1]}
+        assert by_index[0]["status"] == by_index[2]["status"] == "error"
+        assert by_index[0]["error"] == "store down"
+        assert by_index[1]["status"] == "ok"
+
+    @pytest.mark.unit
+    @pytest.mark.api
+    def test_batch_rejects_oversized_batch(self, client, monkeypatch) -> None:
+        """TC-API-005: More than BATCH_MAX_QUESTIONS questions must be rejected with 422."""
+        monkeypatch.setattr(api_server, "BATCH_MAX_QUESTIONS", 1)
+        resp = client.post("/api/query/batch", json={
+            **_CREDS,
+            "questions": [{"query": "question one"}, {"query": "question two"}],
+        })
+        assert resp.status_code == 422
+
+    @pytest.mark.unit
+    @pytest.mark.api
+    def test_answer_batch_question_reports_stage_timings(self, fake_llm) -> None:
+        """TC-API-006: _answer_batch_question returns rewrite/retrieval/synthesis/total timings."""
+        fake_llm._build_history_block.return_value = ""
+        fake_llm._resolve_query_from_block.return_value = "resolved"
+        fake_llm._run_retrieval_loop.return_value = {
+            "chunks": [{"index": 1, "source": "doc.pdf"}],
+            "final_prompt": None,
+            "answer_text": "FULL_ANSWER: 42\n[SOURCE: 1]",
+            "iterations": 1,
+        }
+        fake_llm._parse_structured_answer.return_value = {"answer": "42", "source_number": 1}
+
+        outcome = api_server._answer_batch_question(fake_llm, "what is it", "vs1", 10, 0.1, None)
+
+        assert outcome["status"] == "ok"
+        assert outcome["answer"] == "42"
+        assert outcome["source"] == "doc.pdf"
+        assert set(outcome["timings_ms"]) == {"rewrite", "retrieval", "synthesis", "total"}
+
+
+    @pytest.mark.unit
+    @pytest.mark.api
+    def test_batch_and_stream_split_compound_questions_alike(self, client, fake_llm) -> None:
+        """TC-API-019: A multi-line question is split into the same sub-questions by batch and stream."""
+        fake_llm._build_history_block.return_value = ""
+        fake_llm._resolve_query_from_block.side_effect = lambda q, block: q
+        fake_llm._run_retrieval_loop.side_effect = lambda query, **kwargs: {
+            "chunks": [{"index": 1, "source": f"{query}.pdf"}],
+            "final_prompt": None,
+            "answer_text": f"FULL_ANSWER: about {query}",
+            "iterations": 1,
+        }
+        fake_llm._parse_structured_answer.side_effect = lambda text: {
+            "answer": text.replace("FULL_ANSWER: ", ""), "source_number": 1,
+        }
+        compound = "1. what is alpha\n2. what is beta"
+
+        outcome = api_server._answer_batch_question(fake_llm, compound, "vs1", 10, 0.1, None)
+
+        assert outcome["status"] == "ok"
+        assert [p["query"] for p in outcome["parts"]] == ["what is alpha", "what is beta"]
+        assert outcome["answer"] == "about what is alpha\n\n---\n\nabout what is beta"
+        assert outcome["source"] == "what is alpha.pdf"
+
+        streamed = client.post("/api/query/stream", json={**_CREDS, "query": compound}).text
+        assert "**what is alpha**\n\nabout what is alpha" in streamed
+        assert "\n\n---\n\n**what is beta**\n\nabout what is beta" in streamed
+
+
+class TestReadiness:
+
+    @pytest.mark.unit
+    @pytest.mark.api
+    def test_ready_returns_503_before_warm_up(self, client: TestClient, monkeypatch) -> None:
+        """TC-API-007: /api/ready must report 503 while warm-up has not completed."""
+        monkeypatch.setitem(api_server._readiness, "ready", False)
+        resp = client.get("/api/ready")
+        assert resp.status_code == 503
+        assert resp.json() == {"ready": False}
+
+    @pytest.mark.unit
+    @pytest.mark.api
+    def test_lifespan_warm_up_marks_ready(self, monkeypatch) -> None:
+        """TC-API-008: Starting the app runs warm-up and /api/ready then reports the report."""
+        monkeypatch.setattr(api_server, "WARMUP_ENABLED", True)
+        monkeypatch.setattr(api_server, "_warm_up", lambda: {"tools": ["cas"]})
+        with TestClient(api_server.app, base_url="http://localhost") as c:
+            for _ in range(100):
+                resp = c.get("/api/ready")
+                if resp.status_code == 200:
+                    break
+                time.sleep(0.01)
+        assert resp.status_code == 200
+        assert resp.json()["warmup"]["tools"] == ["cas"]
+
+
+class TestFederatedScope:
+
+    @pytest.mark.unit
+    @pytest.mark.api
+    def test_resolve_store_scope_sets_federated_list(self, fake_llm) -> None:
+        """TC-API-009: Several store ids are set on the LLMService; the first is the nominal store."""
+        fake_llm.vector_store_ids = None
+        fake_llm.resolve_vector_store_ids.return_value = ["a", "b"]
+        assert api_server._resolve_store_scope(fake_llm, ["*"]) == "a"
+        assert fake_llm.vector_store_ids == ["a", "b"]
+
+        fake_llm.vector_store_ids = None
+        fake_llm.resolve_vector_store_ids.return_value = ["only"]
+        assert api_server._resolve_store_scope(fake_llm, ["only"]) == "only"
+        assert fake_llm.vector_store_ids is None
+
+    @pytest.mark.unit
+    @pytest.mark.api
+    def test_query_request_rejects_blank_store_id(self) -> None:
+        """TC-API-010: Blank entries in vector_store_ids must fail validation."""
+        with pytest.raises(ValueError):
+            api_server.QueryRequest(**_CREDS, query="hello", vector_store_ids=["a", " "])
+
+
+class TestHybridCompaction:
+
+    @pytest.mark.unit
+    @pytest.mark.api
+    def test_hybrid_plan_applies_extractive_then_refines(self, fake_llm, monkeypatch) -> None:
+        """TC-API-011: A hybrid plan is applied at once, then replaced by the LLM summary off-thread."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        from session_store import SessionStore, Turn
+
+        store = SessionStore()
+        sid = store.create()
+        store.add_turn(sid, Turn(query="Q1", answer="A1", sources=[]))
+        monkeypatch.setattr(api_server, "session_store", store)
+        pool = ThreadPoolExecutor(max_workers=1)
+        monkeypatch.setattr(api_server, "_compaction_pool", pool)
+
+        fake_llm._compact_history.return_value = {
+            "summary": "extractive", "turns_to_keep": [], "mode": "hybrid",
+            "turns_folded": [], "prior_summary": "",
+        }
+        fake_llm._summarise_turns_with_llm.return_value = "refined"
+
+        api_server._apply_compaction(fake_llm, sid, store.get(sid))
+        pool.shutdown(wait=True)
+
+        assert store.get(sid).running_summary == "refined"
+        assert store.get(sid).turns == []
+
+
+_SOURCE_HEADERS = {"X-CAS-Api-Key": _CREDS["cas_api_key"], "X-CAS-Endpoint": _CREDS["cas_endpoint"]}
+
+
+@pytest.fixture
+def source_cas(monkeypatch, tmp_path):
+    """Point the source cache at tmp_path and stub CASClient.get_file_content."""
+    monkeypatch.setenv("SOURCE_CACHE_DIR", str(tmp_path))
+    fetch = MagicMock(return_value={"status": "success", "content": "0123456789"})
+    monkeypatch.setattr(api_server.CASClient, "get_file_content", lambda self, vs, fid: fetch(vs, fid))
+    return fetch
+
+
+class TestSourcePreview:
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_source_served_from_cache_after_first_fetch(self, client, source_cas) -> None:
+        """TC-API-012: The first request fetches from CAS; the second is served from the disk cache."""
+        first = client.get("/api/source/vs1/file-1", headers=_SOURCE_HEADERS)
+        second = client.get("/api/source/vs1/file-1", headers=_SOURCE_HEADERS)
+        assert first.status_code == second.status_code == 200
+        assert second.text == "0123456789"
+        assert first.headers["etag"] == second.headers["etag"]
+        source_cas.assert_called_once_with("vs1", "file-1")
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_source_if_none_match_returns_304(self, client, source_cas) -> None:
+        """TC-API-013: A matching If-None-Match must answer 304 with no body."""
+        etag = client.get("/api/source/vs1/file-1", headers=_SOURCE_HEADERS).headers["etag"]
+        resp = client.get("/api/source/vs1/file-1", headers={**_SOURCE_HEADERS, "If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.content == b""
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_source_byte_ranges(self, client, source_cas) -> None:
+        """TC-API-014: Range headers and offset/length paging answer 206; impossible ranges 416."""
+        resp = client.get("/api/source/vs1/file-1", headers={**_SOURCE_HEADERS, "Range": "bytes=2-4"})
+        assert resp.status_code == 206
+        assert resp.text == "234"
+        assert resp.headers["content-range"] == "bytes 2-4/10"
+
+        resp = client.get("/api/source/vs1/file-1", headers={**_SOURCE_HEADERS, "Range": "bytes=-3"})
+        assert resp.text == "789"
+
+        resp = client.get("/api/source/vs1/file-1?offset=8&length=5", headers=_SOURCE_HEADERS)
+        assert resp.status_code == 206
+        assert resp.text == "89"
+
+        resp = client.get("/api/source/vs1/file-1", headers={**_SOURCE_HEADERS, "Range": "bytes=20-"})
+        assert resp.status_code == 416
+        assert resp.headers["content-range"] == "bytes */10"
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_source_requires_credentials_and_reports_cas_errors(self, client, source_cas) -> None:
+        """TC-API-015: Missing credentials answer 400; a CAS failure answers 502 and is not cached."""
+        assert client.get("/api/source/vs1/file-1").status_code == 400
+
+        source_cas.return_value = {"status": "error", "error": "no such file"}
+        assert client.get("/api/source/vs1/file-1", headers=_SOURCE_HEADERS).status_code == 502
+        source_cas.return_value = {"status": "success", "content": "now here"}
+        assert client.get("/api/source/vs1/file-1", headers=_SOURCE_HEADERS).text == "now here"
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_prewarm_fetches_top_distinct_files(self, source_cas, monkeypatch) -> None:
+        """TC-API-016: Pre-warming caches the top distinct files, honouring each chunk's own store."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = ThreadPoolExecutor(max_workers=1)
+        monkeypatch.setattr(api_server, "_source_prewarm_pool", pool)
+        chunks = [
+            {"index": 1, "source": "a.pdf", "file_id": "f1"},
+            {"index": 2, "source": "a.pdf", "file_id": "f1"},
+            {"index": 3, "source": "b.pdf", "file_id": "f2", "vector_store_id": "vs2"},
+            {"index": 4, "source": "c.pdf", "file_id": "f3"},
+        ]
+        client = api_server._build_cas_client(_CREDS["cas_api_key"], _CREDS["cas_endpoint"])
+        api_server._prewarm_sources(
+            client, _CREDS["cas_api_key"], _CREDS["cas_endpoint"], "vs1", chunks, limit=2,
+        )
+        pool.shutdown(wait=True)
+
+        assert sorted(c.args for c in source_cas.call_args_list) == [("vs1", "f1"), ("vs2", "f2")]
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_prewarm_never_opens_cache_on_stream(self, source_cas, monkeypatch) -> None:
+        """TC-API-018: An unusable source cache is only hit by the background task, and pre-warming is off by default."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        assert api_server.SOURCE_PREWARM_FILES == 0
+        pool = ThreadPoolExecutor(max_workers=1)
+        monkeypatch.setattr(api_server, "_source_prewarm_pool", pool)
+        import threading
+
+        callers = []
+
+        def broken():
+            callers.append(threading.current_thread())
+            raise OSError("read-only file system")
+
+        monkeypatch.setattr(api_server, "get_source_cache", broken)
+        client = api_server._build_cas_client(_CREDS["cas_api_key"], _CREDS["cas_endpoint"])
+
+        api_server._prewarm_sources(
+            client, _CREDS["cas_api_key"], _CREDS["cas_endpoint"], "vs1",
+            [{"index": 1, "source": "a.pdf", "file_id": "f1"}], limit=1,
+        )
+        pool.shutdown(wait=True)
+
+        assert len(callers) == 1
+        assert callers[0] is not threading.current_thread()
+        source_cas.assert_not_called()
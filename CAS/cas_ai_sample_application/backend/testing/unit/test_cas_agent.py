@@ -622,3 +622,63 @@ class TestListVectorStoresEnvelope:
 
         assert result["status"] == "error"
         assert "error" in result
+
+
+class TestSearchVectorStores:
+    """Test the federated fan-out across several vector stores."""
+
+    @pytest.mark.unit
+    @pytest.mark.cas
+    def test_search_vector_stores_merges_and_tags_results(self) -> None:
+        """TC-CAS-036: Results from every store must be merged and tagged with their vector_store_id."""
+        agent = CASClient()
+        agent.configure(api_key="token", cas_endpoint="example.com")
+
+        def search(sid, query, max_num_results, min_score):
+            return {"status": "success", "data": [{"content": f"from {sid}"}]}
+
+        with patch.object(agent, "search_vector_store", side_effect=search):
+            result = agent.search_vector_stores(["a", "b"], "q")
+
+        assert result["status"] == "success"
+        assert sorted((r["vector_store_id"], r["content"]) for r in result["data"]) == [
+            ("a", "from a"), ("b", "from b"),
+        ]
+        assert result["stores"] == {"a": "ok", "b": "ok"}
+
+    @pytest.mark.unit
+    @pytest.mark.cas
+    def test_search_vector_stores_drops_slow_store_after_timeout(self) -> None:
+        """TC-CAS-037: A store that misses the deadline is reported as timeout; the others still answer."""
+        import threading
+        agent = CASClient()
+        agent.configure(api_key="token", cas_endpoint="example.com")
+        release = threading.Event()
+
+        def search(sid, query, max_num_results, min_score):
+            if sid == "slow":
+                release.wait(2)
+            return {"status": "success", "data": [{"content": sid}]}
+
+        try:
+            with patch.object(agent, "search_vector_store", side_effect=search):
+                result = agent.search_vector_stores(["fast", "slow"], "q", timeout=0.05)
+        finally:
+            release.set()
+
+        assert result["status"] == "success"
+        assert [r["content"] for r in result["data"]] == ["fast"]
+        assert result["stores"]["slow"] == "timeout"
+
+    @pytest.mark.unit
+    @pytest.mark.cas
+    def test_search_vector_stores_errors_when_every_store_fails(self) -> None:
+        """TC-CAS-038: If no store answers, the call must return status=error with per-store detail."""
+        agent = CASClient()
+        agent.configure(api_key="token", cas_endpoint="example.com")
+
+        with patch.object(agent, "search_vector_store", return_value={"status": "error", "error": "down"}):
+            result = agent.search_vector_stores(["a", "b"], "q")
+
+        assert result["status"] == "error"
+        assert result["stores"] == {"a": "error: down", "b": "error: down"}
@@ -21,7 +21,7 @@ so tests are not affected by whatever is set in the environment.
 
 import pytest
 
-from chunk_processor import ChunkProcessor
+from chunk_processor import Chunk, ChunkProcessor, ChunkSet
 
 
 # ---------------------------------------------------------------------------
@@ -742,3 +742,124 @@ class TestProcess:
             assert fragment in all_content, (
                 f"Scenario '{description}': expected fragment {fragment!r} not found in output"
             )
+
+
+# ---------------------------------------------------------------------------
+# normalize_store_scores  (federated search)
+# ---------------------------------------------------------------------------
+
+class TestNormalizeStoreScores:
+    """Test the shared score rescaling applied before federated results are merged."""
+
+    @pytest.mark.unit
+    @pytest.mark.chunk
+    def test_normalize_store_scores_rescales_against_the_best_hit(self) -> None:
+        """TC-CHUNK-038: Scores must be divided by the best hit across all stores; the raw score is kept as raw_score."""
+        results = [
+            {**_make_result("a1", score=0.8), "vector_store_id": "a"},
+            {**_make_result("a2", score=0.4), "vector_store_id": "a"},
+            {**_make_result("b1", score=0.5), "vector_store_id": "b"},
+        ]
+
+        normalized = ChunkProcessor.normalize_store_scores(results)
+
+        scores = {r["content"]: r["score"]["combined_probability_score"] for r in normalized}
+        assert scores == {"a1": 1.0, "a2": 0.5, "b1": 0.625}
+        assert normalized[1]["score"]["raw_score"] == 0.4
+        assert results[0]["score"]["combined_probability_score"] == 0.8  # input untouched
+
+    @pytest.mark.unit
+    @pytest.mark.chunk
+    def test_irrelevant_store_stays_below_the_relevant_one(self) -> None:
+        """TC-CHUNK-045: A store whose best hit is weak must not tie the relevant store, so the dominant filter drops it."""
+        results = [
+            {**_make_result("answer", source="relevant.pdf", score=0.9), "vector_store_id": "a"},
+            {**_make_result("noise", source="unrelated.pdf", score=0.1), "vector_store_id": "b"},
+        ]
+
+        normalized = ChunkProcessor.normalize_store_scores(results)
+        scores = {r["content"]: r["score"]["combined_probability_score"] for r in normalized}
+        assert scores["answer"] == 1.0
+        assert scores["noise"] == pytest.approx(0.1 / 0.9)
+
+        cp = ChunkProcessor(max_chunk_chars=0, dominant_gap_threshold=0.09)
+        chunks = cp.process(normalized)
+        assert [c["source"] for c in chunks] == ["relevant.pdf"]
+
+    @pytest.mark.unit
+    @pytest.mark.chunk
+    def test_build_carries_vector_store_id(self) -> None:
+        """TC-CHUNK-039: _build must copy vector_store_id onto the chunk (None for single-store search)."""
+        cp = ChunkProcessor(max_chunk_chars=0, dominant_gap_threshold=0.0)
+        chunks = cp._build([{**_make_result("x"), "vector_store_id": "a"}, _make_result("y")])
+        assert [c["vector_store_id"] for c in chunks] == ["a", None]
+
+
+# ---------------------------------------------------------------------------
+# Chunk / ChunkSet  (compact records and incremental merge)
+# ---------------------------------------------------------------------------
+
+class TestChunkRecord:
+    """Test the slotted chunk record and its dict-compatible access."""
+
+    @pytest.mark.unit
+    @pytest.mark.chunk
+    def test_chunk_supports_mapping_access(self) -> None:
+        """TC-CHUNK-040: Chunk must answer c["k"], c.get(), dict(c) and compare equal to its dict form."""
+        c = Chunk(content="text", score=0.5, source="doc.pdf", index=2)
+        assert c["content"] == "text"
+        assert c.get("score") == 0.5
+        assert c.get("missing", "d") == "d"
+        assert dict(c)["source"] == "doc.pdf"
+        assert c == dict(c)
+        with pytest.raises(KeyError):
+            c["missing"]
+
+    @pytest.mark.unit
+    @pytest.mark.chunk
+    def test_chunk_interns_source_names(self) -> None:
+        """TC-CHUNK-041: Chunks from the same source must share one interned source string."""
+        a = Chunk(content="a", source="".join(["report", ".pdf"]))
+        b = Chunk(content="b", source="".join(["report", ".pdf"]))
+        assert a.source is b.source
+
+
+class TestChunkSet:
+    """Test incremental de-duplicating, score-ordered merging."""
+
+    @pytest.mark.unit
+    @pytest.mark.chunk
+    def test_chunkset_merge_keeps_sorted_and_indexed(self) -> None:
+        """TC-CHUNK-042: Merged chunks must stay score-ordered and numbered 1..N across merges."""
+        merged = ChunkSet([Chunk(content="a", score=0.5), Chunk(content="b", score=0.3)])
+        added = merged.merge([Chunk(content="c", score=0.9), Chunk(content="d", score=0.4)])
+
+        assert added == 2
+        assert [(c.content, c.index) for c in merged] == [("c", 1), ("a", 2), ("d", 3), ("b", 4)]
+
+    @pytest.mark.unit
+    @pytest.mark.chunk
+    def test_chunkset_merge_drops_duplicate_content(self) -> None:
+        """TC-CHUNK-043: Content already present must not be added again; dicts are accepted."""
+        merged = ChunkSet([Chunk(content="a", score=0.5)])
+        added = merged.merge([{"content": "a", "score": 0.9}, {"content": "b", "score": None}])
+
+        assert added == 1
+        assert [c.content for c in merged] == ["a", "b"]
+        assert "a" in merged
+
+    @pytest.mark.unit
+    @pytest.mark.chunk
+    def test_chunkset_matches_stable_sort_order(self) -> None:
+        """TC-CHUNK-044: Ties keep arrival order — same result as re-sorting everything each time."""
+        batches = [
+            [Chunk(content=f"x{i}", score=s) for i, s in enumerate([0.5, 0.7, 0.5])],
+            [Chunk(content=f"y{i}", score=s) for i, s in enumerate([0.5, None, 0.7])],
+        ]
+        merged = ChunkSet()
+        arrival: list = []
+        for batch in batches:
+            merged.merge(batch)
+            arrival.extend(batch)
+        expected = sorted(arrival, key=lambda c: c.score or 0.0, reverse=True)
+        assert [c.content for c in merged] == [c.content for c in expected]
@@ -0,0 +1,200 @@
+"""
+Unit tests for CircuitBreaker and its CAS / LLM integration
+
+Covers:
+  - CircuitBreaker state machine — closed → open → half-open → closed/open
+  - Rolling window — old outcomes age out, min_calls gate
+  - CASClient._call_mcp_tool — fails fast while the CAS breaker is open
+  - LLMService._call_llm     — yields the sentinel without an HTTP call while open
+
+Naming convention:  test_<thing_under_test>_<condition>_<expected_outcome>
+TC-ID convention:   TC-CB-<NNN> — matches the project's test catalogue format.
+
+A fake clock is injected so cool-downs and window expiry are deterministic.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from requests.exceptions import ConnectionError as ReqConnError
+
+from agents.cas_client import CASClient
+from llm_service import LLMService
+from utils.circuit_breaker import CircuitBreaker, breaker_states, get_breaker
+from utils.exceptions import CASClientError
+
+
+class _Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _breaker(clock: _Clock, **kwargs) -> CircuitBreaker:
+    params = dict(window_seconds=60, min_calls=4, error_rate_threshold=0.5, open_seconds=30)
+    params.update(kwargs)
+    return CircuitBreaker("test", clock=clock, **params)
+
+
+# ---------------------------------------------------------------------------
+# State machine
+# ---------------------------------------------------------------------------
+
+class TestCircuitBreakerStateMachine:
+
+    @pytest.mark.unit
+    @pytest.mark.breaker
+    def test_breaker_stays_closed_below_min_calls(self) -> None:
+        """TC-CB-001: Failures below min_calls must not open the breaker."""
+        b = _breaker(_Clock())
+        for _ in range(3):
+            b.record_failure()
+        assert b.state == CircuitBreaker.CLOSED
+        assert b.allow_request() is True
+
+    @pytest.mark.unit
+    @pytest.mark.breaker
+    def test_breaker_opens_when_error_rate_reached(self) -> None:
+        """TC-CB-002: An error rate at the threshold with enough calls must open the breaker."""
+        b = _breaker(_Clock())
+        b.record_success()
+        b.record_success()
+        b.record_failure()
+        b.record_failure()
+        assert b.state == CircuitBreaker.OPEN
+        assert b.allow_request() is False
+        assert b.snapshot()["rejected"] == 1
+
+    @pytest.mark.unit
+    @pytest.mark.breaker
+    def test_breaker_half_open_admits_single_probe(self) -> None:
+        """TC-CB-003: After the cool-down exactly one caller is admitted as the probe."""
+        clock = _Clock()
+        b = _breaker(clock)
+        for _ in range(4):
+            b.record_failure()
+        clock.now += 31
+        assert b.allow_request() is True
+        assert b.allow_request() is False
+
+    @pytest.mark.unit
+    @pytest.mark.breaker
+    def test_breaker_probe_success_closes(self) -> None:
+        """TC-CB-004: A successful half-open probe must close the breaker and clear the window."""
+        clock = _Clock()
+        b = _breaker(clock)
+        for _ in range(4):
+            b.record_failure()
+        clock.now += 31
+        b.allow_request()
+        b.record_success()
+        assert b.state == CircuitBreaker.CLOSED
+        assert b.snapshot()["window_calls"] == 0
+
+    @pytest.mark.unit
+    @pytest.mark.breaker
+    def test_breaker_probe_failure_reopens(self) -> None:
+        """TC-CB-005: A failed half-open probe must re-open the breaker for another cool-down."""
+        clock = _Clock()
+        b = _breaker(clock)
+        for _ in range(4):
+            b.record_failure()
+        clock.now += 31
+        b.allow_request()
+        b.record_failure()
+        assert b.state == CircuitBreaker.OPEN
+        assert b.allow_request() is False
+
+    @pytest.mark.unit
+    @pytest.mark.breaker
+    def test_breaker_old_failures_age_out_of_window(self) -> None:
+        """TC-CB-006: Failures older than window_seconds must not count toward the rate."""
+        clock = _Clock()
+        b = _breaker(clock)
+        for _ in range(3):
+            b.record_failure()
+        clock.now += 61
+        b.record_failure()
+        assert b.state == CircuitBreaker.CLOSED
+        assert b.snapshot()["window_failures"] == 1
+
+    @pytest.mark.unit
+    @pytest.mark.breaker
+    def test_breaker_disabled_never_rejects(self) -> None:
+        """TC-CB-007: enabled=False must turn the breaker into a pass-through."""
+        b = _breaker(_Clock(), enabled=False)
+        for _ in range(10):
+            b.record_failure()
+        assert b.allow_request() is True
+
+    @pytest.mark.unit
+    @pytest.mark.breaker
+    def test_get_breaker_returns_shared_instance(self) -> None:
+        """TC-CB-008: get_breaker must return the same instance per name and list it in breaker_states."""
+        assert get_breaker("llm:x") is get_breaker("llm:x")
+        assert "llm:x" in breaker_states()
+
+
+# ---------------------------------------------------------------------------
+# Integration with CASClient and LLMService
+# ---------------------------------------------------------------------------
+
+class TestBreakerIntegration:
+
+    @pytest.mark.unit
+    @pytest.mark.breaker
+    def test_cas_call_fails_fast_when_breaker_open(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """TC-CB-009: Repeated CAS connection failures must open the breaker and skip HTTP."""
+        monkeypatch.setenv("CIRCUIT_BREAKER_MIN_CALLS", "2")
+        client = CASClient()
+        client.configure(api_key="token", cas_endpoint="https://cas.example.com")
+        url = client._build_mcp_url()
+
+        with patch("agents.cas_client.requests.post", side_effect=ReqConnError("refused")) as post:
+            for _ in range(2):
+                with pytest.raises(CASClientError):
+                    client._call_mcp_tool(url, "search_vector_stores", {})
+            with pytest.raises(CASClientError, match="circuit breaker open"):
+                client._call_mcp_tool(url, "search_vector_stores", {})
+
+        assert post.call_count == 2
+        assert breaker_states()["cas:cas.example.com"]["state"] == "open"
+
+    @pytest.mark.unit
+    @pytest.mark.breaker
+    def test_cas_client_error_status_does_not_trip_breaker(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """TC-CB-010: A 4xx from CAS means the backend is up — it must not count as a failure."""
+        import requests
+
+        monkeypatch.setenv("CIRCUIT_BREAKER_MIN_CALLS", "1")
+        client = CASClient()
+        client.configure(api_key="token", cas_endpoint="https://cas.example.com")
+        resp = requests.Response()
+        resp.status_code = 401
+        http_error = requests.exceptions.HTTPError(response=resp)
+
+        with patch("agents.cas_client.requests.post") as post:
+            post.return_value.raise_for_status.side_effect = http_error
+            with pytest.raises(CASClientError):
+                client._call_mcp_tool(client._build_mcp_url(), "search_vector_stores", {})
+
+        assert breaker_states()["cas:cas.example.com"]["state"] == "closed"
+
+    @pytest.mark.unit
+    @pytest.mark.breaker
+    def test_llm_call_yields_sentinel_without_http_when_open(
+        self, svc: LLMService, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """TC-CB-011: An open LLM breaker must yield [LLM_UNAVAILABLE] without calling requests.post."""
+        monkeypatch.setenv("CIRCUIT_BREAKER_MIN_CALLS", "1")
+        with patch("llm_service.requests.post", side_effect=ReqConnError("refused")) as post:
+            first = svc._ask_llm("p")
+            second = svc._ask_llm("p")
+
+        assert first.startswith("[LLM_UNAVAILABLE")
+        assert second.startswith("[LLM_UNAVAILABLE")
+        assert post.call_count == 1
@@ -0,0 +1,72 @@
+"""
+Unit tests for utils.compaction
+
+Covers:
+  - key_sentences()       — numbers / entities / subject ranked, order kept
+  - extractive_summary()  — subjects line, unanswered and personal turns,
+                            prior summary carried forward, length cap
+
+Naming convention:  test_<function>_<condition>_<expected_outcome>
+TC-ID convention:   TC-CMP-<NNN> — matches the project's test catalogue format.
+
+Pure functions — no LLM, no mocks.
+"""
+
+import pytest
+
+from session_store import Turn
+from utils.compaction import extractive_summary, key_sentences
+
+
+def _subject(text: str):
+    return "Storm Alpha" if "Storm Alpha" in text else None
+
+
+class TestKeySentences:
+
+    @pytest.mark.unit
+    @pytest.mark.compaction
+    def test_key_sentences_prefers_numbers_and_entities(self) -> None:
+        """TC-CMP-001: Sentences with numbers and names win; the chosen ones keep their original order."""
+        answer = (
+            "Thanks for asking. Storm Alpha caused 1,204 cases in Ohio. "
+            "That is a lot. FEMA opened 12 shelters."
+        )
+        assert key_sentences(answer, "Storm Alpha") == (
+            "Storm Alpha caused 1,204 cases in Ohio. FEMA opened 12 shelters."
+        )
+
+    @pytest.mark.unit
+    @pytest.mark.compaction
+    def test_key_sentences_falls_back_to_first_sentence(self) -> None:
+        """TC-CMP-002: With nothing informative the first sentence is kept."""
+        assert key_sentences("yes it is. it really is.") == "yes it is."
+
+
+class TestExtractiveSummary:
+
+    @pytest.mark.unit
+    @pytest.mark.compaction
+    def test_summary_lists_subjects_and_turns(self) -> None:
+        """TC-CMP-003: Subjects lead; unanswered and [user-context] turns are summarised, not dropped."""
+        turns = [
+            Turn(query="How many cases for Storm Alpha?", answer="Storm Alpha had 42 cases.", sources=["a.pdf"]),
+            Turn(query="And hotline calls?", answer="Not available in the provided context sources.", sources=[]),
+            Turn(query="My name is Priya", answer="Got it!", sources=["[user-context]"]),
+        ]
+        summary = extractive_summary(turns, prior_summary="Earlier: Ohio.", subject_of=_subject)
+        assert summary.startswith("Subjects: Storm Alpha.")
+        assert "Earlier: Ohio." in summary
+        assert "A: Storm Alpha had 42 cases." in summary
+        assert "Q: And hotline calls? A: no answer in the documents." in summary
+        assert "User said: My name is Priya" in summary
+
+    @pytest.mark.unit
+    @pytest.mark.compaction
+    def test_summary_drops_oldest_material_to_fit(self) -> None:
+        """TC-CMP-004: Over max_chars the prior summary goes first and the newest turn survives."""
+        turns = [Turn(query=f"Q{i}", answer=f"Answer number {i}.", sources=["a.pdf"]) for i in range(5)]
+        summary = extractive_summary(turns, prior_summary="x" * 500, max_chars=80)
+        assert len(summary) <= 80
+        assert "xxx" not in summary
+        assert "Answer number 4." in summary
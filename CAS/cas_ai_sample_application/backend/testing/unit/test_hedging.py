@@ -0,0 +1,204 @@
+"""
+Unit tests for Hedger and CAS search hedging
+
+Covers:
+  - Hedger.hedge_delay()  — None until min_samples, p95 with a min_delay floor
+  - Hedger.call()         — unhedged fast path, hedge wins on a slow primary,
+                            budget exhaustion, failure fall-through,
+                            saturated pool, failures kept out of the p95
+  - CASClient.search_vector_store — routes through the hedger only when
+                            CAS_HEDGE_ENABLED=true
+
+Naming convention:  test_<thing_under_test>_<condition>_<expected_outcome>
+TC-ID convention:   TC-HG-<NNN> — matches the project's test catalogue format.
+
+Slow calls block on a threading.Event rather than sleeping, so every test
+finishes in milliseconds.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import threading
+
+import pytest
+
+from agents.cas_client import CASClient
+from utils.hedging import Hedger, hedger_states
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=4)
+    yield pool
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@pytest.fixture
+def slots():
+    return threading.BoundedSemaphore(4)
+
+
+def _warm(hedger: Hedger, latency: float = 0.01, n: int = 20) -> None:
+    for _ in range(n):
+        hedger.record_latency(latency)
+
+
+class TestHedgeDelay:
+
+    @pytest.mark.unit
+    @pytest.mark.hedging
+    def test_hedge_delay_none_until_min_samples(self, executor, slots) -> None:
+        """TC-HG-001: With fewer than min_samples latencies there is no hedge delay."""
+        h = Hedger("t", executor, slots, min_samples=5)
+        _warm(h, n=4)
+        assert h.hedge_delay() is None
+
+    @pytest.mark.unit
+    @pytest.mark.hedging
+    def test_hedge_delay_is_p95_with_floor(self, executor, slots) -> None:
+        """TC-HG-002: hedge_delay must be the p95 latency, never below min_delay."""
+        h = Hedger("t", executor, slots, min_samples=20, min_delay=0.0)
+        for i in range(1, 101):
+            h.record_latency(i / 100.0)
+        assert h.hedge_delay() == pytest.approx(0.95)
+
+        floored = Hedger("t2", executor, slots, min_samples=1, min_delay=0.5)
+        floored.record_latency(0.01)
+        assert floored.hedge_delay() == 0.5
+
+
+class TestHedgerCall:
+
+    @pytest.mark.unit
+    @pytest.mark.hedging
+    def test_call_runs_inline_without_samples(self, executor, slots) -> None:
+        """TC-HG-003: Before warm-up the call must run once, unhedged."""
+        h = Hedger("t", executor, slots)
+        calls = []
+        assert h.call(lambda: calls.append(1) or "ok") == "ok"
+        assert len(calls) == 1
+        assert h.snapshot()["hedges"] == 0
+
+    @pytest.mark.unit
+    @pytest.mark.hedging
+    def test_call_hedge_wins_when_primary_is_slow(self, executor, slots) -> None:
+        """TC-HG-004: A primary slower than p95 must be hedged and the hedge's result returned."""
+        h = Hedger("t", executor, slots, budget_ratio=1.0, min_samples=20, min_delay=0.01)
+        _warm(h)
+        release = threading.Event()
+        attempts = {"n": 0}
+        lock = threading.Lock()
+
+        def fn():
+            with lock:
+                attempts["n"] += 1
+                n = attempts["n"]
+            if n == 1:
+                release.wait(2)
+                return "slow"
+            return "fast"
+
+        try:
+            assert h.call(fn) == "fast"
+        finally:
+            release.set()
+        snap = h.snapshot()
+        assert snap["hedges"] == 1
+        assert snap["hedge_wins"] == 1
+
+    @pytest.mark.unit
+    @pytest.mark.hedging
+    def test_call_no_hedge_when_budget_exhausted(self, executor, slots) -> None:
+        """TC-HG-005: With no budget tokens the slow primary must be awaited, not duplicated."""
+        h = Hedger("t", executor, slots, budget_ratio=0.0, min_samples=20, min_delay=0.01)
+        _warm(h)
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            release.wait(0.1)
+            return "primary"
+
+        assert h.call(fn) == "primary"
+        assert len(calls) == 1
+        assert h.snapshot()["hedges"] == 0
+
+    @pytest.mark.unit
+    @pytest.mark.hedging
+    def test_call_falls_through_to_surviving_attempt_on_error(self, executor, slots) -> None:
+        """TC-HG-006: If the first finisher raises, the other attempt's result must be used."""
+        h = Hedger("t", executor, slots, budget_ratio=1.0, min_samples=20, min_delay=0.01)
+        _warm(h)
+        attempts = {"n": 0}
+        lock = threading.Lock()
+        release = threading.Event()
+
+        def fn():
+            with lock:
+                attempts["n"] += 1
+                n = attempts["n"]
+            if n == 1:
+                release.wait(2)
+                return "primary"
+            release.set()
+            raise RuntimeError("hedge failed")
+
+        assert h.call(fn) == "primary"
+
+    @pytest.mark.unit
+    @pytest.mark.hedging
+    def test_call_runs_on_caller_thread_when_pool_is_busy(self, executor) -> None:
+        """TC-HG-008: With no idle worker the primary must run inline and never queue."""
+        h = Hedger("t", executor, slots=threading.Semaphore(0), budget_ratio=1.0,
+                   min_samples=20, min_delay=0.01)
+        _warm(h)
+        threads = []
+
+        def fn():
+            threads.append(threading.current_thread())
+            return "ok"
+
+        assert h.call(fn) == "ok"
+        assert threads == [threading.current_thread()]
+        snap = h.snapshot()
+        assert snap["saturated"] == 1
+        assert snap["hedges"] == 0
+
+    @pytest.mark.unit
+    @pytest.mark.hedging
+    def test_call_failures_not_recorded_as_latency(self, executor, slots) -> None:
+        """TC-HG-009: Failed calls must not feed the latency sample behind the hedge delay."""
+        h = Hedger("t", executor, slots, min_samples=3, min_delay=0.0)
+
+        def boom():
+            raise RuntimeError("breaker open")
+
+        for _ in range(5):
+            with pytest.raises(RuntimeError):
+                h.call(boom)
+        assert h.hedge_delay() is None
+
+        for _ in range(3):
+            h.call(lambda: "ok")
+        assert h.hedge_delay() is not None
+
+
+class TestSearchHedgingIntegration:
+
+    @pytest.mark.unit
+    @pytest.mark.hedging
+    def test_search_uses_hedger_only_when_enabled(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """TC-HG-007: search_vector_store must register a hedger only with CAS_HEDGE_ENABLED=true."""
+        client = CASClient()
+        client.configure(api_key="token", cas_endpoint="https://cas.example.com")
+
+        with patch.object(client, "_call_mcp_tool", return_value={"data": []}):
+            monkeypatch.delenv("CAS_HEDGE_ENABLED", raising=False)
+            assert client.search_vector_store("vs1", "q")["status"] == "success"
+            assert hedger_states() == {}
+
+            monkeypatch.setenv("CAS_HEDGE_ENABLED", "true")
+            assert client.search_vector_store("vs1", "q")["status"] == "success"
+
+        assert hedger_states()["cas-search:cas.example.com"]["primaries"] == 1
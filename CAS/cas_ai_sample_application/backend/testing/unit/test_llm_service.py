@@ -26,9 +26,11 @@ from typing import Any
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
+from requests.exceptions import ConnectionError as RequestsConnectionError
 
 from llm_service import LLMService
 from utils.exceptions import ConfigurationError
+from utils.token_usage import process_usage
 
 
 # ---------------------------------------------------------------------------
@@ -772,6 +774,33 @@ class TestBuildHistoryBlock:
         assert "Q1" not in block
         assert "Q2" not in block
 
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_history_block_reads_incremental_index(self, svc: LLMService) -> None:
+        """TC-LLM-086: The block is rendered from the session's history index, which add_turn keeps current."""
+        from session_store import SessionStore, Turn, is_anchor_turn
+        store = SessionStore()
+        sid = store.create()
+        store.add_turn(sid, Turn(query="What is OBAC?", answer="OBAC controls access.", sources=["doc.pdf"]))
+        store.add_turn(sid, Turn(query="I work in finance", answer="Noted.", sources=["[user-context]"]))
+        session = store.get(sid)
+
+        with patch("session_store.is_anchor_turn", wraps=is_anchor_turn) as anchor_check:
+            block = svc._build_history_block(session)
+            store.set_active_subject(sid, "OBAC")
+            svc._build_history_block(session)
+            assert anchor_check.call_count == 0  # nothing re-scanned on render
+
+            store.add_turn(sid, Turn(query="Is it on by default?", answer="No.", sources=["doc.pdf"]))
+            assert anchor_check.call_count == 1  # only the new turn is indexed
+
+        assert "Personal facts:\n  I work in finance" in block
+        assert "Active topic: What is OBAC?" in block
+        block = svc._build_history_block(session)
+        assert "Explicit subject: OBAC" in block
+        assert "Turn 2: Q: Is it on by default? | A: No." in block
+        assert "Active topic: Is it on by default?" in block
+
 
 # ---------------------------------------------------------------------------
 # _run_retrieval_loop
@@ -845,6 +874,76 @@ class TestRunRetrievalLoop:
         assert result["iterations"] == 2
         assert result["forced"] is False
 
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_loop_uses_speculative_retry_search(self, svc: LLMService) -> None:
+        """TC-LLM-092: With speculation on, a matching [RETRY] continues with the search started during verification."""
+        from concurrent.futures import Future
+        from utils.speculation import get_speculator
+
+        def run_now(fn):
+            # Stand-in for the pool: the search finishes before the verdict arrives.
+            future = Future()
+            future.set_result(fn())
+            return future
+
+        svc.speculative_retry_enabled = True
+        svc.cas_client.search_vector_store = MagicMock(
+            return_value=self._make_cas_success(["Storm Alpha funding total was $8M."])
+        )
+        responses = iter([
+            "FULL_ANSWER: $5M in housing services, $3M in food services\n[SOURCE: 1]",
+            "[RETRY] total funding received by Storm Alpha",
+            "FULL_ANSWER: $8M\n[SOURCE: 1]",
+        ])
+        with patch.object(svc, "_ask_llm", side_effect=lambda p, **kw: next(responses)), \
+                patch("llm_service.submit_speculative", side_effect=run_now):
+            result = svc._run_retrieval_loop(
+                query="How much funding did Storm Alpha receive?",
+                vector_store_id="vs1",
+                chunk_cap=5,
+                min_score=0.1,
+            )
+
+        queries = [c.kwargs["query"] for c in svc.cas_client.search_vector_store.call_args_list]
+        assert len(queries) == 2
+        assert queries[1] == "total funding receive for Storm Alpha"
+        assert result["iterations"] == 2
+        assert result["answer_text"].startswith("FULL_ANSWER: $8M")
+        assert get_speculator().snapshot()["hits"] == 1
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_loop_does_not_wait_for_unfinished_speculation(self, svc: LLMService) -> None:
+        """TC-LLM-093: A speculative search still running at the verdict is not waited on; the [RETRY] query is fetched."""
+        from concurrent.futures import Future
+        from utils.speculation import get_speculator
+
+        pending = Future()  # never completes
+        svc.speculative_retry_enabled = True
+        svc.cas_client.search_vector_store = MagicMock(
+            return_value=self._make_cas_success(["Storm Alpha funding total was $8M."])
+        )
+        responses = iter([
+            "FULL_ANSWER: $5M in housing services, $3M in food services\n[SOURCE: 1]",
+            "[RETRY] total funding received by Storm Alpha",
+            "FULL_ANSWER: $8M\n[SOURCE: 1]",
+        ])
+        with patch.object(svc, "_ask_llm", side_effect=lambda p, **kw: next(responses)), \
+                patch("llm_service.submit_speculative", return_value=pending):
+            result = svc._run_retrieval_loop(
+                query="How much funding did Storm Alpha receive?",
+                vector_store_id="vs1",
+                chunk_cap=5,
+                min_score=0.1,
+            )
+
+        queries = [c.kwargs["query"] for c in svc.cas_client.search_vector_store.call_args_list]
+        assert queries[1] == "total funding received by Storm Alpha"
+        assert pending.cancelled()
+        assert result["answer_text"].startswith("FULL_ANSWER: $8M")
+        assert get_speculator().snapshot()["hits"] == 0
+
     @pytest.mark.unit
     @pytest.mark.llm
     def test_loop_forces_answer_at_max_iter(self, svc: LLMService) -> None:
@@ -1031,3 +1130,334 @@ class TestCompactHistory:
         # History must be left intact on compaction failure.
         assert len(session.turns) == original_turn_count
         assert session.running_summary == ""
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_extractive_mode_compacts_without_llm(self, svc: LLMService) -> None:
+        """TC-LLM-087: SESSION_COMPACTION_MODE=extractive builds the summary locally — no LLM call."""
+        from session_store import Session, Turn
+        svc.session_max_context_tokens = 10
+        svc.session_compact_threshold = 0.5
+        svc.session_keep_turns = 1
+        svc.session_compaction_mode = "extractive"
+
+        session = Session(session_id="x")
+        session.turns.append(Turn(query="How many cases for Storm Alpha?", answer="Storm Alpha had 42 cases.", sources=["a.pdf"]))
+        session.turns.append(Turn(query="Q2", answer="A2" * 20, sources=[]))
+
+        with patch.object(svc, "_ask_llm") as mock_ask:
+            plan = svc._compact_history(session)
+
+        mock_ask.assert_not_called()
+        assert plan["mode"] == "extractive"
+        assert plan["summary"].startswith("Subjects: Storm Alpha.")
+        assert "42 cases" in plan["summary"]
+        assert [t.query for t in plan["turns_folded"]] == ["How many cases for Storm Alpha?"]
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_unknown_compaction_mode_falls_back_to_llm(
+        self, llm_env: None, mock_cas_client: MagicMock, monkeypatch
+    ) -> None:
+        """TC-LLM-088: An unrecognised SESSION_COMPACTION_MODE must fall back to llm."""
+        monkeypatch.setenv("SESSION_COMPACTION_MODE", "magic")
+        assert LLMService(cas_client=mock_cas_client).session_compaction_mode == "llm"
+
+
+# ---------------------------------------------------------------------------
+# enable_shared_caches — batch-scoped LLM / retrieval memoisation
+# ---------------------------------------------------------------------------
+
+class TestSharedCaches:
+    """Test the opt-in memo tables used by the batch endpoint."""
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_ask_llm_uncached_by_default(self, svc: LLMService) -> None:
+        """TC-LLM-071: Without enable_shared_caches every _ask_llm call reaches _call_llm."""
+        with patch.object(svc, "_call_llm", return_value=iter(["x"])) as mock_call:
+            svc._ask_llm("p")
+            mock_call.return_value = iter(["x"])
+            svc._ask_llm("p")
+        assert mock_call.call_count == 2
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_ask_llm_memoised_when_enabled(self, svc: LLMService) -> None:
+        """TC-LLM-072: With caches enabled a repeated (prompt, max_tokens) is answered from memory."""
+        svc.enable_shared_caches()
+        with patch.object(svc, "_call_llm", return_value=iter(["answer"])) as mock_call:
+            assert svc._ask_llm("p", max_tokens=5) == "answer"
+            assert svc._ask_llm("p", max_tokens=5) == "answer"
+        assert mock_call.call_count == 1
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_ask_llm_never_caches_sentinel(self, svc: LLMService) -> None:
+        """TC-LLM-073: [LLM_*] sentinels must not be memoised — the next call retries."""
+        svc.enable_shared_caches()
+        with patch.object(svc, "_call_llm", side_effect=lambda *a, **k: iter(["[LLM_UNAVAILABLE x]"])) as mock_call:
+            svc._ask_llm("p")
+            svc._ask_llm("p")
+        assert mock_call.call_count == 2
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_call_tool_memoises_successful_results(self, svc: LLMService) -> None:
+        """TC-LLM-074: Identical retrievals hit CAS once when caches are enabled; errors are not cached."""
+        svc.enable_shared_caches()
+        svc.cas_client.search_vector_store = MagicMock(return_value={"status": "success", "data": []})
+        svc._call_tool("cas", "q", "vs1")
+        svc._call_tool("cas", "q", "vs1")
+        assert svc.cas_client.search_vector_store.call_count == 1
+
+        svc.cas_client.search_vector_store = MagicMock(return_value={"status": "error", "error": "down"})
+        svc._call_tool("cas", "other", "vs1")
+        svc._call_tool("cas", "other", "vs1")
+        assert svc.cas_client.search_vector_store.call_count == 2
+
+
+# ---------------------------------------------------------------------------
+# Warm caches — discovery, vector-store id, compatibility probe
+# ---------------------------------------------------------------------------
+
+class TestWarmCaches:
+    """Test the process-wide TTL caches filled by warm_up()."""
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_compat_probe_cached_between_instances(self, llm_env: None, mock_cas_client: MagicMock) -> None:
+        """TC-LLM-075: A definitive probe result is reused by the next LLMService instance."""
+        first = LLMService(cas_client=mock_cas_client)
+        with patch.object(first, "_ask_llm", return_value="FULL_ANSWER: 4.2\n[SOURCE: 1]") as ask:
+            assert first.check_model_compatibility()["compatible"] is True
+        assert ask.call_count == 1
+
+        second = LLMService(cas_client=mock_cas_client)
+        with patch.object(second, "_ask_llm") as ask2:
+            assert second.check_model_compatibility()["compatible"] is True
+        ask2.assert_not_called()
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_compat_probe_skipped_result_not_cached(self, svc: LLMService) -> None:
+        """TC-LLM-076: 'Probe skipped' (LLM unreachable) must not be cached and must not leak the flag."""
+        with patch.object(svc, "_ask_llm", return_value="[LLM_UNAVAILABLE x]") as ask:
+            result = svc.check_model_compatibility()
+            svc.check_model_compatibility()
+        assert "skipped" not in result
+        assert ask.call_count == 2
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_vector_store_id_cached_per_host_and_token(self, svc: LLMService) -> None:
+        """TC-LLM-077: A resolved vector store id is cached; list_vector_stores runs once."""
+        svc.cas_client._extract_host.return_value = "https://cas.example.com"
+        svc.cas_client._api_key = "token-a"
+        assert svc._get_vector_store_id() == "crisis-domain"
+        assert svc._get_vector_store_id() == "crisis-domain"
+        assert svc.cas_client.list_vector_stores.call_count == 1
+
+        svc.cas_client._api_key = "token-b"
+        svc._get_vector_store_id()
+        assert svc.cas_client.list_vector_stores.call_count == 2
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_tool_discovery_cached_per_host(self, llm_env: None, mock_cas_client: MagicMock) -> None:
+        """TC-LLM-078: A non-empty tools/list result is reused by later instances for the same host."""
+        mock_cas_client.is_configured.return_value = True
+        mock_cas_client._extract_host.return_value = "https://cas.example.com"
+        mock_cas_client.discover_tools.return_value = {
+            "status": "success",
+            "tools": [{"name": "search_vector_stores", "description": "search"}],
+        }
+        LLMService(cas_client=mock_cas_client)
+        second = LLMService(cas_client=mock_cas_client)
+        assert mock_cas_client.discover_tools.call_count == 1
+        assert second.tool_registry.is_registered("cas")
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_tool_discovery_boots_from_snapshot(
+        self, llm_env: None, mock_cas_client: MagicMock, monkeypatch, tmp_path
+    ) -> None:
+        """TC-LLM-089: A cold process registers snapshot tools without tools/list, then revalidates in the background."""
+        import llm_service
+        from utils.tool_snapshot import save_tool_snapshot
+
+        monkeypatch.setenv("TOOL_SNAPSHOT_FILE", str(tmp_path / "tools.json"))
+        mock_cas_client.is_configured.return_value = True
+        mock_cas_client._extract_host.return_value = "https://cas.example.com"
+        save_tool_snapshot("https://cas.example.com", [
+            {"name": "search_vector_stores", "description": "search"},
+            {"name": "get_vector_store_file_content", "description": "file"},
+        ])
+
+        with patch.object(llm_service, "_schedule_tool_revalidation") as schedule:
+            svc = LLMService(cas_client=mock_cas_client)
+
+        mock_cas_client.discover_tools.assert_not_called()
+        assert svc.tool_registry.is_registered("get_vector_store_file_content")
+        schedule.assert_called_once()
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_tool_revalidation_swaps_changed_tool_list(
+        self, llm_env: None, mock_cas_client: MagicMock, monkeypatch, tmp_path
+    ) -> None:
+        """TC-LLM-090: Revalidation replaces the cached tool list and snapshot when tools/list changed."""
+        import llm_service
+        from utils.tool_snapshot import load_tool_snapshot, save_tool_snapshot
+
+        monkeypatch.setenv("TOOL_SNAPSHOT_FILE", str(tmp_path / "tools.json"))
+        host = "https://cas.example.com"
+        save_tool_snapshot(host, [{"name": "search_vector_stores", "description": "search"}])
+        new_tools = [{"name": "search_vector_stores", "description": "search"}, {"name": "new_tool"}]
+        mock_cas_client.discover_tools.return_value = {"status": "success", "tools": new_tools}
+
+        llm_service._revalidate_tools(mock_cas_client, host, 600)
+
+        assert llm_service._tool_discovery_cache.get(host) == new_tools
+        assert load_tool_snapshot(host)["tools"] == new_tools
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_failed_discovery_uses_stale_snapshot(
+        self, llm_env: None, mock_cas_client: MagicMock, monkeypatch, tmp_path
+    ) -> None:
+        """TC-LLM-091: When tools/list fails, a snapshot past its TTL is used instead of the hardcoded tool."""
+        from utils.tool_snapshot import save_tool_snapshot
+
+        monkeypatch.setenv("TOOL_SNAPSHOT_FILE", str(tmp_path / "tools.json"))
+        monkeypatch.setenv("TOOL_SNAPSHOT_TTL_SECONDS", "0")
+        mock_cas_client.is_configured.return_value = True
+        mock_cas_client._extract_host.return_value = "https://cas.example.com"
+        save_tool_snapshot("https://cas.example.com", [
+            {"name": "search_vector_stores", "description": "search"},
+            {"name": "get_vector_store_file_content", "description": "file"},
+        ])
+        mock_cas_client.discover_tools.return_value = {"status": "error", "error": "unreachable"}
+
+        svc = LLMService(cas_client=mock_cas_client)
+
+        mock_cas_client.discover_tools.assert_called_once()
+        assert svc.tool_registry.is_registered("get_vector_store_file_content")
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_warm_up_reports_each_step(self, svc: LLMService) -> None:
+        """TC-LLM-079: warm_up returns tools, vector_store and compatibility entries."""
+        svc.cas_client.is_configured.return_value = True
+        with patch.object(svc, "_ask_llm", return_value="FULL_ANSWER: x\n[SOURCE: 1]"):
+            report = svc.warm_up()
+        assert report["tools"] == ["cas"]
+        assert report["vector_store"] == "crisis-domain"
+        assert report["compatibility"]["compatible"] is True
+
+
+# ---------------------------------------------------------------------------
+# Federated search — several vector stores per request
+# ---------------------------------------------------------------------------
+
+class TestFederatedSearch:
+    """Test store-list resolution and the federated CAS search tool."""
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_resolve_vector_store_ids_expands_wildcard(self, svc: LLMService) -> None:
+        """TC-LLM-080: "*" expands to every visible store; duplicates are dropped and the list is capped."""
+        svc.cas_client.list_vector_stores.return_value = {
+            "status": "success",
+            "vector_stores": [{"id": "a"}, {"id": "b"}, {"id": "c"}],
+        }
+        assert svc.resolve_vector_store_ids(["b", "*"]) == ["b", "a", "c"]
+
+        svc.federated_max_stores = 2
+        assert svc.resolve_vector_store_ids(["*"]) == ["a", "b"]
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_cas_search_fans_out_when_several_stores_set(self, svc: LLMService) -> None:
+        """TC-LLM-081: With vector_store_ids set the cas tool calls search_vector_stores and normalises scores."""
+        svc.vector_store_ids = ["a", "b"]
+        svc.cas_client.search_vector_stores.return_value = {
+            "status": "success",
+            "data": [
+                {"content": "x", "score": {"combined_probability_score": 0.5}, "vector_store_id": "a"},
+                {"content": "y", "score": {"combined_probability_score": 0.25}, "vector_store_id": "b"},
+            ],
+            "stores": {"a": "ok", "b": "ok"},
+        }
+
+        result = svc._call_tool("cas", "q", "a")
+
+        svc.cas_client.search_vector_store.assert_not_called()
+        args, kwargs = svc.cas_client.search_vector_stores.call_args
+        assert args[0] == ["a", "b"]
+        assert kwargs["timeout"] == svc.federated_store_timeout
+        assert [r["score"]["combined_probability_score"] for r in result["data"]] == [1.0, 0.5]
+
+
+# ---------------------------------------------------------------------------
+# Token usage accounting
+# ---------------------------------------------------------------------------
+
+def _stream_response(lines):
+    mock_response = MagicMock()
+    mock_response.__enter__ = lambda s: s
+    mock_response.__exit__ = MagicMock(return_value=False)
+    mock_response.raise_for_status = Mock()
+    mock_response.iter_lines.return_value = [b"data: " + json.dumps(l).encode() for l in lines] + [b"data: [DONE]"]
+    return mock_response
+
+
+class TestTokenUsage:
+    """Test usage parsing from the stream, the estimate fallback, and call-type tagging."""
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_payload_requests_stream_usage(self, svc: LLMService, monkeypatch: pytest.MonkeyPatch) -> None:
+        """TC-LLM-082: Streaming payloads ask for include_usage unless LLM_STREAM_USAGE=false."""
+        assert svc._build_chat_payload("p", stream=True)["stream_options"] == {"include_usage": True}
+        assert "stream_options" not in svc._build_chat_payload("p", stream=False)
+        svc.llm_stream_usage = False
+        assert "stream_options" not in svc._build_chat_payload("p", stream=True)
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_reported_usage_recorded_by_call_type(self, svc: LLMService) -> None:
+        """TC-LLM-083: A usage block in the stream (empty choices) is recorded under the call type."""
+        response = _stream_response([
+            {"choices": [{"delta": {"content": "cas"}}]},
+            {"choices": [], "usage": {"prompt_tokens": 321, "completion_tokens": 2, "total_tokens": 323}},
+        ])
+        with patch("llm_service.requests.post", return_value=response):
+            assert svc._ask_llm("route this", call_type="router") == "cas"
+
+        snap = svc.usage.snapshot()
+        assert snap["by_type"]["router"] == {
+            "calls": 1, "prompt_tokens": 321, "completion_tokens": 2, "estimated_calls": 0,
+        }
+        assert process_usage.snapshot()["prompt_tokens"] == 321
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_missing_usage_falls_back_to_estimate(self, svc: LLMService) -> None:
+        """TC-LLM-084: Without a usage block both sides are estimated and flagged as estimated."""
+        response = _stream_response([{"choices": [{"delta": {"content": "x" * 40}}]}])
+        with patch("llm_service.requests.post", return_value=response):
+            list(svc._call_llm("p" * 400, call_type="synthesis"))
+
+        entry = svc.usage.snapshot()["by_type"]["synthesis"]
+        assert entry["prompt_tokens"] == 100
+        assert entry["completion_tokens"] == 10
+        assert entry["estimated_calls"] == 1
+
+    @pytest.mark.unit
+    @pytest.mark.llm
+    def test_unreachable_llm_records_no_usage(self, svc: LLMService) -> None:
+        """TC-LLM-085: A call the model never accepted must not be counted."""
+        with patch("llm_service.requests.post", side_effect=RequestsConnectionError("down")):
+            svc._ask_llm("p", call_type="decision")
+        assert svc.usage.snapshot()["calls"] == 0
@@ -0,0 +1,141 @@
+"""
+Unit tests for utils.profiling and the profiling admin endpoints
+
+Covers:
+  - should_profile()         — master switch, opt-in header, sample rate
+  - RequestProfiler.wrap()   — output unchanged, profile recorded with
+                               timings / top functions / pstats data,
+                               busy profiler slot falls back to unprofiled
+  - ProfileStore             — bounded, newest first
+  - GET /api/admin/profiles  — 404 when disabled, admin token required
+                               and enforced, JSON and .prof download
+
+Naming convention:  test_<thing_under_test>_<condition>_<expected_outcome>
+TC-ID convention:   TC-PRF-<NNN> — matches the project's test catalogue format.
+"""
+
+import marshal
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api_server
+from utils import profiling
+from utils.profiling import ProfileStore, RequestProfiler, should_profile
+
+
+def _work():
+    yield "a"
+    sum(i * i for i in range(10000))
+    yield "b"
+
+
+@pytest.fixture
+def store() -> ProfileStore:
+    return ProfileStore(max_profiles=3)
+
+
+class TestShouldProfile:
+
+    @pytest.mark.unit
+    @pytest.mark.profiling
+    def test_should_profile_off_without_master_switch(self, monkeypatch) -> None:
+        """TC-PRF-001: The opt-in header is ignored unless PROFILING_ENABLED=true."""
+        monkeypatch.delenv("PROFILING_ENABLED", raising=False)
+        assert should_profile("true") is False
+
+    @pytest.mark.unit
+    @pytest.mark.profiling
+    def test_should_profile_header_and_sampling(self, monkeypatch) -> None:
+        """TC-PRF-002: With the switch on, the header opts in; PROFILING_SAMPLE_RATE=1 profiles everything."""
+        monkeypatch.setenv("PROFILING_ENABLED", "true")
+        monkeypatch.setenv("PROFILING_SAMPLE_RATE", "0")
+        assert should_profile("true") is True
+        assert should_profile(None) is False
+        monkeypatch.setenv("PROFILING_SAMPLE_RATE", "1")
+        assert should_profile(None) is True
+
+
+class TestRequestProfiler:
+
+    @pytest.mark.unit
+    @pytest.mark.profiling
+    def test_wrap_records_profile_and_preserves_output(self, store) -> None:
+        """TC-PRF-003: Wrapped output is unchanged and a profile with timings and top functions is stored."""
+        profiler = RequestProfiler("test", store=store)
+        assert list(profiler.wrap(_work())) == ["a", "b"]
+
+        record = store.get(profiler.request_id)
+        assert record["label"] == "test"
+        assert record["wall_ms"] >= record["cpu_ms"] >= 0
+        assert any("_work" in f["function"] for f in record["top"])
+        assert isinstance(marshal.loads(record["stats"]), dict)
+
+    @pytest.mark.unit
+    @pytest.mark.profiling
+    def test_wrap_runs_unprofiled_when_slot_busy(self, store) -> None:
+        """TC-PRF-004: If another request holds the profiler, the stream still completes, unprofiled."""
+        assert profiling._profiler_slot.acquire(blocking=False)
+        try:
+            profiler = RequestProfiler("test", store=store)
+            assert list(profiler.wrap(_work())) == ["a", "b"]
+        finally:
+            profiling._profiler_slot.release()
+        assert store.get(profiler.request_id) is None
+
+    @pytest.mark.unit
+    @pytest.mark.profiling
+    def test_store_is_bounded_and_lists_newest_first(self, store) -> None:
+        """TC-PRF-005: The store keeps max_profiles entries and lists newest first without raw stats."""
+        for i in range(4):
+            store.add({"request_id": f"r{i}", "stats": b"", "top": []})
+        listed = store.list()
+        assert [r["request_id"] for r in listed] == ["r3", "r2", "r1"]
+        assert "stats" not in listed[0]
+
+
+class TestProfileEndpoints:
+
+    @pytest.mark.unit
+    @pytest.mark.profiling
+    def test_admin_endpoints_404_when_disabled(self, monkeypatch) -> None:
+        """TC-PRF-006: /api/admin/profiles must not exist while profiling is disabled."""
+        monkeypatch.delenv("PROFILING_ENABLED", raising=False)
+        client = TestClient(api_server.app, base_url="http://localhost")
+        assert client.get("/api/admin/profiles").status_code == 404
+
+    @pytest.mark.unit
+    @pytest.mark.profiling
+    def test_admin_endpoints_list_and_download(self, monkeypatch) -> None:
+        """TC-PRF-007: With the admin token, profiles can be listed and downloaded as .prof."""
+        monkeypatch.setenv("PROFILING_ENABLED", "true")
+        monkeypatch.setenv("PROFILING_ADMIN_TOKEN", "secret")
+        profiling.profile_store.clear()
+        profiler = RequestProfiler("query_stream")
+        list(profiler.wrap(_work()))
+
+        client = TestClient(api_server.app, base_url="http://localhost")
+        assert client.get("/api/admin/profiles").status_code == 401
+
+        auth = {"X-Admin-Token": "secret"}
+        listed = client.get("/api/admin/profiles", headers=auth).json()["profiles"]
+        assert listed[0]["request_id"] == profiler.request_id
+        assert listed[0]["scope"] == profiling.PROFILE_SCOPE
+
+        detail = client.get(f"/api/admin/profiles/{profiler.request_id}", headers=auth).json()
+        assert detail["top"]
+        raw = client.get(f"/api/admin/profiles/{profiler.request_id}?format=prof", headers=auth)
+        assert raw.headers["content-type"] == "application/octet-stream"
+        assert isinstance(marshal.loads(raw.content), dict)
+        profiling.profile_store.clear()
+
+    @pytest.mark.unit
+    @pytest.mark.profiling
+    def test_admin_endpoints_refused_without_configured_token(self, monkeypatch) -> None:
+        """TC-PRF-008: With profiling on but PROFILING_ADMIN_TOKEN unset, the admin endpoints refuse every request."""
+        monkeypatch.setenv("PROFILING_ENABLED", "true")
+        monkeypatch.delenv("PROFILING_ADMIN_TOKEN", raising=False)
+        client = TestClient(api_server.app, base_url="http://localhost")
+        assert client.get("/api/admin/profiles").status_code == 403
+        assert client.get("/api/admin/profiles", headers={"X-Admin-Token": ""}).status_code == 403
+        assert client.get("/api/admin/profiles/abc").status_code == 403
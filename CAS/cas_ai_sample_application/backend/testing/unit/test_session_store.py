@@ -6,6 +6,10 @@ Covers:
   - SessionStore.create()        — generates a valid UUID, stores the session
   - SessionStore.get()           — hit, miss, last_accessed updated
   - SessionStore.add_turn()      — appends to known session, no-op on unknown
+  - SessionStore.record_usage()  — token usage accumulates per session
+  - Session.version              — bumped by every mutator
+  - Session.history_index()      — incremental regular/personal split and anchor turn
+  - SessionStore.refine_summary() — compare-and-swap of the running summary
   - SessionStore.set_summary()   — atomically replaces summary + turns, no-op on unknown
   - SessionStore.sweep_expired() — removes stale sessions, keeps fresh ones
 
@@ -20,6 +24,7 @@ import time
 import pytest
 
 from session_store import Session, SessionStore, Turn
+from utils.token_usage import TokenUsage
 
 
 # ---------------------------------------------------------------------------
@@ -179,6 +184,80 @@ class TestSessionStoreAddTurn:
         assert store.get("no-such-id") is None
 
 
+class TestSessionStoreRecordUsage:
+
+    @pytest.mark.unit
+    @pytest.mark.session
+    def test_record_usage_accumulates_across_requests(self) -> None:
+        """TC-SS-019: record_usage() must add each request's token usage to the session totals."""
+        store = SessionStore()
+        sid = store.create()
+        for _ in range(2):
+            usage = TokenUsage()
+            usage.add("synthesis", 100, 20)
+            store.record_usage(sid, usage)
+        totals = store.get(sid).token_usage.snapshot()
+        assert totals["prompt_tokens"] == 200
+        assert totals["by_type"]["synthesis"]["calls"] == 2
+
+    @pytest.mark.unit
+    @pytest.mark.session
+    def test_mutators_bump_version(self) -> None:
+        """TC-SS-020: add_turn, set_summary and a changed set_active_subject must bump Session.version."""
+        store = SessionStore()
+        sid = store.create()
+        session = store.get(sid)
+
+        store.add_turn(sid, Turn(query="q", answer="a", sources=[]))
+        assert session.version == 1
+        store.set_active_subject(sid, "OBAC")
+        store.set_active_subject(sid, "OBAC")
+        assert session.version == 2
+        store.set_summary(sid, "summary", [])
+        assert session.version == 3
+
+    @pytest.mark.unit
+    @pytest.mark.session
+    def test_history_index_follows_turn_changes(self) -> None:
+        """TC-SS-022: The history index partitions turns as they arrive and restarts when set_summary replaces them."""
+        store = SessionStore()
+        sid = store.create()
+        doc = Turn(query="What is OBAC?", answer="OBAC controls access.", sources=["doc.pdf"])
+        fact = Turn(query="I work in finance", answer="Noted.", sources=["[user-context]"])
+        failed = Turn(query="And CRAC?", answer="Not available in the provided context sources.", sources=["doc.pdf"])
+        store.add_turn(sid, doc)
+        store.add_turn(sid, fact)
+        store.add_turn(sid, failed)
+        session = store.get(sid)
+
+        index = session.history_index()
+        assert index.regular == [doc, failed]
+        assert index.personal == [fact]
+        assert index.anchor is doc
+
+        store.set_summary(sid, "summary", [failed])
+        index = session.history_index()
+        assert index.regular == [failed]
+        assert index.personal == []
+        assert index.anchor is None
+
+        session.turns.append(doc)  # appended directly, outside the store
+        assert session.history_index().anchor is doc
+
+    @pytest.mark.unit
+    @pytest.mark.session
+    def test_refine_summary_only_replaces_expected_summary(self) -> None:
+        """TC-SS-021: refine_summary() swaps the summary only while it still matches the expected one."""
+        store = SessionStore()
+        sid = store.create()
+        store.set_summary(sid, "extractive", [])
+        assert store.refine_summary(sid, "extractive", "refined") is True
+        assert store.get(sid).running_summary == "refined"
+        assert store.refine_summary(sid, "extractive", "late") is False
+        assert store.get(sid).running_summary == "refined"
+        assert store.refine_summary("no-such-id", "refined", "x") is False
+
+
 # ---------------------------------------------------------------------------
 # SessionStore.set_summary
 # ---------------------------------------------------------------------------
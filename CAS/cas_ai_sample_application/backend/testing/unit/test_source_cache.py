@@ -0,0 +1,164 @@
+"""
+Unit tests for utils.source_cache
+
+Covers:
+  - SourceCache.put() / get()  — round trip, ETag, LRU eviction by bytes
+  - SourceCache start-up       — index rebuilt from the directory, ETags
+                                 read back from the index file, which is
+                                 compacted as entries are evicted, 0o700
+                                 directory, disabled on an unusable one
+  - SourceCache.get_or_load()  — one load per key, failures not cached
+  - source_cache_key()         — credentials are part of the key
+
+Naming convention:  test_<method>_<condition>_<expected_outcome>
+TC-ID convention:   TC-SRC-<NNN> — matches the project's test catalogue format.
+
+Every cache is built in pytest's tmp_path; nothing touches CAS.
+"""
+
+import os
+import stat
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from utils.source_cache import SourceCache, content_etag, source_cache_key
+
+
+class TestSourceCache:
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_put_then_get_returns_content_and_etag(self, tmp_path) -> None:
+        """TC-SRC-001: A stored document comes back byte-for-byte with its content ETag."""
+        cache = SourceCache(str(tmp_path), max_bytes=1000)
+        etag = cache.put("k1", b"hello")
+        assert etag == content_etag(b"hello")
+        assert cache.get("k1") == (b"hello", etag)
+        assert cache.get("missing") is None
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_eviction_drops_least_recently_used_by_bytes(self, tmp_path) -> None:
+        """TC-SRC-002: Over max_bytes the least recently read entry is evicted from memory and disk."""
+        cache = SourceCache(str(tmp_path), max_bytes=10)
+        cache.put("a", b"aaaa")
+        cache.put("b", b"bbbb")
+        cache.get("a")
+        cache.put("c", b"cccc")
+        assert "b" not in cache
+        assert "a" in cache and "c" in cache
+        assert not (tmp_path / "b.src").exists()
+        assert cache.stats()["bytes"] == 8
+        cache.put("huge", b"x" * 11)
+        assert "huge" not in cache
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_index_rebuilt_from_directory(self, tmp_path) -> None:
+        """TC-SRC-003: A new cache over the same directory serves what the previous one stored."""
+        SourceCache(str(tmp_path), max_bytes=1000).put("k1", b"persisted")
+        assert SourceCache(str(tmp_path), max_bytes=1000).get("k1")[0] == b"persisted"
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_restart_reads_etags_from_index_file(self, tmp_path) -> None:
+        """TC-SRC-007: Start-up takes ETags from the index file and re-hashes only unrecorded files."""
+        first = SourceCache(str(tmp_path), max_bytes=1000)
+        etag = first.put("k1", b"persisted")
+        (tmp_path / "k2.src").write_bytes(b"unrecorded")
+
+        with patch("utils.source_cache.content_etag", wraps=content_etag) as hashed:
+            second = SourceCache(str(tmp_path), max_bytes=1000)
+        assert [c.args for c in hashed.call_args_list] == [(b"unrecorded",)]
+        assert second.get("k1") == (b"persisted", etag)
+        assert second.get("k2") == (b"unrecorded", content_etag(b"unrecorded"))
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_etag_index_compacted_as_entries_are_evicted(self, tmp_path) -> None:
+        """TC-SRC-010: Churning through many entries keeps the index file proportional to the live entries."""
+        cache = SourceCache(str(tmp_path), max_bytes=8)
+        for i in range(200):
+            cache.put(f"k{i}", b"%04d" % i)
+
+        lines = (tmp_path / "etags.idx").read_text(encoding="ascii").splitlines()
+        assert cache.stats()["entries"] == 2
+        assert len(lines) <= 2 * 2 + 16  # live entries x2 plus the compaction slack
+        restarted = SourceCache(str(tmp_path), max_bytes=8)
+        assert restarted.get("k199") == (b"0199", content_etag(b"0199"))
+        assert restarted.stats()["entries"] == 2
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_directory_created_private(self, tmp_path) -> None:
+        """TC-SRC-008: The cache directory is created, or tightened, to mode 0o700."""
+        fresh = tmp_path / "fresh"
+        SourceCache(str(fresh), max_bytes=1000)
+        assert stat.S_IMODE(os.stat(fresh).st_mode) == 0o700
+
+        existing = tmp_path / "existing"
+        existing.mkdir(mode=0o755)
+        SourceCache(str(existing), max_bytes=1000)
+        assert stat.S_IMODE(os.stat(existing).st_mode) == 0o700
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_unusable_directory_disables_cache(self, tmp_path) -> None:
+        """TC-SRC-009: A directory that cannot be created disables the cache instead of raising."""
+        blocker = tmp_path / "not-a-dir"
+        blocker.write_bytes(b"")
+        cache = SourceCache(str(blocker / "cache"), max_bytes=1000)
+
+        assert cache.enabled is False
+        assert cache.put("k", b"doc") == content_etag(b"doc")
+        assert cache.get("k") is None
+        assert cache.get_or_load("k", lambda: b"doc") == (b"doc", content_etag(b"doc"))
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_get_or_load_shares_one_load(self, tmp_path) -> None:
+        """TC-SRC-004: Concurrent misses for one key call the loader once."""
+        cache = SourceCache(str(tmp_path), max_bytes=1000)
+        calls = []
+
+        def loader() -> bytes:
+            calls.append(1)
+            time.sleep(0.05)
+            return b"doc"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader)))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1
+        assert {r[0] for r in results} == {b"doc"}
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_get_or_load_failure_is_not_cached(self, tmp_path) -> None:
+        """TC-SRC-005: A loader exception propagates and the next call loads again."""
+        cache = SourceCache(str(tmp_path), max_bytes=1000)
+
+        def failing() -> bytes:
+            raise RuntimeError("CAS down")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_load("k", failing)
+        assert cache.get_or_load("k", lambda: b"ok")[0] == b"ok"
+
+    @pytest.mark.unit
+    @pytest.mark.source
+    def test_key_depends_on_credentials(self) -> None:
+        """TC-SRC-006: The same file seen through different API keys maps to different entries."""
+        a = source_cache_key("https://cas", "key-a", "vs1", "f1")
+        b = source_cache_key("https://cas", "key-b", "vs1", "f1")
+        assert a != b
+        assert a == source_cache_key("https://cas", "key-a", "vs1", "f1")
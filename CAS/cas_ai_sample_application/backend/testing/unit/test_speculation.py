@@ -0,0 +1,98 @@
+"""
+Unit tests for utils.speculation
+
+Covers:
+  - predict_retry_query() — subject + metric words + "total", None without a subject
+  - query_similarity()    — content-word overlap
+  - Speculator            — budget caps wasted speculations, hits are refunded
+  - submit_speculative()  — runs only on an idle worker, never queues
+
+Naming convention:  test_<thing_under_test>_<condition>_<expected_outcome>
+TC-ID convention:   TC-SPEC-<NNN> — matches the project's test catalogue format.
+
+Pure functions and counters — no CAS or LLM traffic.
+"""
+
+import threading
+
+import pytest
+
+from utils.speculation import Speculator, predict_retry_query, query_similarity, submit_speculative
+
+
+class TestPrediction:
+
+    @pytest.mark.unit
+    @pytest.mark.speculation
+    def test_predict_retry_query_uses_subject_and_metric(self) -> None:
+        """TC-SPEC-001: The guess asks for the total of the question's metric for its subject."""
+        guess = predict_retry_query("How much FEMA funding did Storm Alpha get in total?", "Storm Alpha")
+        assert guess == "total FEMA funding get for Storm Alpha"
+        assert predict_retry_query("How much funding?", None) is None
+
+    @pytest.mark.unit
+    @pytest.mark.speculation
+    def test_query_similarity_ignores_stopwords(self) -> None:
+        """TC-SPEC-002: Queries differing only in stopwords are identical; unrelated ones share nothing."""
+        assert query_similarity("total funding for Storm Alpha", "the total funding of Storm Alpha") == 1.0
+        assert query_similarity("total funding", "hotline calls") == 0.0
+
+
+class TestSpeculatorBudget:
+
+    @pytest.mark.unit
+    @pytest.mark.speculation
+    def test_budget_caps_wasted_speculations(self) -> None:
+        """TC-SPEC-003: With no hits, speculations stay within burst + budget_ratio × verifications."""
+        spec = Speculator(budget_ratio=0.1, burst=2.0)
+        granted = sum(spec.try_acquire() for _ in range(50))
+        assert granted <= 2 + 0.1 * 50
+        snap = spec.snapshot()
+        assert snap["wasted"] == granted
+        assert snap["skipped_budget"] == 50 - granted
+
+    @pytest.mark.unit
+    @pytest.mark.speculation
+    def test_hits_refund_budget(self) -> None:
+        """TC-SPEC-004: A used speculation refunds its token, so hits never exhaust the budget."""
+        spec = Speculator(budget_ratio=0.0, burst=1.0)
+        for _ in range(5):
+            assert spec.try_acquire() is True
+            spec.record_hit()
+        assert spec.snapshot()["wasted"] == 0
+
+    @pytest.mark.unit
+    @pytest.mark.speculation
+    def test_saturated_speculation_is_refunded(self) -> None:
+        """TC-SPEC-005: A speculation the pool could not take costs no budget and is not counted as wasted."""
+        spec = Speculator(budget_ratio=0.0, burst=1.0)
+        assert spec.try_acquire() is True
+        spec.record_saturated()
+        snap = spec.snapshot()
+        assert snap["wasted"] == 0
+        assert snap["skipped_saturated"] == 1
+        assert spec.try_acquire() is True
+
+
+class TestSubmitSpeculative:
+
+    @pytest.mark.unit
+    @pytest.mark.speculation
+    def test_submit_returns_none_when_every_worker_is_busy(self, monkeypatch) -> None:
+        """TC-SPEC-006: With every worker busy, submit_speculative returns None instead of queueing."""
+        monkeypatch.setenv("SPECULATIVE_MAX_WORKERS", "1")
+        release = threading.Event()
+        busy = submit_speculative(release.wait)
+        try:
+            assert busy is not None
+            assert submit_speculative(lambda: "queued") is None
+        finally:
+            release.set()
+        busy.result(timeout=5)
+        # The slot comes back once the running search finishes.
+        for _ in range(100):
+            follow_up = submit_speculative(lambda: "ran")
+            if follow_up is not None:
+                break
+            threading.Event().wait(0.01)
+        assert follow_up.result(timeout=5) == "ran"
@@ -0,0 +1,136 @@
+"""
+Unit tests for utils.stream_coalescer
+
+Covers:
+  - coalesce_tokens() — lossless regrouping, size and age flush thresholds,
+                        first token released immediately, passthrough when
+                        disabled
+  - POST /api/query/stream — tokens coalesced, [SOURCE]/[DONE] markers
+                        still emitted as separate chunks
+
+Naming convention:  test_<thing_under_test>_<condition>_<expected_outcome>
+TC-ID convention:   TC-SC-<NNN> — matches the project's test catalogue format.
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+import api_server
+from utils.stream_coalescer import coalesce_tokens
+from utils.token_usage import TokenUsage
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCoalesceTokens:
+
+    @pytest.mark.unit
+    @pytest.mark.stream
+    def test_coalesce_output_concatenates_to_input(self) -> None:
+        """TC-SC-001: Joining the coalesced chunks must reproduce the token stream exactly."""
+        tokens = [f"tok{i} " for i in range(100)]
+        chunks = list(coalesce_tokens(iter(tokens), max_chars=32, max_delay_ms=1000))
+        assert "".join(chunks) == "".join(tokens)
+        assert len(chunks) < len(tokens)
+
+    @pytest.mark.unit
+    @pytest.mark.stream
+    def test_coalesce_first_token_released_immediately(self) -> None:
+        """TC-SC-002: The first token must be its own chunk so time-to-first-byte is unchanged."""
+        chunks = list(coalesce_tokens(iter(["Hello", " world", "!"]), max_chars=1000, max_delay_ms=1000))
+        assert chunks == ["Hello", " world!"]
+
+    @pytest.mark.unit
+    @pytest.mark.stream
+    def test_coalesce_flushes_on_size_threshold(self) -> None:
+        """TC-SC-003: A chunk must be released as soon as max_chars characters are buffered."""
+        chunks = list(coalesce_tokens(iter(["a", "bb", "cc", "dd", "e"]), max_chars=4, max_delay_ms=1000))
+        assert chunks == ["a", "bbcc", "dde"]
+
+    @pytest.mark.unit
+    @pytest.mark.stream
+    def test_coalesce_flushes_on_age_threshold(self) -> None:
+        """TC-SC-004: A buffered token older than max_delay_ms must be released on the next token."""
+        clock = _FakeClock()
+
+        def tokens():
+            yield "first"
+            yield "a"
+            clock.now = 0.01
+            yield "b"
+            clock.now = 0.1
+            yield "c"
+            yield "d"
+
+        chunks = list(coalesce_tokens(tokens(), max_chars=1000, max_delay_ms=50, clock=clock))
+        assert chunks == ["first", "abc", "d"]
+
+    @pytest.mark.unit
+    @pytest.mark.stream
+    def test_coalesce_disabled_passes_tokens_through(self) -> None:
+        """TC-SC-005: max_chars=0 must yield every token unchanged."""
+        tokens = ["a", "b", "c"]
+        assert list(coalesce_tokens(iter(tokens), max_chars=0, max_delay_ms=50)) == tokens
+
+
+class TestStreamEndpoint:
+
+    @pytest.mark.unit
+    @pytest.mark.stream
+    def test_stream_markers_not_merged_with_tokens(self, monkeypatch) -> None:
+        """TC-SC-006: Tokens are coalesced but [SOURCE] and [DONE] still arrive as their own chunks."""
+        monkeypatch.setenv("STREAM_FLUSH_CHARS", "1000")
+        llm = MagicMock()
+        llm.vector_store_id = "vs1"
+        llm.default_max_results = 10
+        llm.default_min_score = 0.1
+        llm.llm_model = "llama3"
+        llm.usage = TokenUsage()
+        llm._build_history_block.return_value = ""
+        llm._resolve_query_from_block.return_value = "what is it"
+        llm._run_retrieval_loop.return_value = {
+            "chunks": [{"index": 1, "source": "doc.pdf", "text": "t", "score": 0.9}],
+            "final_prompt": "PROMPT",
+            "answer_text": None,
+            "iterations": 1,
+        }
+        llm._call_llm.return_value = iter(["The", " answer", " is", " 42", ".\n[SOURCE: 1]"])
+        llm._parse_structured_answer.return_value = {"answer": "The answer is 42.", "source_number": 1}
+
+        # The test transport buffers the whole body, so record the chunks
+        # generate() hands to StreamingResponse instead.
+        chunks = []
+
+        class _RecordingResponse(StreamingResponse):
+            def __init__(self, content, *args, **kwargs):
+                def record():
+                    for chunk in content:
+                        chunks.append(chunk)
+                        yield chunk
+                super().__init__(record(), *args, **kwargs)
+
+        with patch("api_server.LLMService", return_value=llm), \
+                patch("api_server.StreamingResponse", _RecordingResponse):
+            client = TestClient(api_server.app, base_url="http://localhost")
+            client.post("/api/query/stream", json={
+                "query": "what is it",
+                "cas_api_key": "token-1234567890",
+                "cas_endpoint": "https://cas.example.com",
+            })
+
+        assert chunks[0] == "[THINKING]"
+        assert "The" in chunks
+        assert " answer is 42.\n[SOURCE: 1]" in chunks
+        assert chunks[-2] == '\n[SOURCE]{"source_name": "doc.pdf"}'
+        assert chunks[-1].startswith("\n[DONE]")
+        assert "usage" in json.loads(chunks[-1][len("\n[DONE]"):])
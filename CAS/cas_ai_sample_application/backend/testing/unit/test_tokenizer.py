@@ -0,0 +1,132 @@
+"""
+Unit tests for utils.tokenizer
+
+Covers:
+  - get_tokenizer()   — heuristic by default, falls back on a bad
+                        TOKENIZER_FILE, loads a local tokenizer.json
+  - CachedTokenizer   — each distinct string tokenized once, LRU bound
+  - count_tokens_uncached — bypasses the memo
+  - SessionStore.needs_compaction — uses the configured tokenizer
+
+Naming convention:  test_<thing_under_test>_<condition>_<expected_outcome>
+TC-ID convention:   TC-TOK-<NNN> — matches the project's test catalogue format.
+
+The file-tokenizer test builds a tiny word-level tokenizer.json in tmp_path
+and is skipped when the optional ``tokenizers`` package is not installed.
+"""
+
+import pytest
+
+from session_store import SessionStore, Turn
+from utils.tokenizer import (
+    CachedTokenizer,
+    HeuristicTokenizer,
+    count_tokens,
+    count_tokens_uncached,
+    get_tokenizer,
+)
+
+
+class _CountingTokenizer:
+    name = "counting"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def count(self, text: str) -> int:
+        self.calls += 1
+        return len(text.split())
+
+
+class TestGetTokenizer:
+
+    @pytest.mark.unit
+    @pytest.mark.tokenizer
+    def test_default_is_heuristic(self, monkeypatch) -> None:
+        """TC-TOK-001: Without TOKENIZER_FILE counting is the 4-characters-per-token heuristic."""
+        monkeypatch.delenv("TOKENIZER_FILE", raising=False)
+        assert isinstance(get_tokenizer(), HeuristicTokenizer)
+        assert count_tokens("a" * 40) == 10
+
+    @pytest.mark.unit
+    @pytest.mark.tokenizer
+    def test_missing_file_falls_back_to_heuristic(self, monkeypatch, tmp_path) -> None:
+        """TC-TOK-002: An unloadable TOKENIZER_FILE must fall back to the heuristic, not raise."""
+        monkeypatch.setenv("TOKENIZER_FILE", str(tmp_path / "missing.json"))
+        assert isinstance(get_tokenizer(), HeuristicTokenizer)
+
+    @pytest.mark.unit
+    @pytest.mark.tokenizer
+    def test_local_tokenizer_file_is_used_and_memoised(self, monkeypatch, tmp_path) -> None:
+        """TC-TOK-003: A local tokenizer.json gives exact counts through the memo."""
+        tokenizers = pytest.importorskip("tokenizers")
+        from tokenizers.models import WordLevel
+        from tokenizers.pre_tokenizers import Whitespace
+
+        tok = tokenizers.Tokenizer(WordLevel({"[UNK]": 0, "storage": 1, "fusion": 2}, unk_token="[UNK]"))
+        tok.pre_tokenizer = Whitespace()
+        path = tmp_path / "tokenizer.json"
+        tok.save(str(path))
+        monkeypatch.setenv("TOKENIZER_FILE", str(path))
+
+        tokenizer = get_tokenizer()
+        assert isinstance(tokenizer, CachedTokenizer)
+        assert count_tokens("IBM storage fusion rocks") == 4
+        count_tokens("IBM storage fusion rocks")
+        assert tokenizer.stats()["hits"] == 1
+
+
+class TestCachedTokenizer:
+
+    @pytest.mark.unit
+    @pytest.mark.tokenizer
+    def test_repeated_strings_tokenized_once(self) -> None:
+        """TC-TOK-004: The inner tokenizer runs once per distinct string; empty strings are free."""
+        inner = _CountingTokenizer()
+        cached = CachedTokenizer(inner)
+        for _ in range(5):
+            assert cached.count("one two three") == 3
+        assert cached.count("") == 0
+        assert inner.calls == 1
+
+    @pytest.mark.unit
+    @pytest.mark.tokenizer
+    def test_lru_bound_evicts_least_recent(self) -> None:
+        """TC-TOK-005: Beyond max_entries the least recently used string is evicted."""
+        inner = _CountingTokenizer()
+        cached = CachedTokenizer(inner, max_entries=2)
+        cached.count("a")
+        cached.count("b")
+        cached.count("a")
+        cached.count("c")  # evicts "b"
+        cached.count("a")
+        assert inner.calls == 3
+        cached.count("b")
+        assert inner.calls == 4
+
+    @pytest.mark.unit
+    @pytest.mark.tokenizer
+    def test_uncached_count_leaves_memo_untouched(self, monkeypatch) -> None:
+        """TC-TOK-007: count_tokens_uncached tokenizes every time and never fills the LRU."""
+        inner = _CountingTokenizer()
+        cached = CachedTokenizer(inner)
+        monkeypatch.setattr("utils.tokenizer._tokenizer", cached)
+        assert count_tokens_uncached("a whole prompt") == 3
+        assert count_tokens_uncached("a whole prompt") == 3
+        assert inner.calls == 2
+        assert cached.stats()["entries"] == 0
+
+
+class TestCompactionUsesTokenizer:
+
+    @pytest.mark.unit
+    @pytest.mark.tokenizer
+    def test_needs_compaction_counts_with_configured_tokenizer(self, monkeypatch) -> None:
+        """TC-TOK-006: needs_compaction must use the process tokenizer, not a fixed len/4."""
+        store = SessionStore()
+        sid = store.create()
+        store.add_turn(sid, Turn(query="one two three", answer="four five", sources=[]))
+
+        monkeypatch.setattr("utils.tokenizer._tokenizer", CachedTokenizer(_CountingTokenizer()))
+        assert store.needs_compaction(sid, max_tokens=10, threshold=0.4) is True   # 5 > 4
+        assert store.needs_compaction(sid, max_tokens=10, threshold=0.5) is False  # 5 > 5
@@ -0,0 +1,64 @@
+"""
+Unit tests for utils.tool_snapshot
+
+Covers:
+  - save_tool_snapshot() / load_tool_snapshot() — round trip per host,
+                                                  max_age, hash check
+  - snapshot_path()                             — empty TOOL_SNAPSHOT_FILE disables
+
+Naming convention:  test_<function>_<condition>_<expected_outcome>
+TC-ID convention:   TC-SNAP-<NNN> — matches the project's test catalogue format.
+
+Each test points TOOL_SNAPSHOT_FILE at pytest's tmp_path.
+"""
+
+import json
+
+import pytest
+
+from utils.tool_snapshot import load_tool_snapshot, save_tool_snapshot, tools_schema_hash
+
+_TOOLS = [{"name": "search_vector_stores", "description": "search", "inputSchema": {"type": "object"}}]
+
+
+@pytest.fixture
+def snapshot_file(monkeypatch, tmp_path):
+    path = tmp_path / "tools.json"
+    monkeypatch.setenv("TOOL_SNAPSHOT_FILE", str(path))
+    return path
+
+
+class TestToolSnapshot:
+
+    @pytest.mark.unit
+    @pytest.mark.snapshot
+    def test_round_trip_per_host(self, snapshot_file) -> None:
+        """TC-SNAP-001: Saved tools come back for their host only, with their schema hash."""
+        assert save_tool_snapshot("https://a", _TOOLS) == tools_schema_hash(_TOOLS)
+        entry = load_tool_snapshot("https://a")
+        assert entry["tools"] == _TOOLS
+        assert entry["schema_hash"] == tools_schema_hash(_TOOLS)
+        assert load_tool_snapshot("https://b") is None
+
+    @pytest.mark.unit
+    @pytest.mark.snapshot
+    def test_max_age_and_hash_mismatch_ignored(self, snapshot_file) -> None:
+        """TC-SNAP-002: Entries older than max_age, or edited so the hash no longer matches, are ignored."""
+        save_tool_snapshot("https://a", _TOOLS)
+        data = json.loads(snapshot_file.read_text())
+        data["https://a"]["saved_at"] -= 1000
+        snapshot_file.write_text(json.dumps(data))
+        assert load_tool_snapshot("https://a", max_age=10) is None
+        assert load_tool_snapshot("https://a", max_age=10000) is not None
+
+        data["https://a"]["tools"][0]["name"] = "tampered"
+        snapshot_file.write_text(json.dumps(data))
+        assert load_tool_snapshot("https://a") is None
+
+    @pytest.mark.unit
+    @pytest.mark.snapshot
+    def test_empty_path_disables_snapshot(self, monkeypatch) -> None:
+        """TC-SNAP-003: An empty TOOL_SNAPSHOT_FILE turns persistence off."""
+        monkeypatch.setenv("TOOL_SNAPSHOT_FILE", "")
+        assert save_tool_snapshot("https://a", _TOOLS) is None
+        assert load_tool_snapshot("https://a") is None
@@ -0,0 +1,235 @@
+"""
+Circuit breakers for the CAS and LLM backends.
+
+When CAS or the LLM endpoint is down, every request would otherwise pay the
+full CAS_TIMEOUT / LLM_TIMEOUT before failing.  A breaker tracks the outcome
+of recent calls to one backend and, once the error rate over a rolling
+window crosses a threshold, *opens*: further calls fail immediately without
+touching the network.  After a cool-down the breaker goes *half-open* and
+lets exactly one probe call through — success closes it again, failure
+re-opens it for another cool-down.
+
+Breakers are process-wide and keyed by backend (e.g. ``cas:<host>``,
+``llm:<base_url>``) because CASClient and LLMService are constructed per
+request — state has to outlive any single instance.
+
+Configuration (environment variables):
+  CIRCUIT_BREAKER_ENABLED         true/false (default true)
+  CIRCUIT_BREAKER_WINDOW_SECONDS  rolling window length (default 60)
+  CIRCUIT_BREAKER_MIN_CALLS       calls required before the rate is judged (default 5)
+  CIRCUIT_BREAKER_ERROR_RATE      failure fraction that opens the breaker (default 0.5)
+  CIRCUIT_BREAKER_OPEN_SECONDS    cool-down before a half-open probe (default 30)
+"""
+
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Rolling-window error-rate circuit breaker with half-open probing.
+
+    Callers follow a three-step protocol::
+
+        if not breaker.allow_request():
+            ...fail fast...
+        try:
+            ...call the backend...
+        except BackendDown:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    Thread-safe — a single breaker is shared by every request thread that
+    talks to the same backend.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 60.0,
+        min_calls: int = 5,
+        error_rate_threshold: float = 0.5,
+        open_seconds: float = 30.0,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = max(1, min_calls)
+        self.error_rate_threshold = error_rate_threshold
+        self.open_seconds = open_seconds
+        self.enabled = enabled
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        # (timestamp, ok) outcomes inside the rolling window, oldest first.
+        self._events: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._rejected = 0
+
+    # ------------------------------------------------------------------
+    # Call protocol
+    # ------------------------------------------------------------------
+
+    def allow_request(self) -> bool:
+        """Return True if a call may proceed, False if it should fail fast.
+
+        An open breaker whose cool-down has elapsed transitions to half-open
+        and admits the caller as the single probe; concurrent callers keep
+        failing fast until that probe reports back.
+        """
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.open_seconds:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+                logger.info("circuit_breaker half_open name=%s", self.name)
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """Record a successful call — closes a half-open breaker."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._close()
+                return
+            self._append(True)
+
+    def record_failure(self) -> None:
+        """Record a failed call — may open the breaker."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            self._append(False)
+            total = len(self._events)
+            if (
+                self._state == self.CLOSED
+                and total >= self.min_calls
+                and self._failures / total >= self.error_rate_threshold
+            ):
+                self._open()
+
+    # ------------------------------------------------------------------
+    # Introspection
+    # ------------------------------------------------------------------
+
+    @property
+    def state(self) -> str:
+        """Return the current state, accounting for an elapsed cool-down."""
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.open_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serialisable view of the breaker for health endpoints."""
+        state = self.state
+        with self._lock:
+            self._prune()
+            total = len(self._events)
+            retry_in: Optional[float] = None
+            if state == self.OPEN:
+                retry_in = round(max(0.0, self.open_seconds - (self._clock() - self._opened_at)), 1)
+            return {
+                "state": state,
+                "enabled": self.enabled,
+                "window_calls": total,
+                "window_failures": self._failures,
+                "error_rate": round(self._failures / total, 3) if total else 0.0,
+                "rejected": self._rejected,
+                "retry_in_seconds": retry_in,
+            }
+
+    # ------------------------------------------------------------------
+    # Internal helpers — caller must hold self._lock
+    # ------------------------------------------------------------------
+
+    def _append(self, ok: bool) -> None:
+        self._events.append((self._clock(), ok))
+        if not ok:
+            self._failures += 1
+        self._prune()
+
+    def _prune(self) -> None:
+        cutoff = self._clock() - self.window_seconds
+        while self._events and self._events[0][0] < cutoff:
+            _, ok = self._events.popleft()
+            if not ok:
+                self._failures -= 1
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self._probe_in_flight = False
+        logger.warning(
+            "circuit_breaker open name=%s failures=%d window_calls=%d cooldown=%.0fs",
+            self.name, self._failures, len(self._events), self.open_seconds,
+        )
+
+    def _close(self) -> None:
+        self._state = self.CLOSED
+        self._events.clear()
+        self._failures = 0
+        self._probe_in_flight = False
+        logger.info("circuit_breaker closed name=%s", self.name)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide registry
+# ---------------------------------------------------------------------------
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the shared breaker for *name*, creating it from env config on first use."""
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                window_seconds=float(os.getenv("CIRCUIT_BREAKER_WINDOW_SECONDS", "60")),
+                min_calls=int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "5")),
+                error_rate_threshold=float(os.getenv("CIRCUIT_BREAKER_ERROR_RATE", "0.5")),
+                open_seconds=float(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "30")),
+                enabled=os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() not in ("false", "0", "no"),
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Return a snapshot of every registered breaker keyed by name."""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.snapshot() for b in breakers}
+
+
+def reset_breakers() -> None:
+    """Drop every registered breaker — used by tests for isolation."""
+    with _registry_lock:
+        _breakers.clear()
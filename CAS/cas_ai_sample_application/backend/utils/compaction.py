@@ -0,0 +1,108 @@
+"""
+Extractive session compaction.
+
+``LLMService._compact_history`` folds old turns into a running summary.
+The original strategy asks the LLM to write that summary, which puts a
+generation call on the request path exactly when sessions are longest.
+``extractive_summary`` builds one locally instead: for every folded turn it
+keeps the question and the answer sentences that carry the most numbers and
+named entities, and it leads with the subjects the questions named, so the
+rewriter still has its anchors.  No network call, a few microseconds per
+turn.
+
+Which strategy runs is chosen per deployment with SESSION_COMPACTION_MODE:
+  llm         summarise with the LLM (default, the original behaviour)
+  extractive  local summary only
+  hybrid      local summary applied immediately; api_server then refines it
+              with the LLM in the background and swaps the result in if the
+              session has not moved on in the meantime
+"""
+
+from typing import Callable, Iterable, List, Optional
+import re
+
+from utils.query import _NAMED_ENTITY
+
+COMPACTION_MODES = ("llm", "extractive", "hybrid")
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+_NUMBER = re.compile(r'\d[\d,.]*%?')
+
+# Answers that carry nothing worth keeping — same phrases
+# LLMService._is_history_anchor_turn rejects.
+_EMPTY_ANSWERS = (
+    "not available in the provided context sources",
+    "no relevant documents were found",
+)
+
+
+def _score(sentence: str, subject: Optional[str]) -> int:
+    """Numbers count double, named entities once, a mention of the subject twice."""
+    score = 2 * len(_NUMBER.findall(sentence)) + len(_NAMED_ENTITY.findall(sentence))
+    if subject and subject.lower() in sentence.lower():
+        score += 2
+    return score
+
+
+def key_sentences(answer: str, subject: Optional[str] = None, max_sentences: int = 2) -> str:
+    """Return the *max_sentences* most informative sentences of *answer*, in their original order.
+
+    Sentences with no numbers, entities or subject mention are only used
+    when nothing better exists, and then just the first one.
+    """
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(answer.strip()) if s.strip()]
+    if not sentences:
+        return ""
+    ranked = sorted(
+        range(len(sentences)),
+        key=lambda i: (-_score(sentences[i], subject), i),
+    )
+    picked = [i for i in ranked[:max_sentences] if _score(sentences[i], subject) > 0] or [0]
+    return " ".join(sentences[i] for i in sorted(picked))
+
+
+def _summarise_turn(query: str, answer: str, sources: List[str], subject: Optional[str]) -> str:
+    if sources and "[user-context]" in sources:
+        return f"User said: {query}"
+    text = (answer or "").strip()
+    lowered = text.lower()
+    if not text or lowered.startswith("[llm_") or any(p in lowered for p in _EMPTY_ANSWERS):
+        return f"Q: {query} A: no answer in the documents."
+    return f"Q: {query} A: {key_sentences(text, subject)}"
+
+
+def extractive_summary(
+    turns: Iterable,
+    prior_summary: str = "",
+    max_chars: int = 1200,
+    subject_of: Optional[Callable[[str], Optional[str]]] = None,
+) -> str:
+    """Summarise *turns* without an LLM — see the module docstring.
+
+    Args:
+        turns:         The turns being folded (``session_store.Turn``).
+        prior_summary: The session's existing running summary, carried forward.
+        max_chars:     Length cap.  The oldest material (prior summary first,
+                       then the earliest turns) is dropped to fit.
+        subject_of:    Regex-only subject extractor for a question, normally
+                       LLMService._subject_from_regex.
+    """
+    subjects: List[str] = []
+    lines: List[str] = []
+    for turn in turns:
+        subject = subject_of(turn.query) if subject_of else None
+        if subject and subject not in subjects:
+            subjects.append(subject)
+        lines.append(_summarise_turn(turn.query, turn.answer, turn.sources or [], subject))
+
+    head = f"Subjects: {', '.join(subjects)}." if subjects else ""
+    body = ([prior_summary] if prior_summary else []) + lines
+
+    def render() -> str:
+        return " ".join(part for part in [head, *body] if part)
+
+    summary = render()
+    while len(summary) > max_chars and len(body) > 1:
+        body.pop(0)
+        summary = render()
+    return summary[:max_chars]
@@ -0,0 +1,237 @@
+"""
+Hedged requests for tail-latency reduction.
+
+Most CAS searches are fast, but a few take many seconds and dominate p99.
+A hedger runs the call, and if it has not finished after an adaptive delay
+(the observed p95 latency) sends one duplicate and returns whichever
+attempt succeeds first.  The slower attempt is cancelled if it has not
+started yet, otherwise abandoned — its result is discarded when it lands.
+
+Attempts never queue for the shared pool: when every worker is busy the
+primary runs unhedged on the caller's thread and no hedge is sent, so a
+burst of concurrent requests costs no more than it would without hedging.
+Only successful calls feed the latency sample — fast failures and breaker
+rejections would otherwise drag the p95 (and so the hedge delay) to zero.
+
+A token-bucket budget keeps the extra load bounded: every primary call
+earns ``budget_ratio`` tokens (capped at ``burst``) and every hedge spends
+one, so in steady state hedges never exceed ``budget_ratio`` of traffic.
+Until ``min_samples`` latencies have been observed there is no meaningful
+p95, so calls run unhedged.
+
+Hedgers are process-wide and keyed by backend, for the same reason as the
+circuit breakers in ``utils.circuit_breaker``: the clients that use them
+are constructed per request.
+
+Configuration (environment variables):
+  CAS_HEDGE_ENABLED        true/false (default false)
+  CAS_HEDGE_BUDGET_PERCENT max extra load from hedges, in % (default 5)
+  CAS_HEDGE_MIN_SAMPLES    latencies needed before hedging starts (default 20)
+  CAS_HEDGE_MIN_DELAY_MS   floor for the hedge delay (default 50)
+  CAS_HEDGE_MAX_WORKERS    size of the shared hedging thread pool (default 32)
+"""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """Adaptive-delay request hedging with a bounded extra-load budget."""
+
+    def __init__(
+        self,
+        name: str,
+        executor: ThreadPoolExecutor,
+        slots: threading.Semaphore,
+        budget_ratio: float = 0.05,
+        burst: float = 5.0,
+        min_samples: int = 20,
+        sample_size: int = 200,
+        min_delay: float = 0.05,
+    ) -> None:
+        self.name = name
+        self.budget_ratio = budget_ratio
+        self.burst = burst
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._executor = executor
+        # One slot per worker of *executor*; shared by every hedger on it.
+        self._slots = slots
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=sample_size)
+        self._tokens = 0.0
+        self._primaries = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._saturated = 0
+
+    # ------------------------------------------------------------------
+    # Latency tracking and budget
+    # ------------------------------------------------------------------
+
+    def record_latency(self, seconds: float) -> None:
+        """Add one observed call latency to the rolling sample."""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Return the p95 of recent latencies, or None while samples are too few."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        p95 = ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+        return max(self.min_delay, p95)
+
+    def _earn(self) -> None:
+        with self._lock:
+            self._primaries += 1
+            self._tokens = min(self.burst, self._tokens + self.budget_ratio)
+
+    def _try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            self._hedges += 1
+            return True
+
+    def _submit(self, fn: Callable[[], T]) -> "Optional[Future[T]]":
+        """Run *fn* on the pool if a worker is idle, else return None."""
+        if not self._slots.acquire(blocking=False):
+            return None
+        future = self._executor.submit(self._timed, fn)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    # ------------------------------------------------------------------
+    # Call
+    # ------------------------------------------------------------------
+
+    def _timed(self, fn: Callable[[], T]) -> T:
+        start = time.monotonic()
+        result = fn()
+        self.record_latency(time.monotonic() - start)
+        return result
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """Run *fn*, hedging it with one duplicate if it is slower than p95.
+
+        Returns the first successful result.  If every attempt raises, the
+        exception from the last one to finish is re-raised.
+        """
+        self._earn()
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._timed(fn)
+
+        primary = self._submit(fn)
+        if primary is None:
+            with self._lock:
+                self._saturated += 1
+            return self._timed(fn)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._try_spend():
+            return primary.result()
+
+        hedge = self._submit(fn)
+        if hedge is None:
+            with self._lock:
+                self._tokens += 1.0
+                self._hedges -= 1
+                self._saturated += 1
+            return primary.result()
+        logger.debug("hedge_sent name=%s delay=%.3fs", self.name, delay)
+        pending = {primary, hedge}
+        last_exc: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                exc = future.exception()
+                if exc is not None:
+                    last_exc = exc
+                    continue
+                for other in pending:
+                    other.cancel()
+                if future is hedge:
+                    with self._lock:
+                        self._hedge_wins += 1
+                    logger.debug("hedge_won name=%s", self.name)
+                return future.result()
+        assert last_exc is not None
+        raise last_exc
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serialisable view of the hedger for health endpoints."""
+        delay = self.hedge_delay()
+        with self._lock:
+            return {
+                "primaries": self._primaries,
+                "hedges": self._hedges,
+                "hedge_wins": self._hedge_wins,
+                "saturated": self._saturated,
+                "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None,
+                "budget_tokens": round(self._tokens, 2),
+            }
+
+
+# ---------------------------------------------------------------------------
+# Process-wide registry
+# ---------------------------------------------------------------------------
+
+_hedgers: Dict[str, Hedger] = {}
+_registry_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+
+
+def hedging_enabled() -> bool:
+    """Return whether CAS search hedging is switched on (CAS_HEDGE_ENABLED)."""
+    return os.getenv("CAS_HEDGE_ENABLED", "false").lower() in ("true", "1", "yes")
+
+
+def get_hedger(name: str) -> Hedger:
+    """Return the shared hedger for *name*, creating it from env config on first use."""
+    global _executor, _slots
+    with _registry_lock:
+        hedger = _hedgers.get(name)
+        if hedger is None:
+            if _executor is None:
+                max_workers = int(os.getenv("CAS_HEDGE_MAX_WORKERS", "32"))
+                _executor = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix="cas-hedge"
+                )
+                _slots = threading.BoundedSemaphore(max_workers)
+            hedger = Hedger(
+                name,
+                executor=_executor,
+                slots=_slots,
+                budget_ratio=float(os.getenv("CAS_HEDGE_BUDGET_PERCENT", "5")) / 100.0,
+                min_samples=int(os.getenv("CAS_HEDGE_MIN_SAMPLES", "20")),
+                min_delay=int(os.getenv("CAS_HEDGE_MIN_DELAY_MS", "50")) / 1000.0,
+            )
+            _hedgers[name] = hedger
+        return hedger
+
+
+def hedger_states() -> Dict[str, Dict[str, Any]]:
+    """Return a snapshot of every registered hedger keyed by name."""
+    with _registry_lock:
+        hedgers = list(_hedgers.values())
+    return {h.name: h.snapshot() for h in hedgers}
+
+
+def reset_hedgers() -> None:
+    """Drop every registered hedger — used by tests for isolation."""
+    with _registry_lock:
+        _hedgers.clear()
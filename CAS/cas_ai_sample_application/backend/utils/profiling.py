@@ -0,0 +1,207 @@
+"""
+Opt-in per-request CPU profiling for the streaming query endpoint.
+
+When a question pattern is slow, the first thing to know is whether the
+time goes to CPU in our own code (query resolution regexes, chunk
+normalisation, prompt assembly) or to waiting on CAS and the LLM.  A
+profiled request runs ``query_llm_stream``'s generator under cProfile and
+records, per request id:
+
+  - wall, CPU and I/O-wait time (wall minus CPU of the request's own steps)
+  - the top functions by cumulative time
+  - the raw pstats data, downloadable as a ``.prof`` file for
+    ``python -m pstats`` / snakeviz
+
+Starlette runs a sync generator one ``next()`` at a time on worker
+threads, so the profiler is switched on around each step, in whichever
+thread runs it, and off again before the chunk is handed back.
+
+Only one request is profiled at a time — cProfile cannot run two
+profilers at once on newer Pythons — and a request that loses that race
+simply runs unprofiled.
+
+On Python 3.12 and later cProfile is built on ``sys.monitoring``, which is
+interpreter-wide: while a step is being profiled, calls made by every other
+thread (other requests, the CAS pool, background refreshes) are recorded
+too.  Such profiles are marked ``"scope": "interpreter"`` and their
+function table should be read as "what the process was doing during this
+request"; only on older Pythons (``"scope": "thread"``) does it cover the
+profiled request alone.  The wall / CPU / I/O-wait figures are per request
+on every version.  With PROFILING_ENABLED unset the cost per request
+is one environment lookup.
+
+Configuration (environment variables):
+  PROFILING_ENABLED       master switch, true/false (default false)
+  PROFILING_SAMPLE_RATE   fraction of requests profiled without the header
+                          (default 0.0)
+  PROFILING_MAX_PROFILES  profiles kept in memory, oldest dropped (default 50)
+  PROFILING_ADMIN_TOKEN   token the admin endpoints require in the
+                          X-Admin-Token header; while it is unset they
+                          refuse every request (profiles expose code paths
+                          and timings of other users' queries)
+
+A request opts in with the header ``X-Profile: true``; its profile id is
+returned in the ``X-Profile-Id`` response header.
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import cProfile
+import logging
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+_TOP_FUNCTIONS = 25
+# Whether cProfile sees every thread (sys.monitoring, Python 3.12+) or only
+# the one that enabled it.
+PROFILE_SCOPE = "interpreter" if sys.version_info >= (3, 12) else "thread"
+_BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def profiling_enabled() -> bool:
+    """Return whether profiling is switched on at all (PROFILING_ENABLED)."""
+    return os.getenv("PROFILING_ENABLED", "false").lower() in ("true", "1", "yes")
+
+
+def should_profile(header_value: Optional[str]) -> bool:
+    """Decide whether this request is profiled — by opt-in header or by sampling."""
+    if not profiling_enabled():
+        return False
+    if header_value is not None and header_value.strip().lower() in ("true", "1", "yes"):
+        return True
+    rate = float(os.getenv("PROFILING_SAMPLE_RATE", "0") or 0)
+    return rate > 0 and random.random() < rate
+
+
+class ProfileStore:
+    """Bounded, thread-safe store of finished profiles keyed by request id."""
+
+    def __init__(self, max_profiles: int = 50) -> None:
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def add(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._profiles[record["request_id"]] = record
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Return profile summaries, newest first, without the raw stats."""
+        with self._lock:
+            records = list(self._profiles.values())
+        return [
+            {k: v for k, v in r.items() if k not in ("stats", "top")}
+            for r in reversed(records)
+        ]
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._profiles.get(request_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._profiles.clear()
+
+
+profile_store = ProfileStore(max_profiles=int(os.getenv("PROFILING_MAX_PROFILES", "50")))
+
+# cProfile on Python 3.12+ refuses a second concurrent profiler, so only one
+# request holds the profiler at a time.
+_profiler_slot = threading.Lock()
+
+
+def _function_label(key: tuple) -> str:
+    filename, line, name = key
+    if filename.startswith(_BACKEND_ROOT):
+        filename = os.path.relpath(filename, _BACKEND_ROOT)
+    return f"{filename}:{line}({name})"
+
+
+class RequestProfiler:
+    """Profiles one request's generator and files the result in ``profile_store``."""
+
+    def __init__(self, label: str, store: Optional[ProfileStore] = None) -> None:
+        self.request_id = uuid.uuid4().hex
+        self.label = label
+        self._store = store or profile_store
+        self._profile = cProfile.Profile()
+        self._cpu_seconds = 0.0
+        self._wall_start = 0.0
+
+    @contextmanager
+    def _active(self) -> Iterator[None]:
+        cpu_start = time.thread_time()
+        self._profile.enable()
+        try:
+            yield
+        finally:
+            self._profile.disable()
+            self._cpu_seconds += time.thread_time() - cpu_start
+
+    def wrap(self, iterator: Iterable[Any]) -> Iterator[Any]:
+        """Yield from *iterator*, profiling every step.
+
+        The profiler slot is taken on the first step rather than up front, so
+        a response that is never iterated cannot leave it held.
+        """
+        it = iter(iterator)
+        if not _profiler_slot.acquire(blocking=False):
+            logger.info("profiling_skipped request_id=%s reason=another profile running", self.request_id)
+            yield from it
+            return
+        self._wall_start = time.perf_counter()
+        try:
+            while True:
+                with self._active():
+                    try:
+                        item = next(it)
+                    except StopIteration:
+                        return
+                yield item
+        finally:
+            _profiler_slot.release()
+            self._finish()
+
+    def _finish(self) -> None:
+        wall = time.perf_counter() - self._wall_start
+        stats = pstats.Stats(self._profile)
+        ranked = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)
+        top = [
+            {
+                "function": _function_label(key),
+                "calls": nc,
+                "tottime_ms": round(tt * 1000, 3),
+                "cumtime_ms": round(ct * 1000, 3),
+            }
+            for key, (_cc, nc, tt, ct, _callers) in ranked[:_TOP_FUNCTIONS]
+        ]
+        self._store.add({
+            "request_id": self.request_id,
+            "label": self.label,
+            "scope": PROFILE_SCOPE,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "wall_ms": round(wall * 1000, 1),
+            "cpu_ms": round(self._cpu_seconds * 1000, 1),
+            "io_wait_ms": round(max(0.0, wall - self._cpu_seconds) * 1000, 1),
+            "top": top,
+            "stats": marshal.dumps(stats.stats),
+        })
+        logger.info(
+            "profile_recorded request_id=%s label=%s wall_ms=%.1f cpu_ms=%.1f",
+            self.request_id, self.label, wall * 1000, self._cpu_seconds * 1000,
+        )
@@ -0,0 +1,296 @@
+"""
+SourceCache — a byte-capped LRU cache of source document content on local disk.
+
+Backs GET /api/source/{vector_store_id}/{file_id}, the click-through for a
+cited ``[SOURCE]``.  Fetching a file from CAS (``get_vector_store_file_content``)
+is a full MCP round-trip, so each fetched document is written to disk once
+and served from there until it is evicted.  api_server can also pre-warm the
+cache for the top-ranked files of an answer while that answer is still
+streaming (opt-in, SOURCE_PREWARM_FILES), so the click finds the file local.
+
+Keys are opaque strings — api_server derives them from the CAS endpoint, the
+caller's API key, the store id and the file id, so one user's credentials
+never unlock content another user fetched.  Each entry stores the content
+bytes and a strong ETag (a content hash) computed when the entry is written.
+
+The index lives in memory and is rebuilt from the directory on start-up
+(oldest modification time = least recently used), so the cache survives a
+restart.  ETags are not recomputed then: every write appends ``key size
+etag`` to a small index file, which start-up reads back (last line per key
+wins) and compacts.  Only a file with no matching line is re-hashed.  Once
+evictions and rewrites leave the file with more than twice as many lines as
+there are live entries, it is compacted again, so it stays proportional to
+the cache rather than to every write ever made.
+
+The directory is created (or tightened) to mode 0o700 — cached documents
+are readable only by the server's user.  If it cannot be created, secured
+or listed, the cache logs a warning and disables itself: every lookup is a
+miss and nothing is written.  Other disk errors are logged and treated as
+misses — the cache is an optimisation, never a source of failures.
+
+Configuration (environment variables):
+  SOURCE_CACHE_DIR        directory for cached files
+                          (default <system temp dir>/cas-source-cache)
+  SOURCE_CACHE_MAX_BYTES  total bytes kept on disk, LRU evicted (default 268435456)
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+_SUFFIX = ".src"
+_INDEX_FILE = "etags.idx"
+# Dead index lines tolerated on top of 2x the live entries before compacting,
+# so a nearly empty cache does not rewrite the file on every put.
+_COMPACT_SLACK = 16
+
+
+def content_etag(data: bytes) -> str:
+    """Return the quoted strong ETag for *data*."""
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+def source_cache_key(cas_endpoint: str, api_key: str, vector_store_id: str, file_id: str) -> str:
+    """Derive the cache key (and file name) for one document seen through one set of credentials."""
+    raw = "\0".join((cas_endpoint, api_key, vector_store_id, file_id))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SourceCache:
+    """Thread-safe LRU of ``key -> bytes`` stored under *directory*, capped at *max_bytes*."""
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (size in bytes, etag), least recently used first.
+        self._index: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        self._total = 0
+        # Lines in the etag index file; compared with len(_index) to decide
+        # when to compact it.
+        self._index_lines = 0
+        self._loading: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.enabled = True
+        try:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            os.chmod(directory, 0o700)
+            self._load_index()
+        except OSError as exc:
+            logger.warning("source_cache_disabled dir=%s error=%r", directory, exc)
+            self.enabled = False
+            self._index.clear()
+            self._total = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def _read_etags(self) -> Dict[str, Tuple[int, str]]:
+        """Return ``key -> (size, etag)`` from the index file; later lines win."""
+        recorded: Dict[str, Tuple[int, str]] = {}
+        try:
+            with open(os.path.join(self.directory, _INDEX_FILE), "r", encoding="ascii") as fh:
+                for line in fh:
+                    parts = line.split()
+                    if len(parts) == 3 and parts[1].isdigit():
+                        recorded[parts[0]] = (int(parts[1]), parts[2])
+        except FileNotFoundError:
+            pass
+        except (OSError, UnicodeDecodeError) as exc:
+            logger.warning("source_cache_etag_index_unreadable error=%r", exc)
+        return recorded
+
+    def _load_index(self) -> None:
+        recorded = self._read_etags()
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(_SUFFIX):
+                continue
+            key = name[: -len(_SUFFIX)]
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+                known = recorded.get(key)
+                if known is not None and known[0] == st.st_size:
+                    etag = known[1]
+                else:
+                    with open(path, "rb") as fh:
+                        etag = content_etag(fh.read())
+                entries.append((st.st_mtime, key, st.st_size, etag))
+            except OSError as exc:
+                logger.warning("source_cache_index_skip path=%s error=%r", path, exc)
+        for _mtime, key, size, etag in sorted(entries):
+            self._index[key] = (size, etag)
+            self._total += size
+        self._evict()
+        self._rewrite_etags()
+
+    def _rewrite_etags(self) -> None:
+        """Replace the index file with one line per live entry."""
+        path = os.path.join(self.directory, _INDEX_FILE)
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="ascii") as fh:
+                fh.writelines(f"{key} {size} {etag}\n" for key, (size, etag) in self._index.items())
+            os.replace(tmp, path)
+            self._index_lines = len(self._index)
+        except OSError as exc:
+            logger.warning("source_cache_etag_index_write_failed error=%r", exc)
+
+    def _maybe_compact_etags(self) -> None:
+        """Rewrite the index file once dead lines outnumber live entries.  Caller holds the lock."""
+        if self._index_lines > 2 * len(self._index) + _COMPACT_SLACK:
+            self._rewrite_etags()
+
+    def _append_etag(self, key: str, size: int, etag: str) -> None:
+        """Record one written entry in the index file.  Caller holds the lock."""
+        try:
+            with open(os.path.join(self.directory, _INDEX_FILE), "a", encoding="ascii") as fh:
+                fh.write(f"{key} {size} {etag}\n")
+            self._index_lines += 1
+        except OSError as exc:
+            # The entry is still served; it is just re-hashed after a restart.
+            logger.warning("source_cache_etag_index_write_failed key=%s error=%r", key, exc)
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until under max_bytes.  Caller holds the lock."""
+        while self._total > self.max_bytes and self._index:
+            key, (size, _etag) = self._index.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Return ``(content, etag)`` for *key*, or None on a miss."""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as fh:
+                data = fh.read()
+        except OSError as exc:
+            logger.warning("source_cache_read_failed key=%s error=%r", key, exc)
+            with self._lock:
+                if self._index.pop(key, None) is not None:
+                    self._total -= entry[0]
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return data, entry[1]
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._index
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store *data* under *key* and return its ETag.
+
+        Content larger than the whole cache is not stored (the ETag is still
+        returned so the caller can serve it).
+        """
+        etag = content_etag(data)
+        if not self.enabled or len(data) > self.max_bytes:
+            return etag
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning("source_cache_write_failed key=%s error=%r", key, exc)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return etag
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old is not None:
+                self._total -= old[0]
+            self._index[key] = (len(data), etag)
+            self._total += len(data)
+            self._append_etag(key, len(data), etag)
+            self._evict()
+            self._maybe_compact_etags()
+        return etag
+
+    def get_or_load(self, key: str, loader: Callable[[], bytes]) -> Tuple[bytes, str]:
+        """Return the cached entry for *key*, calling *loader* on a miss.
+
+        Concurrent callers for the same key share one load — a click that
+        arrives while the pre-warm for that file is still fetching waits for
+        it instead of fetching again.  Exceptions from *loader* propagate and
+        nothing is cached.
+        """
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                cached = self.get(key)
+                if cached is not None:
+                    return cached
+                data = loader()
+                return data, self.put(key, data)
+        finally:
+            with self._lock:
+                if self._loading.get(key) is key_lock:
+                    del self._loading[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._index),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_cache: Optional[SourceCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_source_cache() -> SourceCache:
+    """Return the process-wide source cache, built from the environment on first use.
+
+    Never raises on a bad SOURCE_CACHE_DIR — the cache comes back disabled.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                directory = os.getenv("SOURCE_CACHE_DIR", "").strip() or os.path.join(
+                    tempfile.gettempdir(), "cas-source-cache",
+                )
+                _cache = SourceCache(
+                    directory,
+                    max_bytes=int(os.getenv("SOURCE_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+                )
+    return _cache
+
+
+def reset_source_cache() -> None:
+    """Forget the process-wide cache so the next call rebuilds it — used by tests."""
+    global _cache
+    with _cache_lock:
+        _cache = None
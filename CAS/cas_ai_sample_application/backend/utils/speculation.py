@@ -0,0 +1,200 @@
+"""
+Speculative retry retrieval for the verification stage.
+
+When ``_run_retrieval_loop`` sends a breakdown answer to the verifier, the
+verifier often rejects it with ``[RETRY] <query for the headline total>`` —
+and only then does the loop go back to CAS, so the refetch latency is added
+in series.  With speculation on, the loop guesses that retry query locally
+(the question's subject plus its metric words, asking for the total) and
+starts the CAS search while the verification call is still running.  If the
+verdict is a ``[RETRY]`` close enough to the guess, the next iteration uses
+the speculative result instead of waiting for a new search.
+
+A speculative search that is not used is wasted CAS load, so the process
+keeps a token budget, the same shape as the hedging budget in
+``utils.hedging``: every verification earns ``budget_ratio`` tokens (capped
+at ``burst``), every speculation spends one, and a speculation that is used
+refunds its token.  Wasted speculative searches therefore stay below
+``budget_ratio`` of verifications plus the burst.
+
+Like hedges, speculative searches only run on an idle worker: when all
+SPECULATIVE_MAX_WORKERS are busy the speculation is skipped (and its token
+refunded) rather than queued behind the others.  The loop never blocks on a
+speculative search either — if it has not finished by the time the verdict
+arrives, the retry query is fetched directly.
+
+Configuration (environment variables):
+  SPECULATIVE_RETRY_ENABLED         true/false (default false)
+  SPECULATIVE_BUDGET_PERCENT        wasted searches allowed per 100 verifications (default 20)
+  SPECULATIVE_MATCH_THRESHOLD       word overlap (Jaccard) at which a [RETRY]
+                                    query counts as the guessed one (default 0.6)
+  SPECULATIVE_MAX_WORKERS           size of the shared speculation pool (default 8)
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set
+import os
+import re
+import threading
+
+from utils.query import _WH_PATTERN
+
+_WORD = re.compile(r"[A-Za-z0-9$%][A-Za-z0-9$%.,'-]*")
+_STOPWORDS = frozenset(
+    "a an the of for in on at to by with and or from about as into per than "
+    "is are was were be been do does did has have had will would can could should "
+    "what which who whom how many much when where why there their its it this that "
+    "these those please tell give me show list".split()
+)
+
+
+def speculation_enabled() -> bool:
+    """Return whether speculative retry retrieval is on (SPECULATIVE_RETRY_ENABLED)."""
+    return os.getenv("SPECULATIVE_RETRY_ENABLED", "false").lower() in ("true", "1", "yes")
+
+
+def match_threshold() -> float:
+    return float(os.getenv("SPECULATIVE_MATCH_THRESHOLD", "0.6"))
+
+
+def _content_words(text: str) -> Set[str]:
+    words = (w.strip(".,'-").lower() for w in _WORD.findall(text))
+    return {w for w in words if w and w not in _STOPWORDS}
+
+
+def query_similarity(a: str, b: str) -> float:
+    """Jaccard overlap of the content words of two retrieval queries."""
+    wa, wb = _content_words(a), _content_words(b)
+    if not wa or not wb:
+        return 0.0
+    return len(wa & wb) / len(wa | wb)
+
+
+def predict_retry_query(query: str, subject: Optional[str]) -> Optional[str]:
+    """Guess the verifier's ``[RETRY]`` query for a rejected breakdown answer.
+
+    The verifier asks for "a better retrieval query that would fetch the
+    headline total directly", which in practice is the subject, the metric
+    and the word "total".  Returns None without a subject — a guess with no
+    subject is too unlikely to match to be worth a search.
+    """
+    if not subject:
+        return None
+    subject_words = {w.lower() for w in subject.split()}
+    metric = [
+        w.strip(".,'-?")
+        for w in _WH_PATTERN.sub(" ", query).split()
+        if w.strip(".,'-?").lower() not in _STOPWORDS
+        and w.strip(".,'-?").lower() not in subject_words
+        and w.strip(".,'-?").lower() != "total"
+    ]
+    metric = [w for w in metric if w]
+    if not metric:
+        return None
+    return f"total {' '.join(metric)} for {subject}"
+
+
+class Speculator:
+    """Token-bucket budget and counters for speculative retry searches."""
+
+    def __init__(self, budget_ratio: float = 0.2, burst: float = 3.0) -> None:
+        self.budget_ratio = budget_ratio
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._opportunities = 0
+        self._speculations = 0
+        self._hits = 0
+        self._skipped = 0
+        self._saturated = 0
+
+    def try_acquire(self) -> bool:
+        """Count one verification; return True if a speculative search may be sent."""
+        with self._lock:
+            self._opportunities += 1
+            self._tokens = min(self.burst, self._tokens + self.budget_ratio)
+            if self._tokens < 1.0:
+                self._skipped += 1
+                return False
+            self._tokens -= 1.0
+            self._speculations += 1
+            return True
+
+    def record_hit(self) -> None:
+        """A speculative result was used — it cost nothing extra, so refund it."""
+        with self._lock:
+            self._hits += 1
+            self._tokens = min(self.burst, self._tokens + 1.0)
+
+    def record_saturated(self) -> None:
+        """The pool had no idle worker, so the acquired speculation was never sent."""
+        with self._lock:
+            self._saturated += 1
+            self._speculations -= 1
+            self._tokens = min(self.burst, self._tokens + 1.0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "verifications": self._opportunities,
+                "speculations": self._speculations,
+                "hits": self._hits,
+                "wasted": self._speculations - self._hits,
+                "skipped_budget": self._skipped,
+                "skipped_saturated": self._saturated,
+                "budget_tokens": round(self._tokens, 2),
+            }
+
+
+_speculator: Optional[Speculator] = None
+_executor: Optional[ThreadPoolExecutor] = None
+# One permit per pool worker; see submit_speculative.
+_slots: Optional[threading.BoundedSemaphore] = None
+_registry_lock = threading.Lock()
+
+
+def get_speculator() -> Speculator:
+    """Return the process-wide speculator, created from env config on first use."""
+    global _speculator
+    with _registry_lock:
+        if _speculator is None:
+            _speculator = Speculator(
+                budget_ratio=float(os.getenv("SPECULATIVE_BUDGET_PERCENT", "20")) / 100.0,
+            )
+        return _speculator
+
+
+def submit_speculative(fn: Callable[[], Any]) -> "Optional[Future[Any]]":
+    """Run *fn* on the shared speculation pool and return its future.
+
+    Returns None, without queueing, when every worker is busy.
+    """
+    global _executor, _slots
+    with _registry_lock:
+        if _executor is None:
+            max_workers = int(os.getenv("SPECULATIVE_MAX_WORKERS", "8"))
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculate")
+            _slots = threading.BoundedSemaphore(max_workers)
+        executor, slots = _executor, _slots
+    if not slots.acquire(blocking=False):
+        return None
+    future = executor.submit(fn)
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def speculation_state() -> Optional[Dict[str, Any]]:
+    """Return the speculator's counters, or None if it has never been used."""
+    with _registry_lock:
+        speculator = _speculator
+    return speculator.snapshot() if speculator is not None else None
+
+
+def reset_speculator() -> None:
+    """Forget the process-wide speculator and pool — used by tests."""
+    global _speculator, _executor, _slots
+    with _registry_lock:
+        _speculator = None
+        executor, _executor, _slots = _executor, None, None
+    if executor is not None:
+        executor.shutdown(wait=False)
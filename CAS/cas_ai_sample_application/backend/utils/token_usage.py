@@ -0,0 +1,67 @@
+"""
+Token usage accounting.
+
+``LLMService._call_llm`` asks OpenAI-compatible servers to report usage on
+the stream (``stream_options.include_usage``) and records each call's
+prompt and completion tokens here, tagged with what the call was for.  When
+the server sends no usage block the counts are estimated from the text and
+the call is counted under ``estimated_calls``.
+
+Three tallies are kept:
+  - per request  — ``LLMService.usage``; the service is built per request
+  - per session  — ``Session.token_usage``, merged in by api_server
+  - per process  — ``process_usage``, reported by GET /api/health
+"""
+
+from typing import Any, Dict
+import threading
+
+# What each LLM call is for.  "probe" is the startup / on-demand format
+# compatibility check; "other" catches anything untagged.
+CALL_TYPES = ("router", "rewrite", "decision", "verify", "synthesis", "compaction", "probe", "other")
+
+_FIELDS = ("calls", "prompt_tokens", "completion_tokens", "estimated_calls")
+
+
+class TokenUsage:
+    """Thread-safe prompt/completion token tallies broken down by call type."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._by_type: Dict[str, Dict[str, int]] = {}
+
+    def add(self, call_type: str, prompt_tokens: int, completion_tokens: int, estimated: bool = False) -> None:
+        """Record one LLM call."""
+        with self._lock:
+            entry = self._by_type.setdefault(call_type, dict.fromkeys(_FIELDS, 0))
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            if estimated:
+                entry["estimated_calls"] += 1
+
+    def merge(self, other: "TokenUsage") -> None:
+        """Add every tally from *other* into this one."""
+        with other._lock:
+            incoming = {k: dict(v) for k, v in other._by_type.items()}
+        with self._lock:
+            for call_type, counts in incoming.items():
+                entry = self._by_type.setdefault(call_type, dict.fromkeys(_FIELDS, 0))
+                for field in _FIELDS:
+                    entry[field] += counts[field]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return totals plus a ``by_type`` breakdown, JSON-serialisable."""
+        with self._lock:
+            by_type = {k: dict(v) for k, v in self._by_type.items()}
+        totals = {field: sum(v[field] for v in by_type.values()) for field in _FIELDS}
+        totals["total_tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+        totals["by_type"] = by_type
+        return totals
+
+    def reset(self) -> None:
+        with self._lock:
+            self._by_type.clear()
+
+
+process_usage = TokenUsage()
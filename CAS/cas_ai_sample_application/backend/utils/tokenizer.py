@@ -0,0 +1,151 @@
+"""
+Token counting for budgets and compaction.
+
+Every token decision in the backend — ``estimate_tokens``, the compaction
+trigger, the usage fallback — goes through ``count_tokens``.  By default
+it is the 4-characters-per-token heuristic.  Point TOKENIZER_FILE at a
+HuggingFace ``tokenizer.json`` for the model you serve and counts become
+exact; the file is loaded from disk, never downloaded.  That needs the
+optional ``tokenizers`` package (see requirements.txt); if it or the file
+is missing the heuristic is used and a warning is logged once.
+
+Real tokenization costs far more than ``len() // 4``, so the file-backed
+tokenizer is wrapped in an LRU memo keyed by the string itself.  Session
+turns and chunks are counted over and over as history grows — each
+distinct string is tokenized once.  ``str`` caches its own hash, so a cache
+hit costs one dict lookup.  One-off strings such as whole prompts and
+completions go through ``count_tokens_uncached`` so they never evict the
+turns and chunks the memo is there for.
+
+Configuration (environment variables):
+  TOKENIZER_FILE        path to a local tokenizer.json (default unset → heuristic)
+  TOKENIZER_CACHE_SIZE  memoised strings kept (default 4096)
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class HeuristicTokenizer:
+    """1 token ≈ 4 characters (floor division)."""
+
+    name = "heuristic"
+
+    def count(self, text: str) -> int:
+        return len(text) // 4
+
+
+class FileTokenizer:
+    """Exact counts from a local HuggingFace ``tokenizer.json``, loaded offline.
+
+    Raises ImportError when the ``tokenizers`` package is not installed and
+    OSError / ValueError-like errors when the file cannot be loaded.
+    """
+
+    def __init__(self, path: str) -> None:
+        from tokenizers import Tokenizer  # optional dependency
+
+        self._tokenizer = Tokenizer.from_file(path)
+        self.name = f"file:{os.path.basename(path)}"
+
+    def count(self, text: str) -> int:
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+class CachedTokenizer:
+    """Thread-safe LRU memo of per-string token counts around another tokenizer."""
+
+    def __init__(self, inner: Any, max_entries: int = 4096) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counts: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        with self._lock:
+            n = self._counts.get(text)
+            if n is not None:
+                self._counts.move_to_end(text)
+                self.hits += 1
+                return n
+            self.misses += 1
+        # Tokenize outside the lock; two threads racing on the same new
+        # string just compute it twice.
+        n = self.inner.count(text)
+        with self._lock:
+            self._counts[text] = n
+            if len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"tokenizer": self.name, "entries": len(self._counts), "hits": self.hits, "misses": self.misses}
+
+
+_tokenizer: Optional[Any] = None
+_tokenizer_lock = threading.Lock()
+
+
+def _build_tokenizer() -> Any:
+    path = os.getenv("TOKENIZER_FILE", "").strip()
+    if not path:
+        return HeuristicTokenizer()
+    try:
+        inner = FileTokenizer(path)
+    except ImportError:
+        logger.warning("tokenizer_fallback reason=tokenizers package not installed path=%s", path)
+        return HeuristicTokenizer()
+    except Exception as exc:
+        logger.warning("tokenizer_fallback reason=%r path=%s", exc, path)
+        return HeuristicTokenizer()
+    logger.info("tokenizer_loaded name=%s", inner.name)
+    return CachedTokenizer(inner, max_entries=int(os.getenv("TOKENIZER_CACHE_SIZE", "4096")))
+
+
+def get_tokenizer() -> Any:
+    """Return the process-wide tokenizer, built from the environment on first use.
+
+    Built lazily rather than at import so it sees values api_server loads
+    from .env.
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                _tokenizer = _build_tokenizer()
+    return _tokenizer
+
+
+def reset_tokenizer() -> None:
+    """Forget the process-wide tokenizer so the next call rebuilds it — used by tests."""
+    global _tokenizer
+    with _tokenizer_lock:
+        _tokenizer = None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in *text* with the configured tokenizer."""
+    return get_tokenizer().count(text)
+
+
+def count_tokens_uncached(text: str) -> int:
+    """Count tokens in *text* without reading or filling the memo.
+
+    For strings that are counted once and never again (full prompts,
+    completions), which would only push useful entries out of the LRU.
+    """
+    tokenizer = get_tokenizer()
+    if isinstance(tokenizer, CachedTokenizer):
+        tokenizer = tokenizer.inner
+    return tokenizer.count(text)
@@ -0,0 +1,112 @@
+"""
+On-disk snapshot of MCP tool discovery results.
+
+``LLMService._register_discovered_tools`` needs the CAS server's
+``tools/list``.  The in-memory warm cache (llm_service._tool_discovery_cache)
+covers repeat requests, but a freshly started process has nothing: if CAS is
+slow or briefly unreachable at boot, discovery blocks and then falls back to
+the single hardcoded ``cas`` tool.
+
+This module persists each host's tool descriptors to a small JSON file, with
+a schema hash and the time they were saved.  On a cold start LLMService
+boots from a snapshot younger than TOOL_SNAPSHOT_TTL_SECONDS without any
+network call and revalidates against ``tools/list`` in the background; a
+snapshot of any age is still preferred over the hardcoded fallback when the
+live call fails.
+
+The file holds tool names, descriptions and input schemas only — no
+credentials.
+
+Configuration (environment variables):
+  TOOL_SNAPSHOT_FILE         snapshot path (default <system temp dir>/cas-tool-snapshot.json);
+                             set to an empty value to disable persistence
+  TOOL_SNAPSHOT_TTL_SECONDS  age up to which a snapshot is trusted for an
+                             instant boot (default 86400)
+"""
+
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_file_lock = threading.Lock()
+
+
+def snapshot_path() -> Optional[str]:
+    """Return the configured snapshot file, or None when persistence is disabled."""
+    path = os.getenv("TOOL_SNAPSHOT_FILE")
+    if path is None:
+        return os.path.join(tempfile.gettempdir(), "cas-tool-snapshot.json")
+    return path.strip() or None
+
+
+def snapshot_ttl() -> float:
+    return float(os.getenv("TOOL_SNAPSHOT_TTL_SECONDS", "86400"))
+
+
+def tools_schema_hash(tools: List[Dict[str, Any]]) -> str:
+    """Stable hash of a tool list — changes whenever a name, description or schema does."""
+    canonical = json.dumps(tools, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def _read_all(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as exc:
+        logger.warning("tool_snapshot_unreadable path=%s error=%r", path, exc)
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def load_tool_snapshot(host: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Return ``{"tools", "schema_hash", "saved_at"}`` for *host*, or None.
+
+    Entries older than *max_age* seconds, or whose hash no longer matches
+    their tools (a hand-edited or truncated file), are ignored.
+    """
+    path = snapshot_path()
+    if path is None:
+        return None
+    with _file_lock:
+        entry = _read_all(path).get(host)
+    if not isinstance(entry, dict) or not isinstance(entry.get("tools"), list):
+        return None
+    if entry.get("schema_hash") != tools_schema_hash(entry["tools"]):
+        logger.warning("tool_snapshot_hash_mismatch host=%s — ignoring entry", host)
+        return None
+    if max_age is not None and time.time() - float(entry.get("saved_at", 0)) > max_age:
+        return None
+    return entry
+
+
+def save_tool_snapshot(host: str, tools: List[Dict[str, Any]]) -> Optional[str]:
+    """Persist *tools* for *host* and return their schema hash (None if disabled or failed)."""
+    path = snapshot_path()
+    if path is None:
+        return None
+    schema_hash = tools_schema_hash(tools)
+    with _file_lock:
+        data = _read_all(path)
+        data[host] = {"tools": tools, "schema_hash": schema_hash, "saved_at": time.time()}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(data, fh)
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning("tool_snapshot_write_failed path=%s error=%r", path, exc)
+            return None
+    return schema_hash
@@ -0,0 +1,66 @@
+"""
+TTLCache — a small thread-safe key/value cache with per-entry expiry.
+
+Used for process-wide results that are expensive to recompute on every
+request but go stale eventually: MCP ``tools/list`` discovery, vector-store
+id resolution, and the LLM compatibility probe.  The startup warm-up in
+api_server fills these caches before traffic arrives.
+"""
+
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import threading
+import time
+
+
+class TTLCache:
+    """Thread-safe dict whose entries expire ``ttl_seconds`` after being set."""
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for *key*, or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store *value* under *key*; *ttl_seconds* overrides the cache default."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                # Full — drop whichever entry expires soonest.
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[key] = (self._clock() + ttl, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove *key* if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
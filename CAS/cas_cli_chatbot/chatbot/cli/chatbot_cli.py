@@ -3,6 +3,7 @@ Enhanced Chatbot CLI with advanced enterprise features.
 """
 
 import logging
+import time
 from typing import Any, cast
 
 from prompt_toolkit import PromptSession
@@ -14,12 +15,21 @@ from rich.prompt import Confirm
 
 from chatbot.cli import command_handlers as handlers
 from chatbot.cli import display_methods as displays
+from chatbot.services.cache_service import (
+    ACCESS_TAG,
+    namespace_tag,
+    vector_store_tag,
+)
 from chatbot.utils.validators import TokenValidator
 
 # HTTP Status Code Constants
 HTTP_STATUS_UNAUTHORIZED = 401
 HTTP_STATUS_FORBIDDEN = 403
 
+# Access decision cache defaults (seconds)
+DEFAULT_ACCESS_TTL = 30
+DEFAULT_ACCESS_STALE_TTL = 300
+
 
 class _SessionProxy:
     """Proxy prompt session to allow method replacement in tests."""
@@ -59,6 +69,7 @@ class ChatbotCLI:
     COMMANDS = {
         "vector search": "Retrieve relevant chunks without LLM processing",
         "vector search filter": "Retrieve specific chunks using filters",
+        "vector search all": "Search every accessible vector store in parallel",
         "show file content": "Show the content of a specified file",
         "vector stores info files": "Show file counts, bytes, and storage details",
         "llm query file": "Query a specific file from a vector store",
@@ -103,6 +114,12 @@ class ChatbotCLI:
         self.current_vector_store: str | None = None
         self.running = True
 
+        cache_config = config.get("cache", {})
+        self.access_ttl = cache_config.get("access_ttl", DEFAULT_ACCESS_TTL)
+        self.access_stale_ttl = cache_config.get(
+            "access_stale_ttl", DEFAULT_ACCESS_STALE_TTL
+        )
+
         self.session: Any = _SessionProxy(PromptSession())
         self.command_completer = FuzzyCompleter(
             WordCompleter(list(self.COMMANDS.keys()), ignore_case=True)
@@ -300,8 +317,18 @@ class ChatbotCLI:
             return False
 
         # Check 4: User must have access to vector store
-        if vector_store in self.get_accessible_vector_stores():
-            return True
+        try:
+            if self._has_access(vector_store):
+                return True
+        except Exception as e:
+            # Could not list the user's stores: refuse this command, but keep
+            # the selection — the user has not been shown to lack access.
+            if not silent:
+                self.console.print(
+                    f"[red]✗ Could not verify access to vector store/domain '{vector_store}': {e}[/]"
+                )
+            self.logger.warning(f"Access check for {vector_store} failed: {e}")
+            return False
 
         # User doesn't have access - show error and return False
         if not silent:
@@ -317,6 +344,57 @@ class ChatbotCLI:
         self.current_vector_store = None
         return False
 
+    def _has_access(self, vector_store: str) -> bool:
+        """
+        Decide whether the current user may query vector_store
+
+        Decisions are cached per (user, vector store) for access_ttl seconds,
+        so the query hot path does not list the user's vector stores over
+        HTTP before every search.  For access_stale_ttl seconds after that a
+        decision is still used at once while it is re-checked in the
+        background, alongside the query it let through.
+
+        A revoked assignment is therefore not refused at once: the old
+        decision is served for the rest of access_ttl, then for every query
+        until a background re-check succeeds, which, if re-checks keep
+        failing, can take up to access_ttl + access_stale_ttl seconds
+        (330 by default) after the decision was made.
+
+        Only a successful listing produces a decision.  A failed one raises
+        and is not cached, so an outage is never remembered as a denial.
+
+        Raises:
+            Exception: The accessible vector stores could not be listed
+        """
+        cache = self.services.get("cache")
+        if cache is None:
+            return vector_store in self.get_accessible_vector_stores(raise_errors=True)
+
+        def decide() -> bool:
+            return vector_store in self.get_accessible_vector_stores(raise_errors=True)
+
+        tags = [ACCESS_TAG, vector_store_tag(vector_store)]
+        if self.current_namespace:
+            tags.append(namespace_tag(self.current_namespace))
+
+        return bool(
+            cache.get_or_compute(
+                f"access_{self.current_user}_{vector_store}",
+                decide,
+                ttl_seconds=self.access_ttl,
+                tags=tags,
+                stale_ttl=self.access_stale_ttl,
+                negative_ttl=0,
+            )
+        )
+
+    def invalidate_access_decisions(self) -> int:
+        """Forget every cached access decision; returns how many were dropped"""
+        cache = self.services.get("cache")
+        if cache is None:
+            return 0
+        return int(cache.invalidate_tag(ACCESS_TAG))
+
     def _retrieved_result_valid(self, result: Any, content_type: str) -> bool:
         """Validate retrieval result."""
         # Check 0: Result must not be None
@@ -439,6 +517,25 @@ class ChatbotCLI:
                 "[yellow]⚠ Config manager not available. Please configure LLM manually in config.yaml[/]"
             )
 
+    def _command_label(self, command: str) -> str:
+        """Metric label for a command line: the known command it starts with."""
+        matches = [cmd for cmd in self.COMMANDS if command.startswith(cmd)]
+        return max(matches, key=len) if matches else "unknown"
+
+    def _execute_timed(self, command: str) -> None:
+        """Execute a command, recording its duration labelled by command."""
+        metrics = self.services.get("metrics")
+        start = time.perf_counter()
+        try:
+            handlers.execute_command(self, command)
+        finally:
+            if metrics is not None:
+                labels = {"command": self._command_label(command)}
+                metrics.record_timing(
+                    "cli_command", (time.perf_counter() - start) * 1000, labels
+                )
+                metrics.increment("cli_commands", labels=labels)
+
     def run(self) -> int:
         """Main CLI loop."""
         displays.display_welcome(self)
@@ -475,7 +572,7 @@ class ChatbotCLI:
                     if not command:
                         continue
 
-                    handlers.execute_command(self, command)
+                    self._execute_timed(command)
 
                 except KeyboardInterrupt:
                     if confirm("\nExit application?"):
@@ -568,6 +665,9 @@ class ChatbotCLI:
     def cmd_vector_search(self, *args: Any, **kwargs: Any) -> Any:
         return handlers.cmd_vector_search(self, *args, **kwargs)
 
+    def cmd_vector_search_all(self, *args: Any, **kwargs: Any) -> Any:
+        return handlers.cmd_vector_search_all(self, *args, **kwargs)
+
     def cmd_vector_search_filter(self, *args: Any, **kwargs: Any) -> Any:
         return handlers.cmd_vector_search_filter(self, *args, **kwargs)
 
@@ -10,6 +10,8 @@ from rich.panel import Panel
 from rich.prompt import Confirm
 from rich.table import Table
 
+from chatbot.services.auth_service import AuthenticationError
+
 # Display constants
 TABLE_COLUMN_WIDTH_INDEX = 4
 TABLE_COLUMN_WIDTH_TIME = 20
@@ -36,6 +38,7 @@ def cmd_vector_stores_list(self: Any) -> None:
 
 def cmd_vector_stores_select(self: Any, vector_store_name: str | None = None) -> None:
     """Select a vector store."""
+    self.invalidate_access_decisions()
     all_vector_stores = self.services["vector store"].list_vector_stores(
         self.current_namespace, use_cache=False
     )
@@ -302,12 +305,21 @@ def cmd_clear(self: Any) -> None:
     self.display_welcome()
 
 
-def get_accessible_vector_stores(self: Any) -> list[str]:
-    """List vector_stores available to user"""
+def get_accessible_vector_stores(self: Any, raise_errors: bool = False) -> list[str]:
+    """
+    List vector_stores available to user
+
+    With raise_errors, a missing token or failed listing raises instead of
+    returning [], so an outage is never mistaken for "no access".
+    """
     if not self._check_token():
+        if raise_errors:
+            raise AuthenticationError("Authentication token is not valid")
         return []
 
-    vector_stores = self.services["query"].list_vector_stores(use_cache=False)
+    vector_stores = self.services["query"].list_vector_stores(
+        use_cache=False, raise_errors=raise_errors
+    )
 
     if not vector_stores:
         return []
@@ -371,6 +383,105 @@ def cmd_vector_search(self: Any) -> None:
         )
 
 
+def _hit_score(item: dict[str, Any]) -> float:
+    """Relevance score of a search hit (top level or in its metadata)."""
+    score = item.get("score", item.get("metadata", {}).get("score", 0.0))
+    try:
+        return float(score)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def cmd_vector_search_all(self: Any) -> None:
+    """Search every accessible vector store concurrently and merge hits by score."""
+    if not self.current_user:
+        self.console.print(
+            "[red]✗ No user selected. Select a user first with 'users select'[/]"
+        )
+        return
+
+    if not self._check_token():
+        return
+
+    vector_stores = self.get_accessible_vector_stores()
+    if not vector_stores:
+        self.console.print("[yellow]No accessible vector stores to search[/]")
+        return
+
+    query = self._get_input(f"[{self.current_user}@all] Enter your query: ")
+    if not query:
+        self.console.print("[yellow]Query cannot be empty[/]")
+        return
+
+    limit_str = self._get_input(
+        f"[{self.current_user}@all] Enter the number of chunks to retrieve: "
+    )
+
+    # Convert limit to integer
+    try:
+        limit = int(limit_str) if limit_str else None
+    except ValueError:
+        self.console.print(
+            f"[red]✗ Invalid limit value: '{limit_str}'. Must be a number.[/]"
+        )
+        return
+
+    self.console.print(
+        f"\n[bold cyan]Searching {len(vector_stores)} vector stores...[/]\n"
+    )
+    self.logger.info(
+        f"Executing search across {len(vector_stores)} vector stores for user {self.current_user}"
+    )
+
+    hits: list[dict[str, Any]] = []
+    try:
+        for vector_store, result in self.services["query"].query_vector_stores(
+            query, vector_stores, limit=limit
+        ):
+            if result.get("success") is False:
+                self.console.print(
+                    f"  [red]✗ {vector_store}: {result.get('error', 'search failed')}[/]"
+                )
+                continue
+
+            data = result.get("data", [])
+            if not data:
+                self.console.print(f"  [dim]○ {vector_store}: no matches[/]")
+                continue
+
+            best = max(_hit_score(item) for item in data)
+            self.console.print(
+                f"  [green]✓ {vector_store}: {len(data)} hit(s), best score {best:.3f}[/]"
+            )
+            for item in data:
+                metadata = {
+                    **item.get("metadata", {}),
+                    "vector_store": vector_store,
+                    "score": _hit_score(item),
+                }
+                hits.append({**item, "metadata": metadata})
+
+    except Exception as e:
+        self.logger.critical(f"Unexpected error in vector search all: {e}", exc_info=True)
+        self.error_handler.handle_error(
+            e, f"Unexpected query error for user {self.current_user}"
+        )
+        return
+
+    if not hits:
+        self.console.print(
+            "\n[yellow]No chunks found matching your query in any vector store.[/]"
+        )
+        return
+
+    hits.sort(key=_hit_score, reverse=True)
+    if limit:
+        hits = hits[:limit]
+
+    self._display_search_chunks({"data": hits}, show_metadata=True)
+    self._record_successful_query(query, hits)
+
+
 def cmd_vector_search_filter(self: Any) -> None:
     """Retrieve raw chunks with user-specific authentication and filters"""
     if not self._user_in_vector_store(self.current_vector_store):
@@ -620,6 +731,7 @@ def execute_command(self: Any, command: str) -> None:
     command_map = {
         "vector search": self.cmd_vector_search,
         "vector search filter": self.cmd_vector_search_filter,
+        "vector search all": self.cmd_vector_search_all,
         "show file content": self.cmd_show_file_content,
         "vector stores info files": self.cmd_vector_stores_info_users_files,
         "llm query file": self.cmd_llm_query_file,
@@ -22,6 +22,7 @@ from chatbot.cli.chatbot_cli import ChatbotCLI
 from chatbot.cli.middleware import ErrorHandler, SessionManager
 from chatbot.services.auth_service import AuthService
 from chatbot.services.cache_service import CacheService
+from chatbot.services.kube_client import KubeClient, KubeResourceCache
 from chatbot.services.llm_service import LLMService
 from chatbot.services.metrics_service import MetricsService
 from chatbot.services.query_service import QueryService
@@ -57,7 +58,7 @@ def display_banner() -> None:
 
 
 def initialize_services(
-    config: dict[str, Any], logger: logging.Logger
+    config: dict[str, Any], logger: logging.Logger, config_dir: Path | None = None
 ) -> dict[str, Any]:
     """
     Initialize all services with dependency injection
@@ -65,6 +66,7 @@ def initialize_services(
     Args:
         config: Configuration dictionary
         logger: Logger instance
+        config_dir: Directory holding config.yaml; the disk cache lives here
 
     Returns:
         Dictionary of initialized services
@@ -75,18 +77,27 @@ def initialize_services(
 
     try:
         # Core services
-        services["cache"] = CacheService(config=config, logger=logger)
+        services["cache"] = CacheService(
+            config=config, logger=logger, base_dir=config_dir
+        )
         services["metrics"] = MetricsService(config=config, logger=logger)
+        services["metrics"].start_textfile_export()
         services["auth"] = AuthService(
             config=config, logger=logger, cache_service=services["cache"]
         )
 
+        # Optional direct Kubernetes API access (falls back to oc)
+        kube = create_kube_resource_cache(config, services["auth"], logger)
+        if kube is not None:
+            services["kube"] = kube
+
         # Business logic services
         services["user"] = UserService(
             config=config,
             auth_service=services["auth"],
             logger=logger,
             cache_service=services["cache"],
+            kube=kube,
         )
 
         services["vector store"] = VectorStoreService(
@@ -94,6 +105,7 @@ def initialize_services(
             auth_service=services["auth"],
             logger=logger,
             cache_service=services["cache"],
+            kube=kube,
         )
 
         services["query"] = QueryService(
@@ -101,6 +113,7 @@ def initialize_services(
             auth_service=services["auth"],
             logger=logger,
             cache_service=services["cache"],
+            metrics_service=services["metrics"],
         )
 
         services["llm"] = LLMService(
@@ -116,6 +129,41 @@ def initialize_services(
         raise
 
 
+def create_kube_resource_cache(
+    config: dict[str, Any], auth_service: AuthService, logger: logging.Logger
+) -> KubeResourceCache | None:
+    """
+    Build the informer-backed Kubernetes API cache if kube_api.enabled
+
+    Args:
+        config: Configuration dictionary
+        auth_service: Supplies the API URL and the current bearer token
+        logger: Logger instance
+
+    Returns:
+        KubeResourceCache, or None when disabled
+    """
+    kube_config = config.get("kube_api", {}) or {}
+    if not kube_config.get("enabled", False):
+        return None
+
+    client = KubeClient(
+        api_url=kube_config.get("api_url") or auth_service.get_api_url_from_console(),
+        token_provider=lambda: auth_service.token,
+        verify=not config.get("allow_self_signed", True),
+        timeout=config.get("request_timeout", 30),
+        logger=logger,
+    )
+    logger.info(f"Kubernetes API access enabled: {client.api_url}")
+    return KubeResourceCache(
+        client,
+        cas_api_version=kube_config.get("cas_api_version", "cas.isf.ibm.com/v1beta1"),
+        sync_timeout=kube_config.get("sync_timeout", 10),
+        watch_timeout=kube_config.get("watch_timeout", 300),
+        logger=logger,
+    )
+
+
 def run_health_checks(services: dict[str, Any], logger: logging.Logger) -> bool:
     """
     Run health checks on all services
@@ -197,7 +245,7 @@ def main() -> int:
         )
 
         # Initialize services
-        services = initialize_services(config, logger)
+        services = initialize_services(config, logger, config_path.parent)
 
         # Authenticate and fetch bearer token
         console.print("\n[bold yellow]Authenticating with OpenShift...[/]")
@@ -253,6 +301,11 @@ def main() -> int:
 
         # Cleanup
         logger.info("Application shutting down")
+        services["query"].close()
+        services["cache"].close()
+        services["metrics"].close()
+        if "kube" in services:
+            services["kube"].close()
         console.print("\n[bold cyan]Thank you for using CAS Chatbot!\n[/]")
 
         return exit_code
@@ -9,6 +9,8 @@ from os import PathLike
 from typing import Any, Protocol
 from urllib.parse import urlparse
 
+from chatbot.services.cache_service import ACCESS_TAG
+
 
 class AuthenticationError(Exception):
     """Authentication related errors"""
@@ -29,6 +31,8 @@ class CacheServiceProtocol(Protocol):
 
     def delete(self, key: str) -> bool: ...
 
+    def invalidate_tag(self, tag: str) -> int: ...
+
 
 class AuthService:
     """Enhanced authentication service with caching and retry logic"""
@@ -170,6 +174,8 @@ class AuthService:
             # Cache token if cache service available
             if self.cache_service:
                 self.cache_service.set("auth_token", self.token, ttl_seconds=86400)
+                # Access decisions were made with the previous token
+                self.cache_service.invalidate_tag(ACCESS_TAG)
 
             self.logger.info("Successfully authenticated and obtained bearer token")
             return True
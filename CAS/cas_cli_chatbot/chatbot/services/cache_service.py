@@ -2,42 +2,137 @@
 Cache Service - In-memory caching with TTL support
 """
 
+import fnmatch
+import heapq
 import logging
+import sys
 import time
-from threading import Lock
-from typing import Any
+from collections import OrderedDict
+from itertools import count
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Iterable
+
+from chatbot.services.disk_cache import DiskCache
+
+# Containers nested deeper than this are not walked when estimating sizes.
+_SIZE_DEPTH_LIMIT = 6
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """
+    Estimate the memory footprint of a cached value in bytes
+
+    Walks dicts, lists, tuples and sets (to a fixed depth) and adds up
+    sys.getsizeof of every element.  This is an estimate for budgeting, not
+    an exact measurement; shared objects are counted every time they appear.
+    """
+    size = sys.getsizeof(value)
+    if _depth >= _SIZE_DEPTH_LIMIT:
+        return size
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _depth + 1)
+    return size
+
+
+# Tag carried by every cached (user, vector store) access decision
+ACCESS_TAG = "access"
+
+
+def vector_store_tag(vector_store: str) -> str:
+    """Tag carried by every entry derived from one vector store"""
+    return f"vector_store:{vector_store}"
+
+
+def namespace_tag(namespace: str) -> str:
+    """Tag carried by every entry derived from one Kubernetes namespace"""
+    return f"namespace:{namespace}"
 
 
 class CacheEntry:
-    """Represents a cached entry with TTL"""
+    """
+    Represents a cached entry with TTL
+
+    ttl_seconds is how long the value is fresh.  With stale_seconds > 0 the
+    entry is kept that much longer so get_or_compute can serve it while it
+    refreshes the value in the background; get() never returns it once stale.
+    """
 
-    def __init__(self, value: Any, ttl_seconds: int = 300) -> None:
+    def __init__(
+        self,
+        value: Any,
+        ttl_seconds: int = 300,
+        size_bytes: int = 0,
+        tags: Iterable[str] = (),
+        stale_seconds: float = 0,
+    ) -> None:
         self.value = value
         self.created_at = time.time()
         self.ttl_seconds = ttl_seconds
+        self.fresh_until = self.created_at + ttl_seconds
+        self.expires_at = self.fresh_until + stale_seconds
+        self.size_bytes = size_bytes
+        self.tags = frozenset(tags)
 
     def is_expired(self) -> bool:
         """Check if entry has expired"""
-        return (time.time() - self.created_at) > self.ttl_seconds
+        return time.time() > self.expires_at
+
+    def is_stale(self) -> bool:
+        """Check if entry is past its fresh TTL"""
+        return time.time() > self.fresh_until
 
     def get_age(self) -> float:
         """Get age of entry in seconds"""
         return time.time() - self.created_at
 
 
+class _NegativeResult:
+    """Cached loader failure, re-raised by get_or_compute until it expires"""
+
+    def __init__(self, error: Exception) -> None:
+        self.error = error
+
+
+class _Flight:
+    """One in-progress load that concurrent get_or_compute callers wait on"""
+
+    def __init__(self) -> None:
+        self.done = Event()
+        self.value: Any = None
+        self.error: Exception | None = None
+
+
 class CacheService:
     """
     Thread-safe in-memory cache service with TTL and statistics
 
     This class provides a thread-safe caching mechanism with the following features:
     - Time-to-live (TTL) support for automatic expiration
-    - LRU-style eviction when max entries is reached
-    - Pattern-based cache clearing
+    - True LRU eviction in O(1) when max entries or the optional byte budget
+      (cache.max_bytes, from estimated payload sizes) is exceeded
+    - An expiry heap, so expired entries are dropped on every set without
+      scanning the whole cache
+    - Optional persistent second tier (cache.disk) — entries are written
+      through to SQLite and promoted back into memory on an L1 miss, so a
+      restarted CLI starts warm; auth tokens are never persisted
+    - Tag-indexed invalidation — entries carry tags such as a resource
+      family ("query") or vector_store_tag(name), and invalidate_tag() costs
+      O(matching entries) instead of scanning every key
+    - get_or_compute() — one loader call per key however many callers miss
+      at once, optional stale-while-revalidate (cache.stale_ttl) and short
+      negative caching of loader failures (cache.negative_ttl)
+    - Pattern-based cache clearing (full scan; prefer tags)
     - Hit/miss statistics tracking
 
     Thread Safety:
     - All public methods are protected by a single lock (self.lock)
-    - Private methods (_evict_oldest) must be called while holding the lock
+    - Private methods (_evict_lru, _purge_expired, _remove, _unindex) must be
+      called while holding the lock
     - Statistics counters are updated atomically within lock-protected sections
     - Cache dictionary operations are always performed within lock context
 
@@ -48,21 +143,60 @@ class CacheService:
     """
 
     def __init__(
-        self, config: dict[str, Any], logger: logging.Logger | None = None
+        self,
+        config: dict[str, Any],
+        logger: logging.Logger | None = None,
+        base_dir: str | Path | None = None,
     ) -> None:
         self.config = config
         self.logger = logger or logging.getLogger(__name__)
-        self.cache: dict[str, CacheEntry] = {}
+        # Least recently used first; get() and set() move a key to the end.
+        self.cache: OrderedDict[str, CacheEntry] = OrderedDict()
         self.lock = Lock()
+        # (expires_at, seq, key, entry) min-heap.  Stale items (the key was
+        # overwritten or removed) are skipped when they surface.
+        self._expiry_heap: list[tuple[float, int, str, CacheEntry]] = []
+        self._seq = count()
+        self.total_bytes = 0
+        # tag -> keys currently carrying it
+        self._tag_index: dict[str, set[str]] = {}
+        # key -> load in progress (single-flight)
+        self._inflight: dict[str, _Flight] = {}
 
         # Configuration
         self.default_ttl = config.get("cache", {}).get("default_ttl", 300)
         self.max_entries = config.get("cache", {}).get("max_entries", 1000)
+        # 0 / unset disables the byte budget
+        self.max_bytes = config.get("cache", {}).get("max_bytes", 0) or 0
+        # get_or_compute defaults; 0 disables each
+        self.stale_ttl = config.get("cache", {}).get("stale_ttl", 0) or 0
+        self.negative_ttl = config.get("cache", {}).get("negative_ttl", 10) or 0
 
         # Statistics
         self.hits = 0
         self.misses = 0
         self.evictions = 0
+        self.expirations = 0
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.stale_served = 0
+        self.negative_hits = 0
+
+        # Optional L2 tier; a relative file is resolved against base_dir
+        # (the config directory when started from main)
+        self.disk: DiskCache | None = None
+        disk_config = config.get("cache", {}).get("disk", {}) or {}
+        if disk_config.get("enabled", False):
+            disk_file = Path(disk_config.get("file", "cache.sqlite3")).expanduser()
+            if not disk_file.is_absolute() and base_dir is not None:
+                disk_file = Path(base_dir) / disk_file
+            disk = DiskCache(
+                disk_file,
+                max_bytes=disk_config.get("max_bytes", 50 * 1024 * 1024),
+                exclude_patterns=disk_config.get("exclude", []),
+                logger=self.logger,
+            )
+            self.disk = disk if disk.enabled else None
 
         self.logger.info(
             f"Cache service initialized (TTL: {self.default_ttl}s, Max: {self.max_entries})"
@@ -79,24 +213,233 @@ class CacheService:
             Cached value or None if not found/expired
         """
         with self.lock:
-            entry = self.cache.get(key)
+            entry = self._lookup(key)
+
+            if entry is not None and not (
+                entry.is_stale() or isinstance(entry.value, _NegativeResult)
+            ):
+                self.hits += 1
+                self.logger.debug(f"Cache hit: {key} (age: {entry.get_age():.1f}s)")
+                return entry.value
 
-            if entry is None:
+            if self.disk is None:
                 self.misses += 1
                 self.logger.debug(f"Cache miss: {key}")
                 return None
 
-            if entry.is_expired():
-                self.logger.debug(f"Cache expired: {key} (age: {entry.get_age():.1f}s)")
-                del self.cache[key]
+        # L1 miss — try the disk tier outside the lock
+        found, value = self._load_from_disk(key)
+        if not found:
+            with self.lock:
                 self.misses += 1
-                return None
+            self.logger.debug(f"Cache miss: {key}")
+            return None
+        return value
+
+    def _lookup(self, key: str) -> CacheEntry | None:
+        """
+        Return the entry for key unless it has expired, marking it recently used
+
+        Note: This method must be called while holding self.lock
+        """
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        if entry.is_expired():
+            self.logger.debug(f"Cache expired: {key} (age: {entry.get_age():.1f}s)")
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self.cache.move_to_end(key)
+        return entry
+
+    def _load_from_disk(self, key: str) -> tuple[bool, Any]:
+        """
+        Promote an entry from the disk tier into memory
 
+        Acquires self.lock itself; must not be called while holding it.
+
+        Returns:
+            (found, value)
+        """
+        if self.disk is None:
+            return False, None
+        stored = self.disk.get(key)
+        if stored is None:
+            return False, None
+
+        value, expires_at, tags = stored
+        self._store(key, value, expires_at - time.time(), tags)
+        with self.lock:
             self.hits += 1
-            self.logger.debug(f"Cache hit: {key} (age: {entry.get_age():.1f}s)")
-            return entry.value
+            self.disk_hits += 1
+        self.logger.debug(f"Cache disk hit: {key} (promoted to memory)")
+        return True, value
+
+    def get_or_compute(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl_seconds: int | None = None,
+        tags: Iterable[str] = (),
+        stale_ttl: float | None = None,
+        negative_ttl: float | None = None,
+        force_refresh: bool = False,
+    ) -> Any:
+        """
+        Return the cached value for key, calling loader to fill a miss
+
+        Concurrent callers that miss the same key share a single loader call
+        — the first one runs it, the rest wait for its result.  When the
+        cached value is past its TTL but within stale_ttl, it is returned
+        immediately and one background refresh is started.  If loader
+        raises on a miss, the exception is cached for negative_ttl seconds
+        and re-raised to every caller in that window, so a failing oc or CAS
+        call is not retried on every command.  A failure never replaces a
+        value that is still cached: a forced refresh that fails re-raises to
+        its caller and leaves the previous value to be served.
+
+        Args:
+            key: Cache key
+            loader: Zero-argument callable producing the value
+            ttl_seconds: Fresh lifetime of the value (default: from config)
+            tags: Invalidation tags for the entry (see invalidate_tag)
+            stale_ttl: Seconds a stale value may be served while it
+                refreshes (default: cache.stale_ttl)
+            negative_ttl: Seconds a loader failure is cached
+                (default: cache.negative_ttl)
+            force_refresh: Skip cached values (fresh, stale or failed) and
+                load; still joins a load already in progress.  If the load
+                fails, the cached value is kept
+
+        Returns:
+            The cached or freshly loaded value
 
-    def set(self, key: str, value: Any, ttl_seconds: int | None = None) -> None:
+        Raises:
+            Whatever loader raised, for the caller that ran it and for
+            callers that waited on it or hit the cached failure
+        """
+        ttl = ttl_seconds if ttl_seconds is not None else self.default_ttl
+        stale = self.stale_ttl if stale_ttl is None else stale_ttl
+        negative = self.negative_ttl if negative_ttl is None else negative_ttl
+
+        if not force_refresh:
+            refresh: _Flight | None = None
+            with self.lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    if isinstance(entry.value, _NegativeResult):
+                        self.negative_hits += 1
+                        self.logger.debug(f"Cache negative hit: {key}")
+                        raise entry.value.error
+                    self.hits += 1
+                    if not entry.is_stale():
+                        return entry.value
+                    self.stale_served += 1
+                    if key not in self._inflight:
+                        refresh = self._inflight[key] = _Flight()
+
+            if entry is not None:
+                if refresh is not None:
+                    self.logger.debug(f"Cache stale: {key}, refreshing in background")
+                    Thread(
+                        target=self._refresh_in_background,
+                        args=(key, refresh, loader, ttl, tags, stale),
+                        name=f"cache-refresh-{key}",
+                        daemon=True,
+                    ).start()
+                return entry.value
+
+            found, value = self._load_from_disk(key)
+            if found:
+                return value
+
+        with self.lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            return self._run_loader(key, flight, loader, ttl, tags, stale, negative)
+
+        self.logger.debug(f"Cache wait: {key} (load already in progress)")
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _run_loader(
+        self,
+        key: str,
+        flight: _Flight,
+        loader: Callable[[], Any],
+        ttl: float,
+        tags: Iterable[str],
+        stale: float,
+        negative: float,
+    ) -> Any:
+        """
+        Run loader for a flight, store the outcome and wake its waiters
+
+        Acquires self.lock itself; must not be called while holding it.
+        """
+        try:
+            value = loader()
+        except Exception as e:
+            flight.error = e
+            if negative > 0 and not self._has_value(key):
+                # Memory only — failures are never written to the disk tier
+                self._store(key, _NegativeResult(e), negative)
+            raise
+        else:
+            flight.value = value
+            self.set(key, value, ttl_seconds=ttl, tags=tags, stale_ttl=stale)
+            return value
+        finally:
+            with self.lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+            flight.done.set()
+
+    def _has_value(self, key: str) -> bool:
+        """
+        Return whether a real value (fresh or stale) is cached for key
+
+        Acquires self.lock itself; must not be called while holding it.
+        """
+        with self.lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return not isinstance(entry.value, _NegativeResult)
+        return self.disk is not None and self.disk.get(key) is not None
+
+    def _refresh_in_background(
+        self,
+        key: str,
+        flight: _Flight,
+        loader: Callable[[], Any],
+        ttl: float,
+        tags: Iterable[str],
+        stale: float,
+    ) -> None:
+        """Refresh a stale entry; on failure the stale value keeps being served"""
+        try:
+            self._run_loader(key, flight, loader, ttl, tags, stale, negative=0)
+        except Exception as e:
+            self.logger.warning(f"Background refresh of {key} failed: {e}")
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: int | None = None,
+        tags: Iterable[str] = (),
+        stale_ttl: float = 0,
+    ) -> None:
         """
         Set value in cache
 
@@ -104,15 +447,54 @@ class CacheService:
             key: Cache key
             value: Value to cache
             ttl_seconds: Time to live in seconds (default: from config)
+            tags: Invalidation tags for the entry (see invalidate_tag)
+            stale_ttl: Extra seconds get_or_compute may serve the value stale
         """
-        with self.lock:
-            # Check if we need to evict entries
-            if len(self.cache) >= self.max_entries:
-                self._evict_oldest()
+        ttl = ttl_seconds if ttl_seconds is not None else self.default_ttl
+        entry = self._store(key, value, ttl, tags, stale_ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, entry.fresh_until, entry.tags)
+        self.logger.debug(f"Cache set: {key} (TTL: {ttl}s)")
+
+    def _store(
+        self,
+        key: str,
+        value: Any,
+        ttl: float,
+        tags: Iterable[str] = (),
+        stale_ttl: float = 0,
+    ) -> CacheEntry:
+        """
+        Insert an entry into the in-memory tier, evicting as needed
 
-            ttl = ttl_seconds if ttl_seconds is not None else self.default_ttl
-            self.cache[key] = CacheEntry(value, ttl)
-            self.logger.debug(f"Cache set: {key} (TTL: {ttl}s)")
+        Acquires self.lock itself; must not be called while holding it.
+        """
+        # Sized outside the lock — walking a large search result is the
+        # expensive part of a set.
+        size = estimate_size(value) if self.max_bytes else 0
+        entry = CacheEntry(
+            value, ttl, size_bytes=size, tags=tags, stale_seconds=stale_ttl
+        )
+        if self.max_bytes and size > self.max_bytes:
+            self.logger.debug(f"Cache skip: {key} ({size} bytes exceeds max_bytes)")
+            with self.lock:
+                self._remove(key)
+            return entry
+
+        with self.lock:
+            self._remove(key)
+            self._purge_expired()
+            self.cache[key] = entry
+            self.total_bytes += size
+            for tag in entry.tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            heapq.heappush(self._expiry_heap, (entry.expires_at, next(self._seq), key, entry))
+
+            while len(self.cache) > self.max_entries or (
+                self.max_bytes and self.total_bytes > self.max_bytes
+            ):
+                self._evict_lru()
+        return entry
 
     def delete(self, key: str) -> bool:
         """
@@ -124,9 +506,10 @@ class CacheService:
         Returns:
             True if deleted, False if not found
         """
+        if self.disk is not None:
+            self.disk.delete(key)
         with self.lock:
-            if key in self.cache:
-                del self.cache[key]
+            if self._remove(key):
                 self.logger.debug(f"Cache delete: {key}")
                 return True
             return False
@@ -136,56 +519,135 @@ class CacheService:
         with self.lock:
             count = len(self.cache)
             self.cache.clear()
+            self._expiry_heap.clear()
+            self._tag_index.clear()
+            self.total_bytes = 0
             self.logger.info(f"Cache cleared ({count} entries)")
+        if self.disk is not None:
+            self.disk.clear()
+
+    def invalidate_tag(self, tag: str) -> int:
+        """
+        Delete every entry carrying tag
+
+        Args:
+            tag: Tag given to set(), e.g. "query" or vector_store_tag(name)
+
+        Returns:
+            Number of in-memory entries removed
+        """
+        with self.lock:
+            keys = list(self._tag_index.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+
+        if self.disk is not None:
+            self.disk.delete_tag(tag)
+
+        if keys:
+            self.logger.info(f"Invalidated {len(keys)} entries tagged '{tag}'")
+        return len(keys)
 
     def clear_pattern(self, pattern: str) -> None:
         """
         Clear entries matching pattern
 
+        Scans every key; use invalidate_tag() for families of entries that
+        are invalidated together.
+
         Args:
             pattern: Pattern to match (supports * wildcard)
         """
         with self.lock:
-            import fnmatch
-
             keys_to_delete = [
                 key for key in self.cache.keys() if fnmatch.fnmatch(key, pattern)
             ]
 
             for key in keys_to_delete:
-                del self.cache[key]
+                self._remove(key)
+
+        if self.disk is not None:
+            self.disk.delete_keys(
+                [key for key in self.disk.keys() if fnmatch.fnmatch(key, pattern)]
+            )
+
+        if keys_to_delete:
+            self.logger.info(
+                f"Cleared {len(keys_to_delete)} entries matching '{pattern}'"
+            )
+
+    def _remove(self, key: str) -> bool:
+        """
+        Remove key and release its bytes; its heap item goes stale
+
+        Note: This method must be called while holding self.lock
+        """
+        entry = self.cache.pop(key, None)
+        if entry is None:
+            return False
+        self._unindex(key, entry)
+        return True
 
-            if keys_to_delete:
-                self.logger.info(
-                    f"Cleared {len(keys_to_delete)} entries matching '{pattern}'"
-                )
+    def _unindex(self, key: str, entry: CacheEntry) -> None:
+        """
+        Release a removed entry's bytes and tag index memberships
 
-    def _evict_oldest(self) -> None:
+        Note: This method must be called while holding self.lock
+        """
+        self.total_bytes -= entry.size_bytes
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def _evict_lru(self) -> None:
         """
-        Evict oldest entry from cache
+        Evict the least recently used entry in O(1)
 
         Note: This method must be called while holding self.lock
         """
         if not self.cache:
             return
 
-        oldest_key = min(self.cache.items(), key=lambda x: x[1].created_at)[0]
-        del self.cache[oldest_key]
+        key, entry = self.cache.popitem(last=False)
+        self._unindex(key, entry)
         self.evictions += 1
-        self.logger.debug(f"Evicted oldest entry: {oldest_key}")
+        self.logger.debug(f"Evicted least recently used entry: {key}")
+
+    def _purge_expired(self) -> int:
+        """
+        Drop every expired entry by popping the expiry heap
+
+        Costs O(k log n) for k expired entries instead of a full scan.  The
+        heap is rebuilt when stale items outnumber live entries.
+
+        Note: This method must be called while holding self.lock
+        """
+        now = time.time()
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now:
+            _, _, key, entry = heapq.heappop(heap)
+            if self.cache.get(key) is entry:
+                self._remove(key)
+                removed += 1
+        if len(heap) > 2 * len(self.cache) + 64:
+            self._expiry_heap = [item for item in heap if self.cache.get(item[2]) is item[3]]
+            heapq.heapify(self._expiry_heap)
+        self.expirations += removed
+        return removed
 
     def cleanup_expired(self) -> None:
         """Remove all expired entries"""
+        if self.disk is not None:
+            self.disk.purge_expired()
         with self.lock:
-            expired_keys = [
-                key for key, entry in self.cache.items() if entry.is_expired()
-            ]
-
-            for key in expired_keys:
-                del self.cache[key]
+            removed = self._purge_expired()
 
-            if expired_keys:
-                self.logger.info(f"Cleaned up {len(expired_keys)} expired entries")
+            if removed:
+                self.logger.info(f"Cleaned up {removed} expired entries")
 
     def get_statistics(self) -> dict[str, Any]:
         """Get cache statistics with atomic reads"""
@@ -195,6 +657,8 @@ class CacheService:
             hits = self.hits
             misses = self.misses
             evictions = self.evictions
+            expirations = self.expirations
+            total_bytes = self.total_bytes
 
             total_requests = hits + misses
             hit_rate = (hits / total_requests * 100) if total_requests > 0 else 0
@@ -205,9 +669,22 @@ class CacheService:
                 "misses": misses,
                 "hit_rate_percent": round(hit_rate, 2),
                 "evictions": evictions,
+                "expirations": expirations,
                 "max_entries": self.max_entries,
+                "bytes": total_bytes,
+                "max_bytes": self.max_bytes,
+                "disk_hits": self.disk_hits,
+                "coalesced": self.coalesced,
+                "stale_served": self.stale_served,
+                "negative_hits": self.negative_hits,
+                "disk": self.disk.get_statistics() if self.disk is not None else None,
             }
 
+    def close(self) -> None:
+        """Close the disk tier, if any"""
+        if self.disk is not None:
+            self.disk.close()
+
     def get_info(self, key: str) -> dict[str, Any] | None:
         """Get information about a cache entry"""
         with self.lock:
@@ -218,5 +695,7 @@ class CacheService:
                     "ttl_seconds": entry.ttl_seconds,
                     "expires_in": entry.ttl_seconds - entry.get_age(),
                     "is_expired": entry.is_expired(),
+                    "size_bytes": entry.size_bytes,
+                    "tags": sorted(entry.tags),
                 }
             return None
@@ -0,0 +1,338 @@
+"""
+Disk Cache - Persistent SQLite second tier for CacheService
+"""
+
+import fnmatch
+import json
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any, Iterable
+
+# Keys that are never written to disk, whatever the configuration says.
+# Tokens and anything else derived from credentials stay in memory only,
+# access decisions are always re-checked after a restart, and search results
+# (query_*, keyed by store and question but not by user) are not left in
+# plaintext for the next user of the file.
+NEVER_PERSIST_PATTERNS = ("auth_token*", "*password*", "*secret*", "access_*", "query_*")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key         TEXT PRIMARY KEY,
+    value       TEXT NOT NULL,
+    expires_at  REAL NOT NULL,
+    size        INTEGER NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS entry_tags (
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (tag, key)
+);
+CREATE INDEX IF NOT EXISTS entry_tags_key ON entry_tags (key);
+CREATE TRIGGER IF NOT EXISTS entries_untag AFTER DELETE ON entries
+BEGIN
+    DELETE FROM entry_tags WHERE key = OLD.key;
+END;
+CREATE TABLE IF NOT EXISTS usage (
+    id    INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO usage (id, bytes) SELECT 0, COALESCE(SUM(size), 0) FROM entries;
+CREATE TRIGGER IF NOT EXISTS entries_size_add AFTER INSERT ON entries
+BEGIN
+    UPDATE usage SET bytes = bytes + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_size_sub AFTER DELETE ON entries
+BEGIN
+    UPDATE usage SET bytes = bytes - OLD.size WHERE id = 0;
+END;
+"""
+
+# SQLite creates these next to the database; the WAL holds recent payloads.
+_SIDE_FILE_SUFFIXES = ("-wal", "-shm")
+
+
+class DiskCache:
+    """
+    SQLite-backed cache tier that survives CLI restarts
+
+    Values are stored as JSON with their absolute expiry time, so an entry
+    cached with a 10 minute TTL is still valid for the rest of those 10
+    minutes after a restart, and no longer.  When the file grows past
+    max_bytes, the least recently read entries are deleted first.
+
+    Values that cannot be serialised to JSON are simply not persisted, and
+    every SQLite error is logged and treated as a miss — the disk tier is an
+    optimisation and must never break a command.
+
+    The database, its -wal and -shm files and any directory created for them
+    are private to the owner.  Total size is kept as a running sum by
+    triggers, so a write never scans the whole table.
+
+    Thread Safety:
+    - One connection shared by all threads, guarded by self.lock
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_bytes: int = 50 * 1024 * 1024,
+        exclude_patterns: list[str] | None = None,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.exclude_patterns = tuple(NEVER_PERSIST_PATTERNS) + tuple(
+            exclude_patterns or ()
+        )
+        self.logger = logger or logging.getLogger(__name__)
+        self.lock = Lock()
+        self.conn: sqlite3.Connection | None = None
+
+        try:
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            # The files can hold user listings; keep them private to the owner.
+            # They are created 0o600 before SQLite opens them, rather than by
+            # changing the process umask, which other threads would see too.
+            # Files left by an older version are tightened the same way, and
+            # -wal/-shm files SQLite recreates later take the database's mode.
+            for suffix in ("",) + _SIDE_FILE_SUFFIXES:
+                side = self.path.with_name(self.path.name + suffix)
+                os.close(os.open(side, os.O_CREAT | os.O_RDWR, 0o600))
+                os.chmod(side, 0o600)
+            self.conn = sqlite3.connect(
+                str(self.path), check_same_thread=False, isolation_level=None
+            )
+            # WAL with synchronous=NORMAL skips the fsync on every commit; a
+            # crash can lose the last few writes, which a cache can afford.
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(_SCHEMA)
+            removed = self.purge_expired()
+            self.logger.info(
+                f"Disk cache opened: {self.path} ({removed} expired entries purged)"
+            )
+        except (sqlite3.Error, OSError) as e:
+            self.logger.warning(f"Disk cache disabled, cannot open {self.path}: {e}")
+            self.conn = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.conn is not None
+
+    def is_persistable(self, key: str) -> bool:
+        """Return False for keys matching an exclude pattern"""
+        return not any(fnmatch.fnmatch(key, p) for p in self.exclude_patterns)
+
+    def get(self, key: str) -> tuple[Any, float, frozenset[str]] | None:
+        """
+        Read an entry from disk
+
+        Args:
+            key: Cache key
+
+        Returns:
+            (value, expires_at, tags) or None if not found/expired
+        """
+        if self.conn is None:
+            return None
+        now = time.time()
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[1] <= now:
+                    self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    return None
+                self.conn.execute(
+                    "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                tags = frozenset(
+                    tag
+                    for (tag,) in self.conn.execute(
+                        "SELECT tag FROM entry_tags WHERE key = ?", (key,)
+                    )
+                )
+            return json.loads(row[0]), row[1], tags
+        except (sqlite3.Error, ValueError) as e:
+            self.logger.warning(f"Disk cache read failed for {key}: {e}")
+            return None
+
+    def set(
+        self, key: str, value: Any, expires_at: float, tags: Iterable[str] = ()
+    ) -> bool:
+        """
+        Write an entry to disk
+
+        Args:
+            key: Cache key
+            value: JSON-serialisable value
+            expires_at: Absolute expiry time (epoch seconds)
+            tags: Invalidation tags for the entry
+
+        Returns:
+            True if the entry was persisted
+        """
+        if self.conn is None or not self.is_persistable(key):
+            return False
+        try:
+            payload = json.dumps(value)
+        except (TypeError, ValueError):
+            self.logger.debug(f"Disk cache skip: {key} (not JSON serialisable)")
+            return False
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return False
+        try:
+            with self.lock:
+                self.conn.execute("BEGIN")
+                try:
+                    # A plain DELETE fires the untag trigger; REPLACE would not
+                    self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self.conn.execute(
+                        "INSERT INTO entries "
+                        "(key, value, expires_at, size, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                        (key, payload, expires_at, size, time.time()),
+                    )
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO entry_tags (tag, key) VALUES (?, ?)",
+                        [(tag, key) for tag in tags],
+                    )
+                    self._enforce_size()
+                    self.conn.execute("COMMIT")
+                except sqlite3.Error:
+                    self.conn.execute("ROLLBACK")
+                    raise
+            return True
+        except sqlite3.Error as e:
+            self.logger.warning(f"Disk cache write failed for {key}: {e}")
+            return False
+
+    def _enforce_size(self) -> None:
+        """
+        Delete least recently read entries until under max_bytes
+
+        Note: This method must be called while holding self.lock
+        """
+        assert self.conn is not None
+        if self._total_bytes() <= self.max_bytes:
+            return
+        self.conn.execute(
+            "DELETE FROM entries WHERE expires_at <= ?", (time.time(),)
+        )
+        rows = self.conn.execute(
+            "SELECT key, size FROM entries ORDER BY accessed_at DESC"
+        ).fetchall()
+        kept = 0
+        evict = []
+        for key, size in rows:
+            kept += size
+            if kept > self.max_bytes:
+                evict.append((key,))
+        self.conn.executemany("DELETE FROM entries WHERE key = ?", evict)
+        if evict:
+            self.logger.debug(f"Disk cache evicted {len(evict)} entries")
+
+    def _total_bytes(self) -> int:
+        """Return the running total kept by the size triggers"""
+        assert self.conn is not None
+        row = self.conn.execute("SELECT bytes FROM usage WHERE id = 0").fetchone()
+        return row[0] if row else 0
+
+    def delete(self, key: str) -> None:
+        """Remove one entry"""
+        self._execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def delete_keys(self, keys: list[str]) -> None:
+        """Remove several entries in one statement batch"""
+        if self.conn is None or not keys:
+            return
+        try:
+            with self.lock:
+                self.conn.executemany(
+                    "DELETE FROM entries WHERE key = ?", [(k,) for k in keys]
+                )
+        except sqlite3.Error as e:
+            self.logger.warning(f"Disk cache delete failed: {e}")
+
+    def delete_tag(self, tag: str) -> None:
+        """Remove every entry carrying tag, using the tag index"""
+        self._execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM entry_tags WHERE tag = ?)",
+            (tag,),
+        )
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        self._execute("DELETE FROM entries", ())
+
+    def keys(self) -> list[str]:
+        """Return every unexpired key"""
+        if self.conn is None:
+            return []
+        try:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT key FROM entries WHERE expires_at > ?", (time.time(),)
+                ).fetchall()
+            return [row[0] for row in rows]
+        except sqlite3.Error as e:
+            self.logger.warning(f"Disk cache scan failed: {e}")
+            return []
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed"""
+        if self.conn is None:
+            return 0
+        try:
+            with self.lock:
+                cursor = self.conn.execute(
+                    "DELETE FROM entries WHERE expires_at <= ?", (time.time(),)
+                )
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            self.logger.warning(f"Disk cache purge failed: {e}")
+            return 0
+
+    def get_statistics(self) -> dict[str, Any]:
+        """Return entry count and size on disk"""
+        if self.conn is None:
+            return {"enabled": False}
+        try:
+            with self.lock:
+                entries = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                total = self._total_bytes()
+        except sqlite3.Error:
+            entries, total = 0, 0
+        return {
+            "enabled": True,
+            "path": str(self.path),
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+        }
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def _execute(self, sql: str, params: tuple) -> None:
+        if self.conn is None:
+            return
+        try:
+            with self.lock:
+                self.conn.execute(sql, params)
+        except sqlite3.Error as e:
+            self.logger.warning(f"Disk cache update failed: {e}")
@@ -0,0 +1,428 @@
+"""
+Kube Client - Direct Kubernetes API access with watch-backed informers
+"""
+
+import json
+import logging
+import threading
+from collections.abc import Callable, Iterator
+from typing import Any
+
+import requests  # type: ignore[import-untyped]
+from requests.adapters import HTTPAdapter  # type: ignore[import-untyped]
+
+
+class KubeAPIError(Exception):
+    """Kubernetes API request failed"""
+
+    def __init__(self, message: str, status: int | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class KubeClient:
+    """
+    Minimal Kubernetes API client over one pooled HTTP session
+
+    Only what the informers need: list a collection and stream a watch.
+    The bearer token is read through token_provider on every request, so a
+    token refreshed by AuthService is picked up without rebuilding the client.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        token_provider: Callable[[], str | None],
+        verify: bool = True,
+        timeout: int = 30,
+        pool_size: int = 8,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.api_url = api_url.rstrip("/")
+        self.token_provider = token_provider
+        self.verify = verify
+        self.timeout = timeout
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _headers(self) -> dict[str, str]:
+        token = self.token_provider()
+        if not token:
+            raise KubeAPIError("No bearer token available", status=401)
+        return {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+
+    def list(self, path: str) -> tuple[list[dict[str, Any]], str]:
+        """
+        List a collection
+
+        Args:
+            path: API path, e.g. /apis/user.openshift.io/v1/users
+
+        Returns:
+            (items, resourceVersion of the list)
+
+        Raises:
+            KubeAPIError: On transport errors or non-2xx responses
+        """
+        try:
+            response = self.session.get(
+                f"{self.api_url}{path}",
+                headers=self._headers(),
+                verify=self.verify,
+                timeout=self.timeout,
+            )
+        except requests.exceptions.RequestException as e:
+            raise KubeAPIError(f"List {path} failed: {e}") from e
+
+        if response.status_code != 200:
+            raise KubeAPIError(
+                f"List {path} returned HTTP {response.status_code}",
+                status=response.status_code,
+            )
+
+        data = response.json()
+        return (
+            data.get("items", []) or [],
+            data.get("metadata", {}).get("resourceVersion", ""),
+        )
+
+    def watch(
+        self, path: str, resource_version: str, timeout_seconds: int = 300
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Stream watch events for a collection, starting after resource_version
+
+        Yields one {"type": ..., "object": ...} dict per event until the
+        server closes the stream (after timeout_seconds).
+
+        Raises:
+            KubeAPIError: On transport errors or non-2xx responses
+        """
+        params = {
+            "watch": "1",
+            "resourceVersion": resource_version,
+            "allowWatchBookmarks": "true",
+            "timeoutSeconds": str(timeout_seconds),
+        }
+        try:
+            response = self.session.get(
+                f"{self.api_url}{path}",
+                headers=self._headers(),
+                params=params,
+                verify=self.verify,
+                stream=True,
+                # The read timeout must outlast a quiet watch
+                timeout=(self.timeout, timeout_seconds + 30),
+            )
+        except requests.exceptions.RequestException as e:
+            raise KubeAPIError(f"Watch {path} failed: {e}") from e
+
+        if response.status_code != 200:
+            response.close()
+            raise KubeAPIError(
+                f"Watch {path} returned HTTP {response.status_code}",
+                status=response.status_code,
+            )
+
+        try:
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise KubeAPIError(f"Watch {path} interrupted: {e}") from e
+        finally:
+            response.close()
+
+    def close(self) -> None:
+        """Close the pooled session"""
+        self.session.close()
+
+
+class Informer:
+    """
+    Local copy of one Kubernetes collection, kept current by a watch
+
+    A background thread lists the collection once, then applies watch
+    events (ADDED / MODIFIED / DELETED) to an in-memory dict keyed by
+    metadata.name.  When the watch ends it resumes from the last seen
+    resourceVersion; when the server answers 410 Gone it lists again.
+    If a list fails (after a watch error, or an expired token) the copy is
+    marked unsynced until a list succeeds, so lookups fall back to oc
+    instead of serving a copy nobody is keeping current.
+
+    Failures are retried after retry_delay, doubling on each consecutive
+    failure up to max_retry_delay, and reset by the next successful list.
+    A 401/403 (no token, or no permission to list the collection) is
+    warned about once; repeats are logged at debug until access works.
+
+    Thread Safety:
+    - items and resource_version are updated under self.lock; list() and
+      status() read them under it
+    """
+
+    def __init__(
+        self,
+        client: KubeClient,
+        path: str,
+        logger: logging.Logger | None = None,
+        watch_timeout: int = 300,
+        retry_delay: float = 5.0,
+        max_retry_delay: float = 300.0,
+    ) -> None:
+        self.client = client
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self.watch_timeout = watch_timeout
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self.lock = threading.Lock()
+        self.items: dict[str, dict[str, Any]] = {}
+        self.resource_version = ""
+        self.synced = threading.Event()
+        # Set after the first list attempt, successful or not
+        self.first_attempt = threading.Event()
+        self.last_error: str | None = None
+        # Consecutive failed attempts, for the retry backoff
+        self.failures = 0
+        self._denied_logged = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start the list/watch thread (idempotent)"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name=f"informer{self.path}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching; the current watch ends at its next event or timeout"""
+        self._stop.set()
+
+    def wait_for_sync(self, timeout: float) -> bool:
+        """
+        Wait for the initial list
+
+        Returns as soon as the first attempt finishes, so an unreachable API
+        server costs one failed request rather than the whole timeout.
+        """
+        self.first_attempt.wait(timeout)
+        return self.synced.is_set()
+
+    def list(self) -> list[dict[str, Any]]:
+        """Return every object, sorted by name"""
+        with self.lock:
+            return [self.items[name] for name in sorted(self.items)]
+
+    def get(self, name: str) -> dict[str, Any] | None:
+        """Return one object by metadata.name"""
+        with self.lock:
+            return self.items.get(name)
+
+    def status(self) -> dict[str, Any]:
+        """Return sync state, object count and the last error"""
+        with self.lock:
+            objects = len(self.items)
+            resource_version = self.resource_version
+        return {
+            "synced": self.synced.is_set(),
+            "objects": objects,
+            "resource_version": resource_version,
+            "last_error": self.last_error,
+            "failures": self.failures,
+        }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if not self.resource_version:
+                    try:
+                        self._relist()
+                    except Exception:
+                        if self.synced.is_set():
+                            self.logger.warning(
+                                f"Informer {self.path} cannot relist, marking stale"
+                            )
+                        self.synced.clear()
+                        raise
+                    finally:
+                        self.first_attempt.set()
+                self._watch()
+            except KubeAPIError as e:
+                if e.status == 410:
+                    self.last_error = str(e)
+                    self.logger.debug(f"Watch {self.path} expired, relisting")
+                    self.resource_version = ""
+                    continue
+                self._retry_later(e)
+            except Exception as e:
+                self._retry_later(e)
+
+    def _retry_later(self, error: Exception) -> None:
+        """Log a failed list/watch and wait out the backoff before the next one"""
+        self.last_error = str(error)
+        with self.lock:
+            self.resource_version = ""
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** min(self.failures, 16))
+        self.failures += 1
+        if getattr(error, "status", None) in (401, 403):
+            if self._denied_logged:
+                self.logger.debug(f"Informer {self.path}: {error}, retry in {delay:.0f}s")
+            else:
+                self._denied_logged = True
+                self.logger.warning(
+                    f"Informer {self.path}: {error}; retrying with backoff, "
+                    "oc is used meanwhile"
+                )
+        else:
+            self.logger.warning(f"Informer {self.path} failed: {error}, retry in {delay:.0f}s")
+        self._stop.wait(delay)
+
+    def _relist(self) -> None:
+        items, resource_version = self.client.list(self.path)
+        with self.lock:
+            self.items = {
+                item["metadata"]["name"]: item
+                for item in items
+                if item.get("metadata", {}).get("name")
+            }
+            self.resource_version = resource_version
+        self.last_error = None
+        self.failures = 0
+        self._denied_logged = False
+        self.synced.set()
+        self.logger.debug(f"Informer {self.path} listed {len(items)} objects")
+
+    def _watch(self) -> None:
+        for event in self.client.watch(
+            self.path, self.resource_version, self.watch_timeout
+        ):
+            if self._stop.is_set():
+                return
+            self.apply_event(event)
+
+    def apply_event(self, event: dict[str, Any]) -> None:
+        """
+        Apply one watch event to the local copy
+
+        Raises:
+            KubeAPIError: For ERROR events (status 410 means relist)
+        """
+        event_type = event.get("type")
+        obj = event.get("object", {}) or {}
+        metadata = obj.get("metadata", {})
+
+        if event_type == "ERROR":
+            raise KubeAPIError(
+                f"Watch {self.path} error: {obj.get('message', obj)}",
+                status=obj.get("code"),
+            )
+
+        with self.lock:
+            if metadata.get("resourceVersion"):
+                self.resource_version = metadata["resourceVersion"]
+            name = metadata.get("name")
+            if event_type == "BOOKMARK" or not name:
+                return
+            if event_type == "DELETED":
+                self.items.pop(name, None)
+            else:
+                self.items[name] = obj
+
+
+class KubeResourceCache:
+    """
+    Informer-backed lookups for the resources the CLI reads
+
+    Replaces `oc get users|domains|casresourceaccesscontrols -o json`.
+    Informers are started on first use; until one has synced (or when the
+    API server cannot be reached) lookups return None and callers fall back
+    to their oc subprocess.
+    """
+
+    USERS = "users"
+    DOMAINS = "domains"
+    CRACS = "casresourceaccesscontrols"
+
+    def __init__(
+        self,
+        client: KubeClient,
+        cas_api_version: str = "cas.isf.ibm.com/v1beta1",
+        sync_timeout: float = 10.0,
+        watch_timeout: int = 300,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.client = client
+        self.cas_api_version = cas_api_version
+        self.sync_timeout = sync_timeout
+        self.watch_timeout = watch_timeout
+        self.logger = logger or logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.informers: dict[str, Informer] = {}
+
+    def _path(self, resource: str, namespace: str | None) -> str:
+        if resource == self.USERS:
+            return "/apis/user.openshift.io/v1/users"
+        return f"/apis/{self.cas_api_version}/namespaces/{namespace}/{resource}"
+
+    def _informer(self, resource: str, namespace: str | None) -> Informer | None:
+        path = self._path(resource, namespace)
+        with self.lock:
+            informer = self.informers.get(path)
+            if informer is None:
+                informer = Informer(
+                    self.client,
+                    path,
+                    logger=self.logger,
+                    watch_timeout=self.watch_timeout,
+                )
+                self.informers[path] = informer
+                informer.start()
+
+        if not informer.wait_for_sync(self.sync_timeout):
+            self.logger.debug(f"Informer {path} not synced, using oc fallback")
+            return None
+        return informer
+
+    def list(
+        self, resource: str, namespace: str | None = None
+    ) -> list[dict[str, Any]] | None:
+        """Return every object of a resource, or None if not available"""
+        informer = self._informer(resource, namespace)
+        return informer.list() if informer is not None else None
+
+    def get(
+        self, resource: str, name: str, namespace: str | None = None
+    ) -> tuple[bool, dict[str, Any] | None]:
+        """
+        Look up one object by name
+
+        Returns:
+            (available, object) — available is False when the informer has
+            not synced and the caller should fall back to oc
+        """
+        informer = self._informer(resource, namespace)
+        if informer is None:
+            return False, None
+        return True, informer.get(name)
+
+    def get_status(self) -> dict[str, Any]:
+        """Return sync state and object counts per watched collection"""
+        with self.lock:
+            informers = dict(self.informers)
+        return {path: informer.status() for path, informer in informers.items()}
+
+    def close(self) -> None:
+        """Stop every informer and close the HTTP session"""
+        with self.lock:
+            informers = list(self.informers.values())
+        for informer in informers:
+            informer.stop()
+        self.client.close()
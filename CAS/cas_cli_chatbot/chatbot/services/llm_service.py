@@ -4,7 +4,7 @@ Enhanced LLM Service with multiple provider support and metrics tracking
 
 import json
 import logging
-from collections.abc import Iterable
+from collections.abc import Iterable, Mapping
 from datetime import datetime
 from typing import Any, Protocol, cast
 
@@ -20,11 +20,20 @@ console = Console()
 class MetricsServiceProtocol(Protocol):
     """Protocol for metrics interactions used by LLM service."""
 
-    def increment(self, metric_name: str) -> None: ...
+    def increment(
+        self, metric_name: str, value: int = ..., labels: Mapping[str, Any] | None = ...
+    ) -> None: ...
 
-    def record_error(self, error_type: str) -> None: ...
+    def record_error(
+        self, error_type: str, labels: Mapping[str, Any] | None = ...
+    ) -> None: ...
 
-    def record_timing(self, metric_name: str, duration_ms: float) -> None: ...
+    def record_timing(
+        self,
+        metric_name: str,
+        duration_ms: float,
+        labels: Mapping[str, Any] | None = ...,
+    ) -> None: ...
 
 
 class LLMService:
@@ -89,14 +98,18 @@ class LLMService:
                 self.logger.info(f"Attempting LLM provider: {provider}")
 
                 if self.metrics_service:
-                    self.metrics_service.increment(f"llm_attempts_{provider}")
+                    self.metrics_service.increment(
+                        "llm_attempts", labels={"provider": provider}
+                    )
 
                 # Try to get response from provider
                 success = self._try_provider(provider, prompt)
 
                 if success:
                     if self.metrics_service:
-                        self.metrics_service.increment(f"llm_success_{provider}")
+                        self.metrics_service.increment(
+                            "llm_success", labels={"provider": provider}
+                        )
                     return success
 
             except Exception as e:
@@ -104,8 +117,12 @@ class LLMService:
                 self.logger.error(f"LLM provider {provider} failed: {e}")
 
                 if self.metrics_service:
-                    self.metrics_service.increment(f"llm_error_{provider}")
-                    self.metrics_service.record_error(f"llm_{provider}")
+                    self.metrics_service.increment(
+                        "llm_error", labels={"provider": provider}
+                    )
+                    self.metrics_service.record_error(
+                        "llm", labels={"provider": provider}
+                    )
 
                 continue
 
@@ -181,7 +198,7 @@ class LLMService:
             if self.metrics_service:
                 duration_ms = (time.time() - start_time) * 1000
                 self.metrics_service.record_timing(
-                    f"llm_{provider}_duration", duration_ms
+                    "llm_duration", duration_ms, labels={"provider": provider}
                 )
 
             return result
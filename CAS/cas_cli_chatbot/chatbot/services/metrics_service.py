@@ -3,16 +3,149 @@ Metrics Service - Track application metrics and performance
 """
 
 import logging
+import math
+import os
+import re
 import time
-from collections import defaultdict, deque
-from threading import Lock
+from collections.abc import Mapping
+from threading import Event, Lock, Thread
 from types import TracebackType
 from typing import Any
 
+# Labels attached to a series, e.g. {"provider": "openai"}
+Labels = Mapping[str, Any] | None
+# (metric name, sorted label pairs)
+SeriesKey = tuple[str, tuple[tuple[str, str], ...]]
+
+# Quantiles reported by get_timing_stats and the OpenMetrics export
+QUANTILES = (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_:]")
+
+
+def series_key(name: str, labels: Labels = None) -> SeriesKey:
+    """Identify one series of a metric by its name and label set"""
+    return name, tuple(sorted((str(k), str(v)) for k, v in (labels or {}).items()))
+
+
+def format_series(key: SeriesKey) -> str:
+    """Render a series key as name{label="value",...}"""
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch with bounded relative error and bounded memory
+
+    Values are counted in logarithmic buckets (DDSketch-style): bucket i
+    holds values in (gamma^(i-1), gamma^i], so any reported quantile is
+    within relative_accuracy of a value that was actually recorded, over
+    the whole stream rather than the last N samples.  Sketches with the
+    same accuracy merge exactly by adding bucket counts.
+
+    When more than max_buckets buckets are in use the lowest ones are
+    folded together, giving up accuracy on the fastest samples first —
+    the tail quantiles that matter for latency stay exact to the bound.
+    """
+
+    # Values at or below this are counted as zero
+    MIN_VALUE = 1e-9
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max(1, max_buckets)
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+
+        self.buckets: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        """Record one value"""
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        if value <= self.MIN_VALUE:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        Add every value recorded by other into this sketch
+
+        Raises:
+            ValueError: If the sketches use a different relative accuracy
+        """
+        if not math.isclose(self.gamma, other.gamma):
+            raise ValueError("Cannot merge sketches with different accuracy")
+        if other.count == 0:
+            return
+        for index, bucket_count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + bucket_count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        """Fold the lowest buckets together until within max_buckets"""
+        indexes = sorted(self.buckets)
+        excess = len(indexes) - self.max_buckets
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self.buckets[target] += self.buckets.pop(index)
+
+    def quantile(self, q: float) -> float:
+        """Return the value at quantile q (0..1), or 0.0 if empty"""
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(self.min, 0.0)
+
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Midpoint of the bucket in relative terms
+                estimate = 2 * self.gamma**index / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def copy(self) -> "QuantileSketch":
+        """Return an independent copy"""
+        clone = QuantileSketch(self.relative_accuracy, self.max_buckets)
+        clone.merge(self)
+        return clone
+
 
 class MetricsService:
     """
     Service for tracking application metrics and performance
+
+    Every metric can carry labels (provider, vector_store, command, ...);
+    each distinct label set is its own series.  Reads that pass no labels
+    aggregate over every series of the metric.  Timings are kept in
+    QuantileSketch instances, so percentiles cover the whole session in
+    bounded memory.
     """
 
     def __init__(
@@ -22,133 +155,138 @@ class MetricsService:
         self.logger = logger or logging.getLogger(__name__)
         self.lock = Lock()
 
+        # Configuration
+        metrics_config = config.get("metrics", {}) or {}
+        self.relative_accuracy = metrics_config.get("relative_accuracy", 0.01)
+        self.max_buckets = metrics_config.get("max_buckets", 2048)
+        self.namespace = metrics_config.get("namespace", "cas_cli")
+        self.textfile_path: str = metrics_config.get("textfile_path", "") or ""
+        self.textfile_interval = metrics_config.get("textfile_interval", 15)
+
         # Metrics storage
-        self.counters: dict[str, int] = defaultdict(int)
-        self.gauges: dict[str, float] = {}
-        self.timings: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=100))
-        self.errors: dict[str, int] = defaultdict(int)
+        self.counters: dict[SeriesKey, int] = {}
+        self.gauges: dict[SeriesKey, float] = {}
+        self.timings: dict[SeriesKey, QuantileSketch] = {}
+        self.errors: dict[SeriesKey, int] = {}
 
-        # Configuration
-        self.max_timing_samples = config.get("metrics", {}).get("max_samples", 100)
+        self._export_stop = Event()
+        self._export_thread: Thread | None = None
 
         self.start_time = time.time()
         self.logger.info("Metrics service initialized")
 
-    def increment(self, metric_name: str, value: int = 1) -> None:
+    def increment(self, metric_name: str, value: int = 1, labels: Labels = None) -> None:
         """Increment a counter metric"""
+        key = series_key(metric_name, labels)
         with self.lock:
-            self.counters[metric_name] += value
-            self.logger.debug(f"Metric incremented: {metric_name} += {value}")
+            self.counters[key] = self.counters.get(key, 0) + value
+            self.logger.debug(f"Metric incremented: {format_series(key)} += {value}")
 
-    def set_gauge(self, metric: str, value: float) -> None:
+    def set_gauge(self, metric: str, value: float, labels: Labels = None) -> None:
         """Set a gauge metric"""
+        key = series_key(metric, labels)
         with self.lock:
-            self.gauges[metric] = value
-            self.logger.debug(f"Gauge set: {metric} = {value}")
+            self.gauges[key] = value
+            self.logger.debug(f"Gauge set: {format_series(key)} = {value}")
 
-    def record_timing(self, metric_name: str, duration_ms: float) -> None:
+    def record_timing(
+        self, metric_name: str, duration_ms: float, labels: Labels = None
+    ) -> None:
         """Record a timing metric"""
+        key = series_key(metric_name, labels)
         with self.lock:
-            self.timings[metric_name].append(duration_ms)
+            sketch = self.timings.get(key)
+            if sketch is None:
+                sketch = self.timings[key] = QuantileSketch(
+                    self.relative_accuracy, self.max_buckets
+                )
+            sketch.add(duration_ms)
             self.logger.debug(
-                f"Timing recorded: {metric_name} = {duration_ms:.2f}ms"
+                f"Timing recorded: {format_series(key)} = {duration_ms:.2f}ms"
             )
 
-    def record_error(self, error_type: str) -> None:
+    def record_error(self, error_type: str, labels: Labels = None) -> None:
         """Record an error occurrence"""
+        key = series_key(error_type, labels)
+        with self.lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+            self.logger.debug(f"Error recorded: {format_series(key)}")
+
+    @staticmethod
+    def _matching(
+        store: Mapping[SeriesKey, Any], metric: str, labels: Labels
+    ) -> list[Any]:
+        """
+        Values of the series of metric: one exact series, or all of them
+
+        Note: This method must be called while holding self.lock
+        """
+        if labels is not None:
+            key = series_key(metric, labels)
+            return [store[key]] if key in store else []
+        return [value for (name, _), value in store.items() if name == metric]
+
+    def get_counter(self, metric: str, labels: Labels = None) -> int:
+        """Get counter value (summed over every label set unless labels given)"""
         with self.lock:
-            self.errors[error_type] += 1
-            self.logger.debug(f"Error recorded: {error_type}")
+            return sum(self._matching(self.counters, metric, labels))
 
-    def get_counter(self, metric: str) -> int:
-        """Get counter value"""
+    def get_gauge(self, metric: str, labels: Labels = None) -> float:
+        """Get gauge value (the unlabelled series unless labels given)"""
         with self.lock:
-            return self.counters.get(metric, 0)
+            return self.gauges.get(series_key(metric, labels), 0.0)
 
-    def get_gauge(self, metric: str) -> float:
-        """Get gauge value"""
+    def get_timing_sketch(self, metric: str, labels: Labels = None) -> QuantileSketch:
+        """Return a copy of the timing sketch, merged over label sets unless labels given"""
+        merged = QuantileSketch(self.relative_accuracy, self.max_buckets)
         with self.lock:
-            return self.gauges.get(metric, 0.0)
+            for sketch in self._matching(self.timings, metric, labels):
+                merged.merge(sketch)
+        return merged
 
-    def get_timing_stats(self, metric: str) -> dict[str, float]:
+    def get_timing_stats(self, metric: str, labels: Labels = None) -> dict[str, float]:
         """Get timing statistics"""
-        with self.lock:
-            timings = list(self.timings.get(metric, []))
-
-            if not timings:
-                return {
-                    "count": 0,
-                    "min": 0,
-                    "max": 0,
-                    "avg": 0,
-                    "p50": 0,
-                    "p95": 0,
-                    "p99": 0,
-                }
-
-            sorted_timings = sorted(timings)
-            count = len(sorted_timings)
+        return self._stats(self.get_timing_sketch(metric, labels))
 
+    @staticmethod
+    def _stats(sketch: QuantileSketch) -> dict[str, float]:
+        if sketch.count == 0:
             return {
-                "count": count,
-                "min": sorted_timings[0],
-                "max": sorted_timings[-1],
-                "avg": sum(sorted_timings) / count,
-                "p50": sorted_timings[int(count * 0.5)],
-                "p95": sorted_timings[int(count * 0.95)]
-                if count > 1
-                else sorted_timings[0],
-                "p99": sorted_timings[int(count * 0.99)]
-                if count > 1
-                else sorted_timings[0],
+                "count": 0,
+                "min": 0,
+                "max": 0,
+                "avg": 0,
+                "p50": 0,
+                "p95": 0,
+                "p99": 0,
             }
 
+        stats: dict[str, float] = {
+            "count": sketch.count,
+            "min": sketch.min,
+            "max": sketch.max,
+            "avg": sketch.sum / sketch.count,
+        }
+        for name, q in QUANTILES:
+            stats[name] = sketch.quantile(q)
+        return stats
+
     def get_all_metrics(self) -> dict[str, Any]:
         """Get all metrics"""
         with self.lock:
             uptime = time.time() - self.start_time
-
-            metrics: dict[str, Any] = {
-                "uptime_seconds": round(uptime, 2),
-                "counters": dict(self.counters),
-                "gauges": dict(self.gauges),
-                "errors": dict(self.errors),
-                "timings": {},
-            }
-
-            # Calculate timing stats while holding the lock to avoid nested lock acquisition
-            for metric in self.timings.keys():
-                timings = list(self.timings.get(metric, []))
-
-                if not timings:
-                    metrics["timings"][metric] = {
-                        "count": 0,
-                        "min": 0,
-                        "max": 0,
-                        "avg": 0,
-                        "p50": 0,
-                        "p95": 0,
-                        "p99": 0,
-                    }
-                else:
-                    sorted_timings = sorted(timings)
-                    count = len(sorted_timings)
-
-                    metrics["timings"][metric] = {
-                        "count": count,
-                        "min": sorted_timings[0],
-                        "max": sorted_timings[-1],
-                        "avg": sum(sorted_timings) / count,
-                        "p50": sorted_timings[int(count * 0.5)],
-                        "p95": sorted_timings[int(count * 0.95)]
-                        if count > 1
-                        else sorted_timings[0],
-                        "p99": sorted_timings[int(count * 0.99)]
-                        if count > 1
-                        else sorted_timings[0],
-                    }
-
-            return metrics
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            errors = dict(self.errors)
+            timings = {key: sketch.copy() for key, sketch in self.timings.items()}
+
+        return {
+            "uptime_seconds": round(uptime, 2),
+            "counters": {format_series(k): v for k, v in counters.items()},
+            "gauges": {format_series(k): v for k, v in gauges.items()},
+            "errors": {format_series(k): v for k, v in errors.items()},
+            "timings": {format_series(k): self._stats(s) for k, s in timings.items()},
+        }
 
     def reset(self) -> None:
         """Reset all metrics"""
@@ -174,13 +312,155 @@ class MetricsService:
 
         return "\n".join(lines)
 
+    def _metric_name(self, name: str) -> str:
+        name = _INVALID_NAME_CHARS.sub("_", name)
+        if self.namespace:
+            name = f"{self.namespace}_{name}"
+        return name if not name[0].isdigit() else f"_{name}"
+
+    @staticmethod
+    def _label_text(labels: tuple[tuple[str, str], ...], **extra: str) -> str:
+        pairs = [*labels, *extra.items()]
+        if not pairs:
+            return ""
+        escaped = (
+            (
+                _INVALID_NAME_CHARS.sub("_", k),
+                v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+            )
+            for k, v in pairs
+        )
+        return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+    def to_openmetrics(self) -> str:
+        """
+        Render every metric in the OpenMetrics text format
+
+        Counters become <name>_total, errors one errors_total counter with a
+        type label, and timings summaries named <name>_milliseconds with
+        p50/p95/p99 quantiles.  All names get the metrics.namespace prefix.
+        """
+        with self.lock:
+            uptime = time.time() - self.start_time
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            errors = dict(self.errors)
+            timings = {key: sketch.copy() for key, sketch in self.timings.items()}
+
+        families: dict[str, tuple[str, list[str]]] = {}
+
+        def sample(family: str, kind: str, line: str) -> None:
+            families.setdefault(family, (kind, []))[1].append(line)
+
+        for (name, labels), value in sorted(counters.items()):
+            family = self._metric_name(name.removesuffix("_total"))
+            sample(family, "counter", f"{family}_total{self._label_text(labels)} {value}")
+
+        errors_family = self._metric_name("errors")
+        for (error_type, labels), value in sorted(errors.items()):
+            label_text = self._label_text(labels, type=error_type)
+            sample(errors_family, "counter", f"{errors_family}_total{label_text} {value}")
+
+        for (name, labels), value in sorted(gauges.items()):
+            family = self._metric_name(name)
+            sample(family, "gauge", f"{family}{self._label_text(labels)} {value}")
+        uptime_family = self._metric_name("uptime_seconds")
+        sample(uptime_family, "gauge", f"{uptime_family} {uptime:.3f}")
+
+        for (name, labels), sketch in sorted(timings.items()):
+            family = self._metric_name(f"{name}_milliseconds")
+            for _, q in QUANTILES:
+                label_text = self._label_text(labels, quantile=str(q))
+                sample(family, "summary", f"{family}{label_text} {sketch.quantile(q)}")
+            label_text = self._label_text(labels)
+            sample(family, "summary", f"{family}_count{label_text} {sketch.count}")
+            sample(family, "summary", f"{family}_sum{label_text} {sketch.sum}")
+
+        lines = []
+        for family, (kind, samples) in families.items():
+            lines.append(f"# TYPE {family} {kind}")
+            if family.endswith("_milliseconds"):
+                lines.append(f"# UNIT {family} milliseconds")
+            elif family.endswith("_seconds"):
+                lines.append(f"# UNIT {family} seconds")
+            lines.extend(samples)
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str | None = None) -> bool:
+        """
+        Write the OpenMetrics export for a node exporter textfile collector
+
+        The file is written next to its destination and renamed into place,
+        so the collector never reads a partial file.
+
+        Args:
+            path: Output file (default: metrics.textfile_path); the
+                collector only reads files ending in .prom
+
+        Returns:
+            True if the file was written
+        """
+        path = path or self.textfile_path
+        if not path:
+            return False
+
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.to_openmetrics())
+            os.replace(tmp, path)
+            return True
+        except OSError as e:
+            self.logger.warning(f"Failed to write metrics textfile {path}: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+
+    def start_textfile_export(self) -> bool:
+        """
+        Rewrite metrics.textfile_path every metrics.textfile_interval seconds
+
+        Returns:
+            True if the export was started (a path is configured)
+        """
+        if not self.textfile_path or self._export_thread is not None:
+            return False
+
+        def export() -> None:
+            while not self._export_stop.wait(self.textfile_interval):
+                self.write_textfile()
+
+        self.write_textfile()
+        self._export_thread = Thread(target=export, name="metrics-textfile", daemon=True)
+        self._export_thread.start()
+        self.logger.info(f"Exporting metrics to {self.textfile_path}")
+        return True
+
+    def close(self) -> None:
+        """Stop the textfile export after writing the final values"""
+        if self._export_thread is None:
+            return
+        self._export_stop.set()
+        self._export_thread.join(timeout=5)
+        self._export_thread = None
+        self.write_textfile()
+
 
 class Timer:
     """Context manager for timing operations"""
 
-    def __init__(self, metrics_service: MetricsService, metric_name: str) -> None:
+    def __init__(
+        self,
+        metrics_service: MetricsService,
+        metric_name: str,
+        labels: Labels = None,
+    ) -> None:
         self.metrics_service = metrics_service
         self.metric_name = metric_name
+        self.labels = labels
         self.start_time: float | None = None
 
     def __enter__(self) -> "Timer":
@@ -195,7 +475,11 @@ class Timer:
     ) -> None:
         if self.start_time is not None:
             duration_ms = (time.time() - self.start_time) * 1000
-            self.metrics_service.record_timing(self.metric_name, duration_ms)
+            self.metrics_service.record_timing(
+                self.metric_name, duration_ms, labels=self.labels
+            )
 
         if exc_type is not None:
-            self.metrics_service.record_error(f"{self.metric_name}_error")
+            self.metrics_service.record_error(
+                f"{self.metric_name}_error", labels=self.labels
+            )
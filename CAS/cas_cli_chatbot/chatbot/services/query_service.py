@@ -5,11 +5,18 @@ Enhanced Query Service with user-specific bearer token support
 import hashlib
 import json
 import logging
-from typing import Any, Protocol, cast
+import math
+import time
+from collections.abc import Iterator, Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Protocol, cast
 
 import requests  # type: ignore[import-untyped]
+from requests.adapters import HTTPAdapter  # type: ignore[import-untyped]
+from urllib3.util.retry import Retry
 
-from chatbot.services.auth_service import AuthService
+from chatbot.services.auth_service import AuthenticationError, AuthService
+from chatbot.services.cache_service import vector_store_tag
 from chatbot.utils.response_formatter import ResponseFormatter
 from chatbot.utils.validators import InputValidator, TokenValidator, ValidationError
 
@@ -19,13 +26,47 @@ class CacheServiceProtocol(Protocol):
 
     def get(self, key: str) -> Any: ...
 
-    def set(self, key: str, value: Any, ttl_seconds: int) -> None: ...
+    def set(
+        self, key: str, value: Any, ttl_seconds: int, tags: Iterable[str] = ...
+    ) -> None: ...
 
-    def clear_pattern(self, pattern: str) -> Any: ...
+    def invalidate_tag(self, tag: str) -> int: ...
+
+    def get_or_compute(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl_seconds: int | None = ...,
+        tags: Iterable[str] = ...,
+        force_refresh: bool = ...,
+    ) -> Any: ...
 
     def get_statistics(self) -> dict[str, Any]: ...
 
 
+class MetricsServiceProtocol(Protocol):
+    """Protocol for metrics interactions used by query service."""
+
+    def increment(
+        self, metric_name: str, value: int = ..., labels: Mapping[str, Any] | None = ...
+    ) -> None: ...
+
+    def record_timing(
+        self,
+        metric_name: str,
+        duration_ms: float,
+        labels: Mapping[str, Any] | None = ...,
+    ) -> None: ...
+
+    def record_error(
+        self, error_type: str, labels: Mapping[str, Any] | None = ...
+    ) -> None: ...
+
+
+# CAS gateway statuses worth retrying: the router or backend pod is briefly away
+RETRY_STATUSES = (502, 503, 504)
+
+
 class QueryService:
     """Enhanced query service with user-specific authentication"""
 
@@ -35,11 +76,13 @@ class QueryService:
         logger: logging.Logger,
         cache_service: CacheServiceProtocol | None = None,
         auth_service: AuthService | None = None,
+        metrics_service: MetricsServiceProtocol | None = None,
     ) -> None:
         self.config: dict[str, Any] = config
         self.logger = logger
         self.cache_service = cache_service
         self.auth_service = auth_service
+        self.metrics_service = metrics_service
 
         # Configuration
         self.cas_url = config.get("cas_url")
@@ -50,9 +93,88 @@ class QueryService:
             "query_cache_ttl", 180
         )  # 3 minutes
 
+        http_config = config.get("http", {}) or {}
+        self.connect_timeout = http_config.get("connect_timeout", 5)
+        self.session = self._create_session(http_config)
+
         if not self.cas_url:
             self.logger.warning("CAS URL not configured")
 
+    @staticmethod
+    def _create_session(http_config: dict[str, Any]) -> requests.Session:
+        """
+        Build the pooled session shared by every CAS request
+
+        Connections are kept alive between commands, so only the first
+        request pays for the TLS handshake.  Gateway errors and failed
+        connects are retried with exponential backoff; searches are POSTs
+        but read-only, so they are retried as well.  Read timeouts are not
+        retried: the read timeout is the caller's deadline (vector search
+        all sets one per store), and a retry would multiply it.
+        """
+        retry = Retry(
+            total=http_config.get("max_retries", 2),
+            # False re-raises the ReadTimeout itself; 0 would wrap it in a
+            # MaxRetryError that requests reports as a ConnectionError
+            read=False,
+            backoff_factor=http_config.get("backoff_factor", 0.5),
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "POST"}),
+            # Hand the last response back so raise_for_status reports it
+            raise_on_status=False,
+        )
+        pool_size = http_config.get("pool_size", 10)
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _request(
+        self,
+        method: str,
+        endpoint: str,
+        url: str,
+        read_timeout: float | None = None,
+        vector_store: str | None = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """
+        Send one CAS request over the pooled session and record its latency
+
+        Records cas_http_request timings and cas_http_requests counts
+        labelled by endpoint (and vector_store when given); transport errors
+        and non-2xx responses also record a cas_http error.
+        """
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = getattr(self.session, method)(
+                url,
+                verify=not self.config.get("allow_self_signed", True),
+                timeout=(self.connect_timeout, read_timeout or self.timeout),
+                **kwargs,
+            )
+            failed = not response.ok
+            return response
+        finally:
+            if self.metrics_service:
+                labels = {"endpoint": endpoint}
+                if vector_store:
+                    labels["vector_store"] = vector_store
+                self.metrics_service.record_timing(
+                    "cas_http_request", (time.perf_counter() - start) * 1000, labels
+                )
+                self.metrics_service.increment("cas_http_requests", labels=labels)
+                if failed:
+                    self.metrics_service.record_error("cas_http", labels=labels)
+
+    def close(self) -> None:
+        """Close the pooled HTTP session"""
+        self.session.close()
+
     def _check_bearer_token(self) -> dict[str, Any]:
         """
         Check if bearer token is available and valid
@@ -68,6 +190,7 @@ class QueryService:
         vector_store: str | None = None,
         limit: int | None = None,
         use_cache: bool = True,
+        timeout: int | None = None,
     ) -> dict[str, Any]:
         """
         Query CAS vector store with admin authentication
@@ -77,6 +200,7 @@ class QueryService:
             vector_store: vector store name (default from config)
             limit: Result limit (default from config)
             use_cache: Use cached results if available
+            timeout: Read timeout in seconds (default: request_timeout)
 
         Returns:
             Query results dictionary
@@ -140,12 +264,14 @@ class QueryService:
                 ),
             }
 
-            response = requests.post(
+            response = self._request(
+                "post",
+                "search",
                 url,
+                read_timeout=timeout,
+                vector_store=vector_store,
                 headers=headers,
                 json=payload,
-                verify=not self.config.get("allow_self_signed", True),
-                timeout=self.timeout,
             )
             response.raise_for_status()
 
@@ -153,14 +279,21 @@ class QueryService:
 
             # Cache successful result
             if self.cache_service:
-                self.cache_service.set(cache_key, result, ttl_seconds=self.cache_ttl)
+                self.cache_service.set(
+                    cache_key,
+                    result,
+                    ttl_seconds=self.cache_ttl,
+                    tags=("query", vector_store_tag(vector_store)),
+                )
 
             self.logger.info(f"Query successful: {vector_store}")
             return result
 
         except requests.exceptions.Timeout:
             self.logger.error(f"Query timed out: {vector_store}")
-            return ResponseFormatter.timeout_error("Vector store query", self.timeout)
+            return ResponseFormatter.timeout_error(
+                "Vector store query", timeout or self.timeout
+            )
         except requests.exceptions.HTTPError as e:
             # Capture response body for HTTP errors
             error_details = {"status_code": e.response.status_code}
@@ -192,6 +325,85 @@ class QueryService:
             self.logger.error(f"Query failed: {e}")
             return ResponseFormatter.internal_error(str(e))
 
+    def query_vector_stores(
+        self,
+        user_query: str,
+        vector_stores: list[str],
+        limit: int | None = None,
+        max_workers: int | None = None,
+        store_timeout: int | None = None,
+    ) -> Iterator[tuple[str, dict[str, Any]]]:
+        """
+        Query several vector stores concurrently
+
+        Each store is searched with query_vector_store on a bounded thread
+        pool, and (vector_store, result) pairs are yielded in the order the
+        stores answer, so callers can show results as they arrive.  A store
+        that has not answered within store_timeout seconds of its turn in
+        the pool is yielded with a timeout error; its request is left to
+        finish in the background.
+
+        Args:
+            user_query: Query entered by user
+            vector_stores: Vector store names to search
+            limit: Result limit per store (default from config)
+            max_workers: Concurrent searches (default: search_all.max_workers)
+            store_timeout: Seconds allowed per store (default:
+                search_all.store_timeout)
+
+        Yields:
+            (vector_store, query result dictionary)
+        """
+        if not vector_stores:
+            return
+
+        search_config = self.config.get("search_all", {}) or {}
+        workers = max_workers or search_config.get("max_workers", 8)
+        per_store = store_timeout or search_config.get("store_timeout", 15)
+        workers = max(1, min(workers, len(vector_stores)))
+        # Stores queue behind a full pool, so the last wave starts late
+        deadline = time.monotonic() + per_store * math.ceil(
+            len(vector_stores) / workers
+        )
+
+        executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="search-all"
+        )
+        try:
+            pending = {
+                executor.submit(
+                    self.query_vector_store,
+                    user_query,
+                    vector_store=vector_store,
+                    limit=limit,
+                    timeout=per_store,
+                ): vector_store
+                for vector_store in vector_stores
+            }
+            while pending:
+                done, _ = wait(
+                    pending,
+                    timeout=max(0.0, deadline - time.monotonic()),
+                    return_when=FIRST_COMPLETED,
+                )
+                if not done:
+                    break
+                for future in done:
+                    vector_store = pending.pop(future)
+                    try:
+                        yield vector_store, future.result()
+                    except Exception as e:
+                        self.logger.error(f"Search of {vector_store} failed: {e}")
+                        yield vector_store, ResponseFormatter.internal_error(str(e))
+
+            for vector_store in pending.values():
+                self.logger.warning(f"Search of {vector_store} timed out")
+                yield vector_store, ResponseFormatter.timeout_error(
+                    "Vector store query", per_store
+                )
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def query_with_filters(
         self,
         user_query: str,
@@ -279,12 +491,13 @@ class QueryService:
                 ),
             }
 
-            response = requests.post(
+            response = self._request(
+                "post",
+                "search",
                 url,
+                vector_store=vector_store,
                 headers=headers,
                 json=payload,
-                verify=not self.config.get("allow_self_signed", True),
-                timeout=self.timeout,
             )
             response.raise_for_status()
 
@@ -292,7 +505,12 @@ class QueryService:
 
             # Cache successful result
             if self.cache_service:
-                self.cache_service.set(cache_key, result, ttl_seconds=self.cache_ttl)
+                self.cache_service.set(
+                    cache_key,
+                    result,
+                    ttl_seconds=self.cache_ttl,
+                    tags=("query", vector_store_tag(vector_store)),
+                )
 
             self.logger.info(f"Filtered query successful: {vector_store}")
             return result
@@ -333,35 +551,41 @@ class QueryService:
             self.logger.error(f"Filtered query failed: {e}")
             return ResponseFormatter.internal_error(str(e))
 
-    def list_vector_stores(self, use_cache: bool = True) -> list[str]:
+    def list_vector_stores(
+        self, use_cache: bool = True, raise_errors: bool = False
+    ) -> list[str]:
         """
         List available vector stores using admin token
 
         Args:
             use_cache: Use cached results if available
+            raise_errors: Raise on failure instead of returning [], for
+                callers that must tell "no stores" from "could not list"
 
         Returns:
             List of vector store names
+
+        Raises:
+            AuthenticationError: No valid bearer token (raise_errors only)
+            requests.exceptions.RequestException: The listing failed
+                (raise_errors only)
         """
         # Check if bearer token is valid before proceeding
         token_check = self._check_bearer_token()
         if not token_check["valid"]:
             self.logger.error(f"Token validation failed: {token_check['error']}")
+            if raise_errors:
+                raise AuthenticationError(token_check["error"])
             return []
 
         cache_key = "query_tables_list"
 
-        # Check cache
-        if use_cache and self.cache_service:
-            cached = self.cache_service.get(cache_key)
-            if cached is not None:
-                self.logger.debug("Retrieved vector store list from cache")
-                return cast(list[str], cached)
-
         # Get bearer token from auth service
         bearer_token = self.auth_service.token if self.auth_service else None
         if not bearer_token:
             self.logger.error("Cannot list vector stores: no bearer token available")
+            if raise_errors:
+                raise AuthenticationError("No bearer token available")
             return []
 
         limit = self.config.get("default_limit", 10)
@@ -371,12 +595,9 @@ class QueryService:
             "Content-Type": "application/json",
         }
 
-        try:
-            response = requests.get(
-                url,
-                headers=headers,
-                verify=not self.config.get("allow_self_signed", True),
-                timeout=self.timeout,
+        def fetch() -> list[str]:
+            response = self._request(
+                "get", "list_vector_stores", url, headers=headers
             )
             response.raise_for_status()
 
@@ -387,16 +608,27 @@ class QueryService:
                 if isinstance(vs, dict) and vs.get("name")
             ]
 
-            # Cache result
-            if self.cache_service:
-                self.cache_service.set(
-                    cache_key, vector_stores, ttl_seconds=600
-                )  # 10 minutes
-
             return vector_stores
 
+        try:
+            if not self.cache_service:
+                return fetch()
+
+            return cast(
+                list[str],
+                self.cache_service.get_or_compute(
+                    cache_key,
+                    fetch,
+                    ttl_seconds=600,  # 10 minutes
+                    tags=("query",),
+                    force_refresh=not use_cache,
+                ),
+            )
+
         except Exception as e:
             self.logger.error(f"Failed to list vector stores: {e}")
+            if raise_errors:
+                raise
             return []
 
     def get_vector_store_info(self, vector_store: str) -> dict[str, Any] | None:
@@ -437,11 +669,8 @@ class QueryService:
         }
 
         try:
-            response = requests.get(
-                url,
-                headers=headers,
-                verify=not self.config.get("allow_self_signed", True),
-                timeout=self.timeout,
+            response = self._request(
+                "get", "vector_store_info", url, headers=headers
             )
             response.raise_for_status()
 
@@ -506,12 +735,13 @@ class QueryService:
                 ),
             }
 
-            response = requests.get(
+            response = self._request(
+                "get",
+                "file_content",
                 url,
+                vector_store=vector_store_id,
                 params=params,
                 headers=headers,
-                verify=not self.config.get("allow_self_signed", True),
-                timeout=self.timeout,
             )
 
             response.raise_for_status()
@@ -538,7 +768,7 @@ class QueryService:
     def clear_cache(self) -> None:
         """Clear query cache"""
         if self.cache_service:
-            self.cache_service.clear_pattern("query_*")
+            self.cache_service.invalidate_tag("query")
             self.logger.info("Query cache cleared")
 
     def get_statistics(self) -> dict[str, Any]:
@@ -5,15 +5,26 @@ Enhanced User Service with caching and improved error handling
 import json
 import logging
 import subprocess
-from typing import Any, Protocol, cast
+from typing import Any, Callable, Iterable, Protocol, cast
 
+from chatbot.services.kube_client import KubeResourceCache
 from chatbot.utils.validators import InputValidator, ValidationError
 
 
 class CacheServiceProtocol(Protocol):
     def get(self, key: str) -> Any: ...
-    def set(self, key: str, value: Any, ttl_seconds: int) -> None: ...
+    def set(
+        self, key: str, value: Any, ttl_seconds: int, tags: Iterable[str] = ...
+    ) -> None: ...
     def delete(self, key: str) -> bool: ...
+    def get_or_compute(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl_seconds: int | None = ...,
+        tags: Iterable[str] = ...,
+        force_refresh: bool = ...,
+    ) -> Any: ...
 
 
 class UserService:
@@ -25,11 +36,14 @@ class UserService:
         auth_service: Any,
         logger: logging.Logger,
         cache_service: CacheServiceProtocol | None = None,
+        kube: KubeResourceCache | None = None,
     ) -> None:
         self.config: dict[str, Any] = config
         self.auth_service = auth_service
         self.logger = logger
         self.cache_service = cache_service
+        # Informer-backed API access; oc subprocesses are the fallback
+        self.kube = kube
 
         # Cache TTL in seconds
         self.cache_ttl = config.get("cache", {}).get(
@@ -46,17 +60,15 @@ class UserService:
         Returns:
             List of usernames
         """
-        cache_key = "users_ocp"
+        # Informer lookups are in-memory and always current — no TTL cache
+        if self.kube is not None:
+            items = self.kube.list(KubeResourceCache.USERS)
+            if items is not None:
+                return sorted(u["metadata"]["name"] for u in items)
 
-        # Check cache
-        if use_cache and self.cache_service:
-            cached = self.cache_service.get(cache_key)
-            if cached is not None:
-                cached_users = cast(list[str], cached)
-                self.logger.debug(f"Retrieved {len(cached_users)} OCP users from cache")
-                return cached_users
+        cache_key = "users_ocp"
 
-        try:
+        def fetch() -> list[str]:
             self.logger.info("Fetching OCP users from cluster")
 
             result = subprocess.run(
@@ -73,13 +85,23 @@ class UserService:
             users.sort()
 
             self.logger.info(f"Fetched {len(users)} OCP users")
-
-            # Cache results
-            if self.cache_service:
-                self.cache_service.set(cache_key, users, ttl_seconds=self.cache_ttl)
-
             return users
 
+        try:
+            if not self.cache_service:
+                return fetch()
+
+            return cast(
+                list[str],
+                self.cache_service.get_or_compute(
+                    cache_key,
+                    fetch,
+                    ttl_seconds=self.cache_ttl,
+                    tags=("users",),
+                    force_refresh=not use_cache,
+                ),
+            )
+
         except subprocess.CalledProcessError as e:
             error_msg = f"Failed to fetch OCP users: {e.stderr.decode()}"
             self.logger.error(error_msg)
@@ -113,14 +135,21 @@ class UserService:
 
         # Try OCP
         try:
-            result = subprocess.run(
-                ["oc", "get", "user", username, "-o", "json"],
-                capture_output=True,
-                timeout=10,
-            )
-
-            if result.returncode == 0:
-                user_data = json.loads(result.stdout.decode())
+            user_data: dict[str, Any] | None = None
+            available = False
+            if self.kube is not None:
+                available, user_data = self.kube.get(KubeResourceCache.USERS, username)
+
+            if not available:
+                result = subprocess.run(
+                    ["oc", "get", "user", username, "-o", "json"],
+                    capture_output=True,
+                    timeout=10,
+                )
+                if result.returncode == 0:
+                    user_data = json.loads(result.stdout.decode())
+
+            if user_data is not None:
                 return {
                     "source": "ocp",
                     "username": username,
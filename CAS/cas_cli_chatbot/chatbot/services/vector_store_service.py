@@ -5,18 +5,31 @@ Fixed Vector Store Service with proper user assignment for OCP and Keycloak user
 import json
 import logging
 import subprocess
-from typing import Any, Protocol, cast
+from typing import Any, Callable, Iterable, Protocol, cast
 
 import urllib3
 from rich.console import Console
 
+from chatbot.services.cache_service import namespace_tag, vector_store_tag
+from chatbot.services.kube_client import KubeResourceCache
 from chatbot.utils.validators import InputValidator, ValidationError
 
 
 class CacheServiceProtocol(Protocol):
     def get(self, key: str) -> Any: ...
-    def set(self, key: str, value: Any, ttl_seconds: int) -> None: ...
+    def set(
+        self, key: str, value: Any, ttl_seconds: int, tags: Iterable[str] = ...
+    ) -> None: ...
     def delete(self, key: str) -> bool: ...
+    def invalidate_tag(self, tag: str) -> int: ...
+    def get_or_compute(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl_seconds: int | None = ...,
+        tags: Iterable[str] = ...,
+        force_refresh: bool = ...,
+    ) -> Any: ...
 
 
 class VectorStoreService:
@@ -29,12 +42,15 @@ class VectorStoreService:
         logger: logging.Logger,
         cache_service: CacheServiceProtocol | None = None,
         console: Console | None = None,
+        kube: KubeResourceCache | None = None,
     ) -> None:
         self.config: dict[str, Any] = config
         self.auth_service = auth_service
         self.logger = logger
         self.cache_service = cache_service
         self.console = console or Console()
+        # Informer-backed API access; oc subprocesses are the fallback
+        self.kube = kube
 
         # Disable insecure HTTPS warnings
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -48,6 +64,10 @@ class VectorStoreService:
         # In-memory storage for domain assignments (local cache)
         self.vector_store_assignments: dict[str, dict[str, list[str]]] = {}
 
+        # Per namespace, the cached CRAC snapshot already refetched because a
+        # store was missing from it; later misses against it are not refetched
+        self._refetched_snapshots: dict[str, dict[str, dict[str, list[str]]]] = {}
+
         # Cache TTL
         self.cache_ttl = config.get("cache", {}).get(
             "domain_cache_ttl", 300
@@ -75,19 +95,15 @@ class VectorStoreService:
             self.logger.error(f"Input validation failed: {e}")
             return []
 
-        cache_key = f"domains_{namespace}"
+        # Informer lookups are in-memory and always current — no TTL cache
+        if self.kube is not None:
+            items = self.kube.list(KubeResourceCache.DOMAINS, namespace)
+            if items is not None:
+                return sorted(item["metadata"]["name"] for item in items)
 
-        # Check cache
-        if use_cache and self.cache_service:
-            cached = self.cache_service.get(cache_key)
-            if cached is not None:
-                cached_vector_stores = cast(list[str], cached)
-                self.logger.debug(
-                    f"Retrieved {len(cached_vector_stores)} vector stores from cache"
-                )
-                return cached_vector_stores
+        cache_key = f"domains_{namespace}"
 
-        try:
+        def fetch() -> list[str]:
             # Fetch vector_stores using oc command
             result = subprocess.run(
                 ["oc", "get", "domains", "-n", namespace, "-o", "json"],
@@ -100,15 +116,25 @@ class VectorStoreService:
             vector_stores = [item["metadata"]["name"] for item in data.get("items", [])]
 
             vector_stores.sort()
-
-            # Cache results
-            if self.cache_service:
-                self.cache_service.set(
-                    cache_key, vector_stores, ttl_seconds=self.cache_ttl
-                )
-
             return vector_stores
 
+        try:
+            if not self.cache_service:
+                return fetch()
+
+            # Concurrent callers (background refresh, health check, a
+            # command) share one oc call
+            return cast(
+                list[str],
+                self.cache_service.get_or_compute(
+                    cache_key,
+                    fetch,
+                    ttl_seconds=self.cache_ttl,
+                    tags=("domains", namespace_tag(namespace)),
+                    force_refresh=not use_cache,
+                ),
+            )
+
         except subprocess.CalledProcessError as e:
             error_msg = f"Failed to fetch vector_stores: {e.stderr.decode()}"
             self.console.print(f"[red]✗ {error_msg}[/]")
@@ -145,31 +171,15 @@ class VectorStoreService:
             return None
 
         try:
-            result = subprocess.run(
-                [
-                    "oc",
-                    "get",
-                    "domain",
-                    vector_store_name,
-                    "-n",
-                    namespace,
-                    "-o",
-                    "json",
-                ],
-                capture_output=True,
-                timeout=10,
-            )
-
-            if result.returncode == 0:
-                data = json.loads(result.stdout.decode())
+            data = self._get_domain(vector_store_name, namespace)
 
+            if data is not None:
                 # Get assigned users and groups for this vector store
+                # Refresh the access snapshot once; groups read the same one
                 users = self.get_assigned_users(
                     vector_store_name, namespace, use_cache=False
                 )
-                groups = self.get_assigned_groups(
-                    vector_store_name, namespace, use_cache=False
-                )
+                groups = self.get_assigned_groups(vector_store_name, namespace)
 
                 return {
                     "name": vector_store_name,
@@ -190,15 +200,23 @@ class VectorStoreService:
 
         return None
 
-    def _get_crac_for_vector_store(
+    def _get_domain(
         self, vector_store_name: str, namespace: str
     ) -> dict[str, Any] | None:
-        """Fetch the CasResourceAccessControl resource for a vector store."""
+        """Fetch the Domain resource for a vector store."""
+        if self.kube is not None:
+            available, domain = self.kube.get(
+                KubeResourceCache.DOMAINS, vector_store_name, namespace
+            )
+            if available:
+                return domain
+
         result = subprocess.run(
             [
                 "oc",
                 "get",
-                "casresourceaccesscontrols.cas.isf.ibm.com",
+                "domain",
+                vector_store_name,
                 "-n",
                 namespace,
                 "-o",
@@ -210,28 +228,139 @@ class VectorStoreService:
 
         if result.returncode != 0:
             return None
+        return cast(dict[str, Any], json.loads(result.stdout.decode()))
+
+    def _list_cracs(self, namespace: str) -> list[dict[str, Any]]:
+        """
+        Fetch every CasResourceAccessControl in the namespace with oc
+
+        The informer's copy is read by _access_snapshot directly; this is
+        the fallback whose result is cached.
+
+        Raises:
+            subprocess.CalledProcessError: If oc fails
+        """
+        result = subprocess.run(
+            [
+                "oc",
+                "get",
+                "casresourceaccesscontrols.cas.isf.ibm.com",
+                "-n",
+                namespace,
+                "-o",
+                "json",
+            ],
+            capture_output=True,
+            timeout=10,
+            check=True,
+        )
 
         data = json.loads(result.stdout.decode())
-        items = data.get("items", [])
+        return cast(list[dict[str, Any]], data.get("items", []))
 
+    @staticmethod
+    def _build_access_index(
+        items: list[dict[str, Any]],
+    ) -> dict[str, dict[str, list[str]]]:
+        """
+        Index CRACs by the vector store they protect
+
+        Returns:
+            {vector_store_name: {"users": [...], "groups": [...]}} holding
+            the validated subjects only; a store's first CRAC wins
+        """
+        index: dict[str, dict[str, list[str]]] = {}
         for resource in items:
-            resource_ref = resource.get("spec", {}).get("resourceRef", {})
-            if resource_ref.get("name") == vector_store_name:
-                return cast(dict[str, Any], resource)
+            name = resource.get("spec", {}).get("resourceRef", {}).get("name")
+            if not name or name in index:
+                continue
+
+            subjects = resource.get("spec", {}).get("subjects", {})
+            validated = {
+                condition.get("type")
+                for condition in resource.get("status", {}).get("conditions", [])
+                if condition.get("status") == "True"
+            }
+            index[name] = {
+                subject_type: (
+                    [s.get("name") for s in subjects.get(subject_type, []) if s.get("name")]
+                    if validation_type in validated
+                    else []
+                )
+                for subject_type, validation_type in (
+                    ("users", "ValidatedUsers"),
+                    ("groups", "ValidatedGroups"),
+                )
+            }
+        return index
 
-        return None
+    def get_access_snapshot(
+        self, namespace: str = "ibm-cas", use_cache: bool = True
+    ) -> dict[str, dict[str, list[str]]] | None:
+        """
+        Validated users and groups of every vector store in the namespace
+
+        One CRAC list serves every store: the index is rebuilt from the
+        informer's in-memory copy when it has synced, and otherwise built
+        from one oc list cached for domain_cache_ttl, so showing access for
+        N stores costs one list instead of one per store and subject type.
+
+        Args:
+            namespace: Kubernetes namespace
+            use_cache: Use the cached snapshot if available
+
+        Returns:
+            {vector_store_name: {"users": [...], "groups": [...]}}, or None
+            if the CRACs could not be fetched
+        """
+        return self._access_snapshot(namespace, use_cache)[0]
+
+    def _access_snapshot(
+        self, namespace: str, use_cache: bool
+    ) -> tuple[dict[str, dict[str, list[str]]] | None, bool]:
+        """
+        get_access_snapshot, also reporting where the snapshot came from
+
+        Returns:
+            (snapshot, cached) — cached is True when the snapshot may come
+            from the cache rather than the informer's current copy
+        """
+        try:
+            if self.kube is not None:
+                items = self.kube.list(KubeResourceCache.CRACS, namespace)
+                if items is not None:
+                    return self._build_access_index(items), False
+
+            if not self.cache_service:
+                return self._build_access_index(self._list_cracs(namespace)), False
+
+            snapshot = cast(
+                dict[str, dict[str, list[str]]],
+                self.cache_service.get_or_compute(
+                    f"crac_snapshot_{namespace}",
+                    lambda: self._build_access_index(self._list_cracs(namespace)),
+                    ttl_seconds=self.cache_ttl,
+                    tags=("crac", namespace_tag(namespace)),
+                    force_refresh=not use_cache,
+                ),
+            )
+            return snapshot, True
+        except subprocess.CalledProcessError as e:
+            self.logger.error(f"Failed to fetch access controls in {namespace}: {e}")
+        except Exception as e:
+            self.logger.error(f"Error fetching access controls in {namespace}: {e}")
+        return None, False
 
     def _get_validated_subjects(
         self,
         vector_store_name: str,
         namespace: str,
         subject_type: str,
-        validation_type: str,
         assignment_key: str,
-        cache_key_prefix: str,
         success_label: str,
+        use_cache: bool,
     ) -> list[str]:
-        """Fetch validated assigned subjects for a vector store."""
+        """Look up validated assigned subjects for a vector store."""
         try:
             vector_store_name = InputValidator.validate_vector_store_name(
                 vector_store_name, "vector_store_name"
@@ -241,70 +370,49 @@ class VectorStoreService:
             self.logger.error(f"Input validation failed: {e}")
             return []
 
-        cache_key = f"{cache_key_prefix}_{vector_store_name}"
-
-        if self.cache_service:
-            cached = self.cache_service.get(cache_key)
-            if cached is not None:
-                self.logger.debug(
-                    f"Retrieved assigned {subject_type} from cache for {vector_store_name}"
-                )
-                return cast(list[str], cached)
-
-        try:
-            item = self._get_crac_for_vector_store(vector_store_name, namespace)
-
-            if not item:
-                self.logger.warning(
-                    f"No CasResourceAccessControl found for vector store '{vector_store_name}'"
-                )
-                return []
-
-            subjects = item.get("spec", {}).get("subjects", {}).get(subject_type, [])
-            subject_names = [
-                subject.get("name") for subject in subjects if subject.get("name")
-            ]
-
-            validated_subjects = []
-            conditions = item.get("status", {}).get("conditions", [])
-            for condition in conditions:
-                if (
-                    condition.get("type") == validation_type
-                    and condition.get("status") == "True"
-                ):
-                    validated_subjects = subject_names
-                    break
-
-            assignments = self.vector_store_assignments.setdefault(
-                vector_store_name, {}
+        snapshot, cached = self._access_snapshot(namespace, use_cache)
+        if snapshot is None:
+            self.console.print(
+                f"[yellow]ℹ Could not fetch {subject_type} for vector store '{vector_store_name}'[/]"
             )
-            assignments[assignment_key] = validated_subjects
+            return []
 
-            if validated_subjects:
-                self.console.print(
-                    f"[green]✓ Vector store '{vector_store_name}' has {len(validated_subjects)} validated {success_label}(s)[/]"
-                )
-            else:
-                self.console.print(
-                    f"[yellow]ℹ No validated {success_label}s assigned to vector store '{vector_store_name}'[/]"
-                )
+        access = snapshot.get(vector_store_name)
+        if (
+            access is None
+            and use_cache
+            and cached
+            and snapshot is not self._refetched_snapshots.get(namespace)
+        ):
+            # A cached snapshot can predate this store's CRAC; never let it
+            # report "no access" for a store it has not seen.  Refetched once
+            # per snapshot, so stores that really have no CRAC cost no extra
+            # list until the snapshot is next rebuilt.
+            snapshot, _ = self._access_snapshot(namespace, use_cache=False)
+            if snapshot is not None:
+                self._refetched_snapshots[namespace] = snapshot
+            access = snapshot.get(vector_store_name) if snapshot else None
+        if access is None:
+            self.logger.warning(
+                f"No CasResourceAccessControl found for vector store '{vector_store_name}'"
+            )
+            return []
 
-            if self.cache_service:
-                self.cache_service.set(
-                    cache_key, validated_subjects, ttl_seconds=self.cache_ttl
-                )
+        validated_subjects = list(access[subject_type])
 
-            return validated_subjects
+        assignments = self.vector_store_assignments.setdefault(vector_store_name, {})
+        assignments[assignment_key] = validated_subjects
 
-        except subprocess.CalledProcessError as e:
-            self.logger.error(f"Failed to fetch domain {vector_store_name}: {e}")
-        except Exception as e:
-            self.logger.error(f"Error fetching assigned {subject_type}: {e}")
+        if validated_subjects:
+            self.console.print(
+                f"[green]✓ Vector store '{vector_store_name}' has {len(validated_subjects)} validated {success_label}(s)[/]"
+            )
+        else:
+            self.console.print(
+                f"[yellow]ℹ No validated {success_label}s assigned to vector store '{vector_store_name}'[/]"
+            )
 
-        self.console.print(
-            f"[yellow]ℹ Could not fetch {subject_type} for vector store '{vector_store_name}'[/]"
-        )
-        return []
+        return validated_subjects
 
     def get_assigned_users(
         self, vector_store_name: str, namespace: str = "ibm-cas", use_cache: bool = True
@@ -320,17 +428,13 @@ class VectorStoreService:
         Returns:
             List of validated assigned usernames
         """
-        if not use_cache and self.cache_service:
-            self.cache_service.delete(f"domain_users_{vector_store_name}")
-
         return self._get_validated_subjects(
             vector_store_name=vector_store_name,
             namespace=namespace,
             subject_type="users",
-            validation_type="ValidatedUsers",
             assignment_key="ocp_users",
-            cache_key_prefix="domain_users",
             success_label="user",
+            use_cache=use_cache,
         )
 
     def get_assigned_groups(
@@ -347,17 +451,13 @@ class VectorStoreService:
         Returns:
             List of validated assigned group names
         """
-        if not use_cache and self.cache_service:
-            self.cache_service.delete(f"domain_groups_{vector_store_name}")
-
         return self._get_validated_subjects(
             vector_store_name=vector_store_name,
             namespace=namespace,
             subject_type="groups",
-            validation_type="ValidatedGroups",
             assignment_key="groups",
-            cache_key_prefix="domain_groups",
             success_label="group",
+            use_cache=use_cache,
         )
 
     def sync_vector_stores(self, namespace: str = "ibm-cas") -> int:
@@ -370,8 +470,28 @@ class VectorStoreService:
         Returns:
             Number of vector stores found
         """
+        # Drops the list and every cached assignment in the namespace
         if self.cache_service:
-            self.cache_service.delete(f"domains_{namespace}")
+            self.cache_service.invalidate_tag(namespace_tag(namespace))
 
         vector_stores = self.list_vector_stores(namespace, use_cache=False)
         return len(vector_stores)
+
+    def invalidate_vector_store(self, vector_store_name: str) -> int:
+        """
+        Drop every cached entry derived from one vector store
+
+        Covers search results cached by QueryService, which carry the
+        vector_store_tag, and the access snapshots holding its users and
+        groups.
+
+        Args:
+            vector_store_name: Name of the vector store
+
+        Returns:
+            Number of cache entries removed
+        """
+        if not self.cache_service:
+            return 0
+        removed = self.cache_service.invalidate_tag(vector_store_tag(vector_store_name))
+        return removed + self.cache_service.invalidate_tag("crac")
@@ -14,7 +14,7 @@ DEFAULT_LOG_MAX_BYTES = 10485760  # 10MB
 DEFAULT_LOG_BACKUP_COUNT = 5
 DEFAULT_CACHE_TTL = 300  # 5 minutes in seconds
 DEFAULT_CACHE_MAX_ENTRIES = 1000
-DEFAULT_METRICS_MAX_SAMPLES = 100
+DEFAULT_METRICS_RELATIVE_ACCURACY = 0.01
 
 
 class ConfigurationError(Exception):
@@ -232,7 +232,7 @@ class ConfigLoader:
                 "max_entries": DEFAULT_CACHE_MAX_ENTRIES,
             },
             "session": {"file": "session_history.json", "auto_save": True},
-            "metrics": {"max_samples": DEFAULT_METRICS_MAX_SAMPLES},
+            "metrics": {"relative_accuracy": DEFAULT_METRICS_RELATIVE_ACCURACY},
             "allow_self_signed": True,
         }
 
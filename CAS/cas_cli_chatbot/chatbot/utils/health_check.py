@@ -28,6 +28,8 @@ class HealthChecker:
             ("llm", self.check_llm_service),
             ("oc_cli", self.check_oc_cli),
         ]
+        if self.services.get("kube"):
+            checks.append(("kube_api", self.check_kube_api))
 
         for service_name, check_func in checks:
             try:
@@ -62,6 +64,8 @@ class HealthChecker:
 
         stats = cache.get_statistics()
         message = f"{stats['entries']} entries, {stats['hit_rate_percent']}% hit rate"
+        if stats.get("disk"):
+            message += f", {stats['disk']['entries']} on disk"
 
         return self._healthy(message)
 
@@ -138,6 +142,27 @@ class HealthChecker:
         except Exception as e:
             return self._unhealthy(f"Error: {str(e)}")
 
+    def check_kube_api(self) -> dict[str, Any]:
+        """Check Kubernetes API informers"""
+        kube = self.services.get("kube")
+
+        if not kube:
+            return self._unhealthy("Service not initialized")
+
+        status = kube.get_status()
+        if not status:
+            return self._healthy("Enabled, informers start on first lookup")
+
+        synced = [path for path, s in status.items() if s["synced"]]
+        if len(synced) < len(status):
+            errors = {s["last_error"] for s in status.values() if s["last_error"]}
+            return self._unhealthy(
+                f"{len(synced)}/{len(status)} informers synced, using oc fallback"
+                + (f": {', '.join(sorted(errors))}" if errors else "")
+            )
+        objects = sum(s["objects"] for s in status.values())
+        return self._healthy(f"{len(synced)} informers synced, {objects} objects")
+
     def _healthy(self, message: str) -> dict[str, Any]:
         """Return healthy status"""
         return {
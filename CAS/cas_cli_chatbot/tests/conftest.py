@@ -79,6 +79,26 @@ def mock_cache_service() -> Mock:
     cache.set = Mock()
     cache.delete = Mock()
     cache.clear_pattern = Mock()
+    cache.invalidate_tag = Mock(return_value=0)
+
+    def get_or_compute(
+        key: str,
+        loader: Any,
+        ttl_seconds: int | None = None,
+        tags: Any = (),
+        force_refresh: bool = False,
+        **kwargs: Any,
+    ) -> Any:
+        # Same observable get/set calls as the real cache, without the locking
+        if not force_refresh:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        value = loader()
+        cache.set(key, value, ttl_seconds=ttl_seconds, tags=tags)
+        return value
+
+    cache.get_or_compute = Mock(side_effect=get_or_compute)
     cache.get_statistics = Mock(
         return_value={
             "entries": 10,
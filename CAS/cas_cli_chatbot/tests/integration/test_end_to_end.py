@@ -15,8 +15,8 @@ class TestEndToEndWorkflows:
     @pytest.mark.integration
     @pytest.mark.slow
     @patch("chatbot.services.auth_service.subprocess.run")
-    @patch("chatbot.services.query_service.requests.post")
-    @patch("chatbot.services.query_service.requests.get")
+    @patch("chatbot.services.query_service.requests.Session.post")
+    @patch("chatbot.services.query_service.requests.Session.get")
     def test_authenticate_list_select_query_workflow(
         self: Any,
         mock_get: Mock,
@@ -272,7 +272,7 @@ class TestTokenRefreshIntegration:
         # Query service should use new token
         assert auth_service.token == "new-token"
 
-        with patch("chatbot.services.query_service.requests.post") as mock_post:
+        with patch("chatbot.services.query_service.requests.Session.post") as mock_post:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {"success": True, "data": []}
@@ -391,6 +391,8 @@ class TestAuthServiceTokenManagement:
         call_args = mock_cache_service.set.call_args
         assert call_args[0][0] == "auth_token"
         assert call_args[0][1] == "test-token"
+        # Access decisions made with the old token are dropped
+        mock_cache_service.invalidate_tag.assert_called_once_with("access")
 
     @pytest.mark.unit
     @pytest.mark.auth
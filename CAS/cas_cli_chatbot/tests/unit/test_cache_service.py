@@ -2,11 +2,15 @@
 Unit tests for CacheService
 """
 
+import os
+import stat
+import threading
 import time
 from typing import Any
+from unittest.mock import Mock, patch
 
 import pytest
-from chatbot.services.cache_service import CacheEntry, CacheService
+from chatbot.services.cache_service import CacheEntry, CacheService, vector_store_tag
 
 
 class TestCacheEntry:
@@ -301,3 +305,477 @@ class TestCacheServiceThreadSafety:
 
         assert result == "value1"
         # In a real scenario, we would use threading to test concurrent access
+
+
+class TestCacheServiceLRU:
+    """Test LRU ordering, byte budget and proactive expiry"""
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_get_protects_recently_used_key_from_eviction(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CACHE-021: Verify a read moves a key to the back of the LRU order"""
+        sample_config["cache"]["max_entries"] = 2
+        cache_service = CacheService(sample_config, mock_logger)
+
+        cache_service.set("key1", "value1")
+        cache_service.set("key2", "value2")
+        cache_service.get("key1")
+        cache_service.set("key3", "value3")
+
+        assert cache_service.get("key1") == "value1"
+        assert cache_service.get("key2") is None
+        assert cache_service.get_statistics()["evictions"] == 1
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_byte_budget_evicts_least_recently_used(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CACHE-022: Verify entries are evicted to stay within max_bytes"""
+        payload = "x" * 1000
+        sample_config["cache"]["max_bytes"] = 2500
+        cache_service = CacheService(sample_config, mock_logger)
+
+        cache_service.set("key1", payload)
+        cache_service.set("key2", payload)
+        cache_service.set("key3", payload)
+
+        stats = cache_service.get_statistics()
+        assert cache_service.get("key1") is None
+        assert cache_service.get("key3") == payload
+        assert stats["bytes"] <= 2500
+        assert stats["max_bytes"] == 2500
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_value_larger_than_budget_is_not_cached(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CACHE-023: Verify a value larger than max_bytes is skipped"""
+        sample_config["cache"]["max_bytes"] = 100
+        cache_service = CacheService(sample_config, mock_logger)
+
+        cache_service.set("small", "a")
+        cache_service.set("big", ["x" * 500])
+
+        assert cache_service.get("big") is None
+        assert cache_service.get("small") == "a"
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_set_drops_expired_entries_proactively(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CACHE-024: Verify expired entries are removed on set without being read"""
+        cache_service = CacheService(sample_config, mock_logger)
+
+        cache_service.set("short", "value", ttl_seconds=0)
+        cache_service.set("long", "value", ttl_seconds=300)
+        time.sleep(0.01)
+        cache_service.set("other", "value")
+
+        assert "short" not in cache_service.cache
+        assert len(cache_service.cache) == 2
+        assert cache_service.get_statistics()["expirations"] == 1
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_overwrite_keeps_byte_total_consistent(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CACHE-025: Verify overwriting and deleting a key releases its bytes"""
+        sample_config["cache"]["max_bytes"] = 10_000
+        cache_service = CacheService(sample_config, mock_logger)
+
+        cache_service.set("key1", "x" * 100)
+        cache_service.set("key1", "x" * 200)
+        assert cache_service.total_bytes == cache_service.get_info("key1")["size_bytes"]
+
+        cache_service.delete("key1")
+        assert cache_service.total_bytes == 0
+
+
+class TestCacheServiceDiskTier:
+    """Test the persistent SQLite second tier"""
+
+    @staticmethod
+    def _disk_config(sample_config: dict[str, Any]) -> dict[str, Any]:
+        sample_config["cache"]["disk"] = {
+            "enabled": True,
+            "file": "cache.sqlite3",
+            "max_bytes": 1024 * 1024,
+        }
+        return sample_config
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_entries_survive_restart_and_are_promoted(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any, tmp_path: Any
+    ) -> None:
+        """TC-CACHE-026: Verify a new CacheService reads entries persisted by the last one"""
+        config = self._disk_config(sample_config)
+        first = CacheService(config, mock_logger, base_dir=tmp_path)
+        first.set("vector_stores_list", [{"name": "vs1"}], ttl_seconds=300)
+        first.close()
+
+        second = CacheService(config, mock_logger, base_dir=tmp_path)
+        assert len(second.cache) == 0
+        assert second.get("vector_stores_list") == [{"name": "vs1"}]
+        assert "vector_stores_list" in second.cache
+        assert second.get_statistics()["disk_hits"] == 1
+        assert (tmp_path / "cache.sqlite3").exists()
+        second.close()
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_ttl_is_preserved_across_restart(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any, tmp_path: Any
+    ) -> None:
+        """TC-CACHE-027: Verify entries expired on disk are not served after a restart"""
+        config = self._disk_config(sample_config)
+        first = CacheService(config, mock_logger, base_dir=tmp_path)
+        first.set("short", "value", ttl_seconds=0)
+        first.set("long", "value", ttl_seconds=300)
+        first.close()
+        time.sleep(0.01)
+
+        second = CacheService(config, mock_logger, base_dir=tmp_path)
+        assert second.get("short") is None
+        assert second.get("long") == "value"
+        assert 0 < second.cache["long"].ttl_seconds <= 300
+        second.close()
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_auth_token_is_never_persisted(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any, tmp_path: Any
+    ) -> None:
+        """TC-CACHE-028: Verify auth_token stays in memory only"""
+        config = self._disk_config(sample_config)
+        first = CacheService(config, mock_logger, base_dir=tmp_path)
+        first.set("auth_token", "sha256~secret", ttl_seconds=86400)
+        assert first.get("auth_token") == "sha256~secret"
+        first.close()
+
+        second = CacheService(config, mock_logger, base_dir=tmp_path)
+        assert second.get("auth_token") is None
+        assert b"sha256~secret" not in (tmp_path / "cache.sqlite3").read_bytes()
+        second.close()
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_disk_size_limit_evicts_least_recently_read(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any, tmp_path: Any
+    ) -> None:
+        """TC-CACHE-029: Verify the disk tier stays within max_bytes"""
+        config = self._disk_config(sample_config)
+        config["cache"]["disk"]["max_bytes"] = 250
+        cache_service = CacheService(config, mock_logger, base_dir=tmp_path)
+
+        for i in range(5):
+            cache_service.set(f"key{i}", "x" * 100)
+            time.sleep(0.002)
+
+        stats = cache_service.get_statistics()["disk"]
+        assert stats["bytes"] <= 250
+        assert cache_service.disk is not None
+        assert cache_service.disk.get("key0") is None
+        assert cache_service.disk.get("key4") is not None
+        cache_service.close()
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_delete_and_clear_pattern_reach_disk(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any, tmp_path: Any
+    ) -> None:
+        """TC-CACHE-030: Verify invalidation removes persisted entries too"""
+        config = self._disk_config(sample_config)
+        cache_service = CacheService(config, mock_logger, base_dir=tmp_path)
+        cache_service.set("domains_a", {"r": 1})
+        cache_service.set("domains_b", {"r": 2})
+        cache_service.set("users", ["u1"])
+
+        cache_service.clear_pattern("domains_*")
+        cache_service.delete("users")
+
+        assert cache_service.disk is not None
+        assert cache_service.disk.keys() == []
+        cache_service.close()
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_database_wal_and_shm_are_private(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any, tmp_path: Any
+    ) -> None:
+        """TC-CACHE-039: Verify the database, -wal and -shm files are 0o600 under umask 022"""
+        config = self._disk_config(sample_config)
+        old_umask = os.umask(0o022)
+        try:
+            cache_service = CacheService(config, mock_logger, base_dir=tmp_path / "state")
+            cache_service.set("vector_stores_list", [{"name": "vs1"}], ttl_seconds=300)
+
+            assert stat.S_IMODE(os.stat(tmp_path / "state").st_mode) == 0o700
+            for name in ("cache.sqlite3", "cache.sqlite3-wal", "cache.sqlite3-shm"):
+                assert stat.S_IMODE(os.stat(tmp_path / "state" / name).st_mode) == 0o600
+            cache_service.close()
+        finally:
+            os.umask(old_umask)
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_database_created_private_without_touching_umask(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any, tmp_path: Any
+    ) -> None:
+        """TC-CACHE-041: Verify opening the disk tier never changes the process umask"""
+        config = self._disk_config(sample_config)
+        with patch("chatbot.services.disk_cache.os.umask") as umask:
+            cache_service = CacheService(config, mock_logger, base_dir=tmp_path)
+        umask.assert_not_called()
+        assert cache_service.disk is not None
+        assert stat.S_IMODE(os.stat(tmp_path / "cache.sqlite3").st_mode) == 0o600
+        cache_service.close()
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_query_results_are_never_persisted(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any, tmp_path: Any
+    ) -> None:
+        """TC-CACHE-042: Verify query_* search results stay in memory even with an empty exclude list"""
+        config = self._disk_config(sample_config)
+        config["cache"]["disk"]["exclude"] = []
+        first = CacheService(config, mock_logger, base_dir=tmp_path)
+        first.set("query_vs1_5_abcd1234", {"data": ["confidential chunk"]})
+        assert first.get("query_vs1_5_abcd1234") == {"data": ["confidential chunk"]}
+        first.close()
+
+        second = CacheService(config, mock_logger, base_dir=tmp_path)
+        assert second.get("query_vs1_5_abcd1234") is None
+        assert b"confidential chunk" not in (tmp_path / "cache.sqlite3").read_bytes()
+        second.close()
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_disk_size_is_a_running_total(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any, tmp_path: Any
+    ) -> None:
+        """TC-CACHE-040: Verify writes never scan the table and the total tracks every change"""
+        config = self._disk_config(sample_config)
+        cache_service = CacheService(config, mock_logger, base_dir=tmp_path)
+        disk = cache_service.disk
+        assert disk is not None and disk.conn is not None
+        statements: list[str] = []
+        disk.conn.set_trace_callback(statements.append)
+
+        cache_service.set("domains_a", "x" * 100)
+        cache_service.set("domains_b", "y" * 50)
+        cache_service.set("domains_a", "z" * 10)
+        assert not [sql for sql in statements if "SUM(" in sql.upper()]
+
+        cache_service.delete("domains_b")
+        cache_service.set("users", ["u1"])
+        cache_service.clear_pattern("users")
+        actual = disk.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        assert disk.get_statistics()["bytes"] == actual == len('"' + "z" * 10 + '"')
+        cache_service.close()
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_disk_tier_disabled_by_default(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CACHE-031: Verify no disk tier is created unless enabled"""
+        cache_service = CacheService(sample_config, mock_logger)
+
+        assert cache_service.disk is None
+        assert cache_service.get_statistics()["disk"] is None
+
+
+class TestCacheServiceTags:
+    """Test tag-indexed invalidation"""
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_invalidate_tag_removes_only_tagged_entries(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CACHE-032: Verify invalidate_tag removes exactly the entries carrying the tag"""
+        cache_service = CacheService(sample_config, mock_logger)
+        cache_service.set("query_a", 1, tags=("query", vector_store_tag("vs1")))
+        cache_service.set("query_b", 2, tags=("query", vector_store_tag("vs2")))
+        cache_service.set("domain_users_vs1", ["u"], tags=(vector_store_tag("vs1"),))
+        cache_service.set("users_ocp", ["u"])
+
+        removed = cache_service.invalidate_tag(vector_store_tag("vs1"))
+
+        assert removed == 2
+        assert cache_service.get("query_a") is None
+        assert cache_service.get("domain_users_vs1") is None
+        assert cache_service.get("query_b") == 2
+        assert cache_service.get("users_ocp") == ["u"]
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_tag_index_follows_overwrite_and_eviction(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CACHE-033: Verify the tag index drops keys that were overwritten or evicted"""
+        sample_config["cache"]["max_entries"] = 2
+        cache_service = CacheService(sample_config, mock_logger)
+        cache_service.set("key1", 1, tags=("old",))
+        cache_service.set("key1", 1, tags=("new",))
+        cache_service.set("key2", 2, tags=("new",))
+        cache_service.set("key3", 3, tags=("new",))
+
+        assert cache_service.invalidate_tag("old") == 0
+        assert cache_service.get_info("key2")["tags"] == ["new"]
+        assert cache_service.invalidate_tag("new") == 2
+        assert len(cache_service.cache) == 0
+        assert cache_service._tag_index == {}
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_invalidate_tag_reaches_disk_tier(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any, tmp_path: Any
+    ) -> None:
+        """TC-CACHE-034: Verify tags survive a restart and invalidate persisted entries"""
+        sample_config["cache"]["disk"] = {"enabled": True, "file": "cache.sqlite3"}
+        first = CacheService(sample_config, mock_logger, base_dir=tmp_path)
+        first.set("domains_a", {"r": 1}, tags=("domains",))
+        first.set("domains_b", {"r": 2}, tags=("domains",))
+        first.set("users_ocp", ["u"], tags=("users",))
+        first.close()
+
+        second = CacheService(sample_config, mock_logger, base_dir=tmp_path)
+        assert second.get("domains_a") == {"r": 1}
+        assert second.get_info("domains_a")["tags"] == ["domains"]
+
+        second.invalidate_tag("domains")
+
+        assert second.get("domains_a") is None
+        assert second.get("domains_b") is None
+        assert second.get("users_ocp") == ["u"]
+        second.close()
+
+
+class TestCacheServiceGetOrCompute:
+    """Test single-flight loading, stale-while-revalidate and negative caching"""
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_get_or_compute_loads_once_then_hits(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CACHE-035: Verify the loader runs on a miss and its value is cached"""
+        cache_service = CacheService(sample_config, mock_logger)
+        loader = Mock(return_value=["vs1"])
+
+        assert cache_service.get_or_compute("domains_ns", loader, tags=("domains",)) == ["vs1"]
+        assert cache_service.get_or_compute("domains_ns", loader) == ["vs1"]
+
+        loader.assert_called_once()
+        assert cache_service.get_info("domains_ns")["tags"] == ["domains"]
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_concurrent_misses_share_one_load(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CACHE-036: Verify concurrent callers of a missing key run the loader once"""
+        cache_service = CacheService(sample_config, mock_logger)
+        release = threading.Event()
+        calls = []
+
+        def slow_loader() -> list[str]:
+            calls.append(1)
+            release.wait(timeout=5)
+            return ["user1"]
+
+        results: list[Any] = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    cache_service.get_or_compute("users_ocp", slow_loader)
+                )
+            )
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        while cache_service.get_statistics()["coalesced"] < 4:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join(timeout=5)
+
+        assert len(calls) == 1
+        assert results == [["user1"]] * 5
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_failure_is_negatively_cached(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CACHE-037: Verify a loader failure is re-raised without retrying for negative_ttl"""
+        cache_service = CacheService(sample_config, mock_logger)
+        loader = Mock(side_effect=RuntimeError("oc failed"))
+
+        for _ in range(3):
+            with pytest.raises(RuntimeError, match="oc failed"):
+                cache_service.get_or_compute("users_ocp", loader, negative_ttl=60)
+
+        loader.assert_called_once()
+        assert cache_service.get("users_ocp") is None
+        assert cache_service.get_statistics()["negative_hits"] == 2
+
+        loader.side_effect = None
+        loader.return_value = ["user1"]
+        assert cache_service.get_or_compute("users_ocp", loader, force_refresh=True) == ["user1"]
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_failed_forced_refresh_keeps_cached_value(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CACHE-043: Verify a failed force_refresh re-raises but leaves the cached value in place"""
+        cache_service = CacheService(sample_config, mock_logger)
+        cache_service.get_or_compute("domains_ns", lambda: ["d1"], ttl_seconds=300)
+
+        failing = Mock(side_effect=RuntimeError("oc failed"))
+        with pytest.raises(RuntimeError, match="oc failed"):
+            cache_service.get_or_compute(
+                "domains_ns", failing, negative_ttl=60, force_refresh=True
+            )
+
+        assert cache_service.get("domains_ns") == ["d1"]
+        assert cache_service.get_or_compute("domains_ns", failing, negative_ttl=60) == ["d1"]
+        failing.assert_called_once()
+        assert cache_service.get_statistics()["negative_hits"] == 0
+
+    @pytest.mark.unit
+    @pytest.mark.cache
+    def test_stale_value_served_while_refreshing(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CACHE-038: Verify a stale value is returned at once and refreshed in the background"""
+        cache_service = CacheService(sample_config, mock_logger)
+        cache_service.get_or_compute("domains_ns", lambda: ["old"], ttl_seconds=0, stale_ttl=60)
+        time.sleep(0.01)
+
+        refreshed = threading.Event()
+
+        def loader() -> list[str]:
+            refreshed.set()
+            return ["new"]
+
+        assert cache_service.get("domains_ns") is None
+        assert cache_service.get_or_compute(
+            "domains_ns", loader, ttl_seconds=300, stale_ttl=60
+        ) == ["old"]
+        assert refreshed.wait(timeout=5)
+        while cache_service._inflight:
+            time.sleep(0.001)
+
+        assert cache_service.get("domains_ns") == ["new"]
+        assert cache_service.get_statistics()["stale_served"] == 1
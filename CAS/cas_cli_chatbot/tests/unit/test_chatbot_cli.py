@@ -2,11 +2,13 @@
 Unit tests for ChatbotCLI
 """
 
+import threading
 from typing import Any
 from unittest.mock import Mock, patch
 
 import pytest
 from chatbot.cli.chatbot_cli import ChatbotCLI, CommandValidator
+from chatbot.services.cache_service import CacheService
 from prompt_toolkit.validation import ValidationError
 
 
@@ -806,3 +808,188 @@ class TestCommandExecution:
         chatbot_cli.execute_command("llm setup")
 
         chatbot_cli._prompt_llm_setup.assert_called_once()
+
+
+class TestAccessDecisionCache:
+    """Test cached (user, vector store) access decisions"""
+
+    @staticmethod
+    def _wait_for_background_refresh() -> None:
+        for thread in threading.enumerate():
+            if thread.name.startswith("cache-refresh-"):
+                thread.join(timeout=5)
+
+    @pytest.mark.unit
+    @pytest.mark.cli
+    @pytest.mark.cache
+    def test_access_decision_cached_across_queries(
+        self: Any, chatbot_cli: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CLI-051: Verify repeated access checks list accessible stores once"""
+        chatbot_cli.services["cache"] = CacheService(sample_config, mock_logger)
+        chatbot_cli.current_user = "test-user"
+
+        for _ in range(5):
+            assert chatbot_cli._user_in_vector_store("vector-store-1") is True
+
+        chatbot_cli.get_accessible_vector_stores.assert_called_once()
+
+    @pytest.mark.unit
+    @pytest.mark.cli
+    @pytest.mark.cache
+    def test_access_decision_keyed_by_user(
+        self: Any, chatbot_cli: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CLI-052: Verify a decision for one user is not reused for another"""
+        chatbot_cli.services["cache"] = CacheService(sample_config, mock_logger)
+
+        chatbot_cli.current_user = "user-a"
+        assert chatbot_cli._user_in_vector_store("vector-store-1") is True
+        chatbot_cli.current_user = "user-b"
+        chatbot_cli.get_accessible_vector_stores.return_value = []
+        assert chatbot_cli._user_in_vector_store("vector-store-1", silent=True) is False
+
+        assert chatbot_cli.get_accessible_vector_stores.call_count == 2
+
+    @pytest.mark.unit
+    @pytest.mark.cli
+    @pytest.mark.cache
+    def test_vector_stores_select_invalidates_access_decisions(
+        self: Any, chatbot_cli: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CLI-053: Verify vector stores select re-checks access"""
+        chatbot_cli.services["cache"] = CacheService(sample_config, mock_logger)
+        chatbot_cli.current_user = "test-user"
+        assert chatbot_cli._user_in_vector_store("vector-store-1") is True
+
+        chatbot_cli.cmd_vector_stores_select("vector-store-1")
+        assert chatbot_cli._user_in_vector_store("vector-store-1") is True
+
+        # select lists accessible stores itself, then the check re-runs
+        assert chatbot_cli.get_accessible_vector_stores.call_count == 4
+
+    @pytest.mark.unit
+    @pytest.mark.cli
+    @pytest.mark.cache
+    def test_stale_access_decision_confirmed_in_background(
+        self: Any, chatbot_cli: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CLI-054: Verify a stale grant is used at once and a revocation applies next"""
+        chatbot_cli.services["cache"] = CacheService(sample_config, mock_logger)
+        chatbot_cli.access_ttl = 0
+        chatbot_cli.current_user = "test-user"
+        assert chatbot_cli._user_in_vector_store("vector-store-1") is True
+
+        chatbot_cli.get_accessible_vector_stores.return_value = ["vector-store-2"]
+        assert chatbot_cli._user_in_vector_store("vector-store-1") is True
+        self._wait_for_background_refresh()
+
+        assert chatbot_cli._user_in_vector_store("vector-store-1", silent=True) is False
+        self._wait_for_background_refresh()
+
+    @pytest.mark.unit
+    @pytest.mark.cli
+    @pytest.mark.cache
+    def test_failed_listing_is_not_cached_as_denial(
+        self: Any, chatbot_cli: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-CLI-058: Verify a listing failure refuses once, keeps the selection and is re-checked"""
+        chatbot_cli.services["cache"] = CacheService(sample_config, mock_logger)
+        chatbot_cli.current_user = "test-user"
+        chatbot_cli.current_vector_store = "vector-store-1"
+        stores = chatbot_cli.get_accessible_vector_stores.return_value
+        chatbot_cli.get_accessible_vector_stores.side_effect = ConnectionError("CAS unreachable")
+
+        assert chatbot_cli._user_in_vector_store("vector-store-1") is False
+        assert chatbot_cli.current_vector_store == "vector-store-1"
+        chatbot_cli.get_accessible_vector_stores.assert_called_with(raise_errors=True)
+
+        chatbot_cli.get_accessible_vector_stores.side_effect = None
+        chatbot_cli.get_accessible_vector_stores.return_value = stores
+        assert chatbot_cli._user_in_vector_store("vector-store-1") is True
+        assert chatbot_cli.get_accessible_vector_stores.call_count == 2
+
+
+class TestVectorSearchAll:
+    """Test the vector search all command"""
+
+    @pytest.mark.unit
+    @pytest.mark.cli
+    def test_hits_merged_by_score_with_store(
+        self: Any, chatbot_cli: Any, sample_vector_stores: list[str]
+    ) -> None:
+        """TC-CLI-055: Verify hits from every store are merged by score"""
+        chatbot_cli.current_user = "test-user"
+        chatbot_cli.services["auth"].has_valid_token.return_value = True
+        chatbot_cli._get_input = Mock(side_effect=["test query", "2"])
+        chatbot_cli._display_search_chunks = Mock()
+        chatbot_cli.services["query"].query_vector_stores.return_value = iter(
+            [
+                ("vector-store-2", {"success": True, "data": [{"score": 0.4}]}),
+                (
+                    "vector-store-1",
+                    {"success": True, "data": [{"score": 0.9}, {"score": 0.2}]},
+                ),
+            ]
+        )
+
+        chatbot_cli.execute_command("vector search all")
+
+        chatbot_cli.services["query"].query_vector_stores.assert_called_once_with(
+            "test query", sample_vector_stores, limit=2
+        )
+        merged = chatbot_cli._display_search_chunks.call_args.args[0]["data"]
+        assert [(h["metadata"]["vector_store"], h["score"]) for h in merged] == [
+            ("vector-store-1", 0.9),
+            ("vector-store-2", 0.4),
+        ]
+        chatbot_cli.session_manager.add_query.assert_called_once()
+
+    @pytest.mark.unit
+    @pytest.mark.cli
+    def test_failed_store_reported_without_aborting(
+        self: Any, chatbot_cli: Any
+    ) -> None:
+        """TC-CLI-056: Verify one failing store is reported and the rest still shown"""
+        chatbot_cli.current_user = "test-user"
+        chatbot_cli.services["auth"].has_valid_token.return_value = True
+        chatbot_cli._get_input = Mock(side_effect=["test query", ""])
+        chatbot_cli._display_search_chunks = Mock()
+        chatbot_cli.services["query"].query_vector_stores.return_value = iter(
+            [
+                (
+                    "vector-store-1",
+                    {"success": False, "error": "Vector store query timed out"},
+                ),
+                ("vector-store-2", {"success": True, "data": [{"score": 0.5}]}),
+            ]
+        )
+
+        chatbot_cli.cmd_vector_search_all()
+
+        printed = str(chatbot_cli.console.print.call_args_list)
+        assert "vector-store-1: Vector store query timed out" in printed
+        merged = chatbot_cli._display_search_chunks.call_args.args[0]["data"]
+        assert len(merged) == 1
+
+
+class TestCommandMetrics:
+    """Test per-command metrics"""
+
+    @pytest.mark.unit
+    @pytest.mark.cli
+    @pytest.mark.metrics
+    def test_command_timing_labelled_by_command(
+        self: Any, chatbot_cli: Any, mock_metrics_service: Any
+    ) -> None:
+        """TC-CLI-057: Verify commands are timed under their name, not their arguments"""
+        chatbot_cli.cmd_vector_stores_select = Mock()
+
+        chatbot_cli._execute_timed("vector stores select my-store")
+
+        metric, _, labels = mock_metrics_service.record_timing.call_args.args
+        assert metric == "cli_command"
+        assert labels == {"command": "vector stores select"}
+        mock_metrics_service.increment.assert_called_once_with(
+            "cli_commands", labels={"command": "vector stores select"}
+        )
@@ -0,0 +1,308 @@
+"""
+Unit tests for KubeClient, Informer and KubeResourceCache
+"""
+
+import json
+import threading
+from collections.abc import Iterator
+from typing import Any
+from unittest.mock import Mock, patch
+
+import pytest
+from chatbot.services.kube_client import (
+    Informer,
+    KubeAPIError,
+    KubeClient,
+    KubeResourceCache,
+)
+from chatbot.services.user_service import UserService
+from chatbot.services.vector_store_service import VectorStoreService
+
+
+def _obj(name: str, rv: str, **extra: Any) -> dict[str, Any]:
+    return {"metadata": {"name": name, "resourceVersion": rv}, **extra}
+
+
+class FakeKubeClient:
+    """Serves a fixed list, then scripted watch streams"""
+
+    def __init__(
+        self,
+        items: list[dict[str, Any]],
+        watches: list[list[dict[str, Any]]] | None = None,
+        list_error: Exception | None = None,
+    ) -> None:
+        self.items = items
+        self.watches = list(watches or [])
+        self.list_error = list_error
+        self.list_calls = 0
+        self.watch_versions: list[str] = []
+        self.idle = threading.Event()
+
+    def list(self, path: str) -> tuple[list[dict[str, Any]], str]:
+        self.list_calls += 1
+        if self.list_error is not None:
+            raise self.list_error
+        return self.items, "100"
+
+    def watch(
+        self, path: str, resource_version: str, timeout_seconds: int = 300
+    ) -> Iterator[dict[str, Any]]:
+        self.watch_versions.append(resource_version)
+        if not self.watches:
+            self.idle.set()
+            threading.Event().wait(0.05)
+            return
+        yield from self.watches.pop(0)
+
+    def close(self) -> None:
+        pass
+
+
+class TestInformer:
+    """Test informer event handling"""
+
+    @pytest.mark.unit
+    @pytest.mark.kube
+    def test_apply_event_tracks_objects_and_resource_version(
+        self: Any, mock_logger: Any
+    ) -> None:
+        """TC-KUBE-001: Verify ADDED/MODIFIED/DELETED/BOOKMARK events update the local copy"""
+        informer = Informer(FakeKubeClient([]), "/apis/x", logger=mock_logger)
+
+        informer.apply_event({"type": "ADDED", "object": _obj("a", "1")})
+        informer.apply_event({"type": "ADDED", "object": _obj("b", "2")})
+        informer.apply_event({"type": "MODIFIED", "object": _obj("a", "3", spec={"x": 1})})
+        informer.apply_event({"type": "DELETED", "object": _obj("b", "4")})
+        informer.apply_event({"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "9"}}})
+
+        assert [o["metadata"]["name"] for o in informer.list()] == ["a"]
+        assert informer.get("a")["spec"] == {"x": 1}
+        assert informer.resource_version == "9"
+
+    @pytest.mark.unit
+    @pytest.mark.kube
+    def test_gone_error_event_raises_410(self: Any, mock_logger: Any) -> None:
+        """TC-KUBE-002: Verify a watch ERROR event surfaces its status code"""
+        informer = Informer(FakeKubeClient([]), "/apis/x", logger=mock_logger)
+
+        with pytest.raises(KubeAPIError) as exc_info:
+            informer.apply_event(
+                {"type": "ERROR", "object": {"code": 410, "message": "too old"}}
+            )
+
+        assert exc_info.value.status == 410
+
+    @pytest.mark.unit
+    @pytest.mark.kube
+    def test_informer_lists_then_watches_and_relists_on_gone(
+        self: Any, mock_logger: Any
+    ) -> None:
+        """TC-KUBE-003: Verify the informer syncs from a list, applies watches and relists after 410"""
+        client = FakeKubeClient(
+            [_obj("vs1", "100")],
+            watches=[
+                [{"type": "ADDED", "object": _obj("vs2", "101")}],
+                [{"type": "ERROR", "object": {"code": 410}}],
+            ],
+        )
+        informer = Informer(client, "/apis/x", logger=mock_logger, retry_delay=0)
+        informer.start()
+
+        assert informer.wait_for_sync(5)
+        assert client.idle.wait(5)
+        informer.stop()
+
+        assert client.list_calls == 2
+        assert client.watch_versions[:3] == ["100", "101", "100"]
+        # The relist replaced the watched state with the listed one
+        assert [o["metadata"]["name"] for o in informer.list()] == ["vs1"]
+
+
+    @pytest.mark.unit
+    @pytest.mark.kube
+    def test_failed_relist_after_watch_error_marks_stale(
+        self: Any, mock_logger: Any
+    ) -> None:
+        """TC-KUBE-009: Verify a relist failing after a watch error clears synced until a list succeeds"""
+        client = FakeKubeClient([_obj("vs1", "100")])
+        informer = Informer(
+            client, "/apis/x", logger=mock_logger, retry_delay=0.01, max_retry_delay=0.05
+        )
+        informer.start()
+        assert informer.wait_for_sync(5)
+
+        # The token expires: the watch is rejected and so is every relist
+        client.list_error = KubeAPIError("Unauthorized", status=401)
+        client.watches.append([{"type": "ERROR", "object": {"code": 401}}])
+        for _ in range(500):
+            if not informer.synced.is_set():
+                break
+            threading.Event().wait(0.01)
+        assert informer.wait_for_sync(0) is False
+
+        client.list_error = None
+        assert informer.synced.wait(5)
+        informer.stop()
+
+    @pytest.mark.unit
+    @pytest.mark.kube
+    def test_forbidden_list_backs_off_and_warns_once(
+        self: Any, mock_logger: Any
+    ) -> None:
+        """TC-KUBE-010: Verify a persistent 403 is retried with exponential backoff and warned about once"""
+        client = FakeKubeClient([], list_error=KubeAPIError("Forbidden", status=403))
+        informer = Informer(
+            client, "/apis/x", logger=mock_logger, retry_delay=1, max_retry_delay=4
+        )
+        delays: list[float] = []
+
+        def record_wait(delay: float) -> bool:
+            delays.append(delay)
+            if len(delays) == 5:
+                informer.stop()
+            return informer._stop.is_set()
+
+        with patch.object(informer._stop, "wait", side_effect=record_wait):
+            informer._run()
+
+        assert delays == [1, 2, 4, 4, 4]
+        assert client.list_calls == 5
+        assert mock_logger.warning.call_count == 1
+        assert informer.status() == {
+            "synced": False,
+            "objects": 0,
+            "resource_version": "",
+            "last_error": "Forbidden",
+            "failures": 5,
+        }
+
+
+class TestKubeClient:
+    """Test the pooled HTTP client"""
+
+    @pytest.mark.unit
+    @pytest.mark.kube
+    def test_list_and_watch_parse_responses(self: Any, mock_logger: Any) -> None:
+        """TC-KUBE-004: Verify list returns items/resourceVersion and watch yields events"""
+        client = KubeClient("https://api.test:6443", lambda: "tok", logger=mock_logger)
+        list_response = Mock(status_code=200)
+        list_response.json.return_value = {
+            "metadata": {"resourceVersion": "42"},
+            "items": [_obj("u1", "41")],
+        }
+        watch_response = Mock(status_code=200)
+        watch_response.iter_lines.return_value = [
+            json.dumps({"type": "ADDED", "object": _obj("u2", "43")}).encode(),
+            b"",
+        ]
+        client.session = Mock()
+        client.session.get.side_effect = [list_response, watch_response]
+
+        items, rv = client.list("/apis/user.openshift.io/v1/users")
+        events = list(client.watch("/apis/user.openshift.io/v1/users", rv))
+
+        assert rv == "42" and items[0]["metadata"]["name"] == "u1"
+        assert events == [{"type": "ADDED", "object": _obj("u2", "43")}]
+        watch_kwargs = client.session.get.call_args_list[1][1]
+        assert watch_kwargs["params"]["resourceVersion"] == "42"
+        assert watch_kwargs["headers"]["Authorization"] == "Bearer tok"
+
+    @pytest.mark.unit
+    @pytest.mark.kube
+    def test_error_status_raises(self: Any, mock_logger: Any) -> None:
+        """TC-KUBE-005: Verify non-200 responses raise KubeAPIError with the status"""
+        client = KubeClient("https://api.test:6443", lambda: "tok", logger=mock_logger)
+        client.session = Mock()
+        client.session.get.return_value = Mock(status_code=403)
+
+        with pytest.raises(KubeAPIError) as exc_info:
+            client.list("/apis/x")
+
+        assert exc_info.value.status == 403
+
+
+class TestKubeResourceCacheFallback:
+    """Test service integration and the oc fallback"""
+
+    @pytest.mark.unit
+    @pytest.mark.kube
+    def test_unreachable_api_returns_none_without_waiting(
+        self: Any, mock_logger: Any
+    ) -> None:
+        """TC-KUBE-006: Verify a failed first list makes lookups fall back immediately"""
+        client = FakeKubeClient([], list_error=KubeAPIError("refused"))
+        kube = KubeResourceCache(client, sync_timeout=30, logger=mock_logger)  # type: ignore[arg-type]
+
+        assert kube.list(KubeResourceCache.USERS) is None
+        assert kube.get(KubeResourceCache.USERS, "alice") == (False, None)
+        assert kube.get_status()["/apis/user.openshift.io/v1/users"]["synced"] is False
+        kube.close()
+
+    @pytest.mark.unit
+    @pytest.mark.kube
+    @patch("chatbot.services.vector_store_service.subprocess.run")
+    def test_vector_store_service_uses_informer(
+        self: Any,
+        mock_run: Mock,
+        sample_config: dict[str, Any],
+        mock_auth_service: Any,
+        mock_logger: Any,
+        mock_cache_service: Any,
+        mock_console: Any,
+    ) -> None:
+        """TC-KUBE-007: Verify domains and CRACs come from informers without oc"""
+        kube = Mock()
+        kube.list.side_effect = lambda resource, namespace=None: {
+            KubeResourceCache.DOMAINS: [_obj("vs-b", "1"), _obj("vs-a", "2")],
+            KubeResourceCache.CRACS: [
+                {
+                    "metadata": {"name": "crac-a"},
+                    "spec": {
+                        "resourceRef": {"name": "vs-a"},
+                        "subjects": {"users": [{"name": "alice"}]},
+                    },
+                    "status": {
+                        "conditions": [{"type": "ValidatedUsers", "status": "True"}]
+                    },
+                }
+            ],
+        }[resource]
+        service = VectorStoreService(
+            sample_config,
+            mock_auth_service,
+            mock_logger,
+            mock_cache_service,
+            mock_console,
+            kube=kube,
+        )
+
+        assert service.list_vector_stores("ibm-cas") == ["vs-a", "vs-b"]
+        assert service.get_assigned_users("vs-a") == ["alice"]
+        mock_run.assert_not_called()
+        mock_cache_service.get_or_compute.assert_not_called()
+
+    @pytest.mark.unit
+    @pytest.mark.kube
+    @patch("chatbot.services.user_service.subprocess.run")
+    def test_user_service_falls_back_to_oc(
+        self: Any,
+        mock_run: Mock,
+        sample_config: dict[str, Any],
+        mock_auth_service: Any,
+        mock_logger: Any,
+        mock_cache_service: Any,
+    ) -> None:
+        """TC-KUBE-008: Verify oc is used when the informer is not available"""
+        kube = Mock()
+        kube.list.return_value = None
+        mock_run.return_value = Mock(
+            returncode=0,
+            stdout=json.dumps({"items": [{"metadata": {"name": "bob"}}]}).encode(),
+        )
+        service = UserService(
+            sample_config, mock_auth_service, mock_logger, mock_cache_service, kube=kube
+        )
+
+        assert service.list_oc_users() == ["bob"]
+        mock_run.assert_called_once()
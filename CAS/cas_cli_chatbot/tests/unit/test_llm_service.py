@@ -415,9 +415,10 @@ class TestLLMServiceMetricsTracking:
 
         # Check that attempts metric was called (it's called before success)
         calls: list[Any] = [
-            call[0][0] for call in mock_metrics_service.increment.call_args_list
+            (call.args[0], call.kwargs.get("labels"))
+            for call in mock_metrics_service.increment.call_args_list
         ]
-        assert "llm_attempts_nvidia" in calls
+        assert ("llm_attempts", {"provider": "nvidia"}) in calls
 
     @pytest.mark.unit
     @pytest.mark.llm
@@ -439,9 +440,10 @@ class TestLLMServiceMetricsTracking:
 
         # Check that success metric was incremented
         calls: list[Any] = [
-            call[0][0] for call in mock_metrics_service.increment.call_args_list
+            (call.args[0], call.kwargs.get("labels"))
+            for call in mock_metrics_service.increment.call_args_list
         ]
-        assert "llm_success_nvidia" in calls
+        assert ("llm_success", {"provider": "nvidia"}) in calls
 
     @pytest.mark.unit
     @pytest.mark.llm
@@ -463,9 +465,10 @@ class TestLLMServiceMetricsTracking:
 
         # Check that error metric was incremented
         calls: list[Any] = [
-            call[0][0] for call in mock_metrics_service.increment.call_args_list
+            (call.args[0], call.kwargs.get("labels"))
+            for call in mock_metrics_service.increment.call_args_list
         ]
-        assert "llm_error_nvidia" in calls
+        assert ("llm_error", {"provider": "nvidia"}) in calls
 
     @pytest.mark.unit
     @pytest.mark.llm
@@ -487,8 +490,9 @@ class TestLLMServiceMetricsTracking:
 
         # Check that timing was recorded
         mock_metrics_service.record_timing.assert_called_once()
-        call_args = mock_metrics_service.record_timing.call_args[0]
-        assert "llm_nvidia_duration" in call_args[0]
+        call_args = mock_metrics_service.record_timing.call_args
+        assert call_args.args[0] == "llm_duration"
+        assert call_args.kwargs["labels"] == {"provider": "nvidia"}
 
 
 class TestLLMServiceProviderStatus:
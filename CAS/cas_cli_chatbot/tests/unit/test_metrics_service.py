@@ -0,0 +1,171 @@
+"""
+Unit tests for MetricsService and QuantileSketch
+"""
+
+import random
+from pathlib import Path
+from typing import Any
+
+import pytest
+from chatbot.services.metrics_service import MetricsService, QuantileSketch, Timer
+
+
+def _exact_quantile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+class TestQuantileSketch:
+    """Test the streaming quantile sketch"""
+
+    @pytest.mark.unit
+    @pytest.mark.metrics
+    def test_quantiles_within_relative_accuracy(self: Any) -> None:
+        """TC-METRICS-001: Verify p50/p95/p99 stay within the accuracy bound over a long stream"""
+        rng = random.Random(42)
+        values = [rng.lognormvariate(4, 1) for _ in range(20000)]
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+
+        for q in (0.5, 0.95, 0.99):
+            exact = _exact_quantile(values, q)
+            assert abs(sketch.quantile(q) - exact) <= 0.011 * exact
+        assert sketch.count == 20000
+        assert sketch.max == max(values)
+
+    @pytest.mark.unit
+    @pytest.mark.metrics
+    def test_memory_bounded_by_max_buckets(self: Any) -> None:
+        """TC-METRICS-002: Verify bucket count never exceeds max_buckets"""
+        sketch = QuantileSketch(relative_accuracy=0.01, max_buckets=64)
+        for exponent in range(-6, 7):
+            for step in range(1, 100):
+                sketch.add(step * 10.0**exponent)
+
+        assert len(sketch.buckets) <= 64
+        # The top of the range is kept accurate
+        assert abs(sketch.quantile(1.0) - sketch.max) <= 0.01 * sketch.max
+
+    @pytest.mark.unit
+    @pytest.mark.metrics
+    def test_merge_matches_single_stream(self: Any) -> None:
+        """TC-METRICS-003: Verify merging two sketches equals sketching both streams"""
+        left, right, both = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for value in range(1, 500):
+            left.add(float(value))
+            both.add(float(value))
+        for value in range(500, 2000):
+            right.add(float(value))
+            both.add(float(value))
+
+        left.merge(right)
+
+        assert left.buckets == both.buckets
+        assert left.count == both.count
+        assert left.quantile(0.99) == both.quantile(0.99)
+        with pytest.raises(ValueError):
+            left.merge(QuantileSketch(relative_accuracy=0.05))
+
+
+class TestMetricsServiceLabels:
+    """Test labelled series"""
+
+    @pytest.mark.unit
+    @pytest.mark.metrics
+    def test_labelled_series_kept_apart_and_aggregated(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-METRICS-004: Verify each label set is a series and reads without labels aggregate"""
+        metrics = MetricsService(sample_config, mock_logger)
+        metrics.increment("llm_attempts", labels={"provider": "openai"})
+        metrics.increment("llm_attempts", labels={"provider": "openai"})
+        metrics.increment("llm_attempts", labels={"provider": "ollama"})
+        metrics.record_timing("llm_duration", 100.0, labels={"provider": "openai"})
+        metrics.record_timing("llm_duration", 300.0, labels={"provider": "ollama"})
+
+        assert metrics.get_counter("llm_attempts", {"provider": "openai"}) == 2
+        assert metrics.get_counter("llm_attempts") == 3
+        assert metrics.get_timing_stats("llm_duration", {"provider": "ollama"})["count"] == 1
+        assert metrics.get_timing_stats("llm_duration")["count"] == 2
+
+        all_metrics = metrics.get_all_metrics()
+        assert all_metrics["counters"]['llm_attempts{provider="ollama"}'] == 1
+        assert 'llm_duration{provider="openai"}' in all_metrics["timings"]
+
+    @pytest.mark.unit
+    @pytest.mark.metrics
+    def test_timer_records_labelled_timing_and_error(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-METRICS-005: Verify Timer passes labels to timing and error series"""
+        metrics = MetricsService(sample_config, mock_logger)
+
+        with pytest.raises(RuntimeError):
+            with Timer(metrics, "search", labels={"vector_store": "vs-1"}):
+                raise RuntimeError("boom")
+
+        assert metrics.get_timing_stats("search", {"vector_store": "vs-1"})["count"] == 1
+        assert metrics.get_all_metrics()["errors"] == {
+            'search_error{vector_store="vs-1"}': 1
+        }
+
+
+class TestMetricsServiceExport:
+    """Test OpenMetrics export"""
+
+    @pytest.mark.unit
+    @pytest.mark.metrics
+    def test_openmetrics_text(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-METRICS-006: Verify counters, errors and summaries render as OpenMetrics"""
+        metrics = MetricsService(sample_config, mock_logger)
+        metrics.increment("cli_commands", labels={"command": "vector search"})
+        metrics.record_error("llm", labels={"provider": "openai"})
+        metrics.record_timing("cli_command", 12.5, labels={"command": "help"})
+
+        text = metrics.to_openmetrics()
+        lines = text.splitlines()
+
+        assert "# TYPE cas_cli_cli_commands counter" in lines
+        assert 'cas_cli_cli_commands_total{command="vector search"} 1' in lines
+        assert 'cas_cli_errors_total{provider="openai",type="llm"} 1' in lines
+        assert "# TYPE cas_cli_cli_command_milliseconds summary" in lines
+        assert "# UNIT cas_cli_cli_command_milliseconds milliseconds" in lines
+        assert 'cas_cli_cli_command_milliseconds_count{command="help"} 1' in lines
+        assert any(
+            line.startswith('cas_cli_cli_command_milliseconds{command="help",quantile="0.99"}')
+            for line in lines
+        )
+        assert lines[-1] == "# EOF"
+
+    @pytest.mark.unit
+    @pytest.mark.metrics
+    def test_label_values_escaped(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-METRICS-007: Verify quotes and backslashes in label values are escaped"""
+        metrics = MetricsService(sample_config, mock_logger)
+        metrics.increment("queries", labels={"vector_store": 'a"b\\c'})
+
+        assert 'cas_cli_queries_total{vector_store="a\\"b\\\\c"} 1' in metrics.to_openmetrics()
+
+    @pytest.mark.unit
+    @pytest.mark.metrics
+    def test_textfile_written_for_collector(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any, tmp_path: Path
+    ) -> None:
+        """TC-METRICS-008: Verify the export is written to the textfile path and refreshed on close"""
+        path = tmp_path / "cas_cli.prom"
+        sample_config["metrics"] = {"textfile_path": str(path), "textfile_interval": 60}
+        metrics = MetricsService(sample_config, mock_logger)
+
+        assert metrics.start_textfile_export() is True
+        assert path.read_text().endswith("# EOF\n")
+
+        metrics.increment("cli_commands", labels={"command": "help"})
+        metrics.close()
+
+        assert 'cas_cli_cli_commands_total{command="help"} 1' in path.read_text()
+        assert list(tmp_path.iterdir()) == [path]
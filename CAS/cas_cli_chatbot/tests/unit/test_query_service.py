@@ -2,10 +2,14 @@
 Unit tests for QueryService
 """
 
+import socket
+import threading
+import time
 from typing import Any
 from unittest.mock import Mock, patch
 
 import pytest
+import requests
 from chatbot.services.query_service import QueryService
 
 
@@ -46,7 +50,7 @@ class TestQueryServiceTokenValidation:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.post")
+    @patch("chatbot.services.query_service.requests.Session.post")
     def test_query_proceeds_when_bearer_token_valid(
         self: Any,
         mock_post: Mock,
@@ -73,7 +77,7 @@ class TestQueryServiceVectorStoreQueries:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.post")
+    @patch("chatbot.services.query_service.requests.Session.post")
     def test_successful_query_to_vector_store(
         self: Any,
         mock_post: Mock,
@@ -101,7 +105,7 @@ class TestQueryServiceVectorStoreQueries:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.post")
+    @patch("chatbot.services.query_service.requests.Session.post")
     def test_default_vector_store_used_when_not_specified(
         self: Any,
         mock_post: Mock,
@@ -127,7 +131,7 @@ class TestQueryServiceVectorStoreQueries:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.post")
+    @patch("chatbot.services.query_service.requests.Session.post")
     def test_default_limit_used_when_not_specified(
         self: Any,
         mock_post: Mock,
@@ -154,7 +158,7 @@ class TestQueryServiceVectorStoreQueries:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.post")
+    @patch("chatbot.services.query_service.requests.Session.post")
     def test_query_results_cached_when_cache_available(
         self: Any,
         mock_post: Mock,
@@ -184,7 +188,7 @@ class TestQueryServiceVectorStoreQueries:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.post")
+    @patch("chatbot.services.query_service.requests.Session.post")
     def test_cached_results_returned_on_subsequent_queries(
         self: Any,
         mock_post: Mock,
@@ -211,7 +215,7 @@ class TestQueryServiceVectorStoreQueries:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.post")
+    @patch("chatbot.services.query_service.requests.Session.post")
     def test_query_timeout_handling(
         self: Any,
         mock_post: Mock,
@@ -232,7 +236,7 @@ class TestQueryServiceVectorStoreQueries:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.post")
+    @patch("chatbot.services.query_service.requests.Session.post")
     def test_error_handling_for_invalid_vector_store(
         self: Any,
         mock_post: Mock,
@@ -257,7 +261,7 @@ class TestQueryServiceVectorStoreQueries:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.post")
+    @patch("chatbot.services.query_service.requests.Session.post")
     def test_error_handling_for_network_failures(
         self: Any,
         mock_post: Mock,
@@ -282,7 +286,7 @@ class TestQueryServiceFilteredQueries:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.post")
+    @patch("chatbot.services.query_service.requests.Session.post")
     def test_query_with_filters_executes_successfully(
         self: Any,
         mock_post: Mock,
@@ -310,7 +314,7 @@ class TestQueryServiceFilteredQueries:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.post")
+    @patch("chatbot.services.query_service.requests.Session.post")
     def test_filters_properly_formatted_in_request(
         self: Any,
         mock_post: Mock,
@@ -343,7 +347,7 @@ class TestQueryServiceVectorStoreManagement:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.get")
+    @patch("chatbot.services.query_service.requests.Session.get")
     def test_list_vector_stores_returns_all_available(
         self: Any,
         mock_get: Mock,
@@ -371,7 +375,7 @@ class TestQueryServiceVectorStoreManagement:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.get")
+    @patch("chatbot.services.query_service.requests.Session.get")
     def test_vector_store_list_cached(
         self: Any,
         mock_get: Mock,
@@ -401,7 +405,7 @@ class TestQueryServiceVectorStoreManagement:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.get")
+    @patch("chatbot.services.query_service.requests.Session.get")
     def test_empty_list_when_no_vector_stores(
         self: Any,
         mock_get: Mock,
@@ -423,13 +427,34 @@ class TestQueryServiceVectorStoreManagement:
 
         assert result == []
 
+    @pytest.mark.unit
+    @pytest.mark.query
+    @patch("chatbot.services.query_service.requests.Session.get")
+    def test_list_failure_raises_only_when_asked(
+        self: Any,
+        mock_get: Mock,
+        sample_config: dict[str, Any],
+        mock_logger: Any,
+        mock_auth_service: Any,
+    ) -> None:
+        """TC-QUERY-032: Verify a failed listing returns [] by default and raises with raise_errors"""
+        mock_get.side_effect = requests.exceptions.ConnectionError("CAS unreachable")
+
+        query_service = QueryService(
+            sample_config, mock_logger, auth_service=mock_auth_service
+        )
+
+        assert query_service.list_vector_stores(use_cache=False) == []
+        with pytest.raises(requests.exceptions.ConnectionError):
+            query_service.list_vector_stores(use_cache=False, raise_errors=True)
+
 
 class TestQueryServiceFileContent:
     """Test file content retrieval"""
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.get")
+    @patch("chatbot.services.query_service.requests.Session.get")
     def test_get_file_content_retrieves_for_valid_file(
         self: Any,
         mock_get: Mock,
@@ -457,7 +482,7 @@ class TestQueryServiceFileContent:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.get")
+    @patch("chatbot.services.query_service.requests.Session.get")
     def test_error_handling_for_invalid_vector_store_id(
         self: Any,
         mock_get: Mock,
@@ -478,7 +503,7 @@ class TestQueryServiceFileContent:
 
     @pytest.mark.unit
     @pytest.mark.query
-    @patch("chatbot.services.query_service.requests.get")
+    @patch("chatbot.services.query_service.requests.Session.get")
     def test_error_handling_for_invalid_file_id(
         self: Any,
         mock_get: Mock,
@@ -519,7 +544,7 @@ class TestQueryServiceCacheManagement:
         )
         query_service.clear_cache()
 
-        mock_cache_service.clear_pattern.assert_called_once_with("query_*")
+        mock_cache_service.invalidate_tag.assert_called_once_with("query")
 
     @pytest.mark.unit
     @pytest.mark.query
@@ -542,3 +567,174 @@ class TestQueryServiceCacheManagement:
         assert "cache_enabled" in stats
         assert stats["cache_enabled"] is True
         assert "cache_stats" in stats
+
+
+class TestQueryServiceHTTPSession:
+    """Test the pooled HTTP session"""
+
+    @pytest.mark.unit
+    @pytest.mark.query
+    def test_session_mounts_retrying_pooled_adapter(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-QUERY-027: Verify the session retries gateway errors over a sized pool"""
+        sample_config["http"] = {"pool_size": 4, "max_retries": 3}
+        query_service = QueryService(sample_config, mock_logger)
+
+        adapter = query_service.session.get_adapter("https://cas.example.com")
+        assert adapter._pool_maxsize == 4
+        assert adapter.max_retries.total == 3
+        assert set(adapter.max_retries.status_forcelist) == {502, 503, 504}
+        assert "POST" in adapter.max_retries.allowed_methods
+
+    @pytest.mark.unit
+    @pytest.mark.query
+    def test_read_timeout_is_not_retried(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-QUERY-033: Verify a read timeout fails after one attempt instead of being retried"""
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen(8)
+        server.settimeout(0.1)
+        accepted: list[socket.socket] = []
+        done = threading.Event()
+
+        def accept_and_stall() -> None:
+            while not done.is_set():
+                try:
+                    accepted.append(server.accept()[0])
+                except OSError:
+                    continue
+
+        acceptor = threading.Thread(target=accept_and_stall, daemon=True)
+        acceptor.start()
+        sample_config["http"] = {"max_retries": 3, "backoff_factor": 0}
+        query_service = QueryService(sample_config, mock_logger)
+        url = f"http://127.0.0.1:{server.getsockname()[1]}/v1/vector_stores"
+
+        try:
+            with pytest.raises(requests.exceptions.ReadTimeout):
+                query_service.session.get(url, timeout=(1, 0.2))
+            time.sleep(0.2)
+            assert len(accepted) == 1
+        finally:
+            done.set()
+            acceptor.join(timeout=1)
+            for conn in accepted:
+                conn.close()
+            server.close()
+            query_service.close()
+
+    @pytest.mark.unit
+    @pytest.mark.query
+    @patch("chatbot.services.query_service.requests.Session.post")
+    def test_requests_reuse_session_with_split_timeouts(
+        self: Any,
+        mock_post: Mock,
+        sample_config: dict[str, Any],
+        mock_logger: Any,
+        mock_auth_service: Any,
+        mock_requests_response: Any,
+    ) -> None:
+        """TC-QUERY-028: Verify searches share one session and separate connect/read timeouts"""
+        mock_post.return_value = mock_requests_response
+        query_service = QueryService(
+            sample_config, mock_logger, auth_service=mock_auth_service
+        )
+
+        query_service.query_vector_store("first query", use_cache=False)
+        query_service.query_vector_store("second query", use_cache=False)
+
+        assert mock_post.call_count == 2
+        assert mock_post.call_args.kwargs["timeout"] == (5, 30)
+
+    @pytest.mark.unit
+    @pytest.mark.query
+    @pytest.mark.metrics
+    @patch("chatbot.services.query_service.requests.Session.get")
+    def test_request_latency_recorded_per_endpoint(
+        self: Any,
+        mock_get: Mock,
+        sample_config: dict[str, Any],
+        mock_logger: Any,
+        mock_auth_service: Any,
+        mock_metrics_service: Any,
+    ) -> None:
+        """TC-QUERY-029: Verify each CAS endpoint records latency and failures"""
+        mock_response = Mock()
+        mock_response.ok = False
+        mock_response.raise_for_status.side_effect = Exception("503 Service Unavailable")
+        mock_get.return_value = mock_response
+        query_service = QueryService(
+            sample_config,
+            mock_logger,
+            auth_service=mock_auth_service,
+            metrics_service=mock_metrics_service,
+        )
+
+        assert query_service.list_vector_stores() == []
+
+        labels = {"endpoint": "list_vector_stores"}
+        metric, duration_ms, timing_labels = (
+            mock_metrics_service.record_timing.call_args.args
+        )
+        assert metric == "cas_http_request"
+        assert duration_ms >= 0
+        assert timing_labels == labels
+        mock_metrics_service.increment.assert_called_once_with(
+            "cas_http_requests", labels=labels
+        )
+        mock_metrics_service.record_error.assert_called_once_with(
+            "cas_http", labels=labels
+        )
+
+
+class TestQueryServiceFanOut:
+    """Test concurrent search across vector stores"""
+
+    @pytest.mark.unit
+    @pytest.mark.query
+    def test_results_yielded_as_stores_answer(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-QUERY-030: Verify fan-out runs concurrently and yields in answer order"""
+        delays = {"slow-vs": 0.2, "fast-vs": 0.0, "mid-vs": 0.1}
+
+        def search(user_query: str, vector_store: str, **kwargs: Any) -> dict[str, Any]:
+            time.sleep(delays[vector_store])
+            return {"success": True, "data": [{"score": delays[vector_store]}]}
+
+        query_service = QueryService(sample_config, mock_logger)
+        with patch.object(query_service, "query_vector_store", side_effect=search):
+            start = time.monotonic()
+            results = list(
+                query_service.query_vector_stores("q", ["slow-vs", "fast-vs", "mid-vs"])
+            )
+            elapsed = time.monotonic() - start
+
+        assert [store for store, _ in results] == ["fast-vs", "mid-vs", "slow-vs"]
+        assert elapsed < 0.3
+
+    @pytest.mark.unit
+    @pytest.mark.query
+    def test_slow_store_reported_as_timeout(
+        self: Any, sample_config: dict[str, Any], mock_logger: Any
+    ) -> None:
+        """TC-QUERY-031: Verify a store past its timeout yields a timeout error"""
+        release = threading.Event()
+
+        def search(user_query: str, vector_store: str, **kwargs: Any) -> dict[str, Any]:
+            if vector_store == "stuck-vs":
+                release.wait(5)
+            return {"success": True, "data": []}
+
+        sample_config["search_all"] = {"store_timeout": 0.1}
+        query_service = QueryService(sample_config, mock_logger)
+        with patch.object(query_service, "query_vector_store", side_effect=search):
+            results = dict(query_service.query_vector_stores("q", ["ok-vs", "stuck-vs"]))
+        release.set()
+
+        assert results["ok-vs"]["success"] is True
+        assert results["stuck-vs"]["success"] is False
+        assert results["stuck-vs"]["error_code"] == "TIMEOUT_ERROR"
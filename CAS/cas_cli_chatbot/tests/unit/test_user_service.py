@@ -8,6 +8,7 @@ from typing import Any
 from unittest.mock import Mock, patch
 
 import pytest
+from chatbot.services.cache_service import CacheService
 from chatbot.services.user_service import UserService
 
 
@@ -443,3 +444,31 @@ class TestUserServiceSyncUsers:
 
         assert stats["ocp_count"] == 2
         assert stats["total_unique"] == 2
+
+
+class TestUserServiceCacheStampede:
+    """Test list_oc_users against a real CacheService"""
+
+    @pytest.mark.unit
+    @pytest.mark.user
+    @patch("chatbot.services.user_service.subprocess.run")
+    def test_failed_fetch_is_not_retried_within_negative_ttl(
+        self: Any,
+        mock_run: Mock,
+        sample_config: dict[str, Any],
+        mock_auth_service: Any,
+        mock_logger: Any,
+    ) -> None:
+        """TC-USER-017: Verify a failing oc call is not repeated by the next caller"""
+        mock_run.side_effect = subprocess.CalledProcessError(
+            1, "oc", stderr=b"Unauthorized"
+        )
+        cache_service = CacheService(sample_config, mock_logger)
+        user_service = UserService(
+            sample_config, mock_auth_service, mock_logger, cache_service
+        )
+
+        assert user_service.list_oc_users() == []
+        assert user_service.list_oc_users() == []
+
+        assert mock_run.call_count == 1
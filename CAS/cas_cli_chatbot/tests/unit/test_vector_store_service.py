@@ -7,6 +7,7 @@ from typing import Any
 from unittest.mock import Mock, patch
 
 import pytest
+from chatbot.services.cache_service import CacheService
 from chatbot.services.vector_store_service import VectorStoreService
 
 
@@ -58,9 +59,12 @@ class TestVectorStoreServiceAssignments:
             "user1",
             "user2",
         ]
-        mock_cache_service.delete.assert_called_once_with("domain_users_test-vs")
+        mock_cache_service.get.assert_not_called()
         mock_cache_service.set.assert_called_once_with(
-            "domain_users_test-vs", ["user1", "user2"], ttl_seconds=300
+            "crac_snapshot_ibm-cas",
+            {"test-vs": {"users": ["user1", "user2"], "groups": []}},
+            ttl_seconds=300,
+            tags=("crac", "namespace:ibm-cas"),
         )
 
     @pytest.mark.unit
@@ -112,12 +116,16 @@ class TestVectorStoreServiceAssignments:
             "group1",
             "group2",
         ]
-        mock_cache_service.delete.assert_called_once_with("domain_groups_test-vs")
+        mock_cache_service.get.assert_not_called()
         mock_cache_service.set.assert_called_once_with(
-            "domain_groups_test-vs", ["group1", "group2"], ttl_seconds=300
+            "crac_snapshot_ibm-cas",
+            {"test-vs": {"users": [], "groups": ["group1", "group2"]}},
+            ttl_seconds=300,
+            tags=("crac", "namespace:ibm-cas"),
         )
 
-    def test_get_assigned_users_uses_users_cache_key(
+    @pytest.mark.unit
+    def test_get_assigned_users_reads_access_snapshot(
         self: Any,
         sample_config: dict[str, Any],
         mock_auth_service: Any,
@@ -125,7 +133,9 @@ class TestVectorStoreServiceAssignments:
         mock_cache_service: Any,
         mock_console: Any,
     ) -> None:
-        mock_cache_service.get.return_value = ["cached-user"]
+        mock_cache_service.get.return_value = {
+            "test-vs": {"users": ["cached-user"], "groups": []}
+        }
 
         service = VectorStoreService(
             sample_config,
@@ -138,9 +148,10 @@ class TestVectorStoreServiceAssignments:
         users: list[str] = service.get_assigned_users("test-vs")
 
         assert users == ["cached-user"]
-        mock_cache_service.get.assert_called_once_with("domain_users_test-vs")
+        mock_cache_service.get.assert_called_once_with("crac_snapshot_ibm-cas")
 
-    def test_get_assigned_groups_uses_groups_cache_key(
+    @pytest.mark.unit
+    def test_get_assigned_groups_reads_access_snapshot(
         self: Any,
         sample_config: dict[str, Any],
         mock_auth_service: Any,
@@ -148,7 +159,9 @@ class TestVectorStoreServiceAssignments:
         mock_cache_service: Any,
         mock_console: Any,
     ) -> None:
-        mock_cache_service.get.return_value = ["cached-group"]
+        mock_cache_service.get.return_value = {
+            "test-vs": {"users": [], "groups": ["cached-group"]}
+        }
 
         service = VectorStoreService(
             sample_config,
@@ -161,4 +174,191 @@ class TestVectorStoreServiceAssignments:
         groups: list[str] = service.get_assigned_groups("test-vs")
 
         assert groups == ["cached-group"]
-        mock_cache_service.get.assert_called_once_with("domain_groups_test-vs")
+        mock_cache_service.get.assert_called_once_with("crac_snapshot_ibm-cas")
+
+    @pytest.mark.unit
+    @patch("chatbot.services.vector_store_service.subprocess.run")
+    def test_access_for_many_stores_costs_one_list(
+        self: Any,
+        mock_run: Mock,
+        sample_config: dict[str, Any],
+        mock_auth_service: Any,
+        mock_logger: Any,
+        mock_console: Any,
+    ) -> None:
+        items = [
+            {
+                "spec": {
+                    "resourceRef": {"name": f"vs-{i}"},
+                    "subjects": {
+                        "users": [{"name": f"user{i}"}],
+                        "groups": [{"name": f"group{i}"}],
+                    },
+                },
+                "status": {
+                    "conditions": [
+                        {"type": "ValidatedUsers", "status": "True"},
+                        {"type": "ValidatedGroups", "status": "False"},
+                    ]
+                },
+            }
+            for i in range(5)
+        ]
+        mock_run.return_value = Mock(
+            returncode=0, stdout=json.dumps({"items": items}).encode()
+        )
+        cache = CacheService(sample_config, mock_logger)
+
+        service = VectorStoreService(
+            sample_config,
+            mock_auth_service,
+            mock_logger,
+            cache,
+            mock_console,
+        )
+
+        for i in range(5):
+            assert service.get_assigned_users(f"vs-{i}") == [f"user{i}"]
+            assert service.get_assigned_groups(f"vs-{i}") == []
+        assert mock_run.call_count == 1
+
+        # A store missing from the cached snapshot is re-checked once; the
+        # refetched snapshot is not refetched again for other missing stores
+        assert service.get_assigned_users("unknown-vs") == []
+        assert mock_run.call_count == 2
+        assert service.get_assigned_users("unknown-vs") == []
+        assert service.get_assigned_groups("other-unknown-vs") == []
+        assert mock_run.call_count == 2
+
+    @pytest.mark.unit
+    @patch("chatbot.services.vector_store_service.subprocess.run")
+    def test_unsynced_informer_uses_cached_oc_list(
+        self: Any,
+        mock_run: Mock,
+        sample_config: dict[str, Any],
+        mock_auth_service: Any,
+        mock_logger: Any,
+        mock_console: Any,
+    ) -> None:
+        items = [
+            {
+                "spec": {
+                    "resourceRef": {"name": f"vs-{i}"},
+                    "subjects": {"users": [{"name": f"user{i}"}]},
+                },
+                "status": {"conditions": [{"type": "ValidatedUsers", "status": "True"}]},
+            }
+            for i in range(3)
+        ]
+        mock_run.return_value = Mock(
+            returncode=0, stdout=json.dumps({"items": items}).encode()
+        )
+        kube = Mock()
+        kube.list.return_value = None  # informer not synced, oc fallback
+        service = VectorStoreService(
+            sample_config,
+            mock_auth_service,
+            mock_logger,
+            CacheService(sample_config, mock_logger),
+            mock_console,
+            kube=kube,
+        )
+
+        for i in range(3):
+            assert service.get_assigned_users(f"vs-{i}") == [f"user{i}"]
+            assert service.get_assigned_groups(f"vs-{i}") == []
+        assert mock_run.call_count == 1
+
+        # Once the informer serves the CRACs, they are read from it uncached
+        kube.list.return_value = items[:1]
+        assert service.get_assigned_users("vs-0") == ["user0"]
+        assert service.get_assigned_users("vs-1") == []
+        assert mock_run.call_count == 1
+
+    @pytest.mark.unit
+    @patch("chatbot.services.vector_store_service.subprocess.run")
+    def test_crac_created_after_snapshot_is_found(
+        self: Any,
+        mock_run: Mock,
+        sample_config: dict[str, Any],
+        mock_auth_service: Any,
+        mock_logger: Any,
+        mock_console: Any,
+    ) -> None:
+        def crac(name: str) -> dict[str, Any]:
+            return {
+                "spec": {
+                    "resourceRef": {"name": name},
+                    "subjects": {"users": [{"name": f"{name}-user"}]},
+                },
+                "status": {"conditions": [{"type": "ValidatedUsers", "status": "True"}]},
+            }
+
+        def listing(items: list[dict[str, Any]]) -> Mock:
+            return Mock(returncode=0, stdout=json.dumps({"items": items}).encode())
+
+        mock_run.side_effect = [
+            listing([crac("vs-old")]),
+            listing([crac("vs-old"), crac("vs-new")]),
+        ]
+        service = VectorStoreService(
+            sample_config,
+            mock_auth_service,
+            mock_logger,
+            CacheService(sample_config, mock_logger),
+            mock_console,
+        )
+
+        assert service.get_assigned_users("vs-old") == ["vs-old-user"]
+        # vs-new's CRAC was created after the snapshot was cached
+        assert service.get_assigned_users("vs-new") == ["vs-new-user"]
+        assert service.get_assigned_users("vs-new") == ["vs-new-user"]
+        assert mock_run.call_count == 2
+
+
+class TestVectorStoreServiceInvalidation:
+    @pytest.mark.unit
+    def test_sync_invalidates_namespace_tag(
+        self: Any,
+        sample_config: dict[str, Any],
+        mock_auth_service: Any,
+        mock_logger: Any,
+        mock_cache_service: Any,
+        mock_console: Any,
+    ) -> None:
+        service = VectorStoreService(
+            sample_config,
+            mock_auth_service,
+            mock_logger,
+            mock_cache_service,
+            mock_console,
+        )
+
+        with patch.object(service, "list_vector_stores", return_value=["a", "b"]):
+            assert service.sync_vector_stores("ibm-cas") == 2
+
+        mock_cache_service.invalidate_tag.assert_called_once_with("namespace:ibm-cas")
+
+    @pytest.mark.unit
+    def test_invalidate_vector_store_uses_store_tag(
+        self: Any,
+        sample_config: dict[str, Any],
+        mock_auth_service: Any,
+        mock_logger: Any,
+        mock_cache_service: Any,
+        mock_console: Any,
+    ) -> None:
+        mock_cache_service.invalidate_tag.return_value = 3
+        service = VectorStoreService(
+            sample_config,
+            mock_auth_service,
+            mock_logger,
+            mock_cache_service,
+            mock_console,
+        )
+
+        assert service.invalidate_vector_store("test-vs") == 6
+        assert [c.args for c in mock_cache_service.invalidate_tag.call_args_list] == [
+            ("vector_store:test-vs",),
+            ("crac",),
+        ]